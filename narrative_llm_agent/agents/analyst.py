@@ -4,7 +4,6 @@ from crewai import Agent, LLM
 from langchain_openai import OpenAIEmbeddings, ChatOpenAI, OpenAI
 from langchain_nomic import NomicEmbeddings
 from pydantic import BaseModel, Field
-from langchain_chroma import Chroma
 from langchain.memory import ConversationBufferMemory, ReadOnlySharedMemory
 from langchain.chains import RetrievalQA
 from crewai.tools import tool
@@ -21,6 +20,12 @@ from narrative_llm_agent.tools.kgtool_cosine_sim import InformationTool
 # from narrative_llm_agent.tools.human_tool import HumanInputChainlit
 # from narrative_llm_agent.tools.human_tool_not_chainlit import HumanInputRun
 from narrative_llm_agent.config import get_config
+from narrative_llm_agent.util.catalog_index import get_catalog_index
+from narrative_llm_agent.util.embedding_cache import CachedEmbeddings, cache_embeddings
+from narrative_llm_agent.util.embeddings import make_embeddings
+from narrative_llm_agent.util.hybrid_retriever import get_app_retriever
+from narrative_llm_agent.util.retrieval_qa import MapReduceQA, StuffQA, make_qa_chain
+from narrative_llm_agent.util.vector_stores import get_vector_store
 
 
 class AnalystInput(BaseModel):
@@ -46,7 +51,8 @@ class AnalystAgent(KBaseAgent):
     _tutorial_db_dir: Path
     _api_key: str
     _tools_llm: ChatOpenAI
-    _embeddings: OpenAIEmbeddings | NomicEmbeddings
+    _embeddings: OpenAIEmbeddings | NomicEmbeddings | CachedEmbeddings
+    _doc_chains: dict[tuple[Path, str], RetrievalQA | MapReduceQA | StuffQA]
     def __init__(
         self: "AnalystAgent",
         llm: LLM,
@@ -61,7 +67,10 @@ class AnalystAgent(KBaseAgent):
         super().__init__(llm, token=token)
         self._api_key = self.__setup_api_key(api_key, provider=provider)
         self._tools_llm = self.__setup_tools_llm(provider=provider, model=tools_model)
-        self._embeddings = self.__setup_embeddings_model(provider=provider)
+        # the cborg embeddings use the same CBORG key, other providers use Nomic's
+        self._embeddings = cache_embeddings(
+            make_embeddings("cborg", self._api_key) if provider == "cborg" else make_embeddings("nomic")
+        )
 
         if catalog_db_dir is not None:
             self._catalog_db_dir = Path(catalog_db_dir)
@@ -79,6 +88,9 @@ class AnalystAgent(KBaseAgent):
 
         for db_path in [self._catalog_db_dir, self._docs_db_dir, self._tutorial_db_dir]:
             self.__check_db_directories(db_path)
+            # opens the shared store now, so the time it takes is spent at startup
+            get_vector_store(db_path, self._embeddings)
+        self._doc_chains = {}
         self.__init_agent()
 
 
@@ -128,19 +140,6 @@ class AnalystAgent(KBaseAgent):
             return ChatOpenAI(
                 model=model,
                 api_key=self._api_key)
-    def __setup_embeddings_model(self,provider: str) -> None:
-        """
-        Sets up the llm for the tools
-        """
-        if provider == "cborg":
-            #If using cborg, use this embedding
-            return OpenAIEmbeddings(openai_api_key=self._api_key,
-                                          openai_api_base="https://api.cborg.lbl.gov/v1", model="lbl/nomic-embed-text")
-        else:
-            # If using openai, Embedding functions to use
-            return NomicEmbeddings(nomic_api_key=os.environ.get("NOMIC_API_KEY"),
-                                     model="nomic-embed-text-v1.5",
-                                     dimensionality=768)
 
     def __init_agent(self: "AnalystAgent") -> None:
         # cfg = RunnableConfig()
@@ -157,14 +156,14 @@ class AnalystAgent(KBaseAgent):
             It is useful for answering questions about how to use KBase applications.
             It does not contain a list of KBase apps. Do not use it to search for KBase app
             presence. Input should be a fully formed question."""
-            return self._create_doc_chain(persist_directory=self._docs_db_dir).invoke(
+            return self._create_doc_chain(persist_directory=self._docs_db_dir, tool="docs").invoke(
                 {"query": query}
             )
         @tool("KBase tutorial retrieval tool")
         def kbase_tutorial_retrieval_tool(query: str):
             """This has the tutorial narratives. Useful for when you need to answer questions about using the KBase platform, apps, and features for establishing a workflow to acheive a scientific goal. Input should be a fully formed question. Do not use it to search for KBase app
             presence. Input should be a fully formed question."""
-            return self._create_doc_chain(persist_directory=self._tutorial_db_dir).invoke(
+            return self._create_doc_chain(persist_directory=self._tutorial_db_dir, tool="tutorial").invoke(
                 {"query": query}
             )
 
@@ -176,7 +175,7 @@ class AnalystAgent(KBaseAgent):
             print("running query against the catalog retrieval tool:")
             print(query)
             result = self._create_doc_chain(
-                persist_directory=self._catalog_db_dir
+                persist_directory=self._catalog_db_dir, tool="catalog"
             ).invoke({"query": query})
             print("got result")
             print(result)
@@ -225,26 +224,39 @@ class AnalystAgent(KBaseAgent):
             memory=True,
         )
 
-    def _create_doc_chain(self, persist_directory: str | Path):
-        """Create a retrieval qa chain for the given embeddings model and persist directory."""
-        # Use the persisted database
-        vectordb = Chroma(
-            persist_directory=str(persist_directory), embedding_function=self._embeddings
-        )
-        retriever = vectordb.as_retriever()
+    def _create_doc_chain(self, persist_directory: str | Path, tool: str = "docs"):
+        """
+        Create a retrieval qa chain for the given embeddings model and persist directory.
+        The chain type (refine, map_reduce, or stuff) is the one configured for the tool -
+        docs, tutorial, or catalog. The chain is made once for each directory and chain type,
+        and uses the shared vector store. The catalog tool can use the hybrid app search
+        instead (catalog_hybrid_search), or the local catalog index (catalog_index_path).
+        """
+        config = get_config()
+        chain_type = config.qa_chain_types[tool]
+        key = (Path(persist_directory), chain_type)
+        if key in self._doc_chains:
+            return self._doc_chains[key]
+        if tool == "catalog" and config.catalog_hybrid_search:
+            retriever = get_app_retriever(persist_directory, self._embeddings)
+        elif tool == "catalog" and config.catalog_index_path:
+            retriever = get_catalog_index(config.catalog_index_path).as_retriever(self._embeddings)
+        else:
+            retriever = get_vector_store(persist_directory, self._embeddings).as_retriever()
 
         memory = ConversationBufferMemory(memory_key="chat_history")
         readonlymemory = ReadOnlySharedMemory(memory=memory)
-        chain_type = "refine"
 
         # Retrieval chain
-        qa_chain = RetrievalQA.from_chain_type(
-            llm=self._tools_llm,
+        qa_chain = make_qa_chain(
+            self._tools_llm,
+            retriever,
             chain_type=chain_type,
-            retriever=retriever,
             memory=readonlymemory,
+            max_concurrency=config.qa_max_concurrency,
+            token_budget=config.qa_stuff_token_budget,
         )
-
+        self._doc_chains[key] = qa_chain
         return qa_chain
     def _create_KG_agent(self):
 
@@ -261,7 +273,7 @@ class AnalystAgent(KBaseAgent):
             ]
         )
 
-        tools=[InformationTool(uri=os.environ.get('NEO4J_URI'), user=os.environ.get('NEO4J_USERNAME'), password=os.environ.get('NEO4J_PASSWORD'))]
+        tools=[InformationTool()]
         print("tools:llm",self._tools_llm)
         agent = create_tool_calling_agent(self._tools_llm, tools, prompt)
         agent_executor = AgentExecutor(agent=agent, tools=tools, verbose=True)
@@ -2,6 +2,7 @@ from typing import Any, Optional
 from narrative_llm_agent.tools.app_tools import get_app_params
 from narrative_llm_agent.tools.job_tools import (
     CompletedJob,
+    JobMemoLedger,
     get_job_status,
     run_job
 )
@@ -70,8 +71,11 @@ class JobAgent(KBaseAgent):
         KBase applications using the Execution Engine. You work with the rest of your crew to run bioinformatics and
         data science analyses, handle job states, and return results."""
 
-    def __init__(self: "JobAgent", llm: LLM, token: str = None) -> "JobAgent":
+    def __init__(
+        self: "JobAgent", llm: LLM, token: str = None, job_memo: JobMemoLedger | None = None
+    ) -> "JobAgent":
         super().__init__(llm, token=token)
+        self._job_memo = job_memo
         self.__init_agent()
 
     def __init_agent(self: "JobAgent") -> None:
@@ -113,6 +117,7 @@ class JobAgent(KBaseAgent):
                 ExecutionEngine(token=self._token),
                 NarrativeMethodStore(),
                 Workspace(token=self._token),
+                memo=self._job_memo,
             )
 
         self.agent = Agent(
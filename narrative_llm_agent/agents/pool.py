@@ -0,0 +1,86 @@
+"""
+Pools of agents (or crews of agents) that get reused between tasks, instead of being
+built from scratch each time. Building one can mean setting up several agents, their LLM
+clients, and service clients, which adds up over a workflow with many steps.
+"""
+import logging
+import threading
+import time
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from typing import Generic, TypeVar
+from pydantic import BaseModel
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class PoolStats(BaseModel):
+    """Counts how many agents a pool has built and reused, and the time spent building them."""
+    built: int = 0
+    reused: int = 0
+    build_seconds: float = 0.0
+
+    @property
+    def mean_build_seconds(self) -> float:
+        return self.build_seconds / self.built if self.built else 0.0
+
+
+class AgentPool(Generic[T]):
+    """
+    A pool of agents that are all built the same way, by a factory function.
+
+    acquire() hands out an idle agent, or builds a new one if they're all in use. So the pool
+    only grows as large as the number of agents used at the same time. Once the caller is done,
+    the agent gets reset (if there's a reset function) and goes back in the pool. If the reset
+    fails, that agent is dropped, and a new one gets built next time.
+    """
+
+    def __init__(
+        self,
+        factory: Callable[[], T],
+        reset: Callable[[T], None] | None = None,
+        name: str = "agent",
+    ) -> None:
+        self._factory = factory
+        self._reset = reset
+        self.name = name
+        self._idle: list[T] = []
+        self._lock = threading.Lock()
+        self.stats = PoolStats()
+
+    @contextmanager
+    def acquire(self) -> Iterator[T]:
+        agent = None
+        with self._lock:
+            if self._idle:
+                agent = self._idle.pop()
+                self.stats.reused += 1
+        if agent is None:
+            start = time.monotonic()
+            agent = self._factory()
+            elapsed = time.monotonic() - start
+            with self._lock:
+                self.stats.built += 1
+                self.stats.build_seconds += elapsed
+            logger.info(f"Built a new {self.name} in {elapsed:.2f}s")
+        try:
+            yield agent
+        finally:
+            self._release(agent)
+
+    def _release(self, agent: T) -> None:
+        if self._reset is not None:
+            try:
+                self._reset(agent)
+            except Exception as e:
+                logger.warning(f"Unable to reset {self.name}, dropping it from the pool: {e}")
+                return
+        with self._lock:
+            self._idle.append(agent)
+
+    def clear(self) -> None:
+        """Drops all idle agents, so new ones get built."""
+        with self._lock:
+            self._idle = []
@@ -1,11 +1,14 @@
-from narrative_llm_agent.agents.analyst_lang import AnalysisSteps
+from narrative_llm_agent.agents.analyst_lang import DEFAULT_CATALOG_DB_DIR, AnalysisSteps
 from narrative_llm_agent.agents.kbase_agent import KBaseAgent
 from narrative_llm_agent.tools.kgtool_cosine_sim import InformationTool
-import os
 import json
+from pathlib import Path
 from langchain.tools import tool
 from narrative_llm_agent.kbase.clients.workspace import Workspace
 from narrative_llm_agent.util.tool import process_tool_input
+from narrative_llm_agent.util.hybrid_retriever import get_app_retriever
+from narrative_llm_agent.config import get_config
+from langchain_core.embeddings import Embeddings
 from langgraph.prebuilt import create_react_agent
 from pydantic import BaseModel, Field
 
@@ -35,9 +38,21 @@ class WorkflowValidatorAgent(KBaseAgent):
     You also look for any errors in the workflow and suggest fixes. You have tools to help you find KBase apps and their properties like app_id, tooltip, version, category and data objects.
     """
 
-    def __init__(self: "WorkflowValidatorAgent", llm, token: str = None):
+    def __init__(
+        self: "WorkflowValidatorAgent",
+        llm,
+        token: str = None,
+        embeddings: Embeddings | None = None,
+        catalog_db_dir: Path = DEFAULT_CATALOG_DB_DIR,
+    ):
+        """
+        If catalog_hybrid_search is set in the config, the validator gets an app lookup tool
+        that searches the catalog in catalog_db_dir. Without embeddings, that's only a lexical search.
+        """
         self._llm = llm
         self._token = token
+        self._embeddings = embeddings
+        self._catalog_db_dir = catalog_db_dir
         self.__init_agent()
     def __init_agent(self: "WorkflowValidatorAgent"):
         @tool("list_objects")
@@ -51,6 +66,9 @@ class WorkflowValidatorAgent(KBaseAgent):
                     process_tool_input(narrative_id, "narrative_id"), as_dict=True
                 )
             )
+        # shares the process-wide Neo4j driver, so it's cheap to keep around
+        get_information = InformationTool()
+
         @tool("kg_retrieval_tool")
         def KGretrieval_tool(input: str):
             """This tool has the KBase app Knowledge Graph. Useful for when you need to confirm the existance of KBase applications and their appid, tooltip, version, category and data objects.
@@ -61,12 +79,25 @@ class WorkflowValidatorAgent(KBaseAgent):
             """
             try:
                 # Call get_information directly
-                get_information = InformationTool(uri=os.environ.get('NEO4J_URI'), user=os.environ.get('NEO4J_USERNAME'), password=os.environ.get('NEO4J_PASSWORD'))
                 result = get_information.run({'entity':input, 'entity_type':'AppCatalog'})
                 return result
             except Exception as e:
                 return f"Error querying Knowledge Graph: {str(e)}"
+        @tool("app_lookup_tool")
+        def app_lookup_tool(query: str) -> str:
+            """Finds KBase apps by name, app id, or a description of what they do. Returns the
+            best matching apps, with their app_id, name, and tooltip. Useful for checking that an
+            app id is right, or for finding the app to use for a step."""
+            # indexed on first use, then shared
+            retriever = get_app_retriever(self._catalog_db_dir, self._embeddings)
+            matches = retriever.search(process_tool_input(query, "query"))
+            if not matches:
+                return "No matching apps found"
+            return "\n".join(f"app_id: {app.id} | name: {app.name} | tooltip: {app.tooltip}" for app, _ in matches)
+
         tools = [KGretrieval_tool, list_objects_tool]
+        if get_config().catalog_hybrid_search:
+            tools.append(app_lookup_tool)
 
         SYSTEM_PROMPT_TEMPLATE = f"""You are {self.role}.
         {self.backstory}
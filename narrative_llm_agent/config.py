@@ -10,11 +10,19 @@ E.g. if your config is "my_config.cfg", then this expects the file to be in:
 
 from pathlib import Path
 from configparser import ConfigParser
+import asyncio
+import hashlib
 import os
+import threading
+import time
+import weakref
 from typing import Any, Dict, Optional
+from cacheout.lru import LRUCache
 from langchain_openai import ChatOpenAI
 from langchain_anthropic import ChatAnthropic
 from crewai import LLM
+import httpx
+from openai import DefaultAsyncHttpxClient, DefaultHttpxClient
 from urllib.parse import urlparse
 
 DEFAULT_CONFIG_FILE = "config.cfg"
@@ -22,6 +30,50 @@ ENV_CONFIG_FILE = "NARRATIVE_LLM_AGENT_CONFIG"
 
 DEBUG = False
 
+class _PerLoopAsyncHttpxClient(DefaultAsyncHttpxClient):
+    """
+    An async HTTP client that sends each request through a client for the running event loop.
+    Async connections only work in the event loop that opened them, so a single client can't
+    be shared between loops (e.g. successive asyncio.run calls). Each loop's client goes away
+    along with the loop.
+    """
+
+    def __init__(self, **kwargs: Any) -> None:
+        super().__init__(**kwargs)
+        self._loop_clients: weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncClient] = (
+            weakref.WeakKeyDictionary()
+        )
+        self._loop_clients_lock = threading.Lock()
+
+    async def send(self, request: httpx.Request, **kwargs: Any) -> httpx.Response:
+        loop = asyncio.get_running_loop()
+        with self._loop_clients_lock:
+            client = self._loop_clients.get(loop)
+            if client is None:
+                client = self._loop_clients[loop] = DefaultAsyncHttpxClient()
+        return await client.send(request, **kwargs)
+
+
+# HTTP clients shared by all OpenAI-style LLM clients with the same base URL, so they
+# can reuse connections. Keyed by (base url, is async).
+_http_clients: Dict[tuple[str | None, bool], Any] = {}
+_http_clients_lock = threading.Lock()
+
+
+def _get_shared_http_client(base_url: str | None, is_async: bool = False) -> Any:
+    key = (base_url, is_async)
+    with _http_clients_lock:
+        if key not in _http_clients:
+            _http_clients[key] = _PerLoopAsyncHttpxClient() if is_async else DefaultHttpxClient()
+        return _http_clients[key]
+
+
+def _hash_api_key(api_key: str | None) -> str | None:
+    """Hashes the API key, so it doesn't have to be kept around as part of a cache key."""
+    if api_key is None:
+        return None
+    return hashlib.sha256(api_key.encode("utf-8")).hexdigest()
+
 
 class AgentConfig:
     def __init__(self: "AgentConfig") -> None:
@@ -69,9 +121,53 @@ class AgentConfig:
         self.neo4j_uri_env = kb_cfg.get("neo4j_uri")
         self.neo4j_username_env = kb_cfg.get("neo4j_username")
         self.neo4j_password_env = kb_cfg.get("neo4j_password")
+        self.neo4j_max_pool_size = int(kb_cfg.get("neo4j_max_pool_size", 50))
+        self.neo4j_liveness_check_timeout = float(kb_cfg.get("neo4j_liveness_check_timeout", 60))
+        self.kg_backend = kb_cfg.get("kg_backend", "neo4j").lower()
+        if self.kg_backend not in ("neo4j", "snapshot"):
+            raise ValueError(f"kg_backend must be either 'neo4j' or 'snapshot', got '{self.kg_backend}'")
+        self.kg_snapshot_path = kb_cfg.get("kg_snapshot_path", "kg_snapshot.npz")
+        self.kg_description_cache_size = int(kb_cfg.get("kg_description_cache_size", 256))
+        self.kg_description_cache_ttl = int(kb_cfg.get("kg_description_cache_ttl", 3600))
+        self.qa_chain_types = {
+            tool: kb_cfg.get(f"{tool}_qa_chain_type", "refine").lower()
+            for tool in ("docs", "tutorial", "catalog")
+        }
+        for tool, chain_type in self.qa_chain_types.items():
+            if chain_type not in ("refine", "map_reduce", "stuff"):
+                raise ValueError(
+                    f"{tool}_qa_chain_type must be one of 'refine', 'map_reduce', or 'stuff', got '{chain_type}'"
+                )
+        self.qa_max_concurrency = int(kb_cfg.get("qa_max_concurrency", 8))
+        self.qa_stuff_token_budget = int(kb_cfg.get("qa_stuff_token_budget", 6000))
+        self.workflow_max_concurrency = int(kb_cfg.get("workflow_max_concurrency", 1))
+        self.job_memo = kb_cfg.get("job_memo", "false").lower() == "true"
+        self.job_memo_scope = [int(ws_id) for ws_id in kb_cfg.get("job_memo_scope", "").split(",") if ws_id.strip()]
+        self.job_mode = kb_cfg.get("job_mode", "crew").lower()
+        if self.job_mode not in ("crew", "direct"):
+            raise ValueError(f"job_mode must be either 'crew' or 'direct', got '{self.job_mode}'")
+        self.param_templates = kb_cfg.get("param_templates", "false").lower() == "true"
+        # caps on each minimized HTML report (see tools/report_tools.py), 0 means no cap
+        self.html_report_max_bytes = int(kb_cfg.get("html_report_max_bytes", 20000)) or None
+        self.html_report_max_tokens = int(kb_cfg.get("html_report_max_tokens", 0)) or None
+        self.catalog_index_path = kb_cfg.get("catalog_index_path") or None
+        self.catalog_hybrid_search = kb_cfg.get("catalog_hybrid_search", "false").lower() == "true"
+        self.embedding_cache = kb_cfg.get("embedding_cache", "true").lower() == "true"
+        self.embedding_cache_batch_size = int(kb_cfg.get("embedding_cache_batch_size", 64))
+        self.embedding_cache_max_entries = int(kb_cfg.get("embedding_cache_max_entries", 10000)) or None
         self.cborg_key_env = kb_cfg.get("cborg_key_env")
         self.redis_url_env = kb_cfg.get("redis_url_env")
         self.redis_url = os.environ.get(self.redis_url_env)
+        self.kv_store = kb_cfg.get("kv_store", "sqlite").lower()
+        self.kv_store_path = kb_cfg.get("kv_store_path") or None
+        self.llm_cache_size = int(kb_cfg.get("llm_cache_size", 32))
+        self.llm_cache_ttl = int(kb_cfg.get("llm_cache_ttl", 3600))
+        # a cache size of 0 means no caching (for cacheout, 0 would mean no limit)
+        self._llm_cache = None
+        if self.llm_cache_size > 0:
+            self._llm_cache = LRUCache(
+                timer=time.time, maxsize=self.llm_cache_size, ttl=self.llm_cache_ttl
+            )
         self.use_background_llm_callbacks = kb_cfg.get("use_background_llm_callbacks", "false").lower() == "true"
         if self.use_background_llm_callbacks:
             if not self.redis_url:
@@ -81,6 +177,8 @@ class AgentConfig:
                 raise ValueError(f"when using background LLM callbacks, the Redis URL must be a valid URL, got {self.redis_url}")
 
         self.debug = DEBUG
+        # multiplies the simulated job times (and job polling interval) in debug mode
+        self.debug_job_time_scale = float(kb_cfg.get("debug_job_time_scale", 0.01))
         # LLM Configuration
         self.llm_config = {}
         if "llm" in config:
@@ -108,11 +206,17 @@ class AgentConfig:
 
             self.provider_config[provider_id] = provider_dict
 
+        # LLM response caching, by scope, with TTLs in seconds
+        self.llm_response_cache_ttls: Dict[str, int] = {}
+        if "llm_response_cache" in config:
+            for scope, ttl in config.items("llm_response_cache"):
+                self.llm_response_cache_ttls[scope] = int(ttl)
+
     def _get_api_key_from_env(self, provider: str) -> str | None:
         """
         Gets the LLM API key from an environment variable.
         Providers are configured in the config file under sections "provider.*"
-        (i.e. provider.openai).
+        (i.e. provider.openai). If the provider config sets api_key directly, that's used instead.
         A ValueError is raised if:
             1. The provider is unknown
             2. There is no API key environment variable configured for the provider.
@@ -123,6 +227,9 @@ class AgentConfig:
         """
         if provider not in self.provider_config:
             raise ValueError(f"Unknown LLM provider {provider}")
+        # local stand-ins, like the fake LLM server, can just set a key in the config
+        if "api_key" in self.provider_config[provider]:
+            return self.provider_config[provider]["api_key"]
         api_key_env = self.provider_config[provider].get("api_key_env")
         if api_key_env is None:
             raise ValueError(
@@ -140,8 +247,19 @@ class AgentConfig:
         model_id: str | None = None,
         return_crewai: bool = False,
         api_key: str = None,
+        cache_scope: str | None = None,
     ) -> Any:
-        """Get an LLM instance based on the model ID from config"""
+        """
+        Get an LLM instance based on the model ID from config.
+        LLM instances are cached by model, provider, API key, and whether it's for CrewAI,
+        so repeated calls return the same instance, with its already open connections.
+        The cache size and TTL (in seconds) are set by the llm_cache_size and llm_cache_ttl
+        config options. A cache size of 0 turns off caching.
+
+        If cache_scope is given, and that scope is enabled in the llm_response_cache config
+        section, the LLM's responses get cached. See util.llm_cache. This only applies to
+        LangChain models, not CrewAI ones.
+        """
         model_id = model_id or self.llm_config["default"]
 
         # Get model config
@@ -159,11 +277,43 @@ class AgentConfig:
 
         if api_key is None:
             api_key = self._get_api_key_from_env(provider)
+
+        response_cache = None
+        if cache_scope in self.llm_response_cache_ttls and not return_crewai:
+            # imported here, since the cache's store uses this config
+            from narrative_llm_agent.util.llm_cache import get_llm_response_cache
+            response_cache = get_llm_response_cache(cache_scope, self.llm_response_cache_ttls[cache_scope])
+        else:
+            cache_scope = None
+
+        cache_key = (model_id, provider, _hash_api_key(api_key), return_crewai, cache_scope)
+        if self._llm_cache is not None:
+            llm = self._llm_cache.get(cache_key)
+            if llm is not None:
+                return llm
+        llm = self._build_llm(model_config, provider, provider_config, api_key, return_crewai, response_cache)
+        if self._llm_cache is not None:
+            self._llm_cache.set(cache_key, llm)
+        return llm
+
+    def clear_llm_cache(self) -> None:
+        if self._llm_cache is not None:
+            self._llm_cache.clear()
+
+    def _build_llm(
+        self,
+        model_config: Dict[str, str],
+        provider: str,
+        provider_config: Dict[str, Any],
+        api_key: str,
+        return_crewai: bool,
+        response_cache: Any = None,
+    ) -> Any:
         model_name = model_config["model_name"]
         # Create appropriate LLM based on provider]
         if return_crewai:
             # If return_crewai is True, return the crewai instance
-            if provider == "cborg" and provider_config.get("use_openai_format"):
+            if provider_config.get("use_openai_format"):
                 # For crewai, we need to use the crewai LLM class
                 return LLM(
                     model=f"openai/{model_name}",
@@ -179,13 +329,14 @@ class AgentConfig:
                 )
         # Create appropriate LLM based on provider
         else:
-            if provider == "openai" or (
-                provider == "cborg" and provider_config.get("use_openai_format")
-            ):
+            if provider == "openai" or provider_config.get("use_openai_format"):
                 return ChatOpenAI(
                     model=model_config["model_name"],
                     api_key=api_key,
                     base_url=provider_config.get("api_base"),
+                    http_client=_get_shared_http_client(provider_config.get("api_base")),
+                    http_async_client=_get_shared_http_client(provider_config.get("api_base"), is_async=True),
+                    cache=response_cache,
                 )
             elif provider == "cborg-anthropic":
                 return ChatAnthropic(
@@ -193,6 +344,7 @@ class AgentConfig:
                     api_key=api_key,
                     base_url=provider_config.get("api_base"),
                     max_tokens = 8000,
+                    cache=response_cache,
                 )
             else:
                 raise ValueError(f"Unsupported provider: {provider}")
@@ -230,11 +382,15 @@ def get_kbase_auth_token() -> str:
 
 # LLM-related convenience functions
 def get_llm(
-    model_id: str | None = None, return_crewai: bool = False, api_key: str | None = None
+    model_id: str | None = None,
+    return_crewai: bool = False,
+    api_key: str | None = None,
+    cache_scope: str | None = None,
 ) -> Any:
     """Get an LLM instance based on the model ID from config. If no api_key is given,
-    this will try to use a key from an environment variable."""
-    return get_config().get_llm(model_id, return_crewai, api_key=api_key)
+    this will try to use a key from an environment variable. If cache_scope is given and
+    enabled in the config, responses are cached."""
+    return get_config().get_llm(model_id, return_crewai, api_key=api_key, cache_scope=cache_scope)
 
 
 def list_available_models() -> Dict[str, Dict[str, Any]]:
@@ -7,21 +7,55 @@ from narrative_llm_agent.agents.metadata import MetadataAgent
 from langchain_core.language_models.llms import LLM
 from crewai import Crew, Task
 from crewai.crew import CrewOutput
+from crewai.types.usage_metrics import UsageMetrics
+from pydantic import BaseModel
 
+from narrative_llm_agent.kbase.clients.blobstore import Blobstore
+from narrative_llm_agent.kbase.clients.execution_engine import ExecutionEngine
 from narrative_llm_agent.kbase.clients.narrative_method_store import NarrativeMethodStore
 from narrative_llm_agent.kbase.clients.workspace import Workspace
 from narrative_llm_agent.kbase.objects.app_spec import AppSpec
 from narrative_llm_agent.kbase.objects.workspace import ObjectInfo
 from narrative_llm_agent.tools.app_tools import app_params_pydantic, get_app_params
-from narrative_llm_agent.tools.job_tools import CompletedJob, CreatedObject
+from narrative_llm_agent.tools.job_tools import CompletedJob, CreatedObject, JobMemoLedger, run_job
+from narrative_llm_agent.tools.narrative_tools import create_markdown_cell
+from narrative_llm_agent.tools.report_tools import get_report
+from narrative_llm_agent.tools.param_template_tools import ParamTemplateStore
+import json
 import logging 
+import time
 
 workflow_logger = logging.getLogger("WorkflowExecution")
+
+CREW_JOB_MODE = "crew"
+DIRECT_JOB_MODE = "direct"
+JOB_MODES = (CREW_JOB_MODE, DIRECT_JOB_MODE)
+
+
+class JobRunStats(BaseModel):
+    app_id: str
+    job_mode: str
+    elapsed_seconds: float
+    token_usage: UsageMetrics
+
+
 class JobCrew:
     """
     Initializes and runs a CrewAI Crew that will run a single KBase job from start to finish,
     analyze, and interpret the results, saving a summary in a Narrative.
 
+    If a ParamTemplateStore is given, parameters for apps that have already run successfully
+    on the same type of input object get filled in from a template, instead of being built
+    by the LLM. Parameters the LLM builds that lead to a successful run get saved as templates.
+
+    There are two ways of running a job, set by job_mode:
+    * "crew" (default) - a single Crew runs all the tasks, from building parameters to saving
+      the report analysis in the Narrative. If the parameters come from a template, the job is
+      run in code first, and the Crew only handles the report.
+    * "direct" - running the job, fetching the report, and saving the analysis are done in code.
+      Only building the parameters (if there's no template) and analyzing the report use an LLM.
+    Either way, the time and token usage of each run is kept in run_stats, for comparison.
+
     TODO: add context from the original metadata task
     TODO: add context from previous app runs
     TODO: add some context about the input object and goals of the app run
@@ -30,16 +64,30 @@ class JobCrew:
     _llm: LLM
     _crew_results: list
 
-    def __init__(self, workflow_llm: LLM, writer_llm: LLM, token: str = None) -> None:
+    def __init__(
+        self,
+        workflow_llm: LLM,
+        writer_llm: LLM,
+        token: str = None,
+        job_memo: JobMemoLedger | None = None,
+        param_templates: ParamTemplateStore | None = None,
+        job_mode: str = CREW_JOB_MODE,
+    ) -> None:
         if not token:
             raise ValueError("KBase auth token must be provided")
+        if job_mode not in JOB_MODES:
+            raise ValueError(f"Unknown job mode '{job_mode}', must be one of {', '.join(JOB_MODES)}")
 
         self._workflow_llm = workflow_llm
         self._crew_results = []
         self._token = token
+        self._param_templates = param_templates
+        self._job_mode = job_mode
+        self._job_memo = job_memo
+        self.run_stats: list[JobRunStats] = []
         self._nms = NarrativeMethodStore()
         self._narr = NarrativeAgent(workflow_llm, token=token)
-        self._job = JobAgent(workflow_llm, token=token)
+        self._job = JobAgent(workflow_llm, token=token, job_memo=job_memo)
         self._workspace = WorkspaceAgent(workflow_llm, token=token)
         self._coordinator = CoordinatorAgent(workflow_llm)
         self._metadata = MetadataAgent(workflow_llm, token=token)
@@ -52,6 +100,18 @@ class JobCrew:
             self._metadata.agent,
             self._writer.agent
         ]
+
+    def reset(self) -> None:
+        """
+        Clears the results and per-run agent state from earlier jobs, so this can be reused
+        for another job without building new agents.
+        """
+        self._tasks = []
+        self._crew_results = []
+        for agent in self._agents:
+            agent.tools_results = []
+            agent.crew = None
+
     def start_job(self, app_name: str, input_object_upa: str, narrative_id: int, app_id: str|None=None) -> CrewOutput:
         """
         Starts the job from a given app name (note this isn't the ID. Name like "Prokka" not id like "ProkkaAnnotation/annotate_contigs")
@@ -59,17 +119,128 @@ class JobCrew:
         """
         ws = Workspace(token=self._token)
         object_info = ws.get_object_info(input_object_upa)
-        self._tasks = self.build_tasks(app_id, narrative_id, object_info)
+        spec = AppSpec(**self._nms.get_app_spec(app_id))
+        params = None
+        if self._param_templates is not None:
+            params = self._param_templates.get_params(spec, object_info)
+            if params is not None:
+                workflow_logger.info(f"Using saved parameter template for {app_id}")
+        start = time.monotonic()
+        if self._job_mode == DIRECT_JOB_MODE:
+            result = self._start_job_direct(app_id, narrative_id, object_info, spec, params, ws)
+        else:
+            # with parameters from a template, there's nothing for an LLM to do until the job is done
+            job = self._run_job(app_id, narrative_id, params, ws) if params is not None else None
+            self._tasks = self.build_tasks(app_id, narrative_id, object_info, spec=spec, job=job)
+            crew = Crew(
+                agents=self._agents,
+                tasks=self._tasks,
+                #verbose=True,
+                function_calling_llm=self._workflow_llm
+            )
+            result = crew.kickoff()
+            logging.info(f"Crew usage metrics: {crew.usage_metrics}")
+        self._crew_results.append(result)
+        logging.info(f"Crew results: {self._crew_results[-1]}")
+        stats = JobRunStats(
+            app_id=app_id,
+            job_mode=self._job_mode,
+            elapsed_seconds=time.monotonic() - start,
+            token_usage=result.token_usage,
+        )
+        self.run_stats.append(stats)
+        workflow_logger.info(
+            f"Ran {app_id} in {self._job_mode} mode in {stats.elapsed_seconds:.1f}s "
+            f"using {stats.token_usage.total_tokens} tokens"
+        )
+        if self._param_templates is not None and params is None:
+            self._save_param_template(spec, object_info, self._crew_results[-1])
+        return self._crew_results[-1]
+
+    def _start_job_direct(
+        self,
+        app_id: str,
+        narrative_id: int,
+        object_info: ObjectInfo,
+        spec: AppSpec,
+        params: dict | None,
+        ws: Workspace,
+    ) -> CrewOutput:
+        """
+        Runs the job without a full Crew. The job is run, its report fetched, and the analysis
+        saved directly. If params is None, an LLM builds them first. An LLM analyzes the report,
+        if there is one.
+        Returns a CrewOutput with the CompletedJob, to match the Crew path.
+        """
+        usage = UsageMetrics()
+        self._tasks = []
+        if params is None:
+            build_params_task = self._build_params_task(app_id, narrative_id, object_info, spec)
+            usage.add_usage_metrics(self._kickoff_tasks([build_params_task]))
+            if build_params_task.output.pydantic is None:
+                raise ValueError(f"Unable to build parameters for {app_id}: {build_params_task.output.raw}")
+            params = build_params_task.output.pydantic.model_dump()
+
+        job = self._run_job(app_id, narrative_id, params, ws)
+
+        if job.report_upa is None:
+            # nothing for an LLM to analyze, so just make a note
+            analysis = f"There is no report to analyze for the {app_id} job."
+            if job.job_error:
+                analysis += f" The job ended with an error: {job.job_error}"
+        else:
+            report = get_report(job.report_upa, ws, Blobstore(token=self._token))
+            analysis_task = self._build_report_analysis_task(app_id, report=report)
+            usage.add_usage_metrics(self._kickoff_tasks([analysis_task]))
+            analysis = analysis_task.output.raw
+        create_markdown_cell(narrative_id, analysis, ws)
+
+        return CrewOutput(
+            raw=job.model_dump_json(),
+            pydantic=job,
+            tasks_output=[task.output for task in self._tasks],
+            token_usage=usage,
+        )
+
+    def _run_job(self, app_id: str, narrative_id: int, params: dict, ws: Workspace) -> CompletedJob:
+        """Runs the app with the given parameters, without an LLM, and waits for it to finish."""
+        return run_job(
+            narrative_id,
+            app_id,
+            params,
+            ExecutionEngine(token=self._token),
+            self._nms,
+            ws,
+            memo=self._job_memo,
+        )
+
+    def _kickoff_tasks(self, tasks: list[Task]) -> UsageMetrics:
+        """Runs the given tasks in a new Crew, and returns its usage metrics."""
+        self._tasks += tasks
         crew = Crew(
             agents=self._agents,
-            tasks=self._tasks,
-            #verbose=True,
+            tasks=tasks,
             function_calling_llm=self._workflow_llm
         )
-        self._crew_results.append(crew.kickoff())
-        logging.info(f"Crew results: {self._crew_results[-1]}")
-        logging.info(f"Crew usage metrics: {crew.usage_metrics}")
-        return self._crew_results[-1]
+        crew.kickoff()
+        return crew.usage_metrics
+
+    def _save_param_template(self, spec: AppSpec, object_info: ObjectInfo, result: CrewOutput) -> None:
+        """
+        Saves the parameters built by the first task as a template, if the job finished
+        successfully.
+        """
+        job = result.pydantic
+        if not isinstance(job, CompletedJob) or job.job_status != "completed" or job.job_error:
+            return
+        built_params = self._tasks[0].output.pydantic if self._tasks[0].output is not None else None
+        if built_params is None:
+            return
+        try:
+            self._param_templates.record_success(spec, built_params.model_dump(), object_info)
+        except Exception as e:
+            # saving a template is just an optimization, it shouldn't fail the job
+            workflow_logger.warning(f"Unable to save parameter template for {spec.info.id}: {e}")
 
     def start_job_debug_skip(self, app_name: str, input_object_upa: str, narrative_id: int, app_id: str|None=None) -> str:
         """
@@ -130,14 +301,51 @@ class JobCrew:
         )
 
     def build_tasks(
-        self, app_id: str, narrative_id: int, object_info: ObjectInfo
+        self,
+        app_id: str,
+        narrative_id: int,
+        object_info: ObjectInfo,
+        spec: AppSpec | None = None,
+        job: CompletedJob | None = None,
     ) -> list[Task]:
+        """
+        Builds the tasks for running the app. If the job has already been run (e.g. with
+        parameters from a template), only the tasks for handling its report are built.
+        """
+        if job is not None:
+            return self._build_report_tasks(app_id, narrative_id, job)
+
+        if spec is None:
+            spec = AppSpec(**self._nms.get_app_spec(app_id))
+        build_params_task = self._build_params_task(app_id, narrative_id, object_info, spec)
+
+        start_job_task = Task(
+            name=f"2. Run app {app_id}",
+            description=f"""
+            Using the app parameters from the context, app id {app_id}, and narrative id {narrative_id}, use the `run_job` tool to run a new
+            KBase app. This will run the app and return a `CompletedJobAndReport` object that contains the output from the job and a
+            report from the app, if applicable.
+
+            - If the job is in an error state, the tool will indicate this in the job_error field.
+            - Your job is to call the tool, and return its result directly — do not modify the structure or add commentary.
+            - This output will be passed to the next task to interpret the job's report.
+
+            The result must be returned exactly as provided by the tool.
+            """,
+            expected_output="The CompletedJobAndReport object returned by the monitor_job tool.",
+            output_pydantic=CompletedJob,
+            agent=self._job.agent,
+            context=[build_params_task],
+        )
+
+        return [build_params_task, start_job_task] + self._build_report_tasks(app_id, narrative_id, start_job_task)
+
+    def _build_params_task(self, app_id: str, narrative_id: int, object_info: ObjectInfo, spec: AppSpec) -> Task:
         # TODO: make sure that input objects are ALWAYS UPAs
         param_template = get_app_params(app_id, self._nms)
-        spec = AppSpec(**self._nms.get_app_spec(app_id))
         param_model = app_params_pydantic(spec)
 
-        build_params_task = Task(
+        return Task(
             name=f"1. Build the parameters for {app_id}",
             description=f"""
             From the given KBase app id, {app_id}, fetch the list of parameters needed to run it. Use the App and Job manager agent
@@ -163,29 +371,21 @@ class JobCrew:
             agent=self._coordinator.agent
         )
 
-        start_job_task = Task(
-            name=f"2. Run app {app_id}",
-            description=f"""
-            Using the app parameters from the context, app id {app_id}, and narrative id {narrative_id}, use the `run_job` tool to run a new
-            KBase app. This will run the app and return a `CompletedJobAndReport` object that contains the output from the job and a
-            report from the app, if applicable.
-
-            - If the job is in an error state, the tool will indicate this in the job_error field.
-            - Your job is to call the tool, and return its result directly — do not modify the structure or add commentary.
-            - This output will be passed to the next task to interpret the job's report.
-
-            The result must be returned exactly as provided by the tool.
-            """,
-            expected_output="The CompletedJobAndReport object returned by the monitor_job tool.",
-            output_pydantic=CompletedJob,
-            agent=self._job.agent,
-            context=[build_params_task],
-        )
-
+    def _build_report_tasks(self, app_id: str, narrative_id: int, finished_job: Task | CompletedJob) -> list[Task]:
+        """
+        Builds the tasks that follow running the job - getting, analyzing, and saving its report.
+        The finished job is either the task that ran it, or the CompletedJob itself.
+        """
+        if isinstance(finished_job, Task):
+            job_context = [finished_job]
+            job_source = "You have received a `CompletedJob` object from the previous task."
+        else:
+            job_context = []
+            job_source = f"Here is the `CompletedJob` object for the finished job: {finished_job.model_dump_json()}"
         report_retrieval_task = Task(
             name=f"3. Retrieve the report for the finished {app_id} job",
-            description="""
-                You have received a `CompletedJob` object from the previous task. Use its `report_upa` field to locate the report UPA in the Workspace.
+            description=f"""
+                {job_source} Use its `report_upa` field to locate the report UPA in the Workspace.
 
                 - If `report_upa` is None, return a string indicating that no report is available due to an error.
                 - Otherwise, use the UPA to retrieve the corresponding report object from the Workspace.
@@ -196,33 +396,10 @@ class JobCrew:
 
             expected_output="The text of a KBase app report object",
             agent=self._workspace.agent,
-            context=[start_job_task]
+            context=job_context,
         )
 
-        report_analysis_task = Task(
-            name=f"4. Analyze the report from the {app_id} job",
-            description=
-            """Analyze the given report and derive some biological insight into the result.
-            If the report is not in JSON format, then interpret the document as-is.
-            If it is in JSON format, The report may contain content in 3 categories.
-            1. "message": this is a brief message describing the outcome of the report
-            2. "direct html": this is HTML-formatted information meant to be displayed to the user, and might be a brief summary of the full report.
-            3. "html report": this is one or more full HTML-formatted documents containing the report information.
-
-            Regardless of the format, it may be plain text, which can be interpreted as-is. It may also
-            also be formatted as HTML. If so, read the HTML document, including any base-64 encoded images for interpretation.
-
-            After interpretation, analyze the report, and summarize the findings with a biological interpretation. Write a brief summary, including
-            bullet points when appropriate, formatted in markdown. Your final answer MUST be the summary of the report.
-
-            If there was no report, the report is null, or an empty string, return a note saying that there is no report to analyze.
-            If the previous task ended with an error, or another note saying that there is no report to analyze,
-            just return a note saying so. Otherwise, return the summary of the report.
-            """,
-            expected_output="A summary of the report from the previous task",
-            agent=self._writer.agent,
-            context=[report_retrieval_task]
-        )
+        report_analysis_task = self._build_report_analysis_task(app_id, context=[report_retrieval_task])
 
         save_analysis_task = Task(
             name=f"5. Save the report analysis for {app_id} as markdown",
@@ -230,18 +407,51 @@ class JobCrew:
             be the analysis text. If not successful, say so and stop. If an output object was created, ensure that it has both an UPA and name.
             In the end, return the results of the job completion task with both UPA and name for output object. The return result must be normalized to contain
             both the UPA and output object name, if either are present. If the app has neither an output object name or UPA, both of these
-            fields may be None.""",
+            fields may be None.
+            {"" if job_context else job_source}""",
             expected_output="A note with either success or failure of saving the new cell",
             output_pydantic=CompletedJob,
             agent=self._narr.agent,
             extra_content=narrative_id,
-            context=[start_job_task, report_analysis_task],
+            context=job_context + [report_analysis_task],
         )
 
         return [
-            build_params_task,
-            start_job_task,
             report_retrieval_task,
             report_analysis_task,
             save_analysis_task,
         ]
+
+    def _build_report_analysis_task(
+        self, app_id: str, report: str | None = None, context: list[Task] | None = None
+    ) -> Task:
+        """
+        Builds the task for analyzing an app report. The report comes either from a task in the
+        context, or is given directly as text.
+        """
+        description = """Analyze the given report and derive some biological insight into the result.
+            If the report is not in JSON format, then interpret the document as-is.
+            If it is in JSON format, The report may contain content in 3 categories.
+            1. "message": this is a brief message describing the outcome of the report
+            2. "direct html": this is HTML-formatted information meant to be displayed to the user, and might be a brief summary of the full report.
+            3. "html report": this is one or more full HTML-formatted documents containing the report information.
+
+            Regardless of the format, it may be plain text, which can be interpreted as-is. It may also
+            also be formatted as HTML. If so, read the HTML document, including any base-64 encoded images for interpretation.
+
+            After interpretation, analyze the report, and summarize the findings with a biological interpretation. Write a brief summary, including
+            bullet points when appropriate, formatted in markdown. Your final answer MUST be the summary of the report.
+
+            If there was no report, the report is null, or an empty string, return a note saying that there is no report to analyze.
+            If the previous task ended with an error, or another note saying that there is no report to analyze,
+            just return a note saying so. Otherwise, return the summary of the report.
+            """
+        if report is not None:
+            description += f"\nHere is the report to analyze:\n{report}\n"
+        return Task(
+            name=f"4. Analyze the report from the {app_id} job",
+            description=description,
+            expected_output="A summary of the report from the previous task",
+            agent=self._writer.agent,
+            context=context,
+        )
@@ -0,0 +1,63 @@
+"""
+Measures how well the app catalog searches find the apps that analysis plans use.
+
+Each lookup case is a query, the way a plan step names an app (its name, a short name like
+"Prokka", or its app id), and the app id it should find. Recall@k is the fraction of cases with
+the right app in the top k results. A case that misses means the LLM has to go back for at
+least one more tool call, so the misses are counted as extra tool calls, and comparing them
+between searches gives the tool calls one saves over another.
+
+See scripts/benchmark_app_lookup.py to run it on the app catalog, with the plan lookup cases
+in tests/test_data/plan_app_lookups.json.
+"""
+import json
+from pathlib import Path
+from typing import Callable
+from pydantic import BaseModel
+from narrative_llm_agent.util.hybrid_retriever import HybridAppRetriever
+
+
+class LookupCase(BaseModel):
+    query: str
+    app_id: str
+
+
+class RecallResult(BaseModel):
+    mode: str
+    k: int
+    cases: int
+    hits: int
+    # the queries that missed, which each need at least one more tool call
+    missed: list[str] = []
+
+    @property
+    def recall(self) -> float:
+        return self.hits / self.cases if self.cases else 0.0
+
+    @property
+    def extra_tool_calls(self) -> int:
+        return self.cases - self.hits
+
+
+def load_lookup_cases(path: str | Path) -> list[LookupCase]:
+    with open(path) as infile:
+        return [LookupCase(**case) for case in json.load(infile)]
+
+
+def recall_at_k(search: Callable[[str, int], list[str]], cases: list[LookupCase], k: int, mode: str = "") -> RecallResult:
+    """Recall@k of a search, given as a function from a query and k to a ranked list of app ids."""
+    missed = [case.query for case in cases if case.app_id not in search(case.query, k)]
+    return RecallResult(mode=mode, k=k, cases=len(cases), hits=len(cases) - len(missed), missed=missed)
+
+
+def compare_search_modes(retriever: HybridAppRetriever, cases: list[LookupCase], k: int) -> dict[str, RecallResult]:
+    """Recall@k of the lexical, vector (if the retriever has embeddings), and hybrid searches."""
+    modes = ["lexical", "hybrid"]
+    if retriever.vector_index is not None:
+        modes.insert(1, "vector")
+    results = {}
+    for mode in modes:
+        def search(query: str, top_k: int) -> list[str]:
+            return [app.id for app, _ in retriever.search(query, top_k, mode=mode)]
+        results[mode] = recall_at_k(search, cases, k, mode=mode)
+    return results
@@ -0,0 +1,284 @@
+"""
+A local stand-in for an OpenAI-compatible chat completions API, for profiling and testing the
+workflow graphs without paying for (or waiting on) real model calls.
+
+Responses come from a script - a JSON list where each entry is either:
+* a scripted response, with optional "content", "tool_calls" (a list of {"name", "arguments"}),
+  and "match", a regex. If "match" is given, that response is only used when the request's
+  messages match it.
+* a recorded response, {"response": {...}}, with a full chat completion body from a real API.
+  That gets returned as-is, except for the id, model, and created time.
+Each request gets the first entry whose regex matches its messages. If none match, the entries
+without a "match" are used in turn, looping back to the start.
+
+Latency can be simulated with a fixed delay per request, plus a rate for "generating" the
+completion tokens.
+
+To use it, run the server:
+    python -m narrative_llm_agent.eval.fake_llm_server --port 8765 --script my_script.json
+then use a model with the "fake" provider from config.cfg, which points at that port.
+"""
+import argparse
+import json
+import logging
+import re
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any
+from pydantic import BaseModel
+from narrative_llm_agent.util.tokens import estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CONTENT = "OK"
+
+
+class ScriptedToolCall(BaseModel):
+    name: str
+    arguments: dict[str, Any] = {}
+
+
+class ScriptedResponse(BaseModel):
+    content: str | None = None
+    tool_calls: list[ScriptedToolCall] = []
+    match: str | None = None
+    # a full chat completion body, replayed instead of building one from the above
+    response: dict[str, Any] | None = None
+
+
+class FakeLLMStats(BaseModel):
+    requests: int = 0
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+
+
+def _count_tokens(text: str) -> int:
+    return estimate_tokens(len(text.encode("utf-8")))
+
+
+def _messages_text(messages: list[dict[str, Any]]) -> str:
+    return json.dumps(messages, sort_keys=True)
+
+
+class FakeLLMScript:
+    """Picks the scripted response for each request. Safe to use from multiple threads."""
+
+    def __init__(self, responses: list[ScriptedResponse] | None = None) -> None:
+        self.responses = responses or []
+        self._unmatched = [resp for resp in self.responses if resp.match is None]
+        self._next = 0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_file(cls, path: str | Path) -> "FakeLLMScript":
+        with open(path) as script_file:
+            return cls([ScriptedResponse(**entry) for entry in json.load(script_file)])
+
+    def next_response(self, messages: list[dict[str, Any]]) -> ScriptedResponse:
+        text = _messages_text(messages)
+        for resp in self.responses:
+            if resp.match is not None and re.search(resp.match, text):
+                return resp
+        if not self._unmatched:
+            return ScriptedResponse(content=DEFAULT_CONTENT)
+        with self._lock:
+            resp = self._unmatched[self._next % len(self._unmatched)]
+            self._next += 1
+        return resp
+
+
+def build_completion(resp: ScriptedResponse, model: str, prompt_tokens: int) -> dict[str, Any]:
+    """Builds a chat completion response body from a scripted response."""
+    created = int(time.time())
+    completion_id = f"chatcmpl-fake-{uuid.uuid4().hex}"
+    if resp.response is not None:
+        return resp.response | {"id": completion_id, "model": model, "created": created}
+    message: dict[str, Any] = {"role": "assistant", "content": resp.content}
+    finish_reason = "stop"
+    if resp.tool_calls:
+        message["tool_calls"] = [
+            {
+                "id": f"call_{uuid.uuid4().hex[:24]}",
+                "type": "function",
+                "function": {"name": call.name, "arguments": json.dumps(call.arguments)},
+            }
+            for call in resp.tool_calls
+        ]
+        finish_reason = "tool_calls"
+    completion_tokens = _count_tokens(json.dumps(message))
+    return {
+        "id": completion_id,
+        "object": "chat.completion",
+        "created": created,
+        "model": model,
+        "choices": [{"index": 0, "message": message, "finish_reason": finish_reason, "logprobs": None}],
+        "usage": {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+        },
+    }
+
+
+def completion_to_chunks(completion: dict[str, Any]) -> list[dict[str, Any]]:
+    """Splits a chat completion into streaming chunks - one with the message, one with the usage."""
+    choice = completion["choices"][0]
+    delta = dict(choice["message"])
+    if "tool_calls" in delta:
+        delta["tool_calls"] = [call | {"index": idx} for idx, call in enumerate(delta["tool_calls"])]
+    base = {
+        "id": completion["id"],
+        "object": "chat.completion.chunk",
+        "created": completion["created"],
+        "model": completion["model"],
+    }
+    return [
+        base | {"choices": [{"index": 0, "delta": delta, "finish_reason": choice["finish_reason"]}]},
+        base | {"choices": [], "usage": completion.get("usage")},
+    ]
+
+
+class FakeLLMServer:
+    """
+    Runs the fake API in a background thread. Use as a context manager, or call start()
+    and stop(). Port 0 picks a free port; base_url has the address to use.
+
+    latency is a delay in seconds before each response. If tokens_per_second is set, each
+    response is also delayed by the time it'd take to generate its completion tokens.
+    """
+
+    def __init__(
+        self,
+        script: FakeLLMScript | None = None,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        latency: float = 0.0,
+        tokens_per_second: float | None = None,
+    ) -> None:
+        self.script = script or FakeLLMScript()
+        self.latency = latency
+        self.tokens_per_second = tokens_per_second
+        self.stats = FakeLLMStats()
+        self._stats_lock = threading.Lock()
+        self._httpd = ThreadingHTTPServer((host, port), self._make_handler())
+        self._httpd.daemon_threads = True
+        self._thread: threading.Thread | None = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def start(self) -> "FakeLLMServer":
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def serve_forever(self) -> None:
+        self._httpd.serve_forever()
+
+    def stop(self) -> None:
+        self._httpd.shutdown()
+        self._httpd.server_close()
+        if self._thread is not None:
+            self._thread.join()
+
+    def __enter__(self) -> "FakeLLMServer":
+        return self.start()
+
+    def __exit__(self, *exc_info) -> None:
+        self.stop()
+
+    def handle_completion(self, request: dict[str, Any]) -> dict[str, Any]:
+        messages = request.get("messages", [])
+        prompt_tokens = _count_tokens(_messages_text(messages))
+        resp = self.script.next_response(messages)
+        completion = build_completion(resp, request.get("model", "fake-model"), prompt_tokens)
+        completion_tokens = completion.get("usage", {}).get("completion_tokens", 0)
+        with self._stats_lock:
+            self.stats.requests += 1
+            self.stats.prompt_tokens += prompt_tokens
+            self.stats.completion_tokens += completion_tokens
+        delay = self.latency
+        if self.tokens_per_second:
+            delay += completion_tokens / self.tokens_per_second
+        if delay > 0:
+            time.sleep(delay)
+        return completion
+
+    def _make_handler(self) -> type[BaseHTTPRequestHandler]:
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, format: str, *args: Any) -> None:
+                logger.debug(format % args)
+
+            def _send_json(self, status: int, body: dict[str, Any]) -> None:
+                data = json.dumps(body).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_GET(self) -> None:
+                if self.path.rstrip("/") in ("/v1/models", "/models"):
+                    self._send_json(200, {"object": "list", "data": [{"id": "fake-model", "object": "model"}]})
+                else:
+                    self._send_json(404, {"error": {"message": f"Unknown path {self.path}"}})
+
+            def do_POST(self) -> None:
+                if self.path.rstrip("/") not in ("/v1/chat/completions", "/chat/completions"):
+                    self._send_json(404, {"error": {"message": f"Unknown path {self.path}"}})
+                    return
+                length = int(self.headers.get("Content-Length", 0))
+                try:
+                    request = json.loads(self.rfile.read(length) or b"{}")
+                except ValueError as e:
+                    self._send_json(400, {"error": {"message": f"Invalid JSON: {e}"}})
+                    return
+                completion = server.handle_completion(request)
+                if not request.get("stream"):
+                    self._send_json(200, completion)
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.end_headers()
+                for chunk in completion_to_chunks(completion):
+                    self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode("utf-8"))
+                self.wfile.write(b"data: [DONE]\n\n")
+                self.wfile.flush()
+                self.close_connection = True
+
+        return Handler
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Run a fake OpenAI-compatible chat completions server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--script", help="JSON file with the scripted or recorded responses")
+    parser.add_argument("--latency", type=float, default=0.0, help="delay in seconds before each response")
+    parser.add_argument("--tokens-per-second", type=float, default=None, help="simulated completion token rate")
+    args = parser.parse_args()
+
+    script = FakeLLMScript.from_file(args.script) if args.script else FakeLLMScript()
+    server = FakeLLMServer(
+        script,
+        host=args.host,
+        port=args.port,
+        latency=args.latency,
+        tokens_per_second=args.tokens_per_second,
+    )
+    print(f"Fake LLM server running at {server.base_url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
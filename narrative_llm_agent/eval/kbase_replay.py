@@ -0,0 +1,323 @@
+"""
+Record and replay KBase service traffic, for running pipelines and benchmarks without a
+network connection to KBase.
+
+RecordingProxy sits in front of the real KBase services. Every request is forwarded, and the
+request and response are saved to a fixtures file (JSON lines). ReplayServer serves those saved
+responses back, optionally waiting the originally recorded time (or a scaled version of it) for
+each one.
+
+Point the clients at either one by setting the service_endpoint in the config file to the
+server's address, e.g.
+    [kbase]
+    service_endpoint=http://127.0.0.1:9100/
+That covers the Workspace, Execution Engine, NMS, Blobstore, auth, and service wizard, as they
+all build their URLs from it. Any URLs to the real services in response bodies (like dynamic
+service URLs from the service wizard, or report file links) are rewritten to point at the
+proxy too, so those calls also get recorded and replayed.
+
+JSON-RPC requests are matched by path, method, and params, ignoring the call id and any values
+that get made fresh on every run (the cell and run ids in a run_job call's meta, and the ids and
+timestamps of new cells in a saved Narrative). Everything else is matched by HTTP method, path,
+and body. When the same request was recorded more than
+once (like polling a job's status), the responses are replayed in order, and the last one
+repeats after that.
+
+Usage:
+    python -m narrative_llm_agent.eval.kbase_replay record --upstream https://kbase.us/services/ --fixtures kbase.jsonl
+    python -m narrative_llm_agent.eval.kbase_replay replay --fixtures kbase.jsonl --latency-scale 0.5
+"""
+import argparse
+import base64
+from abc import ABC, abstractmethod
+import hashlib
+import json
+import logging
+import threading
+import time
+from collections import defaultdict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any
+import requests
+from pydantic import BaseModel
+
+logger = logging.getLogger(__name__)
+
+# stands in for the upstream service URL in recorded bodies
+BASE_URL_PLACEHOLDER = "{{KBASE_REPLAY_BASE_URL}}/"
+_FORWARDED_HEADERS = ("Authorization", "Content-Type", "Accept")
+# JSON-RPC param keys with values made fresh on every run, which get left out of request keys.
+# The cell_id and run_id come from run_job meta (see util.app.build_run_job_params) and app
+# cell launch states, created and event_at are cell timestamps.
+_VOLATILE_KEYS = {"cell_id", "run_id", "created", "event_at"}
+# keys that are only volatile under a parent key, like the ids of Narrative cells
+_VOLATILE_NESTED_KEYS = {("attributes", "id")}
+_VOLATILE_PLACEHOLDER = "<volatile>"
+
+
+class Exchange(BaseModel):
+    """A single recorded request and its response. The body is base64 encoded."""
+    method: str
+    path: str
+    rpc_method: str | None = None
+    request_key: str
+    status: int
+    content_type: str | None = None
+    body: str
+    elapsed: float
+
+    def body_bytes(self) -> bytes:
+        return base64.b64decode(self.body)
+
+
+def _strip_volatile(value: Any, parent_key: str | None = None) -> Any:
+    if isinstance(value, dict):
+        return {
+            key: (
+                _VOLATILE_PLACEHOLDER
+                if key in _VOLATILE_KEYS or (parent_key, key) in _VOLATILE_NESTED_KEYS
+                else _strip_volatile(val, key)
+            )
+            for key, val in value.items()
+        }
+    if isinstance(value, list):
+        return [_strip_volatile(val, parent_key) for val in value]
+    return value
+
+
+def request_key(method: str, path: str, body: bytes) -> tuple[str, str | None]:
+    """
+    Returns a key for matching a request to recorded ones, and the JSON-RPC method, if it is
+    a JSON-RPC request.
+    """
+    rpc_method = None
+    key_source = body.decode("utf-8", errors="replace")
+    if body:
+        try:
+            rpc = json.loads(body)
+        except ValueError:
+            rpc = None
+        if isinstance(rpc, dict) and "method" in rpc:
+            rpc_method = rpc["method"]
+            params = _strip_volatile(rpc.get("params"))
+            key_source = json.dumps({"method": rpc_method, "params": params}, sort_keys=True)
+    digest = hashlib.sha256(f"{method} {path}\n{key_source}".encode("utf-8")).hexdigest()
+    return digest, rpc_method
+
+
+def _url_variants(url: str) -> list[bytes]:
+    # JSON encoders may or may not escape slashes
+    return [url.encode("utf-8"), url.replace("/", "\\/").encode("utf-8")]
+
+
+def replace_base_url(body: bytes, old_url: str, new_url: str) -> bytes:
+    for old, new in zip(_url_variants(old_url), _url_variants(new_url)):
+        body = body.replace(old, new)
+    return body
+
+
+class ExchangeServer(ABC):
+    """
+    The HTTP server parts shared by the recording proxy, the replay server, and the KBase
+    simulator server. Subclasses answer each request in handle.
+    """
+
+    def __init__(self, host: str, port: int) -> None:
+        self._httpd = ThreadingHTTPServer((host, port), self._make_handler())
+        self._httpd.daemon_threads = True
+        self._thread: threading.Thread | None = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}/"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def serve_forever(self) -> None:
+        self._httpd.serve_forever()
+
+    def stop(self) -> None:
+        self._httpd.shutdown()
+        self._httpd.server_close()
+        if self._thread is not None:
+            self._thread.join()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info) -> None:
+        self.stop()
+
+    @abstractmethod
+    def handle(self, method: str, path: str, headers: dict[str, str], body: bytes) -> tuple[int, str | None, bytes]:
+        """Returns the status, content type, and body of the response to a request."""
+        pass
+
+    def _make_handler(self) -> type[BaseHTTPRequestHandler]:
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, format: str, *args: Any) -> None:
+                logger.debug(format % args)
+
+            def _handle(self) -> None:
+                length = int(self.headers.get("Content-Length", 0))
+                body = self.rfile.read(length) if length else b""
+                headers = {name: self.headers[name] for name in _FORWARDED_HEADERS if name in self.headers}
+                status, content_type, resp_body = server.handle(self.command, self.path, headers, body)
+                self.send_response(status)
+                if content_type is not None:
+                    self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(resp_body)))
+                self.end_headers()
+                self.wfile.write(resp_body)
+
+            do_GET = _handle
+            do_POST = _handle
+
+        return Handler
+
+
+class RecordingProxy(ExchangeServer):
+    """
+    Forwards requests to the upstream service URL (e.g. https://kbase.us/services/), and
+    appends each exchange to the fixtures file.
+    """
+
+    def __init__(
+        self, upstream: str, fixtures_path: str | Path, host: str = "127.0.0.1", port: int = 0, timeout: int = 1800
+    ) -> None:
+        self.upstream = upstream.rstrip("/") + "/"
+        self.fixtures_path = Path(fixtures_path)
+        self.timeout = timeout
+        self._write_lock = threading.Lock()
+        super().__init__(host, port)
+
+    def handle(self, method: str, path: str, headers: dict[str, str], body: bytes) -> tuple[int, str | None, bytes]:
+        start = time.monotonic()
+        resp = requests.request(
+            method,
+            self.upstream + path.lstrip("/"),
+            data=body or None,
+            headers=headers,
+            timeout=self.timeout,
+        )
+        elapsed = time.monotonic() - start
+        content_type = resp.headers.get("content-type")
+        recorded_body = replace_base_url(resp.content, self.upstream, BASE_URL_PLACEHOLDER)
+        key, rpc_method = request_key(method, path, body)
+        exchange = Exchange(
+            method=method,
+            path=path,
+            rpc_method=rpc_method,
+            request_key=key,
+            status=resp.status_code,
+            content_type=content_type,
+            body=base64.b64encode(recorded_body).decode("ascii"),
+            elapsed=elapsed,
+        )
+        with self._write_lock, open(self.fixtures_path, "a") as fixtures:
+            fixtures.write(exchange.model_dump_json() + "\n")
+        return resp.status_code, content_type, replace_base_url(recorded_body, BASE_URL_PLACEHOLDER, self.base_url)
+
+
+def load_exchanges(fixtures_path: str | Path) -> list[Exchange]:
+    with open(fixtures_path) as fixtures:
+        return [Exchange.model_validate_json(line) for line in fixtures if line.strip()]
+
+
+class ReplayServer(ExchangeServer):
+    """
+    Serves recorded responses. Each one is delayed by its recorded time, multiplied by
+    latency_scale (so 0 means no delay). Requests that weren't recorded get a JSON-RPC
+    error, which the service clients raise as a ServerError.
+    """
+
+    def __init__(
+        self,
+        fixtures_path: str | Path,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        latency_scale: float = 1.0,
+    ) -> None:
+        self.latency_scale = latency_scale
+        self._exchanges: dict[str, list[Exchange]] = defaultdict(list)
+        for exchange in load_exchanges(fixtures_path):
+            self._exchanges[exchange.request_key].append(exchange)
+        self._served: dict[str, int] = defaultdict(int)
+        self._lock = threading.Lock()
+        self.misses = 0
+        super().__init__(host, port)
+
+    def _next_exchange(self, key: str) -> Exchange | None:
+        with self._lock:
+            recorded = self._exchanges.get(key)
+            if not recorded:
+                self.misses += 1
+                return None
+            idx = min(self._served[key], len(recorded) - 1)
+            self._served[key] += 1
+            return recorded[idx]
+
+    def handle(self, method: str, path: str, headers: dict[str, str], body: bytes) -> tuple[int, str | None, bytes]:
+        key, rpc_method = request_key(method, path, body)
+        exchange = self._next_exchange(key)
+        if exchange is None:
+            logger.warning(f"No recorded response for {method} {path} {rpc_method or ''}")
+            error = {"error": {
+                "name": "ReplayMiss",
+                "code": -32601,
+                "message": f"No recorded response for {method} {path} {rpc_method or ''}".strip(),
+            }}
+            return 500 if rpc_method else 404, "application/json", json.dumps(error).encode("utf-8")
+        if self.latency_scale > 0:
+            time.sleep(exchange.elapsed * self.latency_scale)
+        resp_body = replace_base_url(exchange.body_bytes(), BASE_URL_PLACEHOLDER, self.base_url)
+        if rpc_method is not None:
+            resp_body = self._with_call_id(resp_body, body)
+        return exchange.status, exchange.content_type, resp_body
+
+    def _with_call_id(self, resp_body: bytes, req_body: bytes) -> bytes:
+        """Gives a JSON-RPC response the id from the request that's being answered."""
+        try:
+            resp = json.loads(resp_body)
+            call_id = json.loads(req_body).get("id")
+        except ValueError:
+            return resp_body
+        if isinstance(resp, dict) and "id" in resp:
+            resp["id"] = call_id
+            return json.dumps(resp).encode("utf-8")
+        return resp_body
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Record or replay KBase service traffic")
+    subparsers = parser.add_subparsers(dest="mode", required=True)
+    record = subparsers.add_parser("record", help="proxy to KBase, and record the traffic")
+    record.add_argument("--upstream", required=True, help="real service URL, e.g. https://kbase.us/services/")
+    replay = subparsers.add_parser("replay", help="serve recorded traffic")
+    replay.add_argument("--latency-scale", type=float, default=1.0, help="multiplier for recorded latencies")
+    for sub in (record, replay):
+        sub.add_argument("--fixtures", required=True, help="JSON lines file of recorded exchanges")
+        sub.add_argument("--host", default="127.0.0.1")
+        sub.add_argument("--port", type=int, default=9100)
+    args = parser.parse_args()
+
+    if args.mode == "record":
+        server = RecordingProxy(args.upstream, args.fixtures, host=args.host, port=args.port)
+    else:
+        server = ReplayServer(args.fixtures, host=args.host, port=args.port, latency_scale=args.latency_scale)
+    print(f"KBase {args.mode} server running at {server.base_url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
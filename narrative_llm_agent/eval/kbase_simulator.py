@@ -0,0 +1,115 @@
+"""
+Serves a KBaseSimulator (see kbase/clients/debug_mock.py) over HTTP, so the regular service
+clients can run whole pipelines against it - no network, no real jobs. Many pipelines can share
+one simulator, which makes it handy for load testing, and for comparing job polling strategies
+by the number of check_job calls they make (see the stats).
+
+Like the replay server, point the clients at it by setting the service_endpoint in the config
+file to the server's address, e.g.
+    [kbase]
+    service_endpoint=http://127.0.0.1:9100/
+
+JSON-RPC calls are routed by method name, so the service paths don't matter. GET requests for
+.../node/<id> download files from the simulated Blobstore.
+
+Usage:
+    python -m narrative_llm_agent.eval.kbase_simulator --app-specs tests/test_data/app_spec_data --time-scale 0.1 --timings timings.json
+where the timings file maps app ids to JobTiming fields, e.g.
+    {"kb_quast/run_QUAST_app": {"queue_seconds": 5, "run_seconds": 120, "run_sigma": 0.3}}
+"""
+import argparse
+import json
+import logging
+import re
+from pathlib import Path
+from narrative_llm_agent.eval.kbase_replay import ExchangeServer
+from narrative_llm_agent.kbase.clients.debug_mock import JobTiming, KBaseSimulator
+from narrative_llm_agent.kbase.service_client import ServerError
+
+logger = logging.getLogger(__name__)
+
+_NODE_PATH = re.compile(r"/node/([^/?]+)")
+
+
+def _json_response(status: int, body: dict) -> tuple[int, str, bytes]:
+    return status, "application/json", json.dumps(body).encode("utf-8")
+
+
+class KBaseSimulatorServer(ExchangeServer):
+    """
+    Runs the simulator behind an HTTP server. Use as a context manager, or call start()
+    and stop(). Port 0 picks a free port; base_url has the address to use.
+    """
+
+    def __init__(self, simulator: KBaseSimulator | None = None, host: str = "127.0.0.1", port: int = 0) -> None:
+        self.simulator = simulator or KBaseSimulator()
+        super().__init__(host, port)
+        # so report file links point back here
+        self.simulator.service_url = self.base_url
+
+    def handle(self, method: str, path: str, headers: dict[str, str], body: bytes) -> tuple[int, str | None, bytes]:
+        if method == "GET":
+            node = _NODE_PATH.search(path)
+            if node is None:
+                return _json_response(404, {"error": f"Unknown path {path}"})
+            try:
+                content, filename = self.simulator.get_blob(node.group(1))
+            except KeyError as e:
+                return _json_response(404, {"error": str(e)})
+            return 200, "application/octet-stream", content
+        try:
+            rpc = json.loads(body)
+        except ValueError as e:
+            return _json_response(400, {"error": {"name": "JSONRPCError", "code": -32700, "message": str(e)}})
+        params = rpc.get("params") or [{}]
+        try:
+            result = self.simulator.call(rpc.get("method"), params[0])
+        except ServerError as e:
+            logger.debug(f"Simulated error for {rpc.get('method')}: {e.message}")
+            error = {"name": e.name, "code": e.code, "message": e.message, "error": e.message}
+            return _json_response(500, {"version": "1.1", "id": rpc.get("id"), "error": error})
+        return _json_response(200, {"version": "1.1", "id": rpc.get("id"), "result": [result]})
+
+
+def load_app_specs(spec_dir: str | Path) -> list[dict]:
+    """Loads the app specs from each JSON file in a directory that looks like one."""
+    specs = []
+    for spec_file in sorted(Path(spec_dir).glob("*.json")):
+        with open(spec_file) as infile:
+            spec = json.load(infile)
+        if isinstance(spec, dict) and "id" in spec.get("info", {}) and "behavior" in spec:
+            specs.append(spec)
+    return specs
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Run a simulated KBase for offline pipelines and load tests")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9100)
+    parser.add_argument("--app-specs", help="directory of app spec JSON files to serve")
+    parser.add_argument("--timings", help="JSON file of job timings for each app id")
+    parser.add_argument("--time-scale", type=float, default=1.0, help="multiplier for all job times")
+    parser.add_argument("--seed", type=int, default=None, help="random seed for job times")
+    args = parser.parse_args()
+
+    timings = {}
+    if args.timings:
+        with open(args.timings) as infile:
+            timings = {app_id: JobTiming(**timing) for app_id, timing in json.load(infile).items()}
+    simulator = KBaseSimulator(
+        app_specs=load_app_specs(args.app_specs) if args.app_specs else None,
+        timings=timings,
+        time_scale=args.time_scale,
+        seed=args.seed,
+    )
+    server = KBaseSimulatorServer(simulator, host=args.host, port=args.port)
+    print(f"KBase simulator running at {server.base_url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    print(simulator.stats.model_dump_json(indent=2))
+
+
+if __name__ == "__main__":
+    main()
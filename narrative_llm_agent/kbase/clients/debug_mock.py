@@ -1,6 +1,20 @@
+import io
+import json
+import math
+import random
+import threading
+import time
+import uuid
+import zipfile
+from collections.abc import Callable
+from typing import Any
 from pydantic import BaseModel
 
+from narrative_llm_agent.config import get_config
 from narrative_llm_agent.kbase.clients.execution_engine import JobState
+from narrative_llm_agent.kbase.objects.app_spec import AppSpec
+from narrative_llm_agent.kbase.objects.report import REPORT_TYPE, CreatedObject, KBaseReport, LinkedFile
+from narrative_llm_agent.kbase.service_client import ServerError
 
 
 class Singleton:
@@ -12,6 +26,490 @@ class Singleton:
         return cls._instance
 
 
+class JobTiming(BaseModel):
+    """
+    How long a simulated job takes. The time spent queued is drawn from an exponential
+    distribution with mean queue_seconds, and the run time from a log-normal distribution
+    with median run_seconds and shape run_sigma (0 makes it fixed). error_rate is the
+    chance that a job ends in an error instead of completing.
+    """
+    queue_seconds: float = 2.0
+    run_seconds: float = 30.0
+    run_sigma: float = 0.5
+    error_rate: float = 0.0
+
+
+class SimulatorStats(BaseModel):
+    """Counts the calls made to each service method, and how the simulated jobs ended."""
+    calls: dict[str, int] = {}
+    jobs_submitted: int = 0
+    jobs_completed: int = 0
+    jobs_failed: int = 0
+
+
+class SimulatedJob(BaseModel):
+    job_id: str
+    user: str
+    job_input: dict[str, Any]
+    created: float
+    running: float
+    finished: float
+    fails: bool = False
+    status: str = "queued"
+    job_output: dict[str, Any] | None = None
+    errormsg: str | None = None
+    terminated: float | None = None
+
+
+DEFAULT_OBJECT_TYPE = "KBaseSimulator.Object-1.0"
+REPORT_OBJECT_TYPE = f"{REPORT_TYPE}-3.0"
+
+
+def _timestamp(epoch: float) -> str:
+    return time.strftime("%Y-%m-%dT%H:%M:%S+0000", time.gmtime(epoch))
+
+
+def _ms(epoch: float) -> int:
+    return int(epoch * 1000)
+
+
+class KBaseSimulator:
+    """
+    A stateful, in-memory stand-in for the KBase Workspace, Execution Engine, Narrative Method
+    Store, and Blobstore - enough of each for running apps the way the agents do.
+
+    * Workspaces get made the first time they're used. Objects can be saved, fetched, listed,
+      and copied by UPA or by name, with versions.
+    * Submitted jobs go from queued to running to completed (or error) as time passes, with
+      the times drawn from a JobTiming for each app. time_scale multiplies all of those, so
+      e.g. 0.01 runs a 30 second job in 0.3 seconds.
+    * When a job completes, it saves an object for each output parameter in its app spec (if
+      the spec was added), and a report with a zip file and an HTML page in the Blobstore,
+      just like a real app's results.
+
+    All service calls go through call(), with the JSON-RPC method name (like
+    "Workspace.get_objects2") and its params. Errors raise a ServerError, same as the service
+    clients. This is safe to use from multiple threads, so many pipelines can share one
+    simulator. See eval/kbase_simulator.py for serving it over HTTP.
+    """
+
+    def __init__(
+        self,
+        app_specs: list[dict] | None = None,
+        timings: dict[str, JobTiming] | None = None,
+        default_timing: JobTiming | None = None,
+        time_scale: float = 1.0,
+        seed: int | None = None,
+        user: str = "simulated_user",
+        service_url: str = "http://kbase-simulator.local/services/",
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        self.timings = timings or {}
+        self.default_timing = default_timing or JobTiming()
+        self.time_scale = time_scale
+        self.user = user
+        self.service_url = service_url
+        self.stats = SimulatorStats()
+        self._clock = clock
+        self._random = random.Random(seed)
+        self._lock = threading.RLock()
+        self._app_specs: dict[str, dict] = {}
+        self._workspaces: dict[int, dict[str, Any]] = {}
+        self._jobs: dict[str, SimulatedJob] = {}
+        self._blobs: dict[str, tuple[bytes, str]] = {}
+        for spec in app_specs or []:
+            self.add_app_spec(spec)
+        self._methods: dict[str, Callable[[dict], Any]] = {
+            "Workspace.get_workspace_info": self._get_workspace_info,
+            "Workspace.list_objects": self._list_objects,
+            "Workspace.get_object_info3": self._get_object_info3,
+            "Workspace.get_objects2": self._get_objects2,
+            "Workspace.save_objects": self._save_objects,
+            "Workspace.copy_object": self._copy_object,
+            "execution_engine2.run_job": lambda params: self.run_job(params),
+            "execution_engine2.check_job": lambda params: self.check_job(params["job_id"]),
+            "execution_engine2.check_workspace_jobs": self._check_workspace_jobs,
+            "execution_engine2.cancel_job": lambda params: self.cancel_job(params["job_id"]),
+            "NarrativeMethodStore.get_method_spec": self._get_method_spec,
+            "NarrativeMethodStore.get_method_full_info": self._get_method_full_info,
+        }
+
+    def call(self, method: str, params: Any) -> Any:
+        """Runs a service method, given its full JSON-RPC name, and returns the result."""
+        if method not in self._methods:
+            raise ServerError("JSONRPCError", -32601, f"Method {method} is not supported by the simulator")
+        with self._lock:
+            self.stats.calls[method] = self.stats.calls.get(method, 0) + 1
+            return self._methods[method](params or {})
+
+    # --- Narrative Method Store ---
+    def add_app_spec(self, spec: dict) -> None:
+        with self._lock:
+            self._app_specs[spec["info"]["id"]] = spec
+
+    def _get_app_spec(self, app_id: str) -> dict:
+        if app_id not in self._app_specs:
+            raise ServerError("NMSError", -32500, f"No app spec found for {app_id}")
+        return self._app_specs[app_id]
+
+    def _get_method_spec(self, params: dict) -> list[dict]:
+        return [self._get_app_spec(app_id) for app_id in params.get("ids", [])]
+
+    def _get_method_full_info(self, params: dict) -> list[dict]:
+        infos = []
+        for app_id in params.get("ids", []):
+            info = self._get_app_spec(app_id)["info"]
+            infos.append(info | {"description": info.get("subtitle", ""), "technical_description": ""})
+        return infos
+
+    # --- Workspace ---
+    def _get_ws(self, ws: int | str) -> dict[str, Any]:
+        if isinstance(ws, str) and not ws.isdigit():
+            for workspace in self._workspaces.values():
+                if workspace["name"] == ws:
+                    return workspace
+            raise ServerError("WorkspaceError", -32500, f"No workspace with name {ws} exists")
+        ws_id = int(ws)
+        if ws_id not in self._workspaces:
+            self._workspaces[ws_id] = {
+                "id": ws_id,
+                "name": f"{self.user}:narrative_{ws_id}",
+                "moddate": _timestamp(self._clock()),
+                "max_objid": 0,
+                "objects": {},
+                "names": {},
+            }
+        return self._workspaces[ws_id]
+
+    def _ws_info(self, workspace: dict[str, Any]) -> list[Any]:
+        return [
+            workspace["id"],
+            workspace["name"],
+            self.user,
+            workspace["moddate"],
+            workspace["max_objid"],
+            "a",
+            "n",
+            "unlocked",
+            {"narrative": "1", "is_temporary": "false"},
+        ]
+
+    def _resolve(self, ref: str) -> dict[str, Any]:
+        """Returns the saved version of an object from a reference like ws/obj or ws/obj/ver."""
+        parts = ref.split("/")
+        if len(parts) not in (2, 3):
+            raise ServerError("WorkspaceError", -32500, f"Invalid object reference {ref}")
+        workspace = self._get_ws(parts[0])
+        obj_id = int(parts[1]) if parts[1].isdigit() else workspace["names"].get(parts[1])
+        versions = workspace["objects"].get(obj_id)
+        if not versions:
+            raise ServerError("WorkspaceError", -32500, f"No object with reference {ref} exists")
+        if len(parts) == 3:
+            version = int(parts[2])
+            if version < 1 or version > len(versions):
+                raise ServerError("WorkspaceError", -32500, f"No object with reference {ref} exists")
+            return versions[version - 1]
+        return versions[-1]
+
+    def save_object(
+        self, ws_id: int, name: str, obj_type: str, data: Any, provenance: list[dict] | None = None
+    ) -> list[Any]:
+        """Saves an object, or a new version of one with the same name, and returns its info."""
+        with self._lock:
+            workspace = self._get_ws(ws_id)
+            if "-" not in obj_type:
+                obj_type += "-1.0"
+            obj_id = workspace["names"].get(name)
+            if obj_id is None:
+                workspace["max_objid"] += 1
+                obj_id = workspace["max_objid"]
+                workspace["names"][name] = obj_id
+                workspace["objects"][obj_id] = []
+            now = self._clock()
+            workspace["moddate"] = _timestamp(now)
+            versions = workspace["objects"][obj_id]
+            serialized = json.dumps(data)
+            info = [
+                obj_id,
+                name,
+                obj_type,
+                _timestamp(now),
+                len(versions) + 1,
+                self.user,
+                workspace["id"],
+                workspace["name"],
+                uuid.uuid5(uuid.NAMESPACE_OID, serialized).hex,
+                len(serialized),
+                {},
+            ]
+            versions.append({"info": info, "data": data, "provenance": provenance or []})
+            return info
+
+    def _get_workspace_info(self, params: dict) -> list[Any]:
+        return self._ws_info(self._get_ws(params.get("id", params.get("workspace"))))
+
+    def _list_objects(self, params: dict) -> list[list[Any]]:
+        obj_type = params.get("type")
+        min_id = params.get("minObjectID", 0)
+        max_id = params.get("maxObjectID", math.inf)
+        infos = []
+        for ws_id in params.get("ids", []):
+            for obj_id, versions in sorted(self._get_ws(ws_id)["objects"].items()):
+                info = versions[-1]["info"]
+                if min_id <= obj_id <= max_id and (obj_type is None or info[2].startswith(obj_type)):
+                    infos.append(info)
+        return infos
+
+    def _get_object_info3(self, params: dict) -> dict[str, Any]:
+        saved = [self._resolve(spec["ref"]) for spec in params.get("objects", [])]
+        return {
+            "infos": [obj["info"] for obj in saved],
+            "paths": [[f"{obj['info'][6]}/{obj['info'][0]}/{obj['info'][4]}"] for obj in saved],
+        }
+
+    def _get_objects2(self, params: dict) -> dict[str, Any]:
+        data = []
+        for spec in params.get("objects", []):
+            saved = self._resolve(spec["ref"])
+            obj_data = saved["data"]
+            if spec.get("included") and isinstance(obj_data, dict):
+                # only top level paths, like "/features"
+                keys = {path.strip("/").split("/")[0] for path in spec["included"]}
+                obj_data = {key: val for key, val in obj_data.items() if key in keys}
+            info = saved["info"]
+            data.append({
+                "data": obj_data,
+                "info": info,
+                "provenance": saved["provenance"],
+                "path": [f"{info[6]}/{info[0]}/{info[4]}"],
+                "creator": info[5],
+                "created": info[3],
+                "refs": [],
+            })
+        return {"data": data}
+
+    def _save_objects(self, params: dict) -> list[list[Any]]:
+        ws_id = params.get("id", params.get("workspace"))
+        infos = []
+        for obj in params.get("objects", []):
+            name = obj.get("name")
+            if name is None:
+                name = self._resolve(f"{ws_id}/{obj['objid']}")["info"][1]
+            infos.append(self.save_object(ws_id, name, obj["type"], obj.get("data"), obj.get("provenance")))
+        return infos
+
+    def _copy_object(self, params: dict) -> list[Any]:
+        source = self._resolve(params["from"]["ref"])
+        target = params["to"]
+        return self.save_object(
+            target["wsid"], target.get("name", source["info"][1]), source["info"][2], source["data"], source["provenance"]
+        )
+
+    # --- Blobstore ---
+    def add_blob(self, content: bytes, filename: str) -> str:
+        """Stores a file in the simulated Blobstore, and returns its node id."""
+        node_id = str(uuid.uuid4())
+        with self._lock:
+            self._blobs[node_id] = (content, filename)
+        return node_id
+
+    def get_blob(self, node_id: str) -> tuple[bytes, str]:
+        """Returns a stored file's content and name."""
+        with self._lock:
+            self.stats.calls["blobstore.download"] = self.stats.calls.get("blobstore.download", 0) + 1
+            if node_id not in self._blobs:
+                raise KeyError(f"No Blobstore node with id {node_id}")
+            return self._blobs[node_id]
+
+    def blob_url(self, node_id: str) -> str:
+        # the same form real reports use - the Blobstore client converts it to a download URL
+        return f"{self.service_url.rstrip('/')}/shock-api/node/{node_id}"
+
+    # --- Execution Engine ---
+    def _sample(self, app_id: str) -> tuple[float, float, bool]:
+        timing = self.timings.get(app_id, self.default_timing)
+        queued = self._random.expovariate(1 / timing.queue_seconds) if timing.queue_seconds > 0 else 0.0
+        run = timing.run_seconds
+        if timing.run_sigma > 0 and run > 0:
+            run = self._random.lognormvariate(math.log(run), timing.run_sigma)
+        fails = self._random.random() < timing.error_rate
+        return queued * self.time_scale, run * self.time_scale, fails
+
+    def run_job(self, job_submission: dict, job_id: str | None = None) -> str:
+        """Submits a job, as made by build_run_job_params, and returns its id."""
+        with self._lock:
+            if job_id is None:
+                job_id = uuid.uuid4().hex[:24]
+            job_input = {
+                "method": job_submission.get("method", ""),
+                "app_id": job_submission.get("app_id", ""),
+                "params": job_submission.get("params", []),
+                "service_ver": job_submission.get("service_ver"),
+            } | job_submission
+            queued, run, fails = self._sample(job_input["app_id"])
+            now = self._clock()
+            self._jobs[job_id] = SimulatedJob(
+                job_id=job_id,
+                user=self.user,
+                job_input=job_input,
+                created=now,
+                running=now + queued,
+                finished=now + queued + run,
+                fails=fails,
+            )
+            self.stats.jobs_submitted += 1
+            return job_id
+
+    def check_job(self, job_id: str) -> dict[str, Any]:
+        """Returns the job's state, in the same form as the Execution Engine's check_job."""
+        with self._lock:
+            if job_id not in self._jobs:
+                raise ServerError("EEError", -32500, f"Job {job_id} not found")
+            job = self._jobs[job_id]
+            self._update_job(job, self._clock())
+            return self._job_state(job)
+
+    def cancel_job(self, job_id: str) -> None:
+        with self._lock:
+            if job_id not in self._jobs:
+                raise ServerError("EEError", -32500, f"Job {job_id} not found")
+            job = self._jobs[job_id]
+            now = self._clock()
+            self._update_job(job, now)
+            if job.status in ("queued", "running"):
+                job.status = "terminated"
+                job.terminated = now
+
+    def _check_workspace_jobs(self, params: dict) -> list[dict[str, Any]]:
+        ws_id = int(params["workspace_id"])
+        now = self._clock()
+        states = []
+        for job in self._jobs.values():
+            if job.job_input.get("wsid") == ws_id:
+                self._update_job(job, now)
+                states.append(self._job_state(job))
+        return states
+
+    def _update_job(self, job: SimulatedJob, now: float) -> None:
+        if job.status in ("completed", "error", "terminated"):
+            return
+        if now >= job.finished:
+            self._finish_job(job)
+        elif now >= job.running:
+            job.status = "running"
+
+    def _finish_job(self, job: SimulatedJob) -> None:
+        app_id = job.job_input["app_id"]
+        if job.fails:
+            job.status = "error"
+            job.errormsg = f"Simulated failure while running {app_id}"
+            self.stats.jobs_failed += 1
+            return
+        ws_id = job.job_input.get("wsid", 0)
+        method = job.job_input["method"]
+        service, _, method_name = method.partition(".")
+        provenance = [{
+            "service": service,
+            "method": method_name,
+            "service_ver": job.job_input.get("service_ver"),
+            "method_params": job.job_input["params"],
+            "input_ws_objects": job.job_input.get("source_ws_objects", []),
+        }]
+        created = []
+        for name, obj_type in self._output_objects(job):
+            info = self.save_object(ws_id, name, obj_type, {"simulated_by": job.job_id}, provenance)
+            created.append(CreatedObject(ref=f"{info[6]}/{info[0]}/{info[4]}", description=f"Output from {app_id}"))
+        report_name = f"{method_name or 'app'}_report_{uuid.uuid4().hex[:8]}"
+        report = self._build_report(job, report_name, created)
+        report_info = self.save_object(ws_id, report_name, REPORT_OBJECT_TYPE, report.model_dump(), provenance)
+        job.status = "completed"
+        job.job_output = {
+            "version": "1.1",
+            "id": job.job_id,
+            "result": [{"report_name": report_name, "report_ref": f"{report_info[6]}/{report_info[0]}/{report_info[4]}"}],
+        }
+        self.stats.jobs_completed += 1
+
+    def _output_objects(self, job: SimulatedJob) -> list[tuple[str, str]]:
+        """The names and types of the objects a job makes, from its app's output parameters."""
+        spec_dict = self._app_specs.get(job.job_input["app_id"])
+        if spec_dict is None:
+            return []
+        spec = AppSpec(**spec_dict)
+        output_types = {}
+        for param in spec.parameters:
+            if param.text_options is not None and param.text_options.is_output_name == 1:
+                valid_types = param.text_options.valid_ws_types or [DEFAULT_OBJECT_TYPE]
+                output_types[param.id] = valid_types[0]
+        params = job.job_input["params"][0] if job.job_input["params"] else {}
+        outputs = []
+        for mapping in spec.behavior.kb_service_input_mapping or []:
+            if mapping.input_parameter in output_types and params.get(mapping.target_property):
+                outputs.append((params[mapping.target_property], output_types[mapping.input_parameter]))
+        return outputs
+
+    def _build_report(self, job: SimulatedJob, report_name: str, created: list[CreatedObject]) -> KBaseReport:
+        app_id = job.job_input["app_id"]
+        elapsed = job.finished - job.running
+        summary = (
+            f"{app_id} finished in {elapsed:.1f} seconds.\n"
+            f"Created {len(created)} object(s): {', '.join(obj.ref for obj in created) or 'none'}\n"
+        )
+        zip_buffer = io.BytesIO()
+        with zipfile.ZipFile(zip_buffer, "w", zipfile.ZIP_DEFLATED) as zipped:
+            zipped.writestr(f"{report_name}/summary.txt", summary)
+            zipped.writestr(f"{report_name}/parameters.json", json.dumps(job.job_input["params"], indent=2))
+        zip_node = self.add_blob(zip_buffer.getvalue(), f"{report_name}.zip")
+        html = f"<html><body><h1>{app_id}</h1><pre>{summary}</pre></body></html>"
+        html_node = self.add_blob(html.encode("utf-8"), "index.html")
+        return KBaseReport(
+            text_message=summary,
+            objects_created=created,
+            file_links=[LinkedFile(
+                handle=f"KBH_{zip_node[:8]}",
+                name=f"{report_name}.zip",
+                label="results",
+                description=f"Zipped results from {app_id}",
+                URL=self.blob_url(zip_node),
+            )],
+            html_links=[LinkedFile(
+                handle=f"KBH_{html_node[:8]}",
+                name="index.html",
+                label="report",
+                description=f"{app_id} report",
+                URL=self.blob_url(html_node),
+            )],
+            direct_html_link_index=0,
+        )
+
+    def _job_state(self, job: SimulatedJob) -> dict[str, Any]:
+        state = {
+            "job_id": job.job_id,
+            "user": job.user,
+            "wsid": job.job_input.get("wsid"),
+            "status": job.status,
+            "job_input": job.job_input,
+            "job_output": job.job_output,
+            "created": _ms(job.created),
+            "queued": _ms(job.created),
+            "updated": _ms(self._clock()),
+            "batch_job": False,
+            "child_jobs": [],
+        }
+        if job.status != "queued":
+            state["running"] = _ms(job.running)
+        if job.status in ("completed", "error"):
+            state["finished"] = _ms(job.finished)
+        if job.status == "terminated":
+            state["finished"] = _ms(job.terminated)
+            state["terminated_code"] = 0
+        if job.status == "error":
+            state["errormsg"] = job.errormsg
+            state["error_code"] = 1
+            state["error"] = {"name": "JobError", "code": -32000, "message": job.errormsg, "error": job.errormsg}
+        return state
+
+
 class MockJob(BaseModel):
     narrative_id: int
     app_id: str
@@ -21,7 +519,22 @@ class MockJob(BaseModel):
 
 
 class KBaseMock(Singleton):
+    """
+    Used instead of the Execution Engine in debug mode. Jobs get run in a shared
+    KBaseSimulator, so they finish after a while with results, like real ones. The simulator
+    gets made the first time it's needed, with its job times scaled by debug_job_time_scale
+    from the config.
+    """
     _jobs: dict[str, MockJob] = {}
+    _simulator: KBaseSimulator | None = None
+    _simulator_lock = threading.Lock()
+
+    @property
+    def simulator(self) -> KBaseSimulator:
+        with KBaseMock._simulator_lock:
+            if KBaseMock._simulator is None:
+                KBaseMock._simulator = KBaseSimulator(time_scale=get_config().debug_job_time_scale)
+            return KBaseMock._simulator
 
     def mock_run_job(
         self: "KBaseMock",
@@ -39,6 +552,7 @@ class KBaseMock(Singleton):
             job_submission=job_submission,
         )
         self._jobs[job_id] = mock_job
+        self.simulator.run_job({"app_id": app_id, "wsid": narrative_id} | job_submission, job_id=job_id)
         return job_id
 
     def get_mock_job(self: "KBaseMock", job_id: str) -> MockJob:
@@ -49,5 +563,4 @@ class KBaseMock(Singleton):
     def check_mock_job(self: "KBaseMock", job_id: str) -> JobState:
         if job_id not in self._jobs:
             raise ValueError(f"job id '{job_id}' unknown")
-        # TODO
-        return
+        return JobState(self.simulator.check_job(job_id))
@@ -200,3 +200,14 @@ class ExecutionEngine(ServiceClient):
 
     def run_job(self: "ExecutionEngine", job_submission: dict) -> str:
         return self.simple_call("run_job", job_submission)
+
+    def check_workspace_jobs(self: "ExecutionEngine", ws_id: int) -> list[JobState]:
+        """
+        Returns the states of all jobs run in the given workspace, including their inputs.
+        """
+        result = self.simple_call(
+            "check_workspace_jobs", {"workspace_id": str(ws_id), "return_list": 1}
+        )
+        if isinstance(result, dict):
+            result = result.get("job_states", [])
+        return [JobState(state) for state in result]
@@ -9,7 +9,8 @@ from langchain.callbacks.manager import (
 from pydantic import BaseModel, Field
 from langchain.tools import BaseTool
 
-from narrative_llm_agent.util.semantic import get_candidates, graph
+from narrative_llm_agent.util.kg_snapshot import get_kg_snapshot
+from narrative_llm_agent.util.semantic import get_candidates, query_graph
 
 
 description_query = """
@@ -49,9 +50,13 @@ def get_information(entity: str, type: str) -> str:
     
     all_candidates = "\n".join([str(c) for c in candidates])
     top_candidate = candidates[0]  # Automatically select top candidate
-    data = graph.query(
-        description_query, params={"candidate": top_candidate["candidate"]}
-    )
+    snapshot = get_kg_snapshot()
+    if snapshot is not None:
+        data = snapshot.describe_exact(top_candidate["candidate"])
+    else:
+        data = query_graph(
+            description_query, params={"candidate": top_candidate["candidate"]}
+        )
     
     return (
         "These matches were found, selecting the top match:\n" +
@@ -1,8 +1,16 @@
+import hashlib
+import json
+import logging
+import threading
 import time
 from pydantic import BaseModel
 from narrative_llm_agent.config import get_config
 from narrative_llm_agent.kbase.clients.debug_mock import KBaseMock
-from narrative_llm_agent.kbase.clients.execution_engine import ExecutionEngine, JobState
+from narrative_llm_agent.kbase.clients.execution_engine import (
+    ExecutionEngine,
+    JobInput,
+    JobState,
+)
 from narrative_llm_agent.kbase.clients.narrative_method_store import (
     NarrativeMethodStore,
 )
@@ -14,9 +22,12 @@ from narrative_llm_agent.tools.narrative_tools import create_app_cell
 from narrative_llm_agent.util.app import (
     build_run_job_params,
     get_processed_app_spec_params,
+    split_target_property,
 )
 from typing import Optional
 
+logger = logging.getLogger(__name__)
+
 
 class CreatedObject(BaseModel):
     object_upa: str
@@ -179,6 +190,14 @@ def monitor_job(
     ws: Workspace,
     interval: int = 10,
 ) -> CompletedJob:
+    """
+    Checks the job's status every interval seconds until it's finished, then returns its
+    summary. In debug mode, the interval is scaled by debug_job_time_scale from the config,
+    the same as the simulated jobs.
+    """
+    config = get_config()
+    if config.debug:
+        interval *= config.debug_job_time_scale
     is_complete = False
     while not is_complete:
         status = get_job_status(job_id, ee, as_str=False)
@@ -199,6 +218,149 @@ def get_job_status(job_id: str, ee: ExecutionEngine, as_str=True) -> str | JobSt
     return status
 
 
+def get_job_memo_key(job_submission: dict, app_spec: AppSpec | None = None) -> str:
+    """
+    Builds a content hash for a job submission, as made by `build_run_job_params`.
+    Two submissions that would run the same app version with the same parameters
+    and input objects get the same key. The generated cell and run ids in the meta
+    field are ignored, as is the narrative id.
+
+    If the app spec is given, the parameters that don't change what the job computes are
+    left out too - output object names, narrative system variables (like the workspace
+    name), and generated values. Then the same job run in another workspace, or with
+    other output names, gets the same key.
+    """
+    params = job_submission.get("params")
+    if app_spec is not None and isinstance(params, list):
+        params = _get_memo_params(app_spec, params)
+    memo_fields = {
+        "method": job_submission.get("method"),
+        "app_id": job_submission.get("app_id"),
+        "service_ver": job_submission.get("service_ver"),
+        "params": params,
+        "source_ws_objects": sorted(job_submission.get("source_ws_objects") or []),
+    }
+    canonical = json.dumps(memo_fields, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def _get_memo_params(app_spec: AppSpec, params: list) -> list:
+    """
+    Returns a copy of the mapped job params, without the values from output name parameters,
+    system variables, or generated values. Those are found from the app's input mapping,
+    the same way map_app_params places them.
+    """
+    input_mapping = app_spec.behavior.kb_service_input_mapping or []
+    spec_params = get_processed_app_spec_params(app_spec, separate_group_params=False)
+    positions = sorted({p.target_argument_position or 0 for p in input_mapping})
+    memo_params = json.loads(json.dumps(params, default=str))
+    for p in input_mapping:
+        if p.input_parameter is not None:
+            spec_param = spec_params.get(p.input_parameter, {})
+            if not spec_param.get("is_output_object"):
+                continue
+        elif p.narrative_system_variable is None and not p.generated_value:
+            continue
+        index = positions.index(p.target_argument_position or 0)
+        if index >= len(memo_params):
+            continue
+        if p.target_property is None:
+            memo_params[index] = None
+            continue
+        target = memo_params[index]
+        path = split_target_property(p.target_property)
+        for key in path[:-1]:
+            target = target.get(key) if isinstance(target, dict) else None
+        if isinstance(target, dict):
+            target.pop(path[-1], None)
+    return memo_params
+
+
+def _get_job_input_memo_key(job_input: JobInput, app_spec: AppSpec | None = None) -> str:
+    return get_job_memo_key(
+        {
+            "method": job_input.method,
+            "app_id": job_input.app_id,
+            "service_ver": job_input.service_ver,
+            "params": job_input.params,
+            "source_ws_objects": job_input.source_ws_objects,
+        },
+        app_spec,
+    )
+
+
+class JobMemoLedger:
+    """
+    Tracks completed, successful jobs by their memo key (see `get_job_memo_key`), so
+    identical jobs don't get rerun. The Execution Engine is the source of truth here -
+    when a key isn't known yet, this looks through the jobs run in the narrative, and
+    any other workspaces given in scope, for a completed job with the same inputs.
+    Each workspace's jobs only get fetched once. After that, only jobs run through this
+    ledger get added. Fetched jobs get keyed the first time their app is looked up, with
+    that app's spec, so their output names and workspace don't keep them from matching.
+
+    To use it in the workflows, set job_memo=true in the [kbase] section of the config file,
+    and optionally job_memo_scope to a comma-separated list of other workspace ids to look in.
+    """
+
+    def __init__(self: "JobMemoLedger", scope: list[int] | None = None) -> None:
+        self._scope = scope or []
+        self._completed: dict[str, JobState] = {}
+        # fetched jobs that haven't been keyed yet, by app id
+        self._unkeyed: dict[str | None, list[JobState]] = {}
+        self._scanned: set[int] = set()
+        self._lock = threading.Lock()
+
+    def record(self: "JobMemoLedger", job_state: JobState, app_spec: AppSpec | None = None) -> None:
+        """
+        Adds a job to the ledger, if it completed without errors. It's keyed with the
+        app spec, if given.
+        """
+        if job_state.status != "completed" or job_state.job_input is None:
+            return
+        key = _get_job_input_memo_key(job_state.job_input, app_spec)
+        with self._lock:
+            self._completed.setdefault(key, job_state)
+
+    def _key_fetched_jobs(self: "JobMemoLedger", app_spec: AppSpec | None) -> None:
+        with self._lock:
+            if app_spec is None:
+                job_states = [state for states in self._unkeyed.values() for state in states]
+                self._unkeyed.clear()
+            else:
+                job_states = self._unkeyed.pop(app_spec.info.id, [])
+        for job_state in job_states:
+            self.record(job_state, app_spec)
+
+    def find_completed_job(
+        self: "JobMemoLedger",
+        memo_key: str,
+        narrative_id: int,
+        ee: ExecutionEngine,
+        app_spec: AppSpec | None = None,
+    ) -> JobState | None:
+        """
+        Returns the state of a completed job with the given memo key, or None if there
+        isn't one in the narrative or in this ledger's scope. The app spec should be the
+        one the memo key was made with.
+        """
+        for ws_id in [narrative_id] + [ws for ws in self._scope if ws != narrative_id]:
+            self._key_fetched_jobs(app_spec)
+            if memo_key in self._completed:
+                break
+            with self._lock:
+                if ws_id in self._scanned:
+                    continue
+                self._scanned.add(ws_id)
+            job_states = ee.check_workspace_jobs(ws_id)
+            with self._lock:
+                for job_state in job_states:
+                    if job_state.job_input is not None:
+                        self._unkeyed.setdefault(job_state.job_input.app_id, []).append(job_state)
+        self._key_fetched_jobs(app_spec)
+        return self._completed.get(memo_key)
+
+
 def start_job(
     narrative_id: int,
     app_id: str,
@@ -207,8 +369,28 @@ def start_job(
     nms: NarrativeMethodStore,
     ws: Workspace,
 ) -> str:
+    job_submission = build_job_submission(narrative_id, app_id, params, nms, ws)
+    return submit_job(narrative_id, app_id, params, job_submission, ee)
+
+
+def build_job_submission(
+    narrative_id: int,
+    app_id: str,
+    params: dict,
+    nms: NarrativeMethodStore,
+    ws: Workspace,
+) -> dict:
     spec = nms.get_app_spec(app_id)
-    job_submission = build_run_job_params(AppSpec(**spec), params, narrative_id, ws)
+    return build_run_job_params(AppSpec(**spec), params, narrative_id, ws)
+
+
+def submit_job(
+    narrative_id: int,
+    app_id: str,
+    params: dict,
+    job_submission: dict,
+    ee: ExecutionEngine,
+) -> str:
     print("starting job:")
     print(job_submission)
     if get_config().debug:
@@ -222,13 +404,25 @@ def run_job(
     params: dict,
     ee: ExecutionEngine,
     nms: NarrativeMethodStore,
-    ws: Workspace
+    ws: Workspace,
+    memo: JobMemoLedger | None = None,
 ) -> CompletedJob:
     """
     Runs a job from end to end. Starts it, creates an app cell for it, monitors the job, and returns
     the CompletedJob object at the end.
+
+    If a JobMemoLedger is given, and it finds a job that already completed with the same app,
+    parameters, and inputs, that job's summary is returned instead of starting a new one.
     """
-    job_id = start_job(narrative_id, app_id, params, ee, nms, ws)
+    app_spec = AppSpec(**nms.get_app_spec(app_id))
+    job_submission = build_run_job_params(app_spec, params, narrative_id, ws)
+    if memo is not None and not get_config().debug:
+        memo_key = get_job_memo_key(job_submission, app_spec)
+        prior_job = memo.find_completed_job(memo_key, narrative_id, ee, app_spec)
+        if prior_job is not None:
+            logger.info(f"Reusing completed job {prior_job.job_id} for app {app_id}")
+            return summarize_completed_job(prior_job, nms, ws)
+    job_id = submit_job(narrative_id, app_id, params, job_submission, ee)
     # TODO have this return an error state as well, for checking. Right now, just letting exceptions go up.
     create_app_cell(
         narrative_id,
@@ -237,4 +431,7 @@ def run_job(
         ee,
         nms
     )
-    return monitor_job(job_id, ee, nms, ws)
+    completed_job = monitor_job(job_id, ee, nms, ws)
+    if memo is not None and completed_job.job_error is None:
+        memo.record(get_job_status(job_id, ee, as_str=False), app_spec)
+    return completed_job
@@ -1,10 +1,20 @@
+import threading
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
 from typing import Optional, Type, List, Tuple
+from cacheout.lru import LRUCache
 from langchain_core.callbacks import AsyncCallbackManagerForToolRun, CallbackManagerForToolRun
 from pydantic import BaseModel, Field, PrivateAttr
 from langchain.tools import BaseTool
 from sklearn.feature_extraction.text import TfidfVectorizer
 from sklearn.metrics.pairwise import cosine_similarity
-from neo4j import GraphDatabase
+from narrative_llm_agent.config import get_config
+from narrative_llm_agent.util.kg_snapshot import get_kg_snapshot
+from narrative_llm_agent.util.neo4j_driver import check_neo4j_driver, get_neo4j_driver
+from neo4j import Session
+from neo4j.exceptions import DriverError
+import numpy as np
 
 description_query = """
 MATCH (m:App|DataObject)
@@ -23,6 +33,12 @@ RETURN "type: " + labels(m)[0] + "\n" +
 LIMIT 1
 """
 
+# a cheap fingerprint of the app catalog, to tell when the app name index needs rebuilding
+catalog_version_query = """
+MATCH (app:App)
+RETURN count(app) AS apps, sum(size(app.name)) AS name_chars
+"""
+
 def calculate_cosine_similarity(entity: str, app_names: List[str]) -> List[Tuple[str, float]]:
     vectorizer = TfidfVectorizer().fit_transform([entity] + app_names)
     vectors = vectorizer.toarray()
@@ -34,6 +50,83 @@ def calculate_cosine_similarity(entity: str, app_names: List[str]) -> List[Tuple
     return ranked_apps
 
 
+class AppNameIndex:
+    """
+    A TF-IDF index of app names. The vectorizer and the (sparse, L2 normalized) app name
+    matrix are built once, so matching a batch of entities is a single sparse matrix product.
+    Unlike calculate_cosine_similarity, the entities aren't part of the fitted vocabulary -
+    words that aren't in any app name are ignored.
+    """
+
+    def __init__(self, app_names: List[str], version: Optional[tuple] = None) -> None:
+        if not app_names:
+            raise ValueError("Can't build an app name index without any app names")
+        self.app_names = list(app_names)
+        self.version = version
+        self._vectorizer = TfidfVectorizer()
+        self._matrix = self._vectorizer.fit_transform(self.app_names)
+
+    def rank(self, entities: List[str], top_k: int = 1) -> List[List[Tuple[str, float]]]:
+        """
+        Returns the top_k app names for each entity, most similar first, as
+        (app name, cosine similarity) tuples.
+        """
+        similarities = (self._vectorizer.transform(entities) @ self._matrix.T).toarray()
+        ranked = []
+        for row in similarities:
+            top = np.argsort(-row, kind="stable")[:top_k]
+            ranked.append([(self.app_names[idx], float(row[idx])) for idx in top])
+        return ranked
+
+    def best_matches(self, entities: List[str]) -> List[str]:
+        return [ranks[0][0] for ranks in self.rank(entities)]
+
+
+# app name indexes, shared by all tools for the same backend and Neo4j database
+_app_name_indexes: dict[tuple, AppNameIndex] = {}
+_last_version_checks: dict[tuple, float] = {}
+_index_lock = threading.Lock()
+
+
+def clear_app_name_indexes() -> None:
+    with _index_lock:
+        _app_name_indexes.clear()
+        _last_version_checks.clear()
+
+
+# descriptions of matched apps, keyed by (backend, Neo4j URI, app name). Shared by all tools,
+# so agents asking about the same apps don't rerun the description query.
+_description_cache: LRUCache | None = None
+_description_cache_lock = threading.Lock()
+
+
+def _get_description_cache() -> LRUCache | None:
+    """
+    Returns the app description cache, made the first time with the size and TTL from the
+    config, or None if kg_description_cache_size is 0.
+    """
+    global _description_cache
+    with _description_cache_lock:
+        if _description_cache is None:
+            config = get_config()
+            if config.kg_description_cache_size <= 0:
+                return None
+            _description_cache = LRUCache(
+                timer=time.time, maxsize=config.kg_description_cache_size, ttl=config.kg_description_cache_ttl
+            )
+        return _description_cache
+
+
+def clear_app_description_cache() -> None:
+    """
+    Forgets all cached app descriptions. This happens automatically when the app catalog
+    changes, but can be called after a catalog refresh to pick up changes right away.
+    """
+    global _description_cache
+    with _description_cache_lock:
+        _description_cache = None
+
+
 class InformationInput(BaseModel):
     entity: str = Field(description="KBase app name mentioned in the question")
     entity_type: str = Field(description="type of the entity. Available options are 'AppCatalog' or 'AppCatalogRel'")
@@ -42,36 +135,132 @@ class InformationTool(BaseTool):
     name: str = "Information"
     description: str = "useful for when you need to answer questions about KBase apps"
     args_schema: Type[BaseModel] = InformationInput
-    _driver: GraphDatabase.driver = PrivateAttr()
-    def __init__(self, uri: str, user: str, password: str, **kwargs):
+    _uri: str | None = PrivateAttr()
+    _user: str | None = PrivateAttr()
+    _password: str | None = PrivateAttr()
+    _version_check_interval: float = PrivateAttr()
+
+    def __init__(
+        self,
+        uri: str | None = None,
+        user: str | None = None,
+        password: str | None = None,
+        version_check_interval: float = 300,
+        **kwargs,
+    ):
+        """
+        The connection goes through the shared driver for the database (see
+        util.neo4j_driver), which gets made the first time it's needed. Missing credentials
+        come from the environment. If the config sets kg_backend=snapshot, queries get
+        answered from the local snapshot instead (see util.kg_snapshot).
+
+        version_check_interval is the least time in seconds between checks for a changed app
+        catalog. Until then, the app name index is reused as-is.
+        """
         super().__init__(**kwargs)
-        self._driver = GraphDatabase.driver(uri, auth=(user, password))
+        self._uri = uri
+        self._user = user
+        self._password = password
+        self._version_check_interval = version_check_interval
+
+    @contextmanager
+    def _session(self) -> Iterator[Session]:
+        """
+        Opens a session with the shared driver. If the driver fails, it gets checked, and
+        dropped if it can't reach the database, so the next query gets a new one.
+        """
+        driver = get_neo4j_driver(self._uri, self._user, self._password)
+        try:
+            with driver.session() as session:
+                yield session
+        except DriverError:
+            check_neo4j_driver(self._uri, self._user, self._password)
+            raise
 
     def fetch_app_names(self) -> List[str]:
+        snapshot = get_kg_snapshot()
+        if snapshot is not None:
+            return snapshot.app_names()
         query = "MATCH (app:App) RETURN app.name AS name"
-        with self._driver.session() as session:
+        with self._session() as session:
             result = session.run(query)
             return [record["name"] for record in result]
         
     def fetch_app_id(self,app_name) -> List[str]:
+        snapshot = get_kg_snapshot()
+        if snapshot is not None:
+            return snapshot.app_ids(app_name)
         query = "MATCH (app:App) WHERE app.name CONTAINS $app_name RETURN app.appid AS id"
-        with self._driver.session() as session:
+        with self._session() as session:
             result = session.run(query, app_name=app_name)
             return [record["id"] for record in result]
 
+    def fetch_catalog_version(self) -> tuple:
+        snapshot = get_kg_snapshot()
+        if snapshot is not None:
+            return snapshot.catalog_version()
+        with self._session() as session:
+            record = session.run(catalog_version_query).single()
+            return (record["apps"], record["name_chars"])
+
+    def get_app_name_index(self) -> AppNameIndex:
+        """
+        Returns the app name index for this database, building it if there isn't one yet, or
+        if the catalog version changed since it was built.
+        """
+        now = time.monotonic()
+        key = (get_config().kg_backend, self._uri)
+        with _index_lock:
+            index = _app_name_indexes.get(key)
+            last_check = _last_version_checks.get(key, 0.0)
+        if index is not None and now - last_check < self._version_check_interval:
+            return index
+        version = self.fetch_catalog_version()
+        if index is None or index.version != version:
+            if index is not None:
+                clear_app_description_cache()
+            index = AppNameIndex(self.fetch_app_names(), version=version)
+        with _index_lock:
+            _app_name_indexes[key] = index
+            _last_version_checks[key] = now
+        return index
+
+    def fetch_app_descriptions(self, entities: List[str]) -> List[str]:
+        """
+        Looks up the descriptions of the closest matching app for each entity. Descriptions are
+        cached by app name (see kg_description_cache_size and kg_description_cache_ttl in the
+        config), so only apps that haven't been described recently get queried.
+        """
+        app_names = self.get_app_name_index().best_matches(entities)
+        cache = _get_description_cache()
+        backend = get_config().kg_backend
+        descriptions = {}
+        if cache is not None:
+            for app_name in app_names:
+                cached = cache.get((backend, self._uri, app_name))
+                if cached is not None:
+                    descriptions[app_name] = cached
+        missing = [app_name for app_name in dict.fromkeys(app_names) if app_name not in descriptions]
+        if missing:
+            descriptions.update(zip(missing, self._query_app_descriptions(missing)))
+            if cache is not None:
+                for app_name in missing:
+                    if descriptions[app_name] is not None:
+                        cache.set((backend, self._uri, app_name), descriptions[app_name])
+        return [descriptions[app_name] for app_name in app_names]
+
+    def _query_app_descriptions(self, app_names: List[str]) -> List[str]:
+        snapshot = get_kg_snapshot()
+        if snapshot is not None:
+            return [snapshot.describe(app_name) for app_name in app_names]
+        with self._session() as session:
+            return [session.run(description_query, candidate=app_name).single()[0] for app_name in app_names]
+
     def fetch_app_description(self,entity:str) -> str:
-        with self._driver.session() as session:
-            app_names = self.fetch_app_names()
-            app_name = calculate_cosine_similarity(entity, app_names)[0][0]
-            result = session.run(description_query, candidate=app_name)
-            app_description = result.single()[0]
-            return app_description
+        return self.fetch_app_descriptions([entity])[0]
 
     def _run(self, entity: str, entity_type: str, run_manager: Optional[CallbackManagerForToolRun] = None) -> str:
         return self.fetch_app_description(entity)
 
     async def _arun(self, entity: str, entity_type: str, run_manager: Optional[AsyncCallbackManagerForToolRun] = None) -> str:
         return self.fetch_app_description(entity)
-
-    def __del__(self):
-        self._driver.close()
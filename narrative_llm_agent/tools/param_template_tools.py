@@ -0,0 +1,181 @@
+"""
+Parameter templates learned from successful app runs.
+
+Once an app has run successfully on an object of some type, the parameters it used get saved
+as a template, keyed by the app id and the input object's type. Values that depend on the
+input object get abstracted into slots:
+* the input object UPA (or name) becomes an "input_object" slot.
+* output object names become an "output_name" slot, with the input object name replaced
+  by a placeholder, e.g. "my_reads_assembly" -> "{input_name}_assembly". When filled in, they
+  get a suffix that's unique to the run, so running the same app on the same object again
+  doesn't overwrite the earlier output.
+Everything else is kept as-is.
+
+The next time that app runs on an object of the same type, the template gets filled in with
+the new input object, and the parameters can be used directly without asking an LLM to
+build them from scratch.
+"""
+import json
+import logging
+import uuid
+from typing import Any
+from pydantic import BaseModel
+from narrative_llm_agent.kbase.objects.app_spec import AppSpec
+from narrative_llm_agent.kbase.objects.workspace import ObjectInfo
+from narrative_llm_agent.tools.plan_tools import base_type
+from narrative_llm_agent.util.app import validate_params
+from narrative_llm_agent.util.store import KeyValueStore, get_kv_store
+
+logger = logging.getLogger(__name__)
+
+INPUT_NAME_PLACEHOLDER = "{input_name}"
+_SLOT = "$slot"
+_INPUT_OBJECT = "input_object"
+_OUTPUT_NAME = "output_name"
+PARAM_TEMPLATE_NAMESPACE = "param_templates"
+
+
+class ParamTemplate(BaseModel):
+    app_id: str
+    input_type: str
+    params: dict[str, Any]
+    successes: int = 1
+
+
+def _param_kinds(spec: AppSpec) -> tuple[set[str], set[str]]:
+    """Returns the ids of the (data object input params, output object name params)."""
+    inputs = set()
+    outputs = set()
+    for param in spec.parameters or []:
+        if param.text_options is None:
+            continue
+        if param.text_options.is_output_name:
+            outputs.add(param.id)
+        elif param.text_options.valid_ws_types:
+            inputs.add(param.id)
+    return inputs, outputs
+
+
+class _NotGeneralizable(Exception):
+    pass
+
+
+def _abstract_value(param_id: str, value: Any, object_info: ObjectInfo, inputs: set[str], outputs: set[str]) -> Any:
+    if isinstance(value, dict):
+        return {key: _abstract_value(key, val, object_info, inputs, outputs) for key, val in value.items()}
+    if isinstance(value, list):
+        return [_abstract_value(param_id, val, object_info, inputs, outputs) for val in value]
+    if param_id in inputs and value not in (None, ""):
+        if value in (object_info.upa, object_info.name):
+            return {_SLOT: _INPUT_OBJECT}
+        # some other object, probably made in the same narrative, so this won't carry over.
+        raise _NotGeneralizable(f"parameter {param_id} uses an object other than the input")
+    if param_id in outputs and isinstance(value, str) and value:
+        if value == object_info.name:
+            raise _NotGeneralizable(f"output parameter {param_id} reuses the input object name")
+        if object_info.name in value:
+            pattern = value.replace(object_info.name, INPUT_NAME_PLACEHOLDER)
+        else:
+            pattern = f"{INPUT_NAME_PLACEHOLDER}_{value}"
+        return {_SLOT: _OUTPUT_NAME, "pattern": pattern}
+    return value
+
+
+def _fill_value(value: Any, object_info: ObjectInfo, suffix: str) -> Any:
+    if isinstance(value, dict):
+        if value.get(_SLOT) == _INPUT_OBJECT:
+            return object_info.upa
+        if value.get(_SLOT) == _OUTPUT_NAME:
+            return value["pattern"].replace(INPUT_NAME_PLACEHOLDER, object_info.name) + f"_{suffix}"
+        return {key: _fill_value(val, object_info, suffix) for key, val in value.items()}
+    if isinstance(value, list):
+        return [_fill_value(val, object_info, suffix) for val in value]
+    return value
+
+
+def make_param_template(spec: AppSpec, params: dict[str, Any], object_info: ObjectInfo) -> ParamTemplate | None:
+    """
+    Makes a template from parameters that successfully ran the app on the given input object.
+    Returns None if the parameters can't be generalized to other input objects.
+    """
+    inputs, outputs = _param_kinds(spec)
+    try:
+        abstracted = {
+            param_id: _abstract_value(param_id, value, object_info, inputs, outputs)
+            for param_id, value in params.items()
+        }
+    except _NotGeneralizable as err:
+        logger.info(f"Not saving a parameter template for {spec.info.id}: {err}")
+        return None
+    return ParamTemplate(app_id=spec.info.id, input_type=base_type(object_info.type), params=abstracted)
+
+
+def fill_param_template(template: ParamTemplate, object_info: ObjectInfo, suffix: str | None = None) -> dict[str, Any]:
+    """
+    Fills in a template's slots with the given input object. Output names end with the
+    suffix, which is random if not given.
+    """
+    if suffix is None:
+        suffix = uuid.uuid4().hex[:8]
+    return {param_id: _fill_value(value, object_info, suffix) for param_id, value in template.params.items()}
+
+
+class ParamTemplateStore:
+    """
+    Saves parameter templates by app id and input object type. The templates are kept in a
+    KeyValueStore, so they're shared between runs. By default, this uses the configured store
+    (see util.store.get_kv_store).
+    """
+
+    def __init__(self, store: KeyValueStore | None = None) -> None:
+        self._store = store
+
+    @property
+    def store(self) -> KeyValueStore:
+        if self._store is None:
+            self._store = get_kv_store(PARAM_TEMPLATE_NAMESPACE)
+        return self._store
+
+    def _key(self, app_id: str, input_type: str) -> str:
+        return f"{app_id}|{base_type(input_type)}"
+
+    def get_template(self, app_id: str, input_type: str) -> ParamTemplate | None:
+        raw = self.store.get(self._key(app_id, input_type))
+        if raw is None:
+            return None
+        return ParamTemplate.model_validate_json(raw)
+
+    def get_params(self, spec: AppSpec, object_info: ObjectInfo) -> dict[str, Any] | None:
+        """
+        Returns parameters for running the app on the given object, filled in from a saved
+        template, or None if there's no template, or the filled in parameters aren't valid
+        for the current version of the app.
+        """
+        template = self.get_template(spec.info.id, object_info.type)
+        if template is None:
+            return None
+        params = fill_param_template(template, object_info)
+        try:
+            validate_params(spec, params)
+        except ValueError as err:
+            logger.info(f"Parameter template for {spec.info.id} no longer fits the app: {err}")
+            return None
+        return params
+
+    def record_success(self, spec: AppSpec, params: dict[str, Any], object_info: ObjectInfo) -> ParamTemplate | None:
+        """
+        Saves a template from parameters that successfully ran the app on the given object,
+        replacing any older template for the same app and input type.
+        Returns the saved template, or None if one couldn't be made.
+        """
+        template = make_param_template(spec, params, object_info)
+        if template is None:
+            return None
+        existing = self.get_template(template.app_id, template.input_type)
+        if existing is not None:
+            template.successes = existing.successes + 1
+        self.store.set(
+            self._key(template.app_id, template.input_type),
+            json.dumps(template.model_dump()).encode("utf-8"),
+        )
+        return template
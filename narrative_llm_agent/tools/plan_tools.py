@@ -0,0 +1,213 @@
+import logging
+from pydantic import BaseModel
+from narrative_llm_agent.tools.app_tools import AppSpecCache
+from narrative_llm_agent.kbase.service_client import ServerError
+
+logger = logging.getLogger(__name__)
+
+
+class ConverterApp(BaseModel):
+    """
+    An app that can turn one data type into another, to be put in between plan steps.
+    """
+    app_id: str
+    name: str
+    description: str
+
+
+class PlanIssue(BaseModel):
+    step: int
+    app_id: str
+    message: str
+
+
+class PlanCheckResult(BaseModel):
+    steps: list[dict]
+    issues: list[PlanIssue] = []
+    inserted_converters: list[str] = []
+
+    @property
+    def feasible(self) -> bool:
+        return len(self.issues) == 0
+
+
+# (from type, to type) -> app that converts between them.
+_TYPE_CONVERTERS: dict[tuple[str, str], ConverterApp] = {}
+
+
+def register_type_converter(from_type: str, to_type: str, converter: ConverterApp) -> None:
+    """
+    Registers an app that makes an object of to_type from an object of from_type.
+    Types are KBase workspace types, with or without a version, like "KBaseGenomes.Genome".
+    """
+    _TYPE_CONVERTERS[(base_type(from_type), base_type(to_type))] = converter
+
+
+def base_type(ws_type: str) -> str:
+    """
+    Strips the version from a workspace type string, e.g.
+    KBaseGenomes.Genome-17.0 -> KBaseGenomes.Genome
+    """
+    return ws_type.split("-")[0]
+
+
+def _find_converter(
+    available_types: set[str], required_types: set[str]
+) -> tuple[str, str, ConverterApp] | None:
+    for (from_type, to_type), converter in _TYPE_CONVERTERS.items():
+        if from_type in available_types and to_type in required_types:
+            return from_type, to_type, converter
+    return None
+
+
+def check_plan(
+    steps: list[dict],
+    initial_types: list[str],
+    app_specs: AppSpecCache,
+    insert_converters: bool = True,
+) -> PlanCheckResult:
+    """
+    Checks that the data types of an analysis plan chain together, before anything gets run.
+    Starting with the types of the initial objects (e.g. the reads object given to the
+    analyst), this walks through the plan steps. Each step's app needs at least one of its
+    input types to be available, either from the initial objects or the outputs of an earlier
+    step. App input and output types come from each app's spec info.
+
+    If a step's inputs aren't available, but a registered converter app can make one of them
+    from an available type, and insert_converters is True, a new step running that converter
+    is put in front of it. Otherwise, an issue is recorded for the step and its outputs are
+    still considered available, so the rest of the plan gets checked as well.
+
+    Apps whose spec doesn't list any input types can't be checked, and are assumed fine.
+    If initial_types is empty, the first step is assumed to be given the right inputs.
+
+    Steps are dictionaries in the same form as AnalysisStep.model_dump(). The returned
+    steps are renumbered if any converters were added.
+    """
+    available_types = {base_type(t) for t in initial_types}
+    checked_steps = []
+    issues = []
+    inserted = []
+    for step in steps:
+        app_id = step["app_id"]
+        try:
+            info = app_specs.get_app_spec(app_id).info
+        except (ServerError, ValueError, IndexError) as err:
+            issues.append(
+                PlanIssue(step=step["step"], app_id=app_id, message=f"Unable to find app {app_id}: {err}")
+            )
+            checked_steps.append(step)
+            continue
+        required_types = {base_type(t) for t in info.input_types}
+        if required_types and available_types and not required_types & available_types:
+            converter = _find_converter(available_types, required_types)
+            if converter is not None and insert_converters:
+                from_type, to_type, converter_app = converter
+                checked_steps.append(
+                    {
+                        "step": step["step"],
+                        "name": converter_app.name,
+                        "app": converter_app.name,
+                        "description": converter_app.description,
+                        "expect_new_object": True,
+                        "app_id": converter_app.app_id,
+                        "input_data_object": [from_type],
+                        "output_data_object": [to_type],
+                    }
+                )
+                available_types.add(to_type)
+                inserted.append(converter_app.app_id)
+                logger.info(f"Inserted converter {converter_app.app_id} ({from_type} -> {to_type}) before {app_id}")
+            else:
+                message = (
+                    f"App {app_id} needs one of {sorted(required_types)} as input, "
+                    f"but only {sorted(available_types)} are available."
+                )
+                if converter is not None:
+                    message += f" Running {converter[2].app_id} first would convert {converter[0]} to {converter[1]}."
+                issues.append(PlanIssue(step=step["step"], app_id=app_id, message=message))
+        available_types.update(base_type(t) for t in info.output_types)
+        checked_steps.append(step)
+
+    if inserted:
+        checked_steps = [step | {"step": idx + 1} for idx, step in enumerate(checked_steps)]
+    return PlanCheckResult(steps=checked_steps, issues=issues, inserted_converters=inserted)
+
+
+class StepInputCheck(BaseModel):
+    ok: bool
+    reason: str
+    input_object_upa: str | None = None
+
+
+def check_next_step(
+    next_step: dict,
+    candidate_objects: list[tuple[str, str]],
+    app_specs: AppSpecCache,
+) -> StepInputCheck:
+    """
+    Checks whether one of the candidate objects can be the input to the next plan step,
+    without any LLM help. candidate_objects are (UPA, workspace type) pairs, in order of
+    preference. The first one whose type is one of the next app's input types gets used.
+
+    This isn't ok if the app can't be found, if its spec doesn't list any input types
+    (so there's nothing to check against), or if none of the candidates match.
+    """
+    app_id = next_step["app_id"]
+    try:
+        info = app_specs.get_app_spec(app_id).info
+    except (ServerError, ValueError, IndexError) as err:
+        return StepInputCheck(ok=False, reason=f"Unable to find app {app_id}: {err}")
+    required_types = {base_type(t) for t in info.input_types}
+    if not required_types:
+        return StepInputCheck(ok=False, reason=f"App {app_id} doesn't list any input types")
+    for upa, ws_type in candidate_objects:
+        if base_type(ws_type) in required_types:
+            return StepInputCheck(
+                ok=True,
+                reason=f"Object {upa} has type {base_type(ws_type)}, which app {app_id} takes as input.",
+                input_object_upa=upa,
+            )
+    found = sorted({base_type(ws_type) for _, ws_type in candidate_objects})
+    return StepInputCheck(
+        ok=False,
+        reason=f"App {app_id} needs one of {sorted(required_types)} as input, but got {found}",
+    )
+
+
+register_type_converter(
+    "KBaseGenomes.Genome",
+    "KBaseSearch.GenomeSet",
+    ConverterApp(
+        app_id="kb_SetUtilities/KButil_Build_GenomeSet",
+        name="Build GenomeSet",
+        description="Build a GenomeSet from the genome(s), for apps that need a GenomeSet as input.",
+    ),
+)
+register_type_converter(
+    "KBaseGenomeAnnotations.Assembly",
+    "KBaseSets.AssemblySet",
+    ConverterApp(
+        app_id="kb_SetUtilities/KButil_Build_AssemblySet",
+        name="Build AssemblySet",
+        description="Build an AssemblySet from the assembly, for apps that need an AssemblySet as input.",
+    ),
+)
+register_type_converter(
+    "KBaseFile.PairedEndLibrary",
+    "KBaseSets.ReadsSet",
+    ConverterApp(
+        app_id="kb_SetUtilities/KButil_Build_ReadsSet",
+        name="Build ReadsSet",
+        description="Build a ReadsSet from the reads library, for apps that need a ReadsSet as input.",
+    ),
+)
+register_type_converter(
+    "KBaseFile.SingleEndLibrary",
+    "KBaseSets.ReadsSet",
+    ConverterApp(
+        app_id="kb_SetUtilities/KButil_Build_ReadsSet",
+        name="Build ReadsSet",
+        description="Build a ReadsSet from the reads library, for apps that need a ReadsSet as input.",
+    ),
+)
@@ -1,24 +1,97 @@
+from narrative_llm_agent.config import get_config
 from narrative_llm_agent.kbase.clients.execution_engine import ExecutionEngine
 from narrative_llm_agent.kbase.clients.workspace import Workspace
 from narrative_llm_agent.kbase.clients.blobstore import Blobstore
-from bs4 import BeautifulSoup
+from pydantic import BaseModel, computed_field
 
+from html.parser import HTMLParser
+import logging
 import zipfile
 import io
 from pathlib import Path
+from typing import Callable
 from narrative_llm_agent.kbase.objects.report import (
     KBaseReport,
     LinkedFile,
     is_report,
 )
+from narrative_llm_agent.util.tokens import BYTES_PER_TOKEN, estimate_tokens
 import re
 
+logger = logging.getLogger(__name__)
+
+ReportTranslator = Callable[[KBaseReport, Blobstore], str]
+
+# Used as the method part of a registry key to match every method of a service.
+ANY_METHOD = "*"
+DEFAULT_SOURCE = "default"
+# Default cap on the size of each minimized HTML report, ~5000 tokens. The
+# html_report_max_bytes config option overrides it.
+DEFAULT_HTML_REPORT_MAX_BYTES = 20000
+
+_REPORT_TRANSLATORS: dict[tuple[str, str], ReportTranslator] = {}
+
+
+class ReportTranslationStats(BaseModel):
+    """
+    Size information about a translated report. default_bytes is only set when
+    the default (minimized HTML) translation was also run for comparison.
+    """
+    source: str
+    translated_bytes: int
+    default_bytes: int | None = None
+
+    @computed_field()
+    @property
+    def saved_bytes(self) -> int | None:
+        if self.default_bytes is None:
+            return None
+        return self.default_bytes - self.translated_bytes
+
+    @computed_field()
+    @property
+    def saved_tokens(self) -> int | None:
+        if self.default_bytes is None:
+            return None
+        return estimate_tokens(self.default_bytes) - estimate_tokens(self.translated_bytes)
+
+
+def register_report_translator(
+    service: str, method: str, translator: ReportTranslator
+) -> None:
+    """
+    Registers a function that translates a report into a compact string for an LLM.
+    Reports are matched to translators by the service and method in the first action of
+    the report's provenance. Both are case-insensitive. Use ANY_METHOD as the method to
+    match all methods of a service; an exact service and method match always wins over that.
+
+    The translator gets called with the KBaseReport and a Blobstore client, and must
+    return a string.
+    """
+    _REPORT_TRANSLATORS[(service.lower(), method.lower())] = translator
+
 
 def get_report(upa: str, ws: Workspace, blobstore: Blobstore) -> str:
     """
     Fetches a report object and returns the relevant portion, depending on what it's
     a report for. Which is hard to say. Maybe it needs the app name?
     """
+    report_text, _ = get_report_with_stats(upa, ws, blobstore)
+    return report_text
+
+
+def get_report_with_stats(
+    upa: str, ws: Workspace, blobstore: Blobstore, compare_with_default: bool = False
+) -> tuple[str, ReportTranslationStats]:
+    """
+    Fetches a report object and translates it using the translator registered for
+    the service and method that made it. Returns the translated report and some stats
+    about its size.
+
+    If compare_with_default is True, and the report has a specific translator, this also
+    runs the default translator so the stats include how many bytes and tokens were saved.
+    Note that this means downloading and processing any HTML reports, so it's slower.
+    """
     # get and test it's a report
     obj = ws.get_objects([upa])[0]
     if "info" not in obj or len(obj["info"]) < 10:
@@ -30,16 +103,17 @@ def get_report(upa: str, ws: Workspace, blobstore: Blobstore) -> str:
             f"Object with UPA {upa} is not a report but a {obj['info'][2]}."
         )
     # check report source from provenance and process based on its service and method
-    report_source = _get_report_source(obj["provenance"])
+    report_source, translator = _get_report_translator(obj["provenance"])
     report = KBaseReport(**obj["data"])
-    if report_source == "fastqc":
-        return _translate_fastqc_report(report, blobstore)
-    elif report_source == "checkm":
-        return _translate_checkm_report(report, blobstore)
-    elif report_source == "gtdbtk":
-        return _translate_gtdb_report(report, blobstore)
-    else:
-        return _default_translate_report(report, blobstore)
+    report_text = translator(report, blobstore)
+    stats = ReportTranslationStats(
+        source=report_source, translated_bytes=len(report_text.encode("utf-8"))
+    )
+    if compare_with_default and translator is not _default_translate_report:
+        default_text = _default_translate_report(report, blobstore)
+        stats.default_bytes = len(default_text.encode("utf-8"))
+    logger.info(f"Translated report {upa}: {stats.model_dump_json()}")
+    return report_text, stats
 
 
 def get_report_from_job_id(
@@ -81,24 +155,24 @@ def get_report_from_job_id(
     return "The job was completed, but no job output was found."
 
 
-def _get_report_source(provenance: list[dict]) -> str:
+def _get_report_translator(provenance: list[dict]) -> tuple[str, ReportTranslator]:
     """
     Parses the object provenance to get the most likely source method for that report
     so we can tease apart the structure and return what's necessary for the LLM to do its
     thing. Should be in the first provenance action.
 
-    Tuned for fastqc right now. Others to come!
+    Returns a tuple with the source ("service.method", or "default") and the
+    translator function to use.
     """
+    if not provenance:
+        return DEFAULT_SOURCE, _default_translate_report
     recent = provenance[0]
-    method = recent.get("method", "").lower()
-    service = recent.get("service", "").lower()
-    if method == "runfastqc" and service == "kb_fastqc":
-        return "fastqc"
-    elif method == "run_checkm_lineage_wf" and service == "kb_msuite":
-        return "checkm"
-    elif method == "run_kb_gtdbtk_classify_wf" and service == "kb_gtdbtk":
-        return "gtdbtk"
-    return "other"
+    method = (recent.get("method") or "").lower()
+    service = (recent.get("service") or "").lower()
+    for key in [(service, method), (service, ANY_METHOD)]:
+        if key in _REPORT_TRANSLATORS:
+            return f"{service}.{method}", _REPORT_TRANSLATORS[key]
+    return DEFAULT_SOURCE, _default_translate_report
 
 
 def _default_translate_report(report: KBaseReport, blobstore: Blobstore) -> str:
@@ -109,8 +183,10 @@ def _default_translate_report(report: KBaseReport, blobstore: Blobstore) -> str:
     1. text message
     2. direct html
     3. HTML scraped from html links, with direct_html_link_index being first,
-        if applicable
+        if applicable. Each one is capped by the html_report_max_bytes and
+        html_report_max_tokens config options.
     """
+    config = get_config()
     message = report.text_message or ""
     direct_html = report.direct_html or ""
     html_texts = []
@@ -118,7 +194,11 @@ def _default_translate_report(report: KBaseReport, blobstore: Blobstore) -> str:
         html_texts.append(
             link.label
             + ":\n"
-            + _minimize_html_report(_fetch_html_file(link, blobstore))
+            + _minimize_html_report(
+                _fetch_html_file(link, blobstore),
+                max_bytes=config.html_report_max_bytes,
+                max_tokens=config.html_report_max_tokens,
+            )
         )
     html_text = "\n".join(html_texts)
     return "\n".join(
@@ -130,6 +210,54 @@ def _default_translate_report(report: KBaseReport, blobstore: Blobstore) -> str:
     )
 
 
+def _translate_message_report(report: KBaseReport, blobstore: Blobstore) -> str:
+    """
+    Translator for apps that put their summary statistics in the report's text message,
+    like SPAdes (contig counts and length distribution), Trimmomatic (surviving and
+    dropped reads), Prokka and RAST (gene and feature counts).
+    This skips the HTML reports entirely, and returns the message, any warnings, and
+    a list of created objects.
+    If there's no message, this falls back to the default translator.
+    """
+    message = (report.text_message or "").strip()
+    if not message:
+        return _default_translate_report(report, blobstore)
+    parts = [f"message: {message}"]
+    if report.warnings:
+        parts.append("warnings:\n" + "\n".join(f"- {warning}" for warning in report.warnings))
+    if report.objects_created:
+        parts.append(
+            "objects created:\n"
+            + "\n".join(
+                f"- {obj.ref}: {obj.description or 'no description'}"
+                for obj in report.objects_created
+            )
+        )
+    return "\n".join(parts)
+
+
+def _translate_quast_report(report: KBaseReport, blobstore: Blobstore) -> str:
+    """
+    QUAST puts its whole output directory in the HTML report archive. The report.tsv
+    file there is the summary table with contig counts, N50, L50, GC content, etc.
+    for each assembly, which is all the LLM needs. If that can't be found, this falls
+    back to the default translator.
+    """
+    target_file_name = "report.tsv"
+    for link in (report.html_links or []) + (report.file_links or []):
+        if link.URL is None:
+            continue
+        try:
+            file_data = _extract_report_files(
+                link.URL, [target_file_name], blobstore, only_check_filename=True
+            )
+        except (ValueError, zipfile.BadZipFile):
+            continue
+        if file_data[target_file_name] is not None:
+            return "QUAST summary table:\n" + file_data[target_file_name]
+    return _default_translate_report(report, blobstore)
+
+
 def _translate_gtdb_report(report: KBaseReport, blobstore: Blobstore) -> str:
     id_map = Path("id_to_name.map")
     archaea_summary = Path("gtdbtk.ar53.summary.tsv")
@@ -423,16 +551,231 @@ def _fetch_html_file(html_file: LinkedFile, blobstore: Blobstore) -> str:
     return ""
 
 
-def _minimize_html_report(html_text: str) -> str:
+# Tag content that never gets shown to the LLM.
+_SKIPPED_HTML_TAGS = {
+    "head",
+    "script",
+    "style",
+    "noscript",
+    "template",
+    "svg",
+    "canvas",
+    "iframe",
+    "object",
+}
+# Tags that start a new line of text.
+_BLOCK_HTML_TAGS = {
+    "address",
+    "article",
+    "aside",
+    "blockquote",
+    "body",
+    "br",
+    "caption",
+    "dd",
+    "div",
+    "dl",
+    "dt",
+    "figcaption",
+    "figure",
+    "footer",
+    "form",
+    "header",
+    "hr",
+    "li",
+    "main",
+    "nav",
+    "ol",
+    "p",
+    "pre",
+    "section",
+    "ul",
+}
+_HEADING_HTML_TAGS = {"h1": 1, "h2": 2, "h3": 3, "h4": 4, "h5": 5, "h6": 6}
+_DATA_URI_REGEX = re.compile(r"data:[\w/+.-]*(?:;[\w=.-]+)*;base64,[A-Za-z0-9+/=]+")
+
+
+class _HTMLTable:
+    def __init__(self) -> None:
+        self.rows: list[list[str]] = []
+        self.row: list[str] | None = None
+        self.cell: list[str] | None = None
+        # text that isn't in a cell, like a <caption>
+        self.text: list[str] = []
+
+    def get_text(self) -> str:
+        return " ".join("".join(self.text).split())
+
+    def end_cell(self) -> None:
+        if self.cell is not None:
+            if self.row is None:
+                self.row = []
+            self.row.append(" ".join("".join(self.cell).split()))
+            self.cell = None
+
+    def end_row(self) -> None:
+        self.end_cell()
+        if self.row is not None:
+            self.rows.append(self.row)
+            self.row = None
+
+
+class _HTMLTextExtractor(HTMLParser):
     """
-    Minimizes html reports by removing styles and javascript.
-    This removes <head>, <script> and <style> tags.
-    TODO: add more, alter per-app?
+    Streams through an HTML document and keeps only the visible text. Tables
+    get converted to markdown, with any text outside their cells (like a caption)
+    on the line before. Headings and list items get their markdown prefix,
+    and everything in _SKIPPED_HTML_TAGS is dropped.
     """
-    soup = BeautifulSoup(html_text, "html.parser")
-    for tag in soup.find_all(["head", "script", "style"]):
-        tag.decompose()
-    return str(soup)
+
+    def __init__(self) -> None:
+        super().__init__(convert_charrefs=True)
+        self._chunks: list[str] = []
+        self._skip_depth = 0
+        self._tables: list[_HTMLTable] = []
+
+    def get_text(self) -> str:
+        return "".join(self._chunks)
+
+    def _emit(self, text: str) -> None:
+        if self._tables:
+            table = self._tables[-1]
+            if table.cell is not None:
+                table.cell.append(text)
+            else:
+                table.text.append(text)
+        else:
+            self._chunks.append(text)
+
+    def handle_starttag(self, tag: str, attrs: list[tuple[str, str | None]]) -> None:
+        if tag in _SKIPPED_HTML_TAGS:
+            self._skip_depth += 1
+            return
+        if self._skip_depth:
+            return
+        if tag == "table":
+            self._tables.append(_HTMLTable())
+        elif self._tables and tag == "tr":
+            self._tables[-1].end_row()
+            self._tables[-1].row = []
+        elif self._tables and tag in ("td", "th"):
+            self._tables[-1].end_cell()
+            self._tables[-1].cell = []
+        elif tag in _HEADING_HTML_TAGS:
+            self._emit("\n" + "#" * _HEADING_HTML_TAGS[tag] + " ")
+        elif tag == "li":
+            self._emit("\n- ")
+        elif tag in _BLOCK_HTML_TAGS:
+            self._emit("\n")
+        elif tag == "img":
+            # the src is usually a base64 data URI or a local file, and useless either way.
+            alt = dict(attrs).get("alt")
+            if alt:
+                self._emit(f" [image: {alt}] ")
+
+    def handle_endtag(self, tag: str) -> None:
+        if tag in _SKIPPED_HTML_TAGS:
+            self._skip_depth = max(self._skip_depth - 1, 0)
+            return
+        if self._skip_depth:
+            return
+        if tag == "table" and self._tables:
+            table = self._tables.pop()
+            table.end_row()
+            caption = table.get_text()
+            if self._tables:
+                # nested table, flatten it into the outer cell
+                parts = [caption] if caption else []
+                parts.extend(" ".join(row) for row in table.rows)
+                self._emit(" " + "; ".join(parts) + " ")
+            else:
+                self._emit("\n" + caption + "\n" + _render_markdown_table(table.rows) + "\n")
+        elif self._tables and tag in ("td", "th"):
+            self._tables[-1].end_cell()
+        elif self._tables and tag == "tr":
+            self._tables[-1].end_row()
+        elif tag in _HEADING_HTML_TAGS or tag in _BLOCK_HTML_TAGS:
+            self._emit("\n")
+
+    def handle_data(self, data: str) -> None:
+        if self._skip_depth:
+            return
+        self._emit(re.sub(r"[ \t\r\n\f]+", " ", data))
+
+
+def _render_markdown_table(rows: list[list[str]]) -> str:
+    """
+    Renders table rows as a markdown table, using the first row as the header.
+    Runs of identical rows get collapsed into a single row and a note about how
+    many times it was repeated.
+    """
+    rows = [row for row in rows if any(row)]
+    if not rows:
+        return ""
+    width = max(len(row) for row in rows)
+    rows = [row + [""] * (width - len(row)) for row in rows]
+
+    def format_row(row: list[str]) -> str:
+        return "| " + " | ".join(cell.replace("|", "\\|") for cell in row) + " |"
+
+    lines = [format_row(rows[0]), "|" + " --- |" * width]
+    prev_row = rows[0]
+    repeats = 0
+    for row in rows[1:]:
+        if row == prev_row:
+            repeats += 1
+            continue
+        if repeats:
+            lines.append(f"| (previous row repeated {repeats} more times) |")
+            repeats = 0
+        lines.append(format_row(row))
+        prev_row = row
+    if repeats:
+        lines.append(f"| (previous row repeated {repeats} more times) |")
+    return "\n".join(lines)
+
+
+def _truncate_to_bytes(text: str, max_bytes: int) -> str:
+    """
+    Truncates text to at most max_bytes of UTF-8, cutting at the last full line
+    if there is one, and appends a note saying how much was kept.
+    """
+    encoded = text.encode("utf-8")
+    if len(encoded) <= max_bytes:
+        return text
+    truncated = encoded[:max_bytes].decode("utf-8", errors="ignore")
+    if "\n" in truncated:
+        truncated = truncated.rsplit("\n", 1)[0]
+    kept_bytes = len(truncated.encode("utf-8"))
+    return truncated + f"\n[report truncated, showing {kept_bytes} of {len(encoded)} bytes]"
+
+
+def _minimize_html_report(
+    html_text: str,
+    max_bytes: int | None = DEFAULT_HTML_REPORT_MAX_BYTES,
+    max_tokens: int | None = None,
+) -> str:
+    """
+    Minimizes html reports down to their visible text, so they're cheap to send to
+    an LLM. This:
+    1. Drops <head>, <script>, <style>, and other non-visible content.
+    2. Converts tables to markdown tables, collapsing runs of repeated rows.
+    3. Strips base64 data URIs (usually embedded images).
+    4. Caps the result at max_bytes, or max_tokens (estimated), whichever is smaller.
+       If both are None, there's no cap.
+    This uses a streaming parser, so no document tree gets built.
+    """
+    parser = _HTMLTextExtractor()
+    parser.feed(html_text)
+    parser.close()
+    text = _DATA_URI_REGEX.sub("", parser.get_text())
+    lines = [" ".join(line.split()) for line in text.split("\n")]
+    text = "\n".join(line for line in lines if line)
+
+    caps = [cap for cap in [max_bytes, max_tokens and max_tokens * BYTES_PER_TOKEN] if cap]
+    if caps:
+        text = _truncate_to_bytes(text, min(caps))
+    return text
 
 
 def _extract_report_files(
@@ -483,3 +826,13 @@ def _get_file_url(filename: str, report: KBaseReport) -> str | None:
         if report_file.name == filename:
             return report_file.URL
     return None
+
+
+register_report_translator("kb_fastqc", "runfastqc", _translate_fastqc_report)
+register_report_translator("kb_Msuite", "run_checkM_lineage_wf", _translate_checkm_report)
+register_report_translator("kb_gtdbtk", "run_kb_gtdbtk_classify_wf", _translate_gtdb_report)
+register_report_translator("kb_quast", "run_QUAST_app", _translate_quast_report)
+register_report_translator("kb_SPAdes", ANY_METHOD, _translate_message_report)
+register_report_translator("kb_trimmomatic", ANY_METHOD, _translate_message_report)
+register_report_translator("ProkkaAnnotation", ANY_METHOD, _translate_message_report)
+register_report_translator("RAST_SDK", ANY_METHOD, _translate_message_report)
@@ -1,4 +1,7 @@
+import time
+from cacheout.lru import LRUCache
 from narrative_llm_agent.kbase.clients.workspace import Workspace
+from narrative_llm_agent.kbase.objects.workspace import ObjectInfo
 
 
 def get_object_metadata(obj_upa: str, ws: Workspace) -> dict[str, str]:
@@ -7,3 +10,32 @@ def get_object_metadata(obj_upa: str, ws: Workspace) -> dict[str, str]:
     # then have the agent converse with the user.
     obj_info = ws.get_object_info(obj_upa)
     return obj_info.metadata
+
+
+class ObjectInfoCache:
+    """
+    A small LRU + TTL cache of object info, so workflow steps that keep checking the types
+    of the same objects don't make a round trip to the Workspace each time.
+    Info for a versioned UPA doesn't change, but the expiration keeps the cache from holding
+    onto objects that have since been deleted.
+    """
+
+    def __init__(
+        self,
+        ws: Workspace | None = None,
+        token: str | None = None,
+        cache_max_size: int = 1000,
+        cache_expiration: int = 3600,
+    ) -> None:
+        self._ws = ws
+        self._token = token
+        self._cache = LRUCache(timer=time.time, maxsize=cache_max_size, ttl=cache_expiration)
+
+    def get_object_info(self, upa: str) -> ObjectInfo:
+        if upa in self._cache:
+            return self._cache.get(upa)
+        if self._ws is None:
+            self._ws = Workspace(token=self._token)
+        info = self._ws.get_object_info(upa)
+        self._cache.set(upa, info)
+        return info
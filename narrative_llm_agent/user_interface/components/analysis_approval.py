@@ -18,6 +18,19 @@ REDIS_LOG_NAME = "execution_log"
 
 APP_LOG_BUFFERS = {}
 
+def create_plan_issues_alert(plan_issues: list[str]):
+    """Create a warning listing problems found with the data types flowing through the plan"""
+    if not plan_issues:
+        return html.Div()
+    return dbc.Alert([
+        html.H6([
+            html.I(className="bi bi-exclamation-triangle me-2"),
+            "Plan issues to review before approving:",
+        ], className="alert-heading"),
+        html.Ul([html.Li(issue) for issue in plan_issues], className="mb-0"),
+    ], color="warning", className="mb-3")
+
+
 def create_approval_interface(workflow_state: dict, session_id):
     """Create the approval interface for the analysis plan"""
     if not workflow_state:
@@ -93,6 +106,7 @@ def create_approval_interface(workflow_state: dict, session_id):
                     html.I(className="bi bi-info-circle me-2"),
                     f"Found {len(steps)} analysis steps ready for execution. Please review and approve the plan below.",
                 ], color="info", className="mb-3"),
+                create_plan_issues_alert(workflow_state.get("plan_issues", [])),
                 html.H5("📋 Proposed Analysis Steps:", className="mb-3"),
                 html.Div(analysis_table, className="table-responsive", style={"maxHeight": "500px", "overflowY": "auto"}),
                 html.Hr(),
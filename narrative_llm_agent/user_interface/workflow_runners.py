@@ -7,6 +7,7 @@ from narrative_llm_agent.workflow_graph.graph_hitl import (
     AnalysisWorkflow,
     ExecutionWorkflow,
 )
+from narrative_llm_agent.workflow_graph.checkpoint import get_checkpointer
 from narrative_llm_agent.writer_graph.mra_graph import MraWriterGraph
 from narrative_llm_agent.writer_graph.summary_graph import SummaryWriterGraph
 from narrative_llm_agent.kbase.clients.workspace import Workspace
@@ -53,6 +54,7 @@ def run_analysis_planning(narrative_id, reads_id, description, credentials):
             app_flow_llm=used_llm,
             app_flow_token=api_key,
             kbase_token=kb_auth_token,
+            checkpointer=get_checkpointer(),
         )
 
         # Run the planning phase only
@@ -70,6 +72,7 @@ def run_analysis_planning(narrative_id, reads_id, description, credentials):
             "workflow_state": workflow_state,
             "workflow_key": workflow_key,
             "error": workflow_state.get("error"),
+            "plan_issues": workflow_state.get("plan_issues", []),
             "status": "awaiting_approval"
             if workflow_state.get("awaiting_approval")
             else "completed",
@@ -118,8 +121,12 @@ def generate_mra_draft(narrative_id: int, credentials: dict[str, str]):
         return {"mra_draft": None, "error": str(e)}
 
 
-def run_analysis_execution(workflow_state, credentials, workflow_key=None):
-    """Run the analysis execution phase after approval"""
+def run_analysis_execution(workflow_state, credentials, workflow_key=None, resume=True):
+    """
+    Run the analysis execution phase after approval.
+    By default, if this plan was already running in this narrative and got interrupted
+    (e.g. the server restarted), this continues that run instead of starting over.
+    """
     try:
         # Get credentials and set environment variables
         kb_auth_token = credentials.get("kb_auth_token")
@@ -155,10 +162,11 @@ def run_analysis_execution(workflow_state, credentials, workflow_key=None):
             writer_llm=used_llm,
             writer_token=api_key,
             kbase_token=kb_auth_token,
+            checkpointer=get_checkpointer(),
         )
 
         # Run the execution phase
-        final_state = execution_workflow.run(workflow_state)
+        final_state = execution_workflow.run(workflow_state, resume=resume)
 
         # Make the final_state JSON serializable
         final_state_serializable = make_json_serializable(final_state)
@@ -1,8 +1,9 @@
-from typing import Any, Optional
+from typing import Annotated, Any, Literal, Optional
 import uuid
 import time
 import random
 import re
+from pydantic import BaseModel, ConfigDict, Field, ValidationError, create_model
 from narrative_llm_agent.kbase.clients.workspace import Workspace
 from narrative_llm_agent.kbase.objects.app_spec import (
     AppSpec,
@@ -187,12 +188,214 @@ def build_run_job_params(
     return job_params
 
 
-def validate_params(params: dict, spec_params: dict) -> None:
+def validate_params(app_spec: AppSpec, params: dict) -> None:
     """
+    Validates parameters against the app spec before they get sent to the Execution
+    Engine. This checks for required parameters, value types, numeric ranges, dropdown
+    and checkbox values, output object names, and parameter group structure, using the
+    model from app_params_pydantic.
+    Empty strings are treated as None, the same as when mapping parameters, and
+    parameters get normalized first (see normalize_params).
     If valid, returns None
     If invalid, raises a ValueError with one or more string errors.
     """
-    return None
+    params = normalize_params(app_spec, params)
+    params = {key: None if value == "" else value for key, value in params.items()}
+    try:
+        app_params_pydantic(app_spec).model_validate(params)
+    except ValidationError as err:
+        errors = []
+        for error in err.errors():
+            location = ".".join(str(loc) for loc in error["loc"])
+            errors.append(f"{location}: {error['msg']}")
+        raise ValueError(
+            f"Invalid parameters for app {app_spec.info.id}:\n" + "\n".join(errors)
+        )
+
+
+def normalize_params(app_spec: AppSpec, params: dict) -> dict:
+    """
+    Fixes up parameters that are close to, but not quite, what the app expects, the way
+    the Narrative UI would have entered them. This returns a new dictionary where:
+    * a dropdown option given by its display name, or in a different case, becomes its value.
+    * a single element list for a parameter that only takes one value becomes that value.
+    This applies to parameters in groups as well. Anything else is left for validate_params.
+    """
+    spec_params = {param.id: param for param in app_spec.parameters}
+
+    def normalize(values: dict) -> dict:
+        normalized = dict(values)
+        for param_id, value in values.items():
+            param = spec_params.get(param_id)
+            if param is None:
+                continue
+            if param.allow_multiple != 1 and isinstance(value, list) and len(value) == 1:
+                value = value[0]
+            if param.field_type == "dropdown" and param.dropdown_options is not None:
+                if isinstance(value, list):
+                    value = [_dropdown_value(param, item) for item in value]
+                else:
+                    value = _dropdown_value(param, value)
+            normalized[param_id] = value
+        return normalized
+
+    normalized = normalize(params)
+    for param_group in app_spec.parameter_groups or []:
+        group_value = normalized.get(param_group.id)
+        if isinstance(group_value, dict):
+            normalized[param_group.id] = normalize(group_value)
+        elif isinstance(group_value, list):
+            normalized[param_group.id] = [
+                normalize(item) if isinstance(item, dict) else item for item in group_value
+            ]
+    return normalized
+
+
+def _dropdown_value(param: AppParameter, value: Any) -> Any:
+    """
+    Returns the dropdown option value that matches the given value, or its display name,
+    ignoring case. If nothing matches, the value is returned as is.
+    """
+    if not isinstance(value, str):
+        return value
+    options = param.dropdown_options.options
+    for opt in options:
+        if value == opt.value:
+            return value
+    for opt in options:
+        if value.lower() in (opt.value.lower(), opt.display.lower()):
+            return opt.value
+    return value
+
+
+def app_params_pydantic(app_spec: AppSpec) -> type[BaseModel]:
+    model_atts = {}
+    proc = get_processed_app_spec_params(app_spec)
+    params_dict = {}
+    for param in app_spec.parameters:
+        params_dict[param.id] = param
+    # the individual parameters that are part of a group.
+    param_group_params = set()
+    param_group_model_atts = {}
+    if app_spec.parameter_groups is not None:
+        for param_group in app_spec.parameter_groups:
+            param_group_params.update(param_group.parameter_ids)
+            group_model_atts = {}
+            for param_id in param_group.parameter_ids:
+                group_model_atts[param_id] = _param_to_model_attribute(
+                    params_dict[param_id],
+                    proc[param_group.id]["params"][param_id]["type"]
+                )
+            pg_model = create_model(
+                f"{param_group.id}Model",
+                **group_model_atts,
+                __config__=ConfigDict(regex_engine="python-re")
+            )
+            if param_group.allow_multiple == 1:
+                param_group_model_atts[param_group.id] = list[pg_model]
+            else:
+                param_group_model_atts[param_group.id] = pg_model
+            if param_group.optional == 1:
+                param_group_model_atts[param_group.id] = (param_group_model_atts[param_group.id], None)
+
+    for param in app_spec.parameters:
+        if param.id not in param_group_params:
+            model_atts[param.id] = _param_to_model_attribute(param, proc[param.id].get("type", "string"))
+
+    model_atts = model_atts | param_group_model_atts
+    return create_model(
+        "AppParamsModel",
+        **model_atts,
+        __config__=ConfigDict(regex_engine="python-re")
+    )
+
+def _param_to_model_attribute(param: AppParameter, param_type: str):
+    """
+    `param_type` is figured out from the processed version - turns "text" into "data_object",
+    for example.
+    """
+    param_attr = str   # default
+    if param.default_values is not None and len(param.default_values):
+        default_value = param.default_values[0]
+    else:
+        default_value = None
+    # lots of cases here...
+    # numbers aren't strict, since LLMs often give them as strings, and
+    # transform_param_value coerces those anyway.
+    text_options = param.text_options
+    if param_type == "int":
+        param_attr = Annotated[
+            int,
+            Field(
+                ge=text_options.min_int if text_options else None,
+                le=text_options.max_int if text_options else None
+            )
+        ]
+        try:
+            default_value = int(default_value)
+        except Exception:
+            default_value = 0
+    if param_type == "float":
+        param_attr = Annotated[
+            float,
+            Field(
+                ge=text_options.min_float if text_options else None,
+                le=text_options.max_float if text_options else None
+            )
+        ]
+        try:
+            default_value = float(default_value)
+        except Exception:
+            default_value = 0.0
+    elif param_type == "dropdown":
+        if param.dropdown_options is None:
+            param_attr = Literal[None]
+        else:
+            param_attr = Literal[
+                *[opt.value for opt in param.dropdown_options.options]
+            ]
+    elif param_type == "checkbox":
+        param_attr, default_value = _pydantic_checkbox(param, default_value)
+    elif param_type == "data_object" and text_options.is_output_name == 1:
+        # from the workspace docs:
+        # the object name must be alphanumeric, and can have _\.- characters, and NOT be
+        # only numeric.
+        param_attr = Annotated[
+            str,
+            Field(
+                strict=True,
+                pattern=r"^(?!\d+$)[A-Za-z0-9|_\.-]+$"
+            )
+        ]
+    if param.allow_multiple == 1:
+        param_attr = list[param_attr]
+
+    if param.optional == 1:
+        return (Optional[param_attr], default_value)
+    return param_attr
+
+
+def _pydantic_checkbox(param: AppParameter, default_value: str):
+    """
+    TODO: figure out how to do typing for the return. Apparently, just a bare Literal doesn't work.
+    """
+    param_attr = Literal[
+        param.checkbox_options.checked_value,
+        param.checkbox_options.unchecked_value
+    ]
+    # This is very silly, but for checkboxes, the values must be integers,
+    # and all default values are always strings.
+    # some of these strings, instead of matching the checkbox values, are "false" or "true"
+    # or "False" or "0" or "1" or whatever.
+    # We turn the default into either the checked or unchecked value here.
+    # If the default is either "1" or "true" (or "True"), it becomes the checked value.
+    # all other cases become unchecked.
+    # If it's an empty string, set it to the unchecked value.
+    new_default = param.checkbox_options.unchecked_value
+    if default_value.lower().strip() in ["1", "true"]:
+        new_default = param.checkbox_options.checked_value
+    return param_attr, new_default
+
 
 def map_app_params(
     app_spec: AppSpec, params: dict, ws_id: int, ws_client: Workspace
@@ -204,7 +407,8 @@ def map_app_params(
     """
     input_mapping = app_spec.behavior.kb_service_input_mapping
     spec_params = get_processed_app_spec_params(app_spec, separate_group_params=False)
-    validate_params(params, spec_params)
+    params = normalize_params(app_spec, params)
+    validate_params(app_spec, params)
 
     """
     Maps the dictionary of parameters and inputs based on rules provided in
@@ -254,18 +458,7 @@ def map_app_params(
         if target_prop is not None:
             final_input = inputs_dict.get(arg_position, {})
             if "/" in target_prop:
-                # This is case when slashes in target_prop separate
-                # elements in nested maps. We ignore escaped slashes
-                # (separate backslashes should be escaped as well).
-                bck_slash = "\u244a"
-                fwd_slash = "\u20eb"
-                temp_string = target_prop.replace("\\\\", bck_slash)
-                temp_string = temp_string.replace("\\/", fwd_slash)
-                temp_path = []
-                for part in temp_string.split("/"):
-                    part = part.replace(bck_slash, "\\")
-                    part = part.replace(fwd_slash, "/")
-                    temp_path.append(part.encode("ascii", "ignore").decode("ascii"))
+                temp_path = split_target_property(target_prop)
                 temp_map = final_input
                 temp_key = None
                 # We're going along the path and creating intermediate
@@ -292,6 +485,23 @@ def map_app_params(
     return inputs_list
 
 
+def split_target_property(target_prop: str) -> list[str]:
+    """
+    Splits a target_property from an input mapping into the path of keys into nested maps.
+    Slashes separate the keys. Escaped slashes (and escaped backslashes) are kept in the keys.
+    """
+    bck_slash = "\u244a"
+    fwd_slash = "\u20eb"
+    temp_string = target_prop.replace("\\\\", bck_slash)
+    temp_string = temp_string.replace("\\/", fwd_slash)
+    path = []
+    for part in temp_string.split("/"):
+        part = part.replace(bck_slash, "\\")
+        part = part.replace(fwd_slash, "/")
+        path.append(part.encode("ascii", "ignore").decode("ascii"))
+    return path
+
+
 def transform_param_value(
     transform_type: Optional[str],
     value: Any,
@@ -0,0 +1,173 @@
+"""
+A local, read-only index of the app catalog embeddings, for fast catalog lookups.
+
+Searching the app catalog through Chroma goes through its sqlite-backed client each time.
+CatalogIndex keeps the same embeddings in a directory with two files:
+* vectors.npy - the embeddings, one row per catalog document, as float32 and scaled to unit
+  length. It's memory-mapped when loaded, so it costs next to nothing to open, and processes
+  on the same machine share the one copy in the OS page cache.
+* records.json - the ids, documents, and metadata of the rows, in the same order.
+
+Searches are a single matrix-vector product, scoring every row by cosine similarity, and
+taking the top k.
+
+To use it, export the catalog (see scripts/export_catalog_index.py), then set this in the
+[kbase] section of the config file:
+catalog_index_path=catalog_index
+"""
+import json
+import threading
+from pathlib import Path
+from typing import Any
+import numpy as np
+from langchain_chroma import Chroma
+from langchain_core.callbacks import CallbackManagerForRetrieverRun
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_core.retrievers import BaseRetriever
+from pydantic import ConfigDict
+
+INDEX_FORMAT_VERSION = 1
+VECTORS_FILE = "vectors.npy"
+RECORDS_FILE = "records.json"
+
+
+def _unit_rows(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    # all-zero rows stay zero, and never match anything
+    return vectors / np.where(norms == 0, 1, norms)
+
+
+class CatalogIndex:
+    """
+    The catalog embeddings (see above), with a top-k cosine search. Use from_chroma to build
+    one, and save and load for the files.
+    """
+
+    def __init__(
+        self,
+        vectors: np.ndarray,
+        ids: list[str],
+        documents: list[str],
+        metadatas: list[dict[str, Any]],
+    ) -> None:
+        if len(vectors) != len(ids):
+            raise ValueError(f"Catalog index has {len(vectors)} vectors, but {len(ids)} ids")
+        self.vectors = vectors
+        self.ids = ids
+        self.documents = documents
+        self.metadatas = metadatas
+
+    @classmethod
+    def from_arrays(
+        cls,
+        vectors: Any,
+        ids: list[str],
+        documents: list[str] | None = None,
+        metadatas: list[dict[str, Any] | None] | None = None,
+    ) -> "CatalogIndex":
+        """Builds an index from embeddings and their ids, with optional documents and metadata."""
+        matrix = np.asarray(vectors, dtype=np.float32)
+        if matrix.ndim != 2:
+            matrix = matrix.reshape(len(ids), -1) if len(ids) else np.zeros((0, 0), dtype=np.float32)
+        return cls(
+            _unit_rows(matrix),
+            [str(doc_id) for doc_id in ids],
+            [doc or "" for doc in documents] if documents is not None else [""] * len(ids),
+            [meta or {} for meta in metadatas] if metadatas is not None else [{}] * len(ids),
+        )
+
+    @classmethod
+    def from_chroma(cls, persist_directory: str | Path) -> "CatalogIndex":
+        """Builds an index from everything in a persisted Chroma database."""
+        store = Chroma(persist_directory=str(persist_directory), create_collection_if_not_exists=False)
+        data = store.get(include=["embeddings", "documents", "metadatas"])
+        return cls.from_arrays(data["embeddings"], data["ids"], data["documents"], data["metadatas"])
+
+    def save(self, path: str | Path) -> None:
+        path = Path(path)
+        path.mkdir(parents=True, exist_ok=True)
+        np.save(path / VECTORS_FILE, np.ascontiguousarray(self.vectors, dtype=np.float32))
+        records = {
+            "format_version": INDEX_FORMAT_VERSION,
+            "ids": self.ids,
+            "documents": self.documents,
+            "metadatas": self.metadatas,
+        }
+        with open(path / RECORDS_FILE, "w") as outfile:
+            json.dump(records, outfile)
+
+    @classmethod
+    def load(cls, path: str | Path) -> "CatalogIndex":
+        """Loads an index, with the vectors memory-mapped read-only."""
+        path = Path(path)
+        with open(path / RECORDS_FILE) as infile:
+            records = json.load(infile)
+        if records.get("format_version") != INDEX_FORMAT_VERSION:
+            raise ValueError(
+                f"Catalog index {path} has format version {records.get('format_version')}, "
+                f"expected {INDEX_FORMAT_VERSION}. Export it again."
+            )
+        vectors = np.load(path / VECTORS_FILE, mmap_mode="r")
+        return cls(vectors, records["ids"], records["documents"], records["metadatas"])
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def search(self, query_vector: list[float] | np.ndarray, k: int = 4) -> list[tuple[int, float]]:
+        """The (row, cosine similarity) of the k rows most like the query vector, best first."""
+        query = np.asarray(query_vector, dtype=np.float32)
+        if query.shape != (self.vectors.shape[1],):
+            raise ValueError(
+                f"Query vector has shape {query.shape}, but the catalog index has {self.vectors.shape[1]} dimensions"
+            )
+        k = min(k, len(self))
+        if k <= 0:
+            return []
+        norm = np.linalg.norm(query)
+        scores = self.vectors @ (query / norm if norm else query)
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top], kind="stable")]
+        return [(int(row), float(scores[row])) for row in top]
+
+    def similarity_search_with_score(
+        self, query: str, embeddings: Embeddings, k: int = 4
+    ) -> list[tuple[Document, float]]:
+        return [
+            (Document(id=self.ids[row], page_content=self.documents[row], metadata=self.metadatas[row]), score)
+            for row, score in self.search(embeddings.embed_query(query), k)
+        ]
+
+    def as_retriever(self, embeddings: Embeddings, k: int = 4) -> "CatalogIndexRetriever":
+        return CatalogIndexRetriever(index=self, embeddings=embeddings, k=k)
+
+
+class CatalogIndexRetriever(BaseRetriever):
+    """Retrieves the k catalog documents most like the query, from a CatalogIndex."""
+
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    index: CatalogIndex
+    embeddings: Embeddings
+    k: int = 4
+
+    def _get_relevant_documents(self, query: str, *, run_manager: CallbackManagerForRetrieverRun) -> list[Document]:
+        return [doc for doc, _ in self.index.similarity_search_with_score(query, self.embeddings, self.k)]
+
+
+_indexes: dict[str, CatalogIndex] = {}
+_indexes_lock = threading.Lock()
+
+
+def get_catalog_index(path: str | Path) -> CatalogIndex:
+    """Returns the index at the path, loading it the first time."""
+    key = str(Path(path).resolve())
+    with _indexes_lock:
+        if key not in _indexes:
+            _indexes[key] = CatalogIndex.load(key)
+        return _indexes[key]
+
+
+def clear_catalog_indexes() -> None:
+    with _indexes_lock:
+        _indexes.clear()
@@ -0,0 +1,243 @@
+"""
+A persistent cache of text embeddings, for the analyst's vector searches.
+
+Every retrieval embeds its query with the embeddings API, and the planner asks the same (or
+nearly the same) questions across runs and batch items. CachedEmbeddings wraps an embeddings
+model, and keeps each embedding in a KeyValueStore (see util.store) so it persists between runs.
+The key is a hash of the model, whether it's a query or a document (Nomic embeds them
+differently), and the normalized text - Unicode normalized, lower case, with runs of whitespace
+made single spaces. The Nomic embedding models are uncased, so case doesn't change the embedding.
+Texts that aren't cached get embedded together, in batches. If the store fails, the cache
+logs it and uses the wrapped model, so a broken store doesn't break retrieval. Once the store
+holds more than the max entries, random entries are evicted to make room. The entries are
+counted as they're written, so the store only gets listed when it's first used and when it
+needs trimming.
+
+Caching is set in the [kbase] section of the config file:
+embedding_cache=true
+embedding_cache_batch_size=64
+embedding_cache_max_entries=10000
+"""
+import hashlib
+import logging
+import random
+import re
+import threading
+import unicodedata
+import weakref
+import numpy as np
+from langchain_core.embeddings import Embeddings
+from pydantic import BaseModel
+from narrative_llm_agent.config import get_config
+from narrative_llm_agent.util.store import KeyValueStore, get_kv_store
+
+EMBEDDING_CACHE_NAMESPACE = "embeddings"
+_WHITESPACE = re.compile(r"\s+")
+# when evicting, trim the store to this fraction of its max entries, so it isn't trimmed on every write
+_EVICT_TO = 0.9
+
+logger = logging.getLogger(__name__)
+
+
+class EmbeddingCacheStats(BaseModel):
+    hits: int = 0
+    misses: int = 0
+    # calls made to the wrapped model, which embed the misses in batches
+    batches: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+
+def normalize_text(text: str) -> str:
+    return _WHITESPACE.sub(" ", unicodedata.normalize("NFKC", text)).strip().casefold()
+
+
+def embeddings_model_key(embeddings: Embeddings) -> str:
+    """
+    Identifies the embedding model - the class, model name, output dimensionality, and API base,
+    if there are any.
+    """
+    if isinstance(embeddings, CachedEmbeddings):
+        return embeddings.model_key
+    model = getattr(embeddings, "model", None)
+    dimensionality = getattr(embeddings, "dimensionality", None)
+    base_url = getattr(embeddings, "openai_api_base", None)
+    parts = (type(embeddings).__name__, model, dimensionality, base_url)
+    return ":".join(str(part) for part in parts if part is not None)
+
+
+def make_embedding_key(model_key: str, kind: str, text: str) -> str:
+    key_source = "\x00".join((model_key, kind, normalize_text(text)))
+    return hashlib.sha256(key_source.encode("utf-8")).hexdigest()
+
+
+_stats_lock = threading.Lock()
+# the number of entries in each store, counted from its keys when it's first written to
+_entry_counts: "weakref.WeakKeyDictionary[KeyValueStore, int]" = weakref.WeakKeyDictionary()
+_entry_count_lock = threading.Lock()
+
+
+class CachedEmbeddings(Embeddings):
+    """
+    Embeddings from the wrapped model, cached in a KeyValueStore. By default, this uses the
+    configured store (see util.store.get_kv_store), opened when it's first needed. Hits,
+    misses, and calls to the wrapped model are counted in stats, which can be shared with
+    other caches. If max_entries is set, random entries are evicted once the store holds more
+    than that.
+    """
+
+    def __init__(
+        self,
+        embeddings: Embeddings,
+        store: KeyValueStore | None = None,
+        batch_size: int = 64,
+        stats: EmbeddingCacheStats | None = None,
+        max_entries: int | None = None,
+    ) -> None:
+        self.embeddings = embeddings
+        self._store = store
+        self.batch_size = max(1, batch_size)
+        self.max_entries = max_entries
+        self.model_key = embeddings_model_key(embeddings)
+        self.stats = stats if stats is not None else EmbeddingCacheStats()
+
+    @property
+    def store(self) -> KeyValueStore:
+        if self._store is None:
+            self._store = _get_shared_store()
+        return self._store
+
+    def _count(self, hits: int = 0, misses: int = 0, batches: int = 0) -> None:
+        with _stats_lock:
+            self.stats.hits += hits
+            self.stats.misses += misses
+            self.stats.batches += batches
+
+    def _get(self, key: str) -> list[float] | None:
+        try:
+            raw = self.store.get(key)
+        except Exception as e:
+            logger.warning(f"Unable to read from the embedding cache, ignoring it: {e}")
+            return None
+        if raw is None:
+            return None
+        return np.frombuffer(raw, dtype=np.float64).tolist()
+
+    def _set(self, key: str, vector: list[float]) -> bool:
+        try:
+            self.store.set(key, np.asarray(vector, dtype=np.float64).tobytes())
+            return True
+        except Exception as e:
+            logger.warning(f"Unable to write to the embedding cache, ignoring it: {e}")
+            return False
+
+    def _added(self, count: int) -> None:
+        """Counts entries added to the store, and evicts some once there are more than max_entries."""
+        if self.max_entries is None or not count:
+            return
+        try:
+            store = self.store
+            with _entry_count_lock:
+                if store in _entry_counts:
+                    _entry_counts[store] += count
+                else:
+                    _entry_counts[store] = len(store.keys())
+                if _entry_counts[store] <= self.max_entries:
+                    return
+                # other processes may have written or evicted too, so recount before trimming
+                keys = store.keys()
+                if len(keys) > self.max_entries:
+                    keep = int(self.max_entries * _EVICT_TO)
+                    store.delete(random.sample(keys, len(keys) - keep))
+                    _entry_counts[store] = keep
+                else:
+                    _entry_counts[store] = len(keys)
+        except Exception as e:
+            logger.warning(f"Unable to evict from the embedding cache, ignoring it: {e}")
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        keys = [make_embedding_key(self.model_key, "document", text) for text in texts]
+        found: dict[str, list[float]] = {}
+        # the first text for each missing key, so repeats in texts get embedded once
+        missing: dict[str, str] = {}
+        for key, text in zip(keys, texts):
+            if key in found or key in missing:
+                continue
+            vector = self._get(key)
+            if vector is None:
+                missing[key] = text
+            else:
+                found[key] = vector
+        missing_keys = list(missing)
+        batches = 0
+        added = 0
+        for start in range(0, len(missing_keys), self.batch_size):
+            batch_keys = missing_keys[start:start + self.batch_size]
+            vectors = self.embeddings.embed_documents([missing[key] for key in batch_keys])
+            batches += 1
+            for key, vector in zip(batch_keys, vectors):
+                added += self._set(key, vector)
+                found[key] = vector
+        self._added(added)
+        self._count(hits=len(texts) - len(missing), misses=len(missing), batches=batches)
+        return [found[key] for key in keys]
+
+    def embed_query(self, text: str) -> list[float]:
+        key = make_embedding_key(self.model_key, "query", text)
+        vector = self._get(key)
+        if vector is not None:
+            self._count(hits=1)
+            return vector
+        vector = self.embeddings.embed_query(text)
+        self._added(int(self._set(key, vector)))
+        self._count(misses=1, batches=1)
+        return vector
+
+
+_store: KeyValueStore | None = None
+_model_stats: dict[str, EmbeddingCacheStats] = {}
+_lock = threading.Lock()
+
+
+def _get_shared_store() -> KeyValueStore:
+    global _store
+    with _lock:
+        if _store is None:
+            _store = get_kv_store(EMBEDDING_CACHE_NAMESPACE)
+        return _store
+
+
+def cache_embeddings(embeddings: Embeddings) -> Embeddings:
+    """
+    Wraps the embeddings model in a cache, if the embedding_cache config option is on.
+    All the cached models share the configured store, and the caches for the same model
+    share their stats.
+    """
+    config = get_config()
+    if not config.embedding_cache:
+        return embeddings
+    with _lock:
+        stats = _model_stats.setdefault(embeddings_model_key(embeddings), EmbeddingCacheStats())
+    return CachedEmbeddings(
+        embeddings,
+        batch_size=config.embedding_cache_batch_size,
+        stats=stats,
+        max_entries=config.embedding_cache_max_entries,
+    )
+
+
+def get_embedding_cache_stats() -> dict[str, EmbeddingCacheStats]:
+    """Hit and miss counts for each cached model."""
+    with _lock:
+        return dict(_model_stats)
+
+
+def clear_embedding_caches() -> None:
+    """Forgets the stats and the store, without clearing what's stored."""
+    global _store
+    with _lock:
+        _store = None
+        _model_stats.clear()
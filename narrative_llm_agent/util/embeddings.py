@@ -0,0 +1,66 @@
+"""
+Builds the embeddings model for each embedding provider, so the agents, workflow nodes, and
+scripts all embed with the same model their vector stores were made with.
+"""
+import logging
+import os
+from langchain_core.embeddings import Embeddings
+from langchain_nomic import NomicEmbeddings
+from langchain_openai import OpenAIEmbeddings
+from narrative_llm_agent.config import get_config
+from narrative_llm_agent.util.embedding_cache import cache_embeddings
+
+EMBEDDING_PROVIDERS = ("nomic", "cborg")
+CBORG_API_BASE = "https://api.cborg.lbl.gov"
+
+logger = logging.getLogger(__name__)
+
+
+def make_embeddings(provider: str, api_key: str | None = None) -> Embeddings:
+    """
+    The embeddings for the provider, "cborg" or "nomic". Without an API key, the key comes
+    from the environment - the cborg_key_env config option for cborg, or NOMIC_API_KEY.
+    These aren't cached, see util.embedding_cache.cache_embeddings for that.
+    """
+    provider = provider.lower()
+    if provider == "cborg":
+        return OpenAIEmbeddings(
+            openai_api_key=api_key or os.environ.get(get_config().cborg_key_env),
+            openai_api_base=CBORG_API_BASE,
+            model="lbl/nomic-embed-text",
+            check_embedding_ctx_length=False,
+        )
+    if provider == "nomic":
+        return NomicEmbeddings(
+            nomic_api_key=api_key or os.environ.get("NOMIC_API_KEY"),
+            model="nomic-embed-text-v1.5",
+            dimensionality=768,
+        )
+    raise ValueError(f"Unknown embedding provider '{provider}', expected one of {', '.join(EMBEDDING_PROVIDERS)}")
+
+
+def make_optional_embeddings(provider: str, api_key: str | None = None) -> Embeddings | None:
+    """
+    The embeddings for the provider, cached if the embedding_cache config option is on. For
+    searches that work without embeddings - if they can't be made (e.g. there's no API key),
+    this logs why and returns None.
+    """
+    try:
+        return cache_embeddings(make_embeddings(provider, api_key))
+    except Exception as e:
+        logger.warning(f"Unable to make {provider} embeddings, continuing without them: {e}")
+        return None
+
+
+def make_workflow_embeddings(
+    provider: str, embedding_api_key: str | None = None, analyst_api_key: str | None = None
+) -> Embeddings | None:
+    """
+    The embeddings the workflow agents use, for the embedding provider given to the workflow,
+    or None if they can't be made (see make_optional_embeddings). Like the analyst's, cborg
+    embeddings fall back to the analyst's API key, since that's a CBORG key too.
+    """
+    api_key = embedding_api_key
+    if api_key is None and provider.lower() == "cborg":
+        api_key = analyst_api_key
+    return make_optional_embeddings(provider, api_key)
@@ -0,0 +1,328 @@
+"""
+A hybrid lexical and vector search of the KBase app catalog, for looking up apps.
+
+Vector search alone often misses exact app names and ids, like kb_trimmomatic/run_trimmomatic
+or GTDB-Tk, which sends the LLM back for more tool calls. HybridAppRetriever searches the apps
+two ways, and fuses the results:
+* lexical - a BM25 inverted index over each app's name, id, and tooltip. Names and ids are
+  tokenized both whole (kb_trimmomatic/run_trimmomatic, gtdb-tk) and in parts (kb, trimmomatic,
+  run), so exact and partial mentions both match.
+* vector - cosine similarity of the query embedding with the embeddings of the catalog chunks
+  stored with the catalog (see util.catalog_index), so only the query gets embedded. Each chunk
+  stands for the apps whose records are in it, and apps rank by their best chunk.
+The two ranked lists are merged with reciprocal rank fusion (RRF), which scores each app by
+the sum of 1 / (rrf_k + rank) over the lists it shows up in, except that apps whose full id is
+in the query go first. Without an embeddings model, only the lexical search is used.
+
+The apps come from the catalog documents - the JSON app records in the chunks of the catalog
+in its Chroma database, or in the local catalog index if catalog_index_path is set. To use it for the
+analyst's catalog tool and the validator, set this in the [kbase] section of the config file:
+catalog_hybrid_search=true
+"""
+import json
+import math
+import re
+import threading
+from collections import Counter
+from pathlib import Path
+from typing import Iterable
+import numpy as np
+from langchain_core.callbacks import CallbackManagerForRetrieverRun
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_core.retrievers import BaseRetriever
+from pydantic import BaseModel, ConfigDict
+from narrative_llm_agent.config import get_config
+from narrative_llm_agent.util.catalog_index import CatalogIndex, get_catalog_index
+from narrative_llm_agent.util.embedding_cache import embeddings_model_key
+
+SEARCH_MODES = ("hybrid", "lexical", "vector")
+_WORD = re.compile(r"[a-z0-9]+")
+_CAMEL_PART = re.compile(r"[A-Z]+(?![a-z])|[A-Z]?[a-z]+|\d+")
+_JSON_OBJECT = re.compile(r"\{[^{}]*\}")
+_PUNCTUATION = ".,;:!?()[]{}\"'`"
+
+
+class CatalogApp(BaseModel):
+    id: str
+    name: str
+    ver: str = ""
+    tooltip: str = ""
+    categories: list[str] = []
+
+    def lexical_text(self) -> str:
+        # the name and id count twice as much as the tooltip
+        return f"{self.name} {self.name} {self.id} {self.id} {self.tooltip}"
+
+    def to_document(self, score: float | None = None) -> Document:
+        metadata = {"app_id": self.id, "name": self.name}
+        if score is not None:
+            metadata["score"] = score
+        return Document(id=self.id, page_content=self.model_dump_json(), metadata=metadata)
+
+
+def tokenize(text: str) -> list[str]:
+    """
+    Lower case word tokens, with the camel case parts of words (runFastQC -> run, fast, qc),
+    and compound words kept whole as well (gtdb-tk, and gtdbtk).
+    """
+    tokens = []
+    for chunk in text.split():
+        chunk = chunk.strip(_PUNCTUATION)
+        words = _WORD.findall(chunk.lower())
+        if not words:
+            continue
+        tokens.extend(words)
+        parts = [part.lower() for part in _CAMEL_PART.findall(chunk)]
+        if len(parts) > len(words):
+            tokens.extend(parts)
+        if len(words) > 1:
+            tokens.append(chunk.lower())
+            tokens.append("".join(words))
+    return tokens
+
+
+def join_chunks(documents: Iterable[str]) -> str:
+    """
+    Joins text chunks back into the text they were split from, in order. The catalog was split
+    on whitespace, with the chunks overlapping by a few words, so each chunk's overlap with the
+    text so far (whole words at its start) is dropped. Chunks that don't overlap are joined with
+    a space.
+    """
+    return _join_chunks(documents)[0]
+
+
+def _join_chunks(documents: Iterable[str]) -> tuple[str, list[tuple[int, int]]]:
+    """The joined text (see join_chunks), and the (start, end) of each chunk in it."""
+    text = ""
+    spans = []
+    for chunk in documents:
+        overlap = _chunk_overlap(text, chunk)
+        if overlap:
+            start = len(text) - overlap
+            text += chunk[overlap:]
+        else:
+            text = f"{text} {chunk}" if text else chunk
+            start = len(text) - len(chunk)
+        spans.append((start, len(text)))
+    return text, spans
+
+
+def _chunk_overlap(text: str, chunk: str) -> int:
+    """The length of the longest run of whole words that ends the text and starts the chunk."""
+    for size in range(min(len(text), len(chunk)), 0, -1):
+        starts_word = size == len(text) or text[-size - 1].isspace()
+        ends_word = size == len(chunk) or chunk[size].isspace()
+        if starts_word and ends_word and text.endswith(chunk[:size]):
+            return size
+    return 0
+
+
+def parse_catalog_apps(documents: Iterable[str]) -> list[CatalogApp]:
+    """
+    Finds the app records (JSON objects with at least a name and id) in the catalog documents.
+    The documents are chunks of the catalog, in order, so they get joined first (see join_chunks),
+    and records split across chunks are found too. Each app id is kept once.
+    """
+    return parse_catalog_chunks(documents)[0]
+
+
+def parse_catalog_chunks(documents: Iterable[str]) -> tuple[list[CatalogApp], list[list[int]]]:
+    """
+    The apps in the catalog documents (see parse_catalog_apps), and for each document, the
+    indices of the apps with a record in it, or partly in it.
+    """
+    text, spans = _join_chunks(documents)
+    apps: list[CatalogApp] = []
+    app_indices: dict[str, int] = {}
+    chunk_apps: list[list[int]] = [[] for _ in spans]
+    for match in _JSON_OBJECT.finditer(text):
+        try:
+            record = json.loads(match.group(0))
+        except ValueError:
+            continue
+        if not (isinstance(record, dict) and "id" in record and "name" in record):
+            continue
+        app_id = str(record["id"])
+        if app_id not in app_indices:
+            app_indices[app_id] = len(apps)
+            apps.append(CatalogApp(
+                id=app_id,
+                name=str(record["name"]),
+                ver=str(record.get("ver") or ""),
+                tooltip=str(record.get("tooltip") or ""),
+                categories=[str(cat) for cat in record.get("categories") or []],
+            ))
+        idx = app_indices[app_id]
+        for chunk, (start, end) in enumerate(spans):
+            if start < match.end() and match.start() < end and idx not in chunk_apps[chunk]:
+                chunk_apps[chunk].append(idx)
+    return apps, chunk_apps
+
+
+class BM25Index:
+    """An Okapi BM25 inverted index over a list of texts."""
+
+    def __init__(self, texts: list[str], k1: float = 1.5, b: float = 0.75) -> None:
+        self.k1 = k1
+        self.b = b
+        self.postings: dict[str, list[tuple[int, int]]] = {}
+        doc_lens = []
+        for idx, text in enumerate(texts):
+            counts = Counter(tokenize(text))
+            doc_lens.append(sum(counts.values()))
+            for token, count in counts.items():
+                self.postings.setdefault(token, []).append((idx, count))
+        self.doc_lens = np.array(doc_lens, dtype=np.float32)
+        self.avg_doc_len = float(self.doc_lens.mean()) if len(texts) else 0.0
+        self.idf = {
+            token: math.log(1 + (len(texts) - len(docs) + 0.5) / (len(docs) + 0.5))
+            for token, docs in self.postings.items()
+        }
+
+    def search(self, query: str, k: int = 10) -> list[tuple[int, float]]:
+        """The (text index, score) of the k best matching texts, best first. Texts with no matching tokens are left out."""
+        scores = np.zeros(len(self.doc_lens), dtype=np.float32)
+        for token in set(tokenize(query)):
+            for idx, count in self.postings.get(token, []):
+                norm = self.k1 * (1 - self.b + self.b * self.doc_lens[idx] / self.avg_doc_len)
+                scores[idx] += self.idf[token] * count * (self.k1 + 1) / (count + norm)
+        matched = np.flatnonzero(scores)
+        top = matched[np.argsort(-scores[matched], kind="stable")][:k]
+        return [(int(idx), float(scores[idx])) for idx in top]
+
+
+def reciprocal_rank_fusion(rankings: list[list[int]], rrf_k: int = 60) -> list[tuple[int, float]]:
+    """Fuses ranked lists of ids into one, scored by the sum of 1 / (rrf_k + rank), best first."""
+    scores: dict[int, float] = {}
+    for ranking in rankings:
+        for rank, item in enumerate(ranking, 1):
+            scores[item] = scores.get(item, 0.0) + 1 / (rrf_k + rank)
+    # sorted is stable, so ties stay in the order they were first seen
+    return sorted(scores.items(), key=lambda item: -item[1])
+
+
+class HybridAppRetriever(BaseRetriever):
+    """
+    Retrieves the k apps that best match the query, with a hybrid search (see above). Each
+    document is an app's JSON record, with the app_id, name, and fused score as metadata.
+    """
+
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    apps: list[CatalogApp]
+    lexical_index: BM25Index
+    vector_index: CatalogIndex | None = None
+    # the indices of the apps in each row of the vector index
+    vector_apps: list[list[int]] = []
+    embeddings: Embeddings | None = None
+    k: int = 4
+    # how many results from each search get fused
+    candidates: int = 20
+    rrf_k: int = 60
+
+    @classmethod
+    def from_apps(cls, apps: list[CatalogApp], embeddings: Embeddings | None = None, **kwargs) -> "HybridAppRetriever":
+        """
+        Indexes the apps. If there's an embeddings model, each app record gets embedded for the
+        vector search. For the catalog, use from_catalog_index, which has the embeddings already.
+        """
+        vector_index = None
+        if embeddings is not None and apps:
+            vectors = embeddings.embed_documents([app.model_dump_json() for app in apps])
+            vector_index = CatalogIndex.from_arrays(vectors, [app.id for app in apps])
+        return cls(
+            apps=apps,
+            lexical_index=BM25Index([app.lexical_text() for app in apps]),
+            vector_index=vector_index,
+            vector_apps=[[idx] for idx in range(len(apps))],
+            embeddings=embeddings,
+            **kwargs,
+        )
+
+    @classmethod
+    def from_catalog_index(
+        cls, index: CatalogIndex, embeddings: Embeddings | None = None, **kwargs
+    ) -> "HybridAppRetriever":
+        """
+        Indexes the apps in the catalog chunks of the index. If there's an embeddings model, the
+        vector search uses the index's chunk embeddings, which have to come from the same model.
+        """
+        apps, chunk_apps = parse_catalog_chunks(index.documents)
+        return cls(
+            apps=apps,
+            lexical_index=BM25Index([app.lexical_text() for app in apps]),
+            vector_index=index if embeddings is not None and apps else None,
+            vector_apps=chunk_apps,
+            embeddings=embeddings,
+            **kwargs,
+        )
+
+    def _vector_search(self, query: str, k: int) -> list[tuple[int, float]]:
+        """The (app index, score) of the k apps in the rows most like the query, best first."""
+        results: dict[int, float] = {}
+        query_vector = self.embeddings.embed_query(query)
+        for row, score in self.vector_index.search(query_vector, len(self.vector_index)):
+            for idx in self.vector_apps[row]:
+                results.setdefault(idx, score)
+            if len(results) >= k:
+                break
+        return list(results.items())[:k]
+
+    def _vector_ranking(self, query: str) -> list[int]:
+        if self.vector_index is None:
+            return []
+        return [idx for idx, _ in self._vector_search(query, self.candidates)]
+
+    def search(self, query: str, k: int | None = None, mode: str = "hybrid") -> list[tuple[CatalogApp, float]]:
+        """The k best apps for the query, with their scores, using the hybrid, lexical, or vector search."""
+        k = k or self.k
+        if mode == "lexical":
+            results = self.lexical_index.search(query, k)
+        elif mode == "vector":
+            if self.vector_index is None:
+                raise ValueError("A vector search needs an embeddings model")
+            results = self._vector_search(query, k)
+        elif mode == "hybrid":
+            lexical = [idx for idx, _ in self.lexical_index.search(query, self.candidates)]
+            fused = reciprocal_rank_fusion([lexical, self._vector_ranking(query)], self.rrf_k)
+            # an app id given in full is as sure a match as there is, so it goes first
+            exact = {idx for idx in lexical if self.apps[idx].id.lower() in query.lower()}
+            results = sorted(fused, key=lambda item: item[0] not in exact)[:k]
+        else:
+            raise ValueError(f"Unknown search mode '{mode}', expected one of {', '.join(SEARCH_MODES)}")
+        return [(self.apps[idx], score) for idx, score in results]
+
+    def _get_relevant_documents(self, query: str, *, run_manager: CallbackManagerForRetrieverRun) -> list[Document]:
+        return [app.to_document(score) for app, score in self.search(query)]
+
+
+def load_catalog_index(catalog_db_dir: str | Path) -> CatalogIndex:
+    """The catalog chunks and their embeddings, from the local catalog index if catalog_index_path is set, or the Chroma database."""
+    config = get_config()
+    if config.catalog_index_path:
+        return get_catalog_index(config.catalog_index_path)
+    return CatalogIndex.from_chroma(catalog_db_dir)
+
+
+_retrievers: dict[tuple[str, str | None], HybridAppRetriever] = {}
+_retrievers_lock = threading.Lock()
+
+
+def get_app_retriever(catalog_db_dir: str | Path, embeddings: Embeddings | None = None) -> HybridAppRetriever:
+    """
+    Returns the shared retriever for the catalog and embeddings model, indexing the apps the
+    first time. The vector search uses the catalog's stored embeddings, so the embeddings model
+    has to be the one the catalog was embedded with. With no embeddings model, the retriever
+    only does the lexical search.
+    """
+    key = (str(Path(catalog_db_dir).resolve()), embeddings_model_key(embeddings) if embeddings else None)
+    with _retrievers_lock:
+        if key not in _retrievers:
+            _retrievers[key] = HybridAppRetriever.from_catalog_index(load_catalog_index(catalog_db_dir), embeddings)
+        return _retrievers[key]
+
+
+def clear_app_retrievers() -> None:
+    with _retrievers_lock:
+        _retrievers.clear()
@@ -0,0 +1,278 @@
+"""
+A local snapshot of the KBase app knowledge graph, that can stand in for Neo4j.
+
+The snapshot has the App and DataObject nodes, the nodes they're connected to, and their
+relationships, saved as a compressed numpy (.npz) file:
+* attribute tables - one array each for the node names, tooltips, app ids, hidden flags, and
+  label codes (with a table of label names).
+* adjacency arrays - the (undirected) relationships in compressed sparse row form. The
+  neighbors of node i are adj_neighbors[adj_indptr[i]:adj_indptr[i + 1]], with relationship
+  type codes in adj_types (and a table of type names).
+
+KGSnapshot answers the queries the knowledge graph tools make - app names, the app description
+queries, and the fulltext candidate lookups - in-process, with no Neo4j server.
+
+To use it, export a snapshot (see scripts/export_kg_snapshot.py), then set these in the
+[kbase] section of the config file:
+kg_backend=snapshot
+kg_snapshot_path=kg_snapshot.npz
+"""
+import re
+import threading
+from pathlib import Path
+from typing import Any, Dict, List
+import numpy as np
+from neo4j import Driver
+from narrative_llm_agent.config import get_config
+
+SNAPSHOT_FORMAT_VERSION = 1
+NO_RELATIONS = "No related data object nodes found"
+_SEARCHED_LABELS = ("App", "DataObject")
+
+export_nodes_query = """
+MATCH (n)
+WHERE n:App OR n:DataObject OR EXISTS { MATCH (n)--(m) WHERE m:App OR m:DataObject }
+RETURN elementId(n) AS id, labels(n)[0] AS label, n.name AS name, n.tooltip AS tooltip,
+       n.appid AS appid, n.hidden AS hidden
+"""
+
+export_relationships_query = """
+MATCH (a)-[r]->(b)
+WHERE a:App OR a:DataObject OR b:App OR b:DataObject
+RETURN elementId(a) AS source, type(r) AS type, elementId(b) AS target
+"""
+
+
+def _edit_distance(a: str, b: str, max_dist: int) -> int:
+    """Levenshtein distance, or max_dist + 1 if it's more than max_dist."""
+    if abs(len(a) - len(b)) > max_dist:
+        return max_dist + 1
+    prev = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, 1):
+        cur = [i] + [0] * len(b)
+        for j, char_b in enumerate(b, 1):
+            cur[j] = min(prev[j] + 1, cur[j - 1] + 1, prev[j - 1] + (char_a != char_b))
+        if min(cur) > max_dist:
+            return max_dist + 1
+        prev = cur
+    return prev[-1]
+
+
+def _max_edits(word: str, similarity: float) -> int:
+    # the same as Lucene's legacy fuzzy similarity - some number of edits per character, up to 2
+    return min(2, int((1 - similarity) * len(word)))
+
+
+def _tokenize(text: str) -> List[str]:
+    return re.findall(r"\w+", text.lower())
+
+
+class KGSnapshot:
+    """
+    The knowledge graph snapshot arrays (see above), with the queries the knowledge graph
+    tools need. Use from_records or export to build one, and save and load for the file.
+    """
+
+    def __init__(
+        self,
+        labels: np.ndarray,
+        node_label: np.ndarray,
+        name: np.ndarray,
+        tooltip: np.ndarray,
+        appid: np.ndarray,
+        hidden: np.ndarray,
+        rel_types: np.ndarray,
+        adj_indptr: np.ndarray,
+        adj_neighbors: np.ndarray,
+        adj_types: np.ndarray,
+    ) -> None:
+        self.labels = labels
+        self.node_label = node_label
+        self.name = name
+        self.tooltip = tooltip
+        self.appid = appid
+        self.hidden = hidden
+        self.rel_types = rel_types
+        self.adj_indptr = adj_indptr
+        self.adj_neighbors = adj_neighbors
+        self.adj_types = adj_types
+        searched_codes = [idx for idx, label in enumerate(labels) if label in _SEARCHED_LABELS]
+        self._searched = np.flatnonzero(np.isin(node_label, searched_codes))
+        self._name_tokens = {int(idx): _tokenize(str(name[idx])) for idx in self._searched}
+
+    @classmethod
+    def from_records(cls, nodes: List[Dict[str, Any]], relationships: List[Dict[str, Any]]) -> "KGSnapshot":
+        """
+        Builds a snapshot from node records (with id, label, name, tooltip, appid, hidden) and
+        relationship records (with source, type, target), like the export queries return.
+        """
+        node_index = {node["id"]: idx for idx, node in enumerate(nodes)}
+        labels = sorted({node["label"] or "" for node in nodes})
+        label_codes = {label: code for code, label in enumerate(labels)}
+        rel_types = sorted({rel["type"] for rel in relationships})
+        type_codes = {rel_type: code for code, rel_type in enumerate(rel_types)}
+
+        # each relationship is an edge in both directions, sorted by source node to make the CSR arrays
+        edges = [
+            (node_index[rel["source"]], node_index[rel["target"]], type_codes[rel["type"]])
+            for rel in relationships
+            if rel["source"] in node_index and rel["target"] in node_index
+        ]
+        sources = np.array([e[0] for e in edges] + [e[1] for e in edges], dtype=np.int32)
+        targets = np.array([e[1] for e in edges] + [e[0] for e in edges], dtype=np.int32)
+        types = np.array([e[2] for e in edges] * 2, dtype=np.int16)
+        order = np.argsort(sources, kind="stable")
+        adj_indptr = np.zeros(len(nodes) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(sources, minlength=len(nodes)), out=adj_indptr[1:])
+
+        def strings(key: str) -> np.ndarray:
+            return np.array([str(node.get(key) or "") for node in nodes], dtype=np.str_)
+
+        return cls(
+            labels=np.array(labels, dtype=np.str_),
+            node_label=np.array([label_codes[node["label"] or ""] for node in nodes], dtype=np.int16),
+            name=strings("name"),
+            tooltip=strings("tooltip"),
+            appid=strings("appid"),
+            hidden=np.array([bool(node.get("hidden")) for node in nodes], dtype=bool),
+            rel_types=np.array(rel_types, dtype=np.str_),
+            adj_indptr=adj_indptr,
+            adj_neighbors=targets[order],
+            adj_types=types[order],
+        )
+
+    @classmethod
+    def export(cls, driver: Driver) -> "KGSnapshot":
+        """Builds a snapshot from a Neo4j database."""
+        nodes, _, _ = driver.execute_query(export_nodes_query)
+        relationships, _, _ = driver.execute_query(export_relationships_query)
+        return cls.from_records([rec.data() for rec in nodes], [rec.data() for rec in relationships])
+
+    def save(self, path: str | Path) -> None:
+        np.savez_compressed(
+            path,
+            format_version=np.array(SNAPSHOT_FORMAT_VERSION),
+            labels=self.labels,
+            node_label=self.node_label,
+            name=self.name,
+            tooltip=self.tooltip,
+            appid=self.appid,
+            hidden=self.hidden,
+            rel_types=self.rel_types,
+            adj_indptr=self.adj_indptr,
+            adj_neighbors=self.adj_neighbors,
+            adj_types=self.adj_types,
+        )
+
+    @classmethod
+    def load(cls, path: str | Path) -> "KGSnapshot":
+        with np.load(path, allow_pickle=False) as data:
+            if int(data["format_version"]) != SNAPSHOT_FORMAT_VERSION:
+                raise ValueError(
+                    f"Knowledge graph snapshot {path} has format version {int(data['format_version'])}, "
+                    f"expected {SNAPSHOT_FORMAT_VERSION}. Export it again."
+                )
+            return cls(**{key: data[key] for key in data.files if key != "format_version"})
+
+    def _label(self, idx: int) -> str:
+        return str(self.labels[self.node_label[idx]])
+
+    def _contexts(self, idx: int) -> List[str]:
+        """The node's relationships, one "TYPE: name, name" line per type, as the description queries make."""
+        start, end = self.adj_indptr[idx], self.adj_indptr[idx + 1]
+        by_type: Dict[str, List[str]] = {}
+        for neighbor, rel_type in zip(self.adj_neighbors[start:end], self.adj_types[start:end]):
+            by_type.setdefault(str(self.rel_types[rel_type]), []).append(str(self.name[neighbor]))
+        return [f"{rel_type}: {', '.join(names)}" for rel_type, names in by_type.items()]
+
+    def _app_footer(self, idx: int) -> str:
+        return f"App name: {self.name[idx]}\nTooltip: {self.tooltip[idx]}\nAppID: {self.appid[idx]}"
+
+    def app_names(self) -> List[str]:
+        return [str(self.name[idx]) for idx in range(len(self.name)) if self._label(idx) == "App"]
+
+    def catalog_version(self) -> tuple:
+        """The same fingerprint as kgtool_cosine_sim.catalog_version_query."""
+        names = self.app_names()
+        return (len(names), sum(len(name) for name in names))
+
+    def app_ids(self, app_name: str) -> List[str]:
+        """The app ids of apps with names containing app_name."""
+        return [
+            str(self.appid[idx])
+            for idx in range(len(self.name))
+            if self._label(idx) == "App" and app_name in str(self.name[idx])
+        ]
+
+    def describe(self, candidate: str) -> str | None:
+        """
+        Answers kgtool_cosine_sim.description_query - describes the first visible App or
+        DataObject with a name containing the candidate, or None if there isn't one.
+        """
+        for idx in self._searched:
+            if not self.hidden[idx] and candidate in str(self.name[idx]):
+                contexts = self._contexts(idx) or [NO_RELATIONS]
+                return f"type: {self._label(idx)}\n" + "".join(c + "\n" for c in contexts) + self._app_footer(idx)
+        return None
+
+    def describe_exact(self, name: str) -> List[Dict[str, str]]:
+        """
+        Answers information_tool.description_query - describes the App or DataObject with
+        exactly the given name, if it has any relationships. Returns records like Neo4j would.
+        """
+        for idx in self._searched:
+            if str(self.name[idx]) == name:
+                contexts = self._contexts(idx)
+                if not contexts:
+                    return []
+                context = f"type:{self._label(idx)}\n" + "".join(c + "\n" for c in contexts)
+                return [{"final_context": context + "\n" + self._app_footer(idx)}]
+        return []
+
+    def fulltext_candidates(self, text: str, limit: int = 3, similarity: float = 0.8) -> List[Dict[str, str]]:
+        """
+        Answers semantic.candidate_query - a fuzzy search of App and DataObject names, where
+        every word has to be close to a word in the name (like the "word~0.8 AND ..." fulltext
+        queries), best matches first.
+        """
+        words = _tokenize(text)
+        if not words:
+            return []
+        scored = []
+        for idx, tokens in self._name_tokens.items():
+            score = 0.0
+            for word in words:
+                max_dist = _max_edits(word, similarity)
+                best = min((_edit_distance(word, token, max_dist) for token in tokens), default=max_dist + 1)
+                if best > max_dist:
+                    break
+                score += 1 - best / max(len(word), 1)
+            else:
+                # more of the name matched scores better
+                scored.append((-score / len(tokens), len(tokens), idx))
+        scored.sort()
+        return [{"candidate": str(self.name[idx])} for _, _, idx in scored[:limit]]
+
+
+_snapshots: Dict[str, KGSnapshot] = {}
+_snapshots_lock = threading.Lock()
+
+
+def get_kg_snapshot() -> KGSnapshot | None:
+    """
+    Returns the configured snapshot if kg_backend is "snapshot", loading it the first time,
+    or None if the knowledge graph tools should use Neo4j.
+    """
+    config = get_config()
+    if config.kg_backend != "snapshot":
+        return None
+    path = config.kg_snapshot_path
+    with _snapshots_lock:
+        if path not in _snapshots:
+            _snapshots[path] = KGSnapshot.load(path)
+        return _snapshots[path]
+
+
+def clear_kg_snapshots() -> None:
+    with _snapshots_lock:
+        _snapshots.clear()
@@ -0,0 +1,149 @@
+"""
+An exact-match cache of LLM responses, for LangChain chat models.
+
+Responses are kept in a KeyValueStore (see util.store), so they persist between runs. The key is
+a hash of the model and its parameters (LangChain's llm_string), and the prompt messages. The
+messages get normalized first, by dropping fields that change from run to run without changing
+the prompt - message ids, and response and usage metadata from earlier responses.
+
+Caching is opt-in for each scope (usually a workflow node), in the config file:
+
+[llm_response_cache]
+analyst=86400
+writer=0
+
+Each entry is a scope name and a TTL in seconds. 0 means responses don't expire. Scopes that
+aren't listed don't get cached. Pass the scope to get_llm to use it, e.g.
+get_llm("gpt-4o-openai", cache_scope="analyst").
+"""
+import hashlib
+import json
+import logging
+import threading
+import time
+from typing import Any
+from langchain_core.caches import RETURN_VAL_TYPE, BaseCache
+from langchain_core.load import dumps, loads
+from pydantic import BaseModel
+from narrative_llm_agent.util.store import KeyValueStore, get_kv_store
+
+logger = logging.getLogger(__name__)
+
+LLM_CACHE_NAMESPACE = "llm_responses"
+_VOLATILE_MESSAGE_FIELDS = {"id", "response_metadata", "usage_metadata"}
+
+
+class LLMCacheStats(BaseModel):
+    hits: int = 0
+    misses: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+
+def _normalize(value: Any) -> Any:
+    if isinstance(value, dict):
+        normalized = {key: _normalize(val) for key, val in value.items()}
+        # serialized messages keep their fields under kwargs. The top level "id" is the class path.
+        if normalized.get("type") == "constructor" and isinstance(normalized.get("kwargs"), dict):
+            normalized["kwargs"] = {
+                key: val for key, val in normalized["kwargs"].items() if key not in _VOLATILE_MESSAGE_FIELDS
+            }
+        return normalized
+    if isinstance(value, list):
+        return [_normalize(val) for val in value]
+    return value
+
+
+def normalize_prompt(prompt: str) -> str:
+    """
+    Normalizes a prompt, as given to a LangChain cache. For chat models, that's the
+    serialized list of messages. Anything that isn't JSON is used as-is.
+    """
+    try:
+        parsed = json.loads(prompt)
+    except ValueError:
+        return prompt
+    return json.dumps(_normalize(parsed), sort_keys=True)
+
+
+def make_cache_key(prompt: str, llm_string: str) -> str:
+    key_source = llm_string + "\x00" + normalize_prompt(prompt)
+    return hashlib.sha256(key_source.encode("utf-8")).hexdigest()
+
+
+class LLMResponseCache(BaseCache):
+    """
+    A LangChain cache that keeps responses in a KeyValueStore, with an optional TTL in
+    seconds (None or 0 means no expiration). Hits and misses are counted in stats.
+    """
+
+    def __init__(self, store: KeyValueStore, ttl: int | None = None, scope: str = "default") -> None:
+        self.store = store
+        self.ttl = ttl or None
+        self.scope = scope
+        self.stats = LLMCacheStats()
+        self._stats_lock = threading.Lock()
+
+    def _count(self, hit: bool) -> None:
+        with self._stats_lock:
+            if hit:
+                self.stats.hits += 1
+            else:
+                self.stats.misses += 1
+
+    def lookup(self, prompt: str, llm_string: str) -> RETURN_VAL_TYPE | None:
+        key = make_cache_key(prompt, llm_string)
+        raw = self.store.get(key)
+        if raw is not None:
+            saved = json.loads(raw)
+            if saved["expires"] is not None and saved["expires"] < time.time():
+                self.store.delete([key])
+            else:
+                try:
+                    generations = [loads(gen) for gen in saved["generations"]]
+                    self._count(True)
+                    return generations
+                except Exception as e:
+                    logger.warning(f"Unable to load cached LLM response, ignoring it: {e}")
+        self._count(False)
+        return None
+
+    def update(self, prompt: str, llm_string: str, return_val: RETURN_VAL_TYPE) -> None:
+        saved = {
+            "expires": time.time() + self.ttl if self.ttl else None,
+            "generations": [dumps(gen) for gen in return_val],
+        }
+        self.store.set(make_cache_key(prompt, llm_string), json.dumps(saved).encode("utf-8"))
+
+    def clear(self, **kwargs: Any) -> None:
+        self.store.delete(self.store.keys())
+
+
+__caches: dict[str, LLMResponseCache] = {}
+__caches_lock = threading.Lock()
+
+
+def get_llm_response_cache(scope: str, ttl: int | None = None) -> LLMResponseCache:
+    """
+    Returns the response cache for a scope, making it the first time. All scopes share the
+    same configured store, but keep their own TTL and stats.
+    """
+    with __caches_lock:
+        if scope not in __caches:
+            __caches[scope] = LLMResponseCache(get_kv_store(LLM_CACHE_NAMESPACE), ttl=ttl, scope=scope)
+        return __caches[scope]
+
+
+def get_llm_cache_stats() -> dict[str, LLMCacheStats]:
+    """Hit and miss counts for each scope that's been used."""
+    with __caches_lock:
+        return {scope: cache.stats for scope, cache in __caches.items()}
+
+
+def clear_llm_response_caches() -> None:
+    """Forgets the per-scope caches, without clearing what's stored."""
+    with __caches_lock:
+        __caches.clear()
@@ -0,0 +1,92 @@
+"""
+A process-wide Neo4j driver for the knowledge graph tools.
+
+A Neo4j driver keeps its own pool of connections, and is meant to be made once and shared -
+making one per query means a new connection (and handshake) each time. get_neo4j_driver makes
+a driver the first time it's needed for each database and user, and hands that same one out
+after that. Idle connections get checked before they're reused (see
+neo4j_liveness_check_timeout in the config), and all drivers get closed when the process exits.
+
+The pool size and liveness check timeout are set in the [kbase] section of the config file:
+neo4j_max_pool_size=50
+neo4j_liveness_check_timeout=60
+"""
+import atexit
+import logging
+import os
+import threading
+from neo4j import Driver, GraphDatabase
+from narrative_llm_agent.config import get_config
+
+logger = logging.getLogger(__name__)
+
+_drivers: dict[tuple[str, str | None], Driver] = {}
+_drivers_lock = threading.Lock()
+
+
+def _default_credentials() -> tuple[str | None, str | None, str | None]:
+    config = get_config()
+    return (
+        os.environ.get(config.neo4j_uri_env or "NEO4J_URI"),
+        os.environ.get(config.neo4j_username_env or "NEO4J_USERNAME"),
+        os.environ.get(config.neo4j_password_env or "NEO4J_PASSWORD"),
+    )
+
+
+def get_neo4j_driver(uri: str | None = None, user: str | None = None, password: str | None = None) -> Driver:
+    """
+    Returns the shared driver for the given database and user, making it the first time.
+    Any missing values come from the environment variables named in the config.
+    """
+    default_uri, default_user, default_password = _default_credentials()
+    uri = uri or default_uri
+    user = user or default_user
+    password = password or default_password
+    if uri is None:
+        raise ValueError("No Neo4j URI given, and none is set in the environment")
+    key = (uri, user)
+    with _drivers_lock:
+        if key not in _drivers:
+            config = get_config()
+            _drivers[key] = GraphDatabase.driver(
+                uri,
+                auth=(user, password),
+                max_connection_pool_size=config.neo4j_max_pool_size,
+                liveness_check_timeout=config.neo4j_liveness_check_timeout,
+            )
+            logger.info(f"Created a Neo4j driver for {uri}")
+        return _drivers[key]
+
+
+def check_neo4j_driver(uri: str | None = None, user: str | None = None, password: str | None = None) -> bool:
+    """
+    Checks that the shared driver can reach the database. If it can't, the driver gets closed
+    and dropped, so the next get_neo4j_driver call makes a new one.
+    """
+    driver = get_neo4j_driver(uri, user, password)
+    try:
+        driver.verify_connectivity()
+        return True
+    except Exception as e:
+        logger.warning(f"Neo4j health check failed, dropping the driver: {e}")
+        with _drivers_lock:
+            for key, cached in list(_drivers.items()):
+                if cached is driver:
+                    del _drivers[key]
+        driver.close()
+        return False
+
+
+def close_neo4j_drivers() -> None:
+    """Closes all the shared drivers. New ones get made if they're needed again."""
+    with _drivers_lock:
+        drivers = list(_drivers.values())
+        _drivers.clear()
+    for driver in drivers:
+        try:
+            driver.close()
+        except Exception as e:
+            logger.warning(f"Unable to close Neo4j driver: {e}")
+
+
+atexit.register(close_neo4j_drivers)
@@ -0,0 +1,147 @@
+"""
+Retrieval QA chains for the analyst's document tools.
+
+The tools used to always make a "refine" RetrievalQA chain, which makes one LLM call per
+retrieved document, each waiting on the one before. These are the other chain types:
+* map_reduce - asks the LLM for the relevant text of every document at once (up to
+  max_concurrency calls at a time), then answers from those in one more call. That's two
+  round trips of waiting, no matter how many documents get retrieved.
+* stuff - puts as many of the documents as fit in a token budget into one prompt, and
+  answers in a single call.
+
+make_qa_chain makes any of the three. All of them take {"query": ...} and return a dict with
+the query and the "result", like RetrievalQA does. The chain type for each tool is set in the
+[kbase] section of the config file, along with the concurrency and token budget:
+docs_qa_chain_type=refine
+tutorial_qa_chain_type=refine
+catalog_qa_chain_type=refine
+qa_max_concurrency=8
+qa_stuff_token_budget=6000
+"""
+from typing import Any
+from langchain.chains import RetrievalQA
+from langchain_core.documents import Document
+from langchain_core.language_models import BaseLanguageModel
+from langchain_core.memory import BaseMemory
+from langchain_core.output_parsers import StrOutputParser
+from langchain_core.prompts import PromptTemplate
+from langchain_core.retrievers import BaseRetriever
+from narrative_llm_agent.util.tokens import BYTES_PER_TOKEN, estimate_tokens
+
+QA_CHAIN_TYPES = ("refine", "map_reduce", "stuff")
+NO_RELEVANT_TEXT = "NONE"
+
+map_prompt = PromptTemplate.from_template(
+    "Use the following portion of a long document to see if any of the text is relevant to answer the question.\n"
+    f"Return any relevant text verbatim. If none of it is relevant, return only {NO_RELEVANT_TEXT}.\n"
+    "{context}\n"
+    "Question: {question}\n"
+    "Relevant text, if any:"
+)
+
+answer_prompt = PromptTemplate.from_template(
+    "Use the following pieces of context to answer the question at the end. If you don't know the answer, "
+    "just say that you don't know, don't try to make up an answer.\n\n"
+    "{context}\n\n"
+    "Question: {question}\n"
+    "Helpful Answer:"
+)
+
+
+def _query(inputs: dict[str, Any] | str) -> str:
+    if isinstance(inputs, dict):
+        return inputs["query"]
+    return inputs
+
+
+def _join_documents(texts: list[str]) -> str:
+    return "\n\n".join(texts)
+
+
+class MapReduceQA:
+    """
+    Gets the relevant text from each retrieved document in parallel, then answers the
+    question from all of it with one last call.
+    """
+
+    def __init__(self, llm: BaseLanguageModel, retriever: BaseRetriever, max_concurrency: int = 8) -> None:
+        self._map_chain = map_prompt | llm | StrOutputParser()
+        self._answer_chain = answer_prompt | llm | StrOutputParser()
+        self._retriever = retriever
+        self._max_concurrency = max(1, max_concurrency)
+
+    def extract(self, query: str, docs: list[Document], config: Any = None) -> list[str]:
+        """
+        The relevant text from each document, leaving out the ones with none. The config
+        (with its callbacks, tags, etc.) is used for every call, but its max_concurrency
+        gets replaced with this chain's.
+        """
+        if not docs:
+            return []
+        extracts = self._map_chain.batch(
+            [{"context": doc.page_content, "question": query} for doc in docs],
+            config={**(config or {}), "max_concurrency": self._max_concurrency},
+        )
+        return [text.strip() for text in extracts if text.strip() and text.strip() != NO_RELEVANT_TEXT]
+
+    def invoke(self, inputs: dict[str, Any] | str, config: Any = None) -> dict[str, Any]:
+        query = _query(inputs)
+        docs = self._retriever.invoke(query, config=config)
+        context = _join_documents(self.extract(query, docs, config=config))
+        result = self._answer_chain.invoke({"context": context, "question": query}, config=config)
+        return {"query": query, "result": result}
+
+
+class StuffQA:
+    """
+    Answers the question with one call, with as many of the retrieved documents as fit in
+    the token budget, in the order they were retrieved. If the first document doesn't fit on
+    its own, it gets cut down to size.
+    """
+
+    def __init__(self, llm: BaseLanguageModel, retriever: BaseRetriever, token_budget: int = 6000) -> None:
+        self._answer_chain = answer_prompt | llm | StrOutputParser()
+        self._retriever = retriever
+        self._token_budget = token_budget
+
+    def fit_documents(self, docs: list[Document]) -> list[str]:
+        """The document texts that fit in the token budget."""
+        texts = []
+        tokens = 0
+        for doc in docs:
+            doc_tokens = estimate_tokens(len(doc.page_content.encode("utf-8")))
+            if tokens + doc_tokens > self._token_budget:
+                if not texts:
+                    max_bytes = self._token_budget * BYTES_PER_TOKEN
+                    texts.append(doc.page_content.encode("utf-8")[:max_bytes].decode("utf-8", errors="ignore"))
+                break
+            texts.append(doc.page_content)
+            tokens += doc_tokens
+        return texts
+
+    def invoke(self, inputs: dict[str, Any] | str, config: Any = None) -> dict[str, Any]:
+        query = _query(inputs)
+        context = _join_documents(self.fit_documents(self._retriever.invoke(query, config=config)))
+        result = self._answer_chain.invoke({"context": context, "question": query}, config=config)
+        return {"query": query, "result": result}
+
+
+def make_qa_chain(
+    llm: BaseLanguageModel,
+    retriever: BaseRetriever,
+    chain_type: str = "refine",
+    memory: BaseMemory | None = None,
+    max_concurrency: int = 8,
+    token_budget: int = 6000,
+) -> RetrievalQA | MapReduceQA | StuffQA:
+    """
+    Makes a retrieval QA chain of the given type - refine, map_reduce, or stuff.
+    The memory is only used by refine chains.
+    """
+    if chain_type == "refine":
+        return RetrievalQA.from_chain_type(llm=llm, chain_type="refine", retriever=retriever, memory=memory)
+    if chain_type == "map_reduce":
+        return MapReduceQA(llm, retriever, max_concurrency=max_concurrency)
+    if chain_type == "stuff":
+        return StuffQA(llm, retriever, token_budget=token_budget)
+    raise ValueError(f"Unknown QA chain type '{chain_type}', expected one of {', '.join(QA_CHAIN_TYPES)}")
@@ -1,8 +1,22 @@
-from typing import Dict, List
+from typing import Any, Dict, List
 
-from langchain_community.graphs import Neo4jGraph
+from neo4j.exceptions import DriverError
+from narrative_llm_agent.util.kg_snapshot import get_kg_snapshot
+from narrative_llm_agent.util.neo4j_driver import check_neo4j_driver, get_neo4j_driver
 
-graph = Neo4jGraph()
+
+def query_graph(query: str, params: Dict[str, Any] | None = None) -> List[Dict[str, Any]]:
+    """
+    Runs a Cypher query with the shared Neo4j driver, and returns the records as dicts.
+    If the driver fails, it gets dropped if it can't reach the database (see
+    check_neo4j_driver), so the next query gets a new one.
+    """
+    try:
+        records, _, _ = get_neo4j_driver().execute_query(query, params or {})
+    except DriverError:
+        check_neo4j_driver()
+        raise
+    return [record.data() for record in records]
 
 
 def get_user_id() -> int:
@@ -76,8 +90,11 @@ def get_candidates(input: str, type: str, limit: int = 3) -> List[Dict[str, str]
     matching the query, with each candidate being a dictionary containing their name
     and label.
     """
+    snapshot = get_kg_snapshot()
+    if snapshot is not None:
+        return snapshot.fulltext_candidates(input, limit=limit)
     ft_query = generate_full_text_query(input)
-    candidates = graph.query(
+    candidates = query_graph(
         candidate_query, {"fulltextQuery": ft_query, "index": type, "limit": limit}
     )
     return candidates
@@ -0,0 +1,167 @@
+"""
+Small key-value stores for persisting bytes between processes.
+These all use string keys and bytes values, and support listing keys by prefix.
+
+Use get_kv_store to build one from the config, or make one directly:
+* MemoryStore - a dict, only lasts as long as the process. Mostly for tests.
+* SqliteStore - a table in a local SQLite file. This is the default, in the user's cache directory.
+* RedisStore - keys in Redis, all under a namespace prefix.
+"""
+import os
+import re
+import sqlite3
+from abc import ABC, abstractmethod
+import threading
+from pathlib import Path
+import redis
+from narrative_llm_agent.config import get_config
+
+DEFAULT_KV_STORE_FILE = "kv_store.db"
+
+
+class KeyValueStore(ABC):
+    @abstractmethod
+    def get(self, key: str) -> bytes | None:
+        pass
+
+    @abstractmethod
+    def set(self, key: str, value: bytes) -> None:
+        pass
+
+    @abstractmethod
+    def delete(self, keys: list[str]) -> None:
+        pass
+
+    @abstractmethod
+    def keys(self, prefix: str = "") -> list[str]:
+        """Returns all keys starting with prefix, sorted."""
+        pass
+
+    def close(self) -> None:
+        """Releases any connections. The store shouldn't be used after this."""
+        pass
+
+
+class MemoryStore(KeyValueStore):
+    def __init__(self) -> None:
+        self._data: dict[str, bytes] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> bytes | None:
+        with self._lock:
+            return self._data.get(key)
+
+    def set(self, key: str, value: bytes) -> None:
+        with self._lock:
+            self._data[key] = value
+
+    def delete(self, keys: list[str]) -> None:
+        with self._lock:
+            for key in keys:
+                self._data.pop(key, None)
+
+    def keys(self, prefix: str = "") -> list[str]:
+        with self._lock:
+            return sorted(key for key in self._data if key.startswith(prefix))
+
+
+class SqliteStore(KeyValueStore):
+    def __init__(self, db_path: str | Path, table: str = "kv_store") -> None:
+        if not re.fullmatch(r"[A-Za-z_][A-Za-z0-9_]*", table):
+            raise ValueError(f"Invalid SQLite table name '{table}'")
+        self.db_path = str(db_path)
+        self.table = table
+        self._lock = threading.Lock()
+        # one connection, shared between threads, with the lock around every use.
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                f"CREATE TABLE IF NOT EXISTS {self.table} (key TEXT PRIMARY KEY, value BLOB NOT NULL)"
+            )
+
+    def get(self, key: str) -> bytes | None:
+        with self._lock:
+            row = self._conn.execute(f"SELECT value FROM {self.table} WHERE key = ?", (key,)).fetchone()
+        return row[0] if row is not None else None
+
+    def set(self, key: str, value: bytes) -> None:
+        with self._lock, self._conn:
+            self._conn.execute(
+                f"INSERT OR REPLACE INTO {self.table} (key, value) VALUES (?, ?)", (key, value)
+            )
+
+    def delete(self, keys: list[str]) -> None:
+        with self._lock, self._conn:
+            self._conn.executemany(f"DELETE FROM {self.table} WHERE key = ?", [(key,) for key in keys])
+
+    def keys(self, prefix: str = "") -> list[str]:
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT key FROM {self.table} WHERE substr(key, 1, ?) = ? ORDER BY key",
+                (len(prefix), prefix),
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+class RedisStore(KeyValueStore):
+    def __init__(self, client: redis.Redis, namespace: str = "narrative_llm_agent:") -> None:
+        self.client = client
+        self.namespace = namespace
+
+    def get(self, key: str) -> bytes | None:
+        return self.client.get(self.namespace + key)
+
+    def set(self, key: str, value: bytes) -> None:
+        self.client.set(self.namespace + key, value)
+
+    def delete(self, keys: list[str]) -> None:
+        if keys:
+            self.client.delete(*[self.namespace + key for key in keys])
+
+    def keys(self, prefix: str = "") -> list[str]:
+        # escape glob characters so they match literally
+        pattern = re.sub(r"([*?\[\]\\])", r"\\\1", self.namespace + prefix) + "*"
+        found = []
+        for key in self.client.scan_iter(match=pattern):
+            if isinstance(key, bytes):
+                key = key.decode("utf-8")
+            found.append(key[len(self.namespace):])
+        return sorted(found)
+
+    def close(self) -> None:
+        self.client.close()
+
+
+def default_kv_store_path() -> Path:
+    """The SQLite file used when kv_store_path isn't set, under $XDG_CACHE_HOME or ~/.cache."""
+    cache_dir = os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache"
+    return Path(cache_dir) / "narrative_llm_agent" / DEFAULT_KV_STORE_FILE
+
+
+def get_kv_store(namespace: str) -> KeyValueStore:
+    """
+    Builds a key-value store based on the kv_store config option.
+    * "sqlite" (default) - uses a table named after the namespace, in a SQLite file at the
+      kv_store_path config option, or default_kv_store_path() if that isn't set.
+    * "memory" - nothing persists after the process ends. The tests use this.
+    * "redis" - uses the Redis server at the Redis URL from the config, with keys
+      under the namespace.
+    """
+    config = get_config()
+    store_type = config.kv_store
+    if store_type == "sqlite":
+        db_path = Path(config.kv_store_path or default_kv_store_path())
+        db_path.parent.mkdir(parents=True, exist_ok=True)
+        return SqliteStore(db_path, table=namespace)
+    if store_type == "redis":
+        if config.redis_url is None:
+            raise ValueError("The Redis URL must be set to use a Redis key-value store")
+        return RedisStore(redis.from_url(config.redis_url), namespace=f"narrative_llm_agent:{namespace}:")
+    if store_type == "memory":
+        return MemoryStore()
+    raise ValueError(f"Unknown key-value store type '{store_type}'")
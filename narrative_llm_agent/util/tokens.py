@@ -0,0 +1,15 @@
+"""
+Rough LLM token estimates, for sizing prompts without running a tokenizer.
+"""
+import math
+
+# Rough conversion for estimating prompt size - most tokenizers average about
+# 4 bytes per token on English text and tables.
+BYTES_PER_TOKEN = 4
+
+
+def estimate_tokens(num_bytes: int) -> int:
+    """
+    Estimates the number of LLM tokens used by a text of the given size in bytes.
+    """
+    return math.ceil(num_bytes / BYTES_PER_TOKEN)
@@ -0,0 +1,82 @@
+"""
+Shared, read-only Chroma vector stores for the retrieval tools.
+
+Opening a persisted Chroma store means starting a client over its sqlite database, which is
+slow enough to notice when done on every tool call. get_vector_store opens each store once per
+process (for each embeddings model), and hands the same one to every agent and thread after
+that. The stores are only searched - anything that would change them raises an error.
+"""
+import logging
+import threading
+import time
+from pathlib import Path
+from typing import Any
+from langchain_chroma import Chroma
+from langchain_core.embeddings import Embeddings
+from pydantic import BaseModel
+from narrative_llm_agent.util.embedding_cache import embeddings_model_key
+
+logger = logging.getLogger(__name__)
+
+
+class VectorStoreInfo(BaseModel):
+    persist_directory: str
+    embeddings: str
+    open_seconds: float
+
+
+class ReadOnlyChroma(Chroma):
+    """A Chroma store that can be searched, but not changed."""
+
+    def _read_only(self, *args: Any, **kwargs: Any) -> Any:
+        raise RuntimeError(f"The vector store {self._collection.name} is read-only")
+
+    add_texts = _read_only
+    add_images = _read_only
+    add_documents = _read_only
+    update_document = _read_only
+    update_documents = _read_only
+    delete = _read_only
+    reset_collection = _read_only
+    delete_collection = _read_only
+
+
+_stores: dict[tuple[str, str], ReadOnlyChroma] = {}
+_store_info: dict[tuple[str, str], VectorStoreInfo] = {}
+_stores_lock = threading.Lock()
+
+
+def get_vector_store(persist_directory: str | Path, embeddings: Embeddings) -> Chroma:
+    """
+    Returns the shared store for the persisted directory and embeddings model, opening it
+    the first time. Raises chromadb's NotFoundError if there's no store in the directory.
+    """
+    directory = str(Path(persist_directory).resolve())
+    key = (directory, embeddings_model_key(embeddings))
+    with _stores_lock:
+        if key not in _stores:
+            start = time.monotonic()
+            _stores[key] = ReadOnlyChroma(
+                persist_directory=directory,
+                embedding_function=embeddings,
+                create_collection_if_not_exists=False,
+            )
+            info = VectorStoreInfo(
+                persist_directory=directory, embeddings=key[1], open_seconds=time.monotonic() - start
+            )
+            _store_info[key] = info
+            logger.info(f"Opened vector store {directory} in {info.open_seconds:.2f}s")
+        return _stores[key]
+
+
+def get_vector_store_stats() -> list[VectorStoreInfo]:
+    """How long each open store took to open."""
+    with _stores_lock:
+        return list(_store_info.values())
+
+
+def clear_vector_stores() -> None:
+    """Forgets the open stores, so they get opened again the next time they're needed."""
+    with _stores_lock:
+        _stores.clear()
+        _store_info.clear()
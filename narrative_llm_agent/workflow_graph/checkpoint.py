@@ -0,0 +1,243 @@
+"""
+Persistent LangGraph checkpointing for the HITL workflows.
+
+KVCheckpointSaver saves each checkpoint and its pending writes to a KeyValueStore, so a
+workflow that dies partway through (crash, redeploy, etc.) can be picked back up from the
+last node that finished, instead of starting over.
+
+Checkpoints are kept in threads, and thread ids here are based on the narrative id. The
+execution thread id also includes a hash of the approved plan, so running a different
+plan in the same narrative doesn't pick up where an old plan left off.
+"""
+import atexit
+import hashlib
+import json
+import threading
+from collections.abc import Iterator, Sequence
+from typing import Any
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.base import (
+    WRITES_IDX_MAP,
+    BaseCheckpointSaver,
+    ChannelVersions,
+    Checkpoint,
+    CheckpointMetadata,
+    CheckpointTuple,
+    get_checkpoint_id,
+    get_checkpoint_metadata,
+)
+from narrative_llm_agent.util.store import KeyValueStore, get_kv_store
+
+# unit separator, since checkpoint namespaces can contain both ":" and "|"
+_SEP = "\x1f"
+_CHECKPOINT = "checkpoint"
+_WRITE = "write"
+CHECKPOINT_NAMESPACE = "workflow_checkpoints"
+
+
+def analysis_thread_id(narrative_id: int) -> str:
+    return f"analysis-{narrative_id}"
+
+
+def execution_thread_id(narrative_id: int, steps: list[dict[str, Any]] | None) -> str:
+    plan = json.dumps(steps or [], sort_keys=True, default=str)
+    plan_hash = hashlib.sha256(plan.encode("utf-8")).hexdigest()[:16]
+    return f"execution-{narrative_id}-{plan_hash}"
+
+
+class KVCheckpointSaver(BaseCheckpointSaver):
+    """
+    A LangGraph checkpoint saver that keeps everything in a KeyValueStore.
+    Each checkpoint is stored whole under one key, and each pending write gets its own key.
+    This only supports the synchronous interface, which is what the workflows use.
+    """
+
+    def __init__(self, store: KeyValueStore, **kwargs) -> None:
+        super().__init__(**kwargs)
+        self.store = store
+
+    def _dump(self, obj: Any) -> bytes:
+        type_name, data = self.serde.dumps_typed(obj)
+        return type_name.encode("utf-8") + b"\x00" + data
+
+    def _load(self, raw: bytes) -> Any:
+        type_name, data = raw.split(b"\x00", 1)
+        return self.serde.loads_typed((type_name.decode("utf-8"), data))
+
+    def _checkpoint_prefix(self, thread_id: str, checkpoint_ns: str) -> str:
+        return _SEP.join([thread_id, checkpoint_ns, _CHECKPOINT, ""])
+
+    def _writes_prefix(self, thread_id: str, checkpoint_ns: str, checkpoint_id: str) -> str:
+        return _SEP.join([thread_id, checkpoint_ns, _WRITE, checkpoint_id, ""])
+
+    def _load_tuple(self, thread_id: str, checkpoint_ns: str, checkpoint_id: str) -> CheckpointTuple | None:
+        raw = self.store.get(self._checkpoint_prefix(thread_id, checkpoint_ns) + checkpoint_id)
+        if raw is None:
+            return None
+        saved = self._load(raw)
+        writes = [
+            self._load(self.store.get(key))
+            for key in self.store.keys(self._writes_prefix(thread_id, checkpoint_ns, checkpoint_id))
+        ]
+        writes.sort(key=lambda write: (write["task_id"], write["idx"]))
+        parent_id = saved["parent_checkpoint_id"]
+        return CheckpointTuple(
+            config={
+                "configurable": {
+                    "thread_id": thread_id,
+                    "checkpoint_ns": checkpoint_ns,
+                    "checkpoint_id": checkpoint_id,
+                }
+            },
+            checkpoint=saved["checkpoint"],
+            metadata=saved["metadata"],
+            parent_config=(
+                {
+                    "configurable": {
+                        "thread_id": thread_id,
+                        "checkpoint_ns": checkpoint_ns,
+                        "checkpoint_id": parent_id,
+                    }
+                }
+                if parent_id
+                else None
+            ),
+            pending_writes=[(write["task_id"], write["channel"], write["value"]) for write in writes],
+        )
+
+    def _checkpoint_ids(self, thread_id: str, checkpoint_ns: str) -> list[str]:
+        """Checkpoint ids in a thread, newest first. LangGraph's ids sort by creation time."""
+        prefix = self._checkpoint_prefix(thread_id, checkpoint_ns)
+        return sorted((key[len(prefix):] for key in self.store.keys(prefix)), reverse=True)
+
+    def get_tuple(self, config: RunnableConfig) -> CheckpointTuple | None:
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        checkpoint_id = get_checkpoint_id(config)
+        if checkpoint_id is None:
+            checkpoint_ids = self._checkpoint_ids(thread_id, checkpoint_ns)
+            if not checkpoint_ids:
+                return None
+            checkpoint_id = checkpoint_ids[0]
+        return self._load_tuple(thread_id, checkpoint_ns, checkpoint_id)
+
+    def list(
+        self,
+        config: RunnableConfig | None,
+        *,
+        filter: dict[str, Any] | None = None,
+        before: RunnableConfig | None = None,
+        limit: int | None = None,
+    ) -> Iterator[CheckpointTuple]:
+        # find every (thread, namespace) pair with a checkpoint, narrowed down by config
+        prefix = ""
+        if config is not None:
+            prefix = config["configurable"]["thread_id"] + _SEP
+        threads = set()
+        for key in self.store.keys(prefix):
+            thread_id, checkpoint_ns, kind, _ = key.split(_SEP, 3)
+            if kind == _CHECKPOINT:
+                threads.add((thread_id, checkpoint_ns))
+        config_ns = config["configurable"].get("checkpoint_ns") if config else None
+        config_checkpoint_id = get_checkpoint_id(config) if config else None
+        before_checkpoint_id = get_checkpoint_id(before) if before else None
+
+        for thread_id, checkpoint_ns in sorted(threads):
+            if config_ns is not None and checkpoint_ns != config_ns:
+                continue
+            for checkpoint_id in self._checkpoint_ids(thread_id, checkpoint_ns):
+                if config_checkpoint_id and checkpoint_id != config_checkpoint_id:
+                    continue
+                if before_checkpoint_id and checkpoint_id >= before_checkpoint_id:
+                    continue
+                checkpoint_tuple = self._load_tuple(thread_id, checkpoint_ns, checkpoint_id)
+                if checkpoint_tuple is None:
+                    continue
+                if filter and not all(
+                    checkpoint_tuple.metadata.get(key) == value for key, value in filter.items()
+                ):
+                    continue
+                if limit is not None:
+                    if limit <= 0:
+                        return
+                    limit -= 1
+                yield checkpoint_tuple
+
+    def put(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        saved = {
+            "checkpoint": checkpoint,
+            "metadata": get_checkpoint_metadata(config, metadata),
+            "parent_checkpoint_id": config["configurable"].get("checkpoint_id"),
+        }
+        self.store.set(self._checkpoint_prefix(thread_id, checkpoint_ns) + checkpoint["id"], self._dump(saved))
+        return {
+            "configurable": {
+                "thread_id": thread_id,
+                "checkpoint_ns": checkpoint_ns,
+                "checkpoint_id": checkpoint["id"],
+            }
+        }
+
+    def put_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[tuple[str, Any]],
+        task_id: str,
+        task_path: str = "",
+    ) -> None:
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        checkpoint_id = config["configurable"]["checkpoint_id"]
+        prefix = self._writes_prefix(thread_id, checkpoint_ns, checkpoint_id)
+        for idx, (channel, value) in enumerate(writes):
+            write_idx = WRITES_IDX_MAP.get(channel, idx)
+            key = prefix + _SEP.join([task_id, str(write_idx)])
+            # regular writes are only saved once, special ones (errors, interrupts) get replaced
+            if write_idx >= 0 and self.store.get(key) is not None:
+                continue
+            self.store.set(key, self._dump({
+                "task_id": task_id,
+                "idx": write_idx,
+                "channel": channel,
+                "value": value,
+                "task_path": task_path,
+            }))
+
+    def delete_thread(self, thread_id: str) -> None:
+        self.store.delete(self.store.keys(thread_id + _SEP))
+
+
+_store: KeyValueStore | None = None
+_store_lock = threading.Lock()
+
+
+def get_checkpointer() -> KVCheckpointSaver:
+    """
+    Makes a checkpoint saver using the configured key-value store. All checkpoint savers
+    share one store, opened the first time, and closed when the process exits.
+    """
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = get_kv_store(CHECKPOINT_NAMESPACE)
+        return KVCheckpointSaver(_store)
+
+
+def close_checkpointer() -> None:
+    """Closes the shared checkpoint store. A new one gets opened if it's needed again."""
+    global _store
+    with _store_lock:
+        store, _store = _store, None
+    if store is not None:
+        store.close()
+
+
+atexit.register(close_checkpointer)
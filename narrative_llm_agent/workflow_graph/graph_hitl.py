@@ -1,6 +1,13 @@
 from langgraph.graph import StateGraph, END
+from langgraph.graph.state import CompiledStateGraph
+from langgraph.checkpoint.base import BaseCheckpointSaver
 from narrative_llm_agent.workflow_graph.nodes_hitl import WorkflowState, WorkflowNodes
-from narrative_llm_agent.workflow_graph.routers_hitl import next_step_router, analyst_router, post_validation_router
+from narrative_llm_agent.workflow_graph.routers_hitl import next_step_router, analyst_router, post_validation_router, dag_router
+from narrative_llm_agent.workflow_graph.checkpoint import analysis_thread_id, execution_thread_id
+from narrative_llm_agent.tools.job_tools import JobMemoLedger
+from narrative_llm_agent.tools.param_template_tools import ParamTemplateStore
+from narrative_llm_agent.config import get_config
+from functools import partial
 import logging
 from typing import Dict, Any
 
@@ -44,12 +51,39 @@ def log_router_decision(router_name: str, state: WorkflowState, decision: str):
     workflow_logger.info(f"State - Awaiting approval: {state.awaiting_approval}")
     workflow_logger.info(f"DECISION: {decision}")
 
+def _invoke_graph(graph: CompiledStateGraph, state: dict[str, Any], thread_id: str, checkpointer: BaseCheckpointSaver | None, resume: bool) -> dict[str, Any]:
+    """
+    Invokes the graph. With a checkpointer, this saves progress under the thread id, and if
+    resume is True and an earlier run in that thread didn't finish, this picks up after the
+    last node that finished instead of starting over.
+    """
+    if checkpointer is None:
+        return graph.invoke(state)
+    config = {"configurable": {"thread_id": thread_id}}
+    if resume:
+        snapshot = graph.get_state(config)
+        if snapshot.next:
+            workflow_logger.info(f"RESUMING {thread_id} at: {', '.join(snapshot.next)}")
+            return graph.invoke(None, config)
+    return graph.invoke(state, config)
+
+def _get_finished_state(graph: CompiledStateGraph, thread_id: str, checkpointer: BaseCheckpointSaver | None) -> dict[str, Any] | None:
+    """Returns the final state of the last run in the thread, if it finished, otherwise None."""
+    if checkpointer is None:
+        return None
+    snapshot = graph.get_state({"configurable": {"thread_id": thread_id}})
+    if snapshot.values and not snapshot.next:
+        return snapshot.values
+    return None
+
 class AnalysisWorkflow:
     """
     Class to handle analysis workflows using LangGraph with human approval.
+
+    If a checkpointer is given, progress is saved by narrative id (see workflow_graph.checkpoint).
     """
 
-    def __init__(self, kbase_token:str=None, analyst_llm:str=None, analyst_token:str=None, validator_llm:str=None, validator_token:str=None, app_flow_llm:str=None, app_flow_token:str=None, writer_llm:str=None, writer_token:str=None, embedding_provider:str=None, embedding_provider_token:str=None):
+    def __init__(self, kbase_token:str=None, analyst_llm:str=None, analyst_token:str=None, validator_llm:str=None, validator_token:str=None, app_flow_llm:str=None, app_flow_token:str=None, writer_llm:str=None, writer_token:str=None, embedding_provider:str=None, embedding_provider_token:str=None, checkpointer:BaseCheckpointSaver=None):
         """Initialize the workflow graph with logging enabled."""
         if analyst_llm is None:
             analyst_llm = "gpt-4.1-mini-cborg"
@@ -63,6 +97,7 @@ class AnalysisWorkflow:
             embedding_provider = "cborg"
 
         self.nodes = WorkflowNodes(analyst_llm, validator_llm, app_flow_llm, writer_llm, embedding_provider, token=kbase_token, analyst_token=analyst_token, validator_token=validator_token, app_flow_token=app_flow_token, writer_token=writer_token, embedding_token=embedding_provider_token)
+        self.checkpointer = checkpointer
         self.graph = self._build_graph()
         self.callback = WorkflowCallback(workflow_logger)
 
@@ -113,10 +148,13 @@ class AnalysisWorkflow:
         planning_graph.add_edge("human_approval", END)
         planning_graph.set_entry_point("analyst")
 
-        return planning_graph.compile()
+        return planning_graph.compile(checkpointer=self.checkpointer)
 
-    def run(self, narrative_id: int, reads_id: str, description: str) -> dict[str, Any]:
-        """Run analysis workflow with logging."""
+    def run(self, narrative_id: int, reads_id: str, description: str, resume: bool = False) -> dict[str, Any]:
+        """
+        Run analysis workflow with logging. If resume is True and there's an unfinished
+        checkpointed run for this narrative, that run continues instead.
+        """
         workflow_logger.info("🚀 STARTING ANALYSIS WORKFLOW")
         workflow_logger.info(f"   📊 Narrative ID: {narrative_id}")
         workflow_logger.info(f"   📊 Reads ID: {reads_id}")
@@ -136,7 +174,7 @@ class AnalysisWorkflow:
             "human_feedback": None,
         }
 
-        final_state = self.graph.invoke(initial_state)
+        final_state = _invoke_graph(self.graph, initial_state, analysis_thread_id(narrative_id), self.checkpointer, resume)
 
         workflow_logger.info("ANALYSIS WORKFLOW COMPLETED")
         workflow_logger.info(f"Final Steps: {len(final_state.get('steps_to_run', []))}")
@@ -145,6 +183,10 @@ class AnalysisWorkflow:
 
         return final_state
 
+    def get_finished_state(self, narrative_id: int) -> dict[str, Any] | None:
+        """Returns the final state of the last checkpointed run for this narrative, if it finished."""
+        return _get_finished_state(self.graph, analysis_thread_id(narrative_id), self.checkpointer)
+
     def approve_plan(self, current_state, approved_steps=None):
         """Approve the analysis plan and continue workflow with logging."""
         workflow_logger.info("PLAN APPROVED")
@@ -155,7 +197,8 @@ class AnalysisWorkflow:
         current_state["human_approved"] = True
         current_state["awaiting_approval"] = False
 
-        return self.graph.invoke(current_state)
+        thread_id = analysis_thread_id(current_state.get("narrative_id"))
+        return _invoke_graph(self.graph, current_state, thread_id, self.checkpointer, False)
 
     def reject_plan(self, current_state, feedback=""):
         """Reject the analysis plan with logging."""
@@ -169,9 +212,30 @@ class AnalysisWorkflow:
         return current_state
 
 class ExecutionWorkflow:
-    """Class to handle execution of the analysis workflows after human approval."""
+    """
+    Class to handle execution of the analysis workflows after human approval.
+
+    With max_concurrency of 1, steps run one at a time, with the validator checking each
+    result before the next step. With a higher max_concurrency, all steps are run as a
+    dependency graph, with up to that many independent steps at once. The validator still
+    checks each step before it runs, but since the plan can't change mid-run, a step the
+    validator would stop or revise fails instead (along with the steps that depend on it).
+    If max_concurrency isn't given, it comes from workflow_max_concurrency in the config.
+
+    If a checkpointer is given, progress is saved by narrative id and plan (see
+    workflow_graph.checkpoint).
 
-    def __init__(self, kbase_token:str=None, analyst_llm:str=None, analyst_token:str=None, validator_llm:str=None, validator_token:str=None, app_flow_llm:str=None, app_flow_token:str=None, writer_llm:str=None, writer_token:str=None, embedding_provider:str=None, embedding_provider_token:str=None):
+    If a job_memo is given (or job_memo is on in the config), steps that would rerun an
+    already completed job with identical inputs reuse that job instead.
+
+    If param_templates is given (or param_templates is on in the config), apps that have
+    already run on the same type of input object reuse the parameters that worked then.
+
+    job_mode sets how each app gets run, either "crew" or "direct" (see crews.job_crew.JobCrew).
+    If it isn't given, it comes from job_mode in the config.
+    """
+
+    def __init__(self, kbase_token:str=None, analyst_llm:str=None, analyst_token:str=None, validator_llm:str=None, validator_token:str=None, app_flow_llm:str=None, app_flow_token:str=None, writer_llm:str=None, writer_token:str=None, embedding_provider:str=None, embedding_provider_token:str=None, max_concurrency:int=None, checkpointer:BaseCheckpointSaver=None, job_memo:JobMemoLedger=None, param_templates:ParamTemplateStore=None, job_mode:str=None):
         """Initialize the execution workflow with logging enabled."""
         if analyst_llm is None:
             analyst_llm = "gpt-4.1-mini-cborg"
@@ -184,8 +248,15 @@ class ExecutionWorkflow:
         if embedding_provider is None:
             embedding_provider = "cborg"
 
-        self.nodes = WorkflowNodes(analyst_llm, validator_llm, app_flow_llm, writer_llm, embedding_provider, token=kbase_token, analyst_token=analyst_token, validator_token=validator_token, app_flow_token=app_flow_token, writer_token=writer_token, embedding_token=embedding_provider_token)
-        self.graph = self._build_graph()
+        self.nodes = WorkflowNodes(analyst_llm, validator_llm, app_flow_llm, writer_llm, embedding_provider, token=kbase_token, analyst_token=analyst_token, validator_token=validator_token, app_flow_token=app_flow_token, writer_token=writer_token, embedding_token=embedding_provider_token, job_memo=job_memo, param_templates=param_templates, job_mode=job_mode)
+        if max_concurrency is None:
+            max_concurrency = get_config().workflow_max_concurrency
+        self.max_concurrency = max_concurrency
+        self.checkpointer = checkpointer
+        if self.max_concurrency > 1:
+            self.graph = self._build_dag_graph()
+        else:
+            self.graph = self._build_graph()
 
     def _create_logged_node(self, node_name: str, node_func):
         """Wrap a node function with logging"""
@@ -244,15 +315,43 @@ class ExecutionWorkflow:
         genome_graph.add_edge("workflow_end", END)
         genome_graph.set_entry_point("validate_step")
 
-        return genome_graph.compile()
+        return genome_graph.compile(checkpointer=self.checkpointer)
+
+    def _build_dag_graph(self):
+        """Build the workflow graph that runs all steps as a dependency graph, with logging."""
+        genome_graph = StateGraph(WorkflowState)
 
-    def run(self, state: dict[str, Any]) -> dict[str, Any]:
-        """Run execution workflow with logging."""
+        dag_runner = partial(self.nodes.dag_runner_node, max_concurrency=self.max_concurrency)
+        genome_graph.add_node("run_workflow_steps", self._create_logged_node("run_workflow_steps", dag_runner))
+        genome_graph.add_node("handle_error", self._create_logged_node("handle_error", self.nodes.handle_error))
+        genome_graph.add_node("workflow_end", self._create_logged_node("workflow_end", self.nodes.workflow_end))
+
+        genome_graph.add_conditional_edges(
+            "run_workflow_steps",
+            self._create_logged_router("dag_router", dag_router),
+            {
+                "workflow_end": "workflow_end",
+                "handle_error": "handle_error"
+            }
+        )
+
+        genome_graph.add_edge("handle_error", END)
+        genome_graph.add_edge("workflow_end", END)
+        genome_graph.set_entry_point("run_workflow_steps")
+
+        return genome_graph.compile(checkpointer=self.checkpointer)
+
+    def run(self, state: dict[str, Any], resume: bool = False) -> dict[str, Any]:
+        """
+        Run execution workflow with logging. If resume is True and there's an unfinished
+        checkpointed run of the same plan in this narrative, that run continues instead.
+        """
         workflow_logger.info("STARTING EXECUTION WORKFLOW")
         workflow_logger.info(f"Initial Steps: {len(state.get('steps_to_run', []))}")
         workflow_logger.info(f"Narrative ID: {state.get('narrative_id')}")
 
-        final_state = self.graph.invoke(state)
+        thread_id = execution_thread_id(state.get("narrative_id"), state.get("steps_to_run"))
+        final_state = _invoke_graph(self.graph, state, thread_id, self.checkpointer, resume)
 
         workflow_logger.info("EXECUTION WORKFLOW COMPLETED")
         workflow_logger.info(f"Final Steps: {len(final_state.get('steps_to_run', []))}")
@@ -260,3 +359,11 @@ class ExecutionWorkflow:
         workflow_logger.info(f"Final Results: {final_state.get('results')}")
 
         return final_state
+
+    def get_finished_state(self, state: dict[str, Any]) -> dict[str, Any] | None:
+        """
+        Returns the final state of the last checkpointed run of the plan in state (the
+        steps_to_run) for its narrative, if it finished.
+        """
+        thread_id = execution_thread_id(state.get("narrative_id"), state.get("steps_to_run"))
+        return _get_finished_state(self.graph, thread_id, self.checkpointer)
@@ -2,6 +2,7 @@ from narrative_llm_agent.crews.job_crew import JobCrew
 from narrative_llm_agent.agents.validator import WorkflowValidatorAgent
 from narrative_llm_agent.agents.analyst_lang import AnalystAgent
 from narrative_llm_agent.tools.job_tools import CompletedJob
+from narrative_llm_agent.util.embeddings import make_workflow_embeddings
 from narrative_llm_agent.util.json_util import extract_json_from_string, extract_json_from_string_curly
 from pydantic import BaseModel
 from typing import List, Dict, Any, Optional
@@ -204,7 +205,8 @@ class WorkflowNodes:
 
             # Initialize the validator agent
             llm = get_llm(self._validator_llm, api_key=self._validator_token)
-            validator = WorkflowValidatorAgent(llm, token=self.token)
+            embeddings = make_workflow_embeddings(self._embedding_provider, self._embedding_token, self._analyst_token)
+            validator = WorkflowValidatorAgent(llm, token=self.token, embeddings=embeddings)
 
             # Create the validation task
 
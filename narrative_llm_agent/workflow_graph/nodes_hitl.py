@@ -1,13 +1,19 @@
 import logging
+import threading
 from narrative_llm_agent.crews.job_crew import JobCrew
 from narrative_llm_agent.agents.validator import DecisionResponse, WorkflowValidatorAgent
 from narrative_llm_agent.agents.analyst_lang import AnalystAgent
-from narrative_llm_agent.kbase.clients.narrative_method_store import NarrativeMethodStore
-from narrative_llm_agent.kbase.objects.app_spec import AppSpec
-from narrative_llm_agent.tools.job_tools import CompletedJob
+from narrative_llm_agent.agents.pool import AgentPool, PoolStats
+from narrative_llm_agent.tools.app_tools import AppSpecCache
+from narrative_llm_agent.tools.job_tools import CompletedJob, JobMemoLedger
+from narrative_llm_agent.tools.param_template_tools import ParamTemplateStore
+from narrative_llm_agent.tools.plan_tools import PlanCheckResult, StepInputCheck, check_next_step, check_plan
+from narrative_llm_agent.tools.workspace_tools import ObjectInfoCache
+from narrative_llm_agent.util.embeddings import make_workflow_embeddings
+from narrative_llm_agent.workflow_graph.scheduler import StepOutcome, run_step_dag
 from pydantic import BaseModel
 from typing import List, Dict, Any, Optional
-from narrative_llm_agent.config import get_llm
+from narrative_llm_agent.config import get_config, get_llm
 import json
 
 workflow_logger = logging.getLogger("WorkflowExecution")
@@ -59,14 +65,28 @@ class WorkflowState(BaseModel):
     human_approval_status: Optional[str] = None  # "approved", "rejected", "cancelled"
     awaiting_approval: bool = False
     human_feedback: Optional[str] = None
+    # Problems found with the data types flowing through the analysis plan
+    plan_issues: List[str] = []
+
+class ValidationStats(BaseModel):
+    """Counts how often the validator could decide without the LLM agent."""
+    fast_path: int = 0
+    agent: int = 0
+
+    @property
+    def fast_path_rate(self) -> float:
+        total = self.fast_path + self.agent
+        return self.fast_path / total if total else 0.0
 
 class WorkflowNodes:
     """
     Class that encapsulates all node functions used in the workflow graph.
     This class handles creating and managing agents for different steps in the workflow.
+    Agents and job crews are kept in pools, so they get built once and reused by later steps,
+    instead of being rebuilt for each step. See agent_pool_stats for how long building them took.
     """
 
-    def __init__(self, analyst_llm: str, validator_llm: str, app_flow_llm: str, writer_llm: str, embedding_provider: str, token=None, analyst_token: str | None = None, validator_token: str | None = None, app_flow_token: str | None = None, writer_token: str | None = None, embedding_token: str | None = None):
+    def __init__(self, analyst_llm: str, validator_llm: str, app_flow_llm: str, writer_llm: str, embedding_provider: str, token=None, analyst_token: str | None = None, validator_token: str | None = None, app_flow_token: str | None = None, writer_token: str | None = None, embedding_token: str | None = None, job_memo: JobMemoLedger | None = None, param_templates: ParamTemplateStore | None = None, job_mode: str | None = None):
         """
         Initialize the WorkflowNodes class.
         TODO: This should ensure that llm names exist in config, and fail otherwise
@@ -80,6 +100,13 @@ class WorkflowNodes:
             writer_llm (str): config name for the LLM for the summary and report writer
             embedding_provider (str): (one of "cborg" or "nomic"), used for embedding queries to the knowledge graph
             token (str, optional): Authentication token for the KBase API.
+            job_memo (JobMemoLedger, optional): if given, app runs reuse already completed jobs with identical inputs.
+                If not, one gets made when job_memo is on in the config.
+            param_templates (ParamTemplateStore, optional): if given, app runs reuse parameters that worked before
+                on the same type of input object, and save new ones. If not, one gets made when param_templates is
+                on in the config.
+            job_mode (str, optional): how JobCrew runs each app, either "crew" or "direct". See JobCrew.
+                Defaults to job_mode in the config.
         """
         self._analyst_llm = analyst_llm.lower()
         self._validator_llm = validator_llm.lower()
@@ -92,8 +119,58 @@ class WorkflowNodes:
         self._writer_token = writer_token
         self._embedding_token = embedding_token
         self.token = token
+        config = get_config()
+        if job_memo is None and config.job_memo:
+            job_memo = JobMemoLedger(scope=config.job_memo_scope)
+        self._job_memo = job_memo
+        if param_templates is None and config.param_templates:
+            param_templates = ParamTemplateStore()
+        self._param_templates = param_templates
+        self._job_mode = job_mode or config.job_mode
+        self._app_specs = AppSpecCache()
+        self._object_infos = ObjectInfoCache(token=self.token)
+        self.validation_stats = ValidationStats()
+        # the DAG runner validates steps from worker threads
+        self._validation_stats_lock = threading.Lock()
         if not self.token:
             raise ValueError("KBase auth token must be provided")
+        self._analysts = AgentPool(self._build_analyst, name="analyst agent")
+        self._validators = AgentPool(self._build_validator, name="validator agent")
+        self._job_crews = AgentPool(self._build_job_crew, reset=lambda crew: crew.reset(), name="job crew")
+
+    @property
+    def agent_pool_stats(self) -> Dict[str, PoolStats]:
+        """Build and reuse counts, and total build time, for each pool of agents."""
+        return {
+            "analyst": self._analysts.stats,
+            "validator": self._validators.stats,
+            "job_crew": self._job_crews.stats,
+        }
+
+    def _build_analyst(self) -> AnalystAgent:
+        llm = get_llm(self._analyst_llm, api_key=self._analyst_token, cache_scope="analyst")
+        print(f"Using LLM: {self._analyst_llm} with llm: {llm}")
+        return AnalystAgent(
+            llm = llm,
+            provider = self._embedding_provider,
+            api_key=self._analyst_token,
+            token=self.token,
+        )
+
+    def _build_validator(self) -> WorkflowValidatorAgent:
+        llm = get_llm(self._validator_llm, api_key=self._validator_token, cache_scope="validator")
+        embeddings = make_workflow_embeddings(self._embedding_provider, self._embedding_token, self._analyst_token)
+        return WorkflowValidatorAgent(llm, token=self.token, embeddings=embeddings)
+
+    def _build_job_crew(self) -> JobCrew:
+        return JobCrew(
+            get_llm(self._app_flow_llm, api_key=self._app_flow_token, return_crewai=True),
+            get_llm(self._writer_llm, api_key=self._writer_token, return_crewai=True),
+            token=self.token,
+            job_memo=self._job_memo,
+            param_templates=self._param_templates,
+            job_mode=self._job_mode,
+        )
 
     def analyst_node(self, state: WorkflowState):
         """
@@ -110,15 +187,6 @@ class WorkflowNodes:
             # Get the existing description from the state
             description = state.description
             workflow_logger.info(f"Description for the analyst agent: {description}")
-            # Initialize the analyst agent
-            llm = get_llm(self._analyst_llm, api_key=self._analyst_token)
-            print(f"Using LLM: {self._analyst_llm} with llm: {llm}")
-            analyst_expert = AnalystAgent(
-                    llm = llm,
-                    provider = self._embedding_provider,
-                    api_key=self._analyst_token,
-                    token=self.token,
-                )
             # Create combined description for the agent
             description_complete = description + """/nThis analysis is for a Microbiology Resource Announcements (MRA) paper so these need to be a part of analysis. Always keep in mind the following:
                     - The analysis steps should begin with read quality assessment.
@@ -131,10 +199,15 @@ class WorkflowNodes:
                     """
             config = {"recursion_limit": 50 }
 
-            output = analyst_expert.agent.invoke({"messages": [{"role": "user", "content": description_complete}]},config)
+            with self._analysts.acquire() as analyst_expert:
+                output = analyst_expert.agent.invoke({"messages": [{"role": "user", "content": description_complete}]},config)
             # Extract the JSON from the output
             # analysis_plan = [step.model_dump() for step in output["structured_response"].steps_to_run]
-            analysis_plan = self._process_analysis_result(output["structured_response"].steps_to_run)
+            plan_check = self._process_analysis_result(
+                output["structured_response"].steps_to_run,
+                self._get_object_types(state.reads_id),
+            )
+            analysis_plan = plan_check.steps
             workflow_logger.info(f"Analysis plan: {analysis_plan}")
             #Mock analysis plan for testing purposes
             #read from json file
@@ -149,23 +222,47 @@ class WorkflowNodes:
 
             return state.model_copy(update={
                 "steps_to_run": analysis_plan,
+                "plan_issues": [issue.message for issue in plan_check.issues],
                 "error": None,
                 "awaiting_approval": True
             })
         except Exception as e:
             return state.model_copy(update={"steps_to_run": None, "error": str(e)})
 
-    def _process_analysis_result(self, result: List[AnalysisStep]) -> List[AnalysisStep]:
-        nms = NarrativeMethodStore()
+    def _process_analysis_result(
+        self, result: List[AnalysisStep], initial_types: List[str] | None = None
+    ) -> PlanCheckResult:
+        """
+        Marks which steps are expected to create new objects, then checks that the
+        data types chain together through the plan, adding converter steps where needed.
+        """
         for step in result:
-            app_spec = AppSpec(**nms.get_app_spec(step.app_id))
+            app_spec = self._app_specs.get_app_spec(step.app_id)
             creates_object = False
             for param in app_spec.parameters:
                 if param.text_options is not None and param.text_options.is_output_name != 0:
                     creates_object = True
                     break
             step.expect_new_object = creates_object
-        return [step.model_dump() for step in result]
+        plan_check = check_plan(
+            [step.model_dump() for step in result], initial_types or [], self._app_specs
+        )
+        for issue in plan_check.issues:
+            workflow_logger.warning(f"Plan issue at step {issue.step}: {issue.message}")
+        return plan_check
+
+    def _get_object_types(self, upa: str | None) -> List[str]:
+        """
+        Returns the workspace type of the given object as a single element list, or an empty
+        list if it can't be found.
+        """
+        if not upa:
+            return []
+        try:
+            return [self._object_infos.get_object_info(upa).type]
+        except Exception as e:
+            workflow_logger.warning(f"Unable to get type of object {upa}: {e}")
+            return []
 
     def human_approval_node(self, state: WorkflowState):
         """
@@ -182,7 +279,9 @@ class WorkflowNodes:
         # Check if we're still awaiting approval
         if state.awaiting_approval and not state.human_approval_status:
             # Still waiting for human input - return state unchanged
-            # The UI will handle displaying the approval interface
+            # The UI will handle displaying the approval interface, including any plan issues
+            print(f"📋 Analysis plan awaiting approval for Narrative ID: {state.narrative_id}")
+            print(self._format_analysis_plan(state.steps_to_run or [], state.plan_issues))
             return state.model_copy(update={
                 "awaiting_approval": True,
                 "error": None
@@ -221,18 +320,22 @@ class WorkflowNodes:
                 "error": None
             })
 
-    def _format_analysis_plan(self, steps: List[Dict[str, Any]]) -> str:
+    def _format_analysis_plan(self, steps: List[Dict[str, Any]], plan_issues: List[str] | None = None) -> str:
         """
         Format the analysis plan for human-readable display.
 
         Args:
             steps: List of analysis steps
+            plan_issues: Problems found with the data types flowing through the plan, if any
 
         Returns:
             Formatted string representation of the analysis plan
         """
+        issues_text = ""
+        if plan_issues:
+            issues_text = "\n⚠️ Plan issues to review before approving:\n" + "\n".join(f"   - {issue}" for issue in plan_issues)
         if not steps:
-            return "No steps defined in the analysis plan."
+            return "No steps defined in the analysis plan." + issues_text
 
         formatted_steps = []
         for i, step in enumerate(steps, 1):
@@ -243,7 +346,7 @@ class WorkflowNodes:
             step_info += f"   Creates new object: {'Yes' if step.get('expect_new_object', False) else 'No'}\n"
             formatted_steps.append(step_info)
 
-        return "\n".join(formatted_steps)
+        return "\n".join(formatted_steps) + issues_text
 
     def app_runner_node(self, state: WorkflowState) -> WorkflowState:
         """
@@ -263,13 +366,7 @@ class WorkflowNodes:
         app_id = current_step["app_id"]
         input_object_upa = state.input_object_upa
         try:
-            jc = JobCrew(
-                get_llm(self._app_flow_llm, api_key=self._app_flow_token, return_crewai=True),
-                get_llm(self._writer_llm, api_key=self._writer_token, return_crewai=True),
-                token=self.token
-            )
-            result = jc.start_job(app_id, input_object_upa, state.narrative_id, app_id=app_id)
-            job_result: CompletedJob = result.pydantic
+            job_result = self._run_step(app_id, input_object_upa, state.narrative_id)
             updated_last_data_object_upa = state.last_data_object_upa
             if len(job_result.created_objects):
                 updated_last_data_object_upa = job_result.created_objects[0].object_upa
@@ -289,6 +386,93 @@ class WorkflowNodes:
                 "error": str(e)
             })
 
+    def _run_step(self, app_id: str, input_object_upa: str | None, narrative_id: int) -> CompletedJob:
+        """
+        Runs a single app with a JobCrew from the pool, and returns the completed job.
+        """
+        with self._job_crews.acquire() as jc:
+            result = jc.start_job(app_id, input_object_upa, narrative_id, app_id=app_id)
+        return result.pydantic
+
+    def dag_runner_node(self, state: WorkflowState, max_concurrency: int = 1) -> WorkflowState:
+        """
+        Node function for running all remaining steps as a dependency graph, with independent
+        steps running concurrently. See workflow_graph.scheduler for how dependencies are found.
+        Each step gets checked by the validator before it runs (see _validate_dag_step).
+
+        Results get merged back in plan order, regardless of which step finished first.
+        Steps that failed, or were skipped because a step they depend on failed, stay in
+        steps_to_run, and the error from the first failed step is set.
+
+        Args:
+            state (WorkflowState): The current workflow state.
+            max_concurrency (int): The most steps to run at once.
+
+        Returns:
+            WorkflowState: Updated workflow state with execution results.
+        """
+        outcomes = run_step_dag(
+            state.steps_to_run or [],
+            lambda step, input_upa: self._run_step(step["app_id"], input_upa, state.narrative_id),
+            state.input_object_upa or state.reads_id,
+            max_concurrency=max_concurrency,
+            validate_step=lambda step, input_upa, deps: self._validate_dag_step(state, step, input_upa, deps),
+        )
+        completed_steps = list(state.completed_steps)
+        remaining_steps = []
+        step_result = state.step_result
+        last_executed_step = state.last_executed_step
+        last_data_object_upa = state.last_data_object_upa
+        error = None
+        for outcome in outcomes:
+            if outcome.succeeded:
+                completed_steps.append(outcome.step)
+                last_executed_step = outcome.step
+                step_result = outcome.result
+                if len(outcome.result.created_objects):
+                    last_data_object_upa = outcome.result.created_objects[0].object_upa
+            else:
+                remaining_steps.append(outcome.step)
+                if error is None and not outcome.skipped:
+                    step_num = outcome.step.get("step", outcome.index + 1)
+                    error = f"Step {step_num} ({outcome.step.get('app_id')}) failed: {outcome.error}"
+        return state.model_copy(update={
+            "step_result": step_result,
+            "steps_to_run": remaining_steps,
+            "last_executed_step": last_executed_step,
+            "completed_steps": completed_steps,
+            "last_data_object_upa": last_data_object_upa,
+            "error": error,
+        })
+
+    def _validate_dag_step(
+        self, state: WorkflowState, step: Dict[str, Any], input_object_upa: str | None, dependencies: List[StepOutcome]
+    ) -> str | None:
+        """
+        Runs the workflow validator on a step before the dependency graph runs it, the same
+        as the sequential workflow does between steps. The last executed step is the latest
+        step it depends on. Returns the input object UPA to use.
+        Since the plan can't be changed while other steps are running, this raises a
+        RuntimeError if the validator would stop or change the step.
+        """
+        last = dependencies[-1] if dependencies else None
+        step_state = state.model_copy(update={
+            "steps_to_run": [step],
+            "last_executed_step": last.step if last else {},
+            "step_result": last.result if last else None,
+            "input_object_upa": input_object_upa,
+            "last_data_object_upa": input_object_upa,
+            "error": None,
+        })
+        validated = self.workflow_validator_node(step_state)
+        if validated.error:
+            raise RuntimeError(validated.error)
+        if validated.steps_to_run != [step]:
+            raise RuntimeError(
+                f"The validator would stop or change this step, which can't be done while other steps are running: {validated.validation_reasoning}"
+            )
+        return validated.input_object_upa
+
     def workflow_validator_node(self, state: WorkflowState) -> WorkflowState:
         """
         Node function for validating workflow results and determining next steps.
@@ -312,11 +496,26 @@ class WorkflowNodes:
                 "error": None
             })
 
-        try:
-            # Initialize the validator agent
-            llm = get_llm(self._validator_llm, api_key=self._validator_token)
-            validator = WorkflowValidatorAgent(llm, token=self.token)
+        fast_check = self._fast_validate(state, next_step)
+        with self._validation_stats_lock:
+            if fast_check.ok:
+                self.validation_stats.fast_path += 1
+            else:
+                self.validation_stats.agent += 1
+            fast_path_count = self.validation_stats.fast_path
+            total_count = fast_path_count + self.validation_stats.agent
+        workflow_logger.info(
+            f"Validator fast path {'used' if fast_check.ok else 'skipped'}: {fast_check.reason} "
+            f"(used {fast_path_count} of {total_count} times)"
+        )
+        if fast_check.ok:
+            return state.model_copy(update={
+                "input_object_upa": fast_check.input_object_upa,
+                "validation_reasoning": fast_check.reason,
+                "error": None
+            })
 
+        try:
             # Create the validation task
             description = f"""
                 Analyze the result of the last executed step and determine if the next planned step is appropriate.
@@ -350,7 +549,8 @@ class WorkflowNodes:
                 IMPORTANT: For the input_object_upa field, you MUST use the actual UPA from the previous step's output or the {state.reads_id} for the initial object.
                 A valid UPA has the format "workspace_id/object_id/version_id" (like "12345/6/1").UPA fields must be numbers. DO NOT make up UPA values - they must be actual reference IDs extracted from the previous step's output or the initial state.
                 """
-            output = validator.agent.invoke({"messages": [{"role": "user", "content": description}]})
+            with self._validators.acquire() as validator:
+                output = validator.agent.invoke({"messages": [{"role": "user", "content": description}]})
             # Extract the JSON from the output
             decision: DecisionResponse = output["structured_response"]
             workflow_logger.info(f"Validator node: {decision}")
@@ -389,6 +589,38 @@ class WorkflowNodes:
         except Exception as e:
             return state.model_copy(update={"error": f"An error occurred while validating the workflow: {str(e)}"})
 
+    def _fast_validate(self, state: WorkflowState, next_step: Dict[str, Any]) -> StepInputCheck:
+        """
+        Rule-based check for whether the workflow can just continue with the next step, so the
+        validator agent is only needed when something looks off. This is ok when the last job
+        completed without an error, made a new object if it was expected to, and there's an
+        object whose type is one of the next app's input types.
+        The input object is one made by the last step if there were any, otherwise the last
+        data object (or the initial object, if nothing has run yet).
+        """
+        last_step = state.last_executed_step
+        if last_step:
+            result = state.step_result
+            if result is None:
+                return StepInputCheck(ok=False, reason="There's no result from the last step")
+            if isinstance(result, dict):
+                result = CompletedJob.model_validate(result)
+            if result.job_status != "completed" or result.job_error:
+                return StepInputCheck(
+                    ok=False, reason=f"The last job ended with status {result.job_status}: {result.job_error}"
+                )
+            if last_step.get("expect_new_object") and not len(result.created_objects):
+                return StepInputCheck(ok=False, reason="The last step was expected to make a new object, but didn't")
+            candidates = [obj.object_upa for obj in result.created_objects]
+            if not candidates:
+                candidates = [state.last_data_object_upa or state.input_object_upa]
+        else:
+            candidates = [state.input_object_upa or state.reads_id]
+        typed_candidates = [
+            (upa, ws_type) for upa in dict.fromkeys(candidates) for ws_type in self._get_object_types(upa)
+        ]
+        return check_next_step(next_step, typed_candidates, self._app_specs)
+
     def handle_error(self, state: WorkflowState):
         """
         Node function for handling errors in the workflow.
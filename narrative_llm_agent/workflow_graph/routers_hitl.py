@@ -21,4 +21,10 @@ def post_validation_router(state: WorkflowState):
     if state.steps_to_run:
         return "run_workflow_step"  # Continue with next step
     else:
-        return "workflow_end"
\ No newline at end of file
+        return "workflow_end"
+
+# Router after running all steps as a dependency graph
+def dag_router(state: WorkflowState):
+    if state.error:
+        return "handle_error"
+    return "workflow_end"
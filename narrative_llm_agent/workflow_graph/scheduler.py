@@ -0,0 +1,147 @@
+"""
+Runs the steps of an analysis plan as a dependency graph, so steps that don't depend on
+each other can run at the same time.
+
+Dependencies come from each step's input_data_object and output_data_object lists. A step
+depends on every earlier step that outputs one of its inputs. Since those are written by
+an LLM, they don't always line up. When a step's inputs don't match any earlier output,
+it's assumed to depend on the most recent earlier step that makes a new object, which is
+what the sequential workflow would've done anyway.
+"""
+import logging
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any, Callable
+from pydantic import BaseModel
+from narrative_llm_agent.tools.job_tools import CompletedJob
+
+workflow_logger = logging.getLogger("WorkflowExecution")
+
+StepRunner = Callable[[dict[str, Any], str | None], CompletedJob]
+# Checks a step before it runs. Gets called with the step, its input object UPA, and the
+# outcomes of the steps it depends on. Returns the input object UPA to use, or raises an
+# exception if the step shouldn't run.
+StepValidator = Callable[[dict[str, Any], str | None, list["StepOutcome"]], str | None]
+
+
+class StepOutcome(BaseModel):
+    index: int
+    step: dict[str, Any]
+    input_object_upa: str | None = None
+    result: CompletedJob | None = None
+    error: str | None = None
+    skipped: bool = False
+
+    @property
+    def succeeded(self) -> bool:
+        return self.result is not None and self.error is None
+
+
+def _normalize_object_name(name: Any) -> str:
+    return " ".join(str(name).lower().split())
+
+
+def build_step_dag(steps: list[dict[str, Any]]) -> list[set[int]]:
+    """
+    Returns the dependencies of each step, as a list of sets of indices of earlier steps.
+    Dependencies always point backward, so the result is always acyclic.
+    """
+    outputs = [
+        {_normalize_object_name(name) for name in step.get("output_data_object") or []}
+        for step in steps
+    ]
+    dependencies = []
+    for idx, step in enumerate(steps):
+        inputs = {_normalize_object_name(name) for name in step.get("input_data_object") or []}
+        step_deps = {prior for prior in range(idx) if inputs & outputs[prior]}
+        if not step_deps:
+            producers = [prior for prior in range(idx) if steps[prior].get("expect_new_object")]
+            if producers:
+                step_deps = {producers[-1]}
+        dependencies.append(step_deps)
+    return dependencies
+
+
+def _get_input_object_upa(
+    dependencies: set[int], outcomes: dict[int, StepOutcome], initial_input_upa: str | None
+) -> str | None:
+    """
+    A step's input is the first object created by its latest dependency that made one,
+    or the initial input object if none did.
+    """
+    for dep in sorted(dependencies, reverse=True):
+        result = outcomes[dep].result
+        if result is not None and len(result.created_objects):
+            return result.created_objects[0].object_upa
+    return initial_input_upa
+
+
+def _run_checked_step(
+    run_step: StepRunner,
+    validate_step: StepValidator | None,
+    step: dict[str, Any],
+    input_upa: str | None,
+    dependency_outcomes: list[StepOutcome],
+) -> tuple[CompletedJob, str | None]:
+    if validate_step is not None:
+        input_upa = validate_step(step, input_upa, dependency_outcomes)
+    return run_step(step, input_upa), input_upa
+
+
+def run_step_dag(
+    steps: list[dict[str, Any]],
+    run_step: StepRunner,
+    initial_input_upa: str | None,
+    max_concurrency: int = 1,
+    validate_step: StepValidator | None = None,
+) -> list[StepOutcome]:
+    """
+    Runs all steps, starting each one as soon as all of its dependencies have succeeded,
+    with at most max_concurrency steps running at once. run_step gets called with the
+    step and its input object UPA, and should return a CompletedJob.
+
+    If validate_step is given, it gets called in the same worker before each step runs,
+    and can change the step's input object UPA.
+
+    If a step (or its validation) raises an exception or its job has an error, every step
+    that depends on it (directly or not) is skipped.
+
+    Returns one StepOutcome per step, in the same order as the steps, no matter what
+    order they finished in.
+    """
+    dependencies = build_step_dag(steps)
+    max_concurrency = max(1, max_concurrency)
+    outcomes: dict[int, StepOutcome] = {}
+    pending = set(range(len(steps)))
+    # future -> (step index, input object upa)
+    running: dict[Future, tuple[int, str | None]] = {}
+
+    with ThreadPoolExecutor(max_workers=max_concurrency) as executor:
+        while pending or running:
+            for idx in sorted(pending):
+                deps = dependencies[idx]
+                if any(dep in outcomes and not outcomes[dep].succeeded for dep in deps):
+                    outcomes[idx] = StepOutcome(index=idx, step=steps[idx], skipped=True)
+                    pending.discard(idx)
+                    workflow_logger.info(f"Skipping step {idx + 1}, a step it depends on failed")
+                elif all(dep in outcomes for dep in deps) and len(running) < max_concurrency:
+                    input_upa = _get_input_object_upa(deps, outcomes, initial_input_upa)
+                    dep_outcomes = [outcomes[dep] for dep in sorted(deps)]
+                    future = executor.submit(
+                        _run_checked_step, run_step, validate_step, steps[idx], input_upa, dep_outcomes
+                    )
+                    running[future] = (idx, input_upa)
+                    pending.discard(idx)
+            if not running:
+                continue
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                idx, input_upa = running.pop(future)
+                outcome = StepOutcome(index=idx, step=steps[idx], input_object_upa=input_upa)
+                try:
+                    outcome.result, outcome.input_object_upa = future.result()
+                    outcome.error = outcome.result.job_error
+                except Exception as e:
+                    workflow_logger.info(f"Step {idx + 1} failed: {e}")
+                    outcome.error = str(e)
+                outcomes[idx] = outcome
+    return [outcomes[idx] for idx in range(len(steps))]
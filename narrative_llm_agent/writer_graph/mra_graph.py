@@ -263,7 +263,7 @@ class MraWriterGraph:
             [("system", WRITING_SYSTEM_PROMPT), ("user", MRA_WRITING_PROMPT)]
         )
 
-        llm = get_llm(self._writer_llm, api_key=self._writer_token)
+        llm = get_llm(self._writer_llm, api_key=self._writer_token, cache_scope="writer")
         msg = llm.invoke(
             mra_writing_prompt_template.invoke({"narrative": state.narrative_data})
         )
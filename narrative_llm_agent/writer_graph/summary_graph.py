@@ -74,7 +74,7 @@ class SummaryWriterGraph:
         summary_prompt_template = ChatPromptTemplate(
             [("system", writing_system_prompt), ("user", summary_writing_prompt)]
         )
-        llm = get_llm(self._writer_llm, api_key=self._writer_token)
+        llm = get_llm(self._writer_llm, api_key=self._writer_token, cache_scope="writer")
         msg = llm.invoke(
             summary_prompt_template.invoke(
                 {"narrative_text": state.narrative_markdown, "app_list": state.app_list}
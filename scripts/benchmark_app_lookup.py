@@ -0,0 +1,49 @@
+"""
+A script that compares the app catalog searches - lexical (BM25), vector, and the hybrid of
+both (see narrative_llm_agent/util/hybrid_retriever.py) - by their recall@k on the plan
+lookup cases, and the extra tool calls each one's misses would cost.
+
+Without an embeddings model, only the lexical and hybrid searches run (and they're the same).
+"""
+import argparse
+from pathlib import Path
+
+from narrative_llm_agent.agents.analyst_lang import DEFAULT_CATALOG_DB_DIR
+from narrative_llm_agent.eval.app_lookup_recall import RecallResult, compare_search_modes, load_lookup_cases
+from narrative_llm_agent.util.embedding_cache import cache_embeddings
+from narrative_llm_agent.util.embeddings import make_embeddings
+from narrative_llm_agent.util.hybrid_retriever import HybridAppRetriever, load_catalog_index
+
+DEFAULT_CASES = Path(__file__).parent.parent / "tests" / "test_data" / "plan_app_lookups.json"
+
+
+def print_results(results: dict[str, RecallResult]) -> None:
+    print(f"{'search':<8} {'k':>3} {'cases':>5} {'recall':>7} {'extra tool calls':>16}")
+    for mode, result in results.items():
+        print(f"{mode:<8} {result.k:>3} {result.cases:>5} {result.recall:>7.2f} {result.extra_tool_calls:>16}")
+    if "vector" in results:
+        saved = results["vector"].extra_tool_calls - results["hybrid"].extra_tool_calls
+        print(f"hybrid saves {saved} tool calls over vector search")
+    for mode, result in results.items():
+        for query in result.missed:
+            print(f"{mode} missed: {query}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare app catalog searches by recall@k on plan app lookups")
+    parser.add_argument("-d", "--db_dir", help="catalog Chroma database directory", default=str(DEFAULT_CATALOG_DB_DIR))
+    parser.add_argument("-c", "--cases", help="JSON file of lookup cases", default=str(DEFAULT_CASES))
+    parser.add_argument("-k", type=int, default=3, help="number of results that count as found")
+    parser.add_argument("-e", "--embeddings", choices=["none", "nomic", "cborg"], default="none", help="embeddings provider")
+    parser.add_argument("--embeddings_token", help="embeddings API key")
+    args = parser.parse_args()
+
+    embeddings = None
+    if args.embeddings != "none":
+        embeddings = cache_embeddings(make_embeddings(args.embeddings, args.embeddings_token))
+    retriever = HybridAppRetriever.from_catalog_index(load_catalog_index(args.db_dir), embeddings)
+    print_results(compare_search_modes(retriever, load_lookup_cases(args.cases), args.k))
+
+
+if __name__ == "__main__":
+    main()
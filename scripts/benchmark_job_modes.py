@@ -0,0 +1,73 @@
+"""
+A script that compares the two JobCrew modes, "crew" and "direct", for running a single app.
+The same app gets run on the same input object in an existing narrative, some number of times
+in each mode, and the time and token usage of each run is reported.
+
+Note that this runs real jobs, and adds cells to the narrative for each run.
+"""
+import argparse
+import statistics
+
+from narrative_llm_agent.config import get_llm
+from narrative_llm_agent.crews.job_crew import JOB_MODES, JobCrew, JobRunStats
+
+
+def run_benchmark(
+    narrative_id: int,
+    app_id: str,
+    input_upa: str,
+    llm: str,
+    llm_token: str | None,
+    kbase_token: str,
+    runs: int,
+) -> dict[str, list[JobRunStats]]:
+    results = {}
+    for job_mode in JOB_MODES:
+        crew = JobCrew(
+            get_llm(llm, api_key=llm_token, return_crewai=True),
+            get_llm(llm, api_key=llm_token, return_crewai=True),
+            token=kbase_token,
+            job_mode=job_mode,
+        )
+        for _ in range(runs):
+            crew.start_job(app_id, input_upa, narrative_id, app_id=app_id)
+        results[job_mode] = crew.run_stats
+    return results
+
+
+def print_results(results: dict[str, list[JobRunStats]]) -> None:
+    print(f"{'mode':<8} {'runs':>4} {'median sec':>10} {'median tokens':>13} {'median requests':>15}")
+    for job_mode, stats in results.items():
+        print(
+            f"{job_mode:<8} {len(stats):>4} "
+            f"{statistics.median(s.elapsed_seconds for s in stats):>10.1f} "
+            f"{statistics.median(s.token_usage.total_tokens for s in stats):>13.0f} "
+            f"{statistics.median(s.token_usage.successful_requests for s in stats):>15.0f}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare JobCrew's crew and direct job modes")
+    parser.add_argument("-k", "--kbase_token", help="KBase Auth Token", required=True)
+    parser.add_argument("-n", "--narrative_id", type=int, help="narrative to run the app in", required=True)
+    parser.add_argument("-a", "--app_id", help="app to run", required=True)
+    parser.add_argument("-u", "--upa", help="input object UPA", required=True)
+    parser.add_argument("-m", "--llm", help="LLM id from the config", default="gpt-4o-openai")
+    parser.add_argument("-l", "--llm_token", help="LLM API key")
+    parser.add_argument("--runs", type=int, default=3, help="number of runs for each mode")
+    args = parser.parse_args()
+
+    results = run_benchmark(
+        args.narrative_id,
+        args.app_id,
+        args.upa,
+        args.llm,
+        args.llm_token,
+        args.kbase_token,
+        args.runs,
+    )
+    print_results(results)
+
+
+if __name__ == "__main__":
+    main()
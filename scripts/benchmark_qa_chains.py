@@ -0,0 +1,86 @@
+"""
+A script that compares the retrieval QA chain types the analyst's doc tools can use - refine,
+map_reduce, and stuff (see narrative_llm_agent/util/retrieval_qa.py). Each query gets asked
+of a persisted Chroma database some number of times with each chain type, and the time each
+answer took is reported.
+
+To compare the chains without paying for model calls, use the "fake" model and run the fake
+LLM server with some latency, e.g.
+    python -m narrative_llm_agent.eval.fake_llm_server --port 8765 --latency 1
+The embeddings still need a real embedding model, that matches the one the database was
+made with.
+"""
+import argparse
+import statistics
+import time
+
+from langchain_core.language_models import BaseLanguageModel
+from langchain_core.retrievers import BaseRetriever
+
+from narrative_llm_agent.config import get_config, get_llm
+from narrative_llm_agent.util.embeddings import make_embeddings
+from narrative_llm_agent.util.retrieval_qa import QA_CHAIN_TYPES, make_qa_chain
+from narrative_llm_agent.util.vector_stores import get_vector_store
+
+
+def run_benchmark(
+    llm: BaseLanguageModel,
+    retriever: BaseRetriever,
+    queries: list[str],
+    runs: int,
+    chain_types: tuple[str, ...] = QA_CHAIN_TYPES,
+) -> dict[str, list[float]]:
+    """Returns the seconds each answer took, for each chain type."""
+    config = get_config()
+    results = {}
+    for chain_type in chain_types:
+        chain = make_qa_chain(
+            llm,
+            retriever,
+            chain_type=chain_type,
+            max_concurrency=config.qa_max_concurrency,
+            token_budget=config.qa_stuff_token_budget,
+        )
+        results[chain_type] = []
+        for _ in range(runs):
+            for query in queries:
+                start = time.monotonic()
+                chain.invoke({"query": query})
+                results[chain_type].append(time.monotonic() - start)
+    return results
+
+
+def print_results(results: dict[str, list[float]]) -> None:
+    baseline = statistics.median(results["refine"]) if results.get("refine") else None
+    print(f"{'chain':<11} {'answers':>7} {'median sec':>10} {'max sec':>8} {'vs refine':>9}")
+    for chain_type, seconds in results.items():
+        median = statistics.median(seconds)
+        speedup = f"{baseline / median:>8.1f}x" if baseline and median else f"{'-':>9}"
+        print(f"{chain_type:<11} {len(seconds):>7} {median:>10.2f} {max(seconds):>8.2f} {speedup}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the retrieval QA chain types of the analyst doc tools")
+    parser.add_argument("-d", "--db_dir", help="persisted Chroma database directory", required=True)
+    parser.add_argument("-q", "--query", action="append", help="question to ask, can be given more than once", required=True)
+    parser.add_argument("-m", "--llm", help="LLM id from the config", default="gpt-4o-openai")
+    parser.add_argument("-l", "--llm_token", help="LLM API key")
+    parser.add_argument("-e", "--embeddings", choices=["nomic", "cborg"], default="nomic", help="embeddings provider")
+    parser.add_argument("--embeddings_token", help="embeddings API key")
+    parser.add_argument("--runs", type=int, default=3, help="number of runs for each chain type")
+    parser.add_argument("--chain_types", nargs="+", choices=QA_CHAIN_TYPES, default=list(QA_CHAIN_TYPES))
+    args = parser.parse_args()
+
+    vectordb = get_vector_store(args.db_dir, make_embeddings(args.embeddings, args.embeddings_token))
+    results = run_benchmark(
+        get_llm(args.llm, api_key=args.llm_token),
+        vectordb.as_retriever(),
+        args.query,
+        args.runs,
+        tuple(args.chain_types),
+    )
+    print_results(results)
+
+
+if __name__ == "__main__":
+    main()
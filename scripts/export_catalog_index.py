@@ -0,0 +1,27 @@
+"""
+Exports the embeddings of the app catalog's Chroma database into a local catalog index, with
+memory-mapped vectors. Set catalog_index_path in the config to use it for the catalog tool,
+instead of the Chroma database (see narrative_llm_agent/util/catalog_index.py).
+
+The index only has the embeddings that are already in the database, so queries still need the
+same embedding model that made them.
+"""
+import argparse
+
+from narrative_llm_agent.agents.analyst import DEFAULT_CATALOG_DB_DIR
+from narrative_llm_agent.util.catalog_index import CatalogIndex
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export a local index of the app catalog embeddings")
+    parser.add_argument("-d", "--db_dir", help="catalog Chroma database directory", default=str(DEFAULT_CATALOG_DB_DIR))
+    parser.add_argument("-o", "--output", help="index directory to write", default="catalog_index")
+    args = parser.parse_args()
+
+    index = CatalogIndex.from_chroma(args.db_dir)
+    index.save(args.output)
+    print(f"Saved {len(index)} catalog embeddings with {index.vectors.shape[1]} dimensions to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,31 @@
+"""
+Exports the App and DataObject nodes of the KBase app knowledge graph, and their relationships,
+from Neo4j into a local snapshot file. Set kg_backend=snapshot and kg_snapshot_path in the
+config to use it instead of Neo4j (see narrative_llm_agent/util/kg_snapshot.py).
+
+The Neo4j connection uses the environment variables named in the config, unless given here.
+"""
+import argparse
+
+from narrative_llm_agent.util.kg_snapshot import KGSnapshot
+from narrative_llm_agent.util.neo4j_driver import get_neo4j_driver
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export a local snapshot of the app knowledge graph")
+    parser.add_argument("-o", "--output", help="snapshot file to write", default="kg_snapshot.npz")
+    parser.add_argument("--uri", help="Neo4j URI")
+    parser.add_argument("--user", help="Neo4j username")
+    parser.add_argument("--password", help="Neo4j password")
+    args = parser.parse_args()
+
+    snapshot = KGSnapshot.export(get_neo4j_driver(args.uri, args.user, args.password))
+    snapshot.save(args.output)
+    print(
+        f"Saved {len(snapshot.name)} nodes, {len(snapshot.app_names())} apps, and "
+        f"{len(snapshot.adj_neighbors) // 2} relationships to {args.output}"
+    )
+
+
+if __name__ == "__main__":
+    main()
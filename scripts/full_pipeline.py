@@ -8,6 +8,10 @@ Given the full file path and data type (and other params needed for import)
 4. Wait for finish
 5. Get import data object
 6. Run headless agentic annotation pipeline
+
+The analysis and execution workflows save checkpoints by narrative id. If a run dies partway
+through execution, run this again with -r/--resume and the narrative id to pick up where it
+left off, with the same saved analysis plan.
 """
 import logging
 
@@ -25,6 +29,7 @@ from narrative_llm_agent.kbase.clients.narrative_service import NarrativeService
 from narrative_llm_agent.kbase.clients.workspace import Workspace
 from narrative_llm_agent.tools.job_tools import run_job
 from narrative_llm_agent.workflow_graph.graph_hitl import AnalysisWorkflow, ExecutionWorkflow
+from narrative_llm_agent.workflow_graph.checkpoint import get_checkpointer
 from narrative_llm_agent.writer_graph.mra_graph import MraWriterGraph
 
 ASSEMBLY = "assembly"
@@ -77,6 +82,8 @@ class PipelineConfig(BaseModel):
     input_data_params: Optional[dict] = None
     input_upa: Optional[str]
     is_salterns: Optional[bool] = False
+    resume_narrative_id: Optional[int] = None
+    max_concurrency: Optional[int] = None
 
 def parse_args() -> PipelineConfig:
     """
@@ -84,6 +91,7 @@ def parse_args() -> PipelineConfig:
     Input files are used (along with data type and some parameters) to import a data file from
     the user's staging area.
     UPAs are used to copy an existing data object to the new Narrative.
+    A narrative id to resume uses the data and analysis plan from an earlier run.
     These are mutually exclusive! One and only one must be used, this will
     raise a ValueError otherwise.
     """
@@ -113,10 +121,17 @@ def parse_args() -> PipelineConfig:
     data_input_group.add_argument(
         "-u", "--upa", help="data object to copy as initial data input"
     )
+    data_input_group.add_argument(
+        "-r", "--resume", type=int, help="narrative id of an earlier run to resume"
+    )
 
     parser.add_argument(
         "--salterns", action="store_true", help="treat as salterns MAG input"
     )
+    parser.add_argument(
+        "-c", "--max_concurrency", type=int,
+        help="number of app steps to run at once (default from workflow_max_concurrency in the config)"
+    )
     args = parser.parse_args()
 
     input_params = None
@@ -140,6 +155,9 @@ def parse_args() -> PipelineConfig:
         ws = Workspace(token=args.kbase_token)
         obj_name = ws.get_object_info(args.upa).name
 
+    if args.resume is not None:
+        obj_name = f"resumed_narrative_{args.resume}"
+
     narrative_name = f"LLM Agent Annotation for {obj_name}"
 
     logfile_name = "llm_genome_annotation_"
@@ -161,7 +179,9 @@ def parse_args() -> PipelineConfig:
         input_data_type=data_type,
         input_data_params=input_params,
         input_upa=args.upa,
-        is_salterns=args.salterns
+        is_salterns=args.salterns,
+        resume_narrative_id=args.resume,
+        max_concurrency=args.max_concurrency,
     )
     logger.info(config.model_dump_json(exclude=["kbase_token", "llm_token"]))
     return config
@@ -299,6 +319,8 @@ def run_analysis_workflow(narr_id: int, obj_upa: str, meta_context: str, config:
         app_flow_llm=used_llm,
         app_flow_token=config.llm_token,
         kbase_token=config.kbase_token,
+        checkpointer=get_checkpointer(),
+        max_concurrency=config.max_concurrency,
     )
 
     description = f"""
@@ -338,12 +360,29 @@ def run_execution_workflow(analysis_state: dict[str, Any], config: PipelineConfi
         writer_llm=used_llm,
         writer_token=config.llm_token,
         kbase_token=config.kbase_token,
+        checkpointer=get_checkpointer(),
+        max_concurrency=config.max_concurrency,
     )
 
-    final_state = execution_workflow.run(analysis_state)
+    resuming = config.resume_narrative_id is not None
+    if resuming:
+        finished_state = execution_workflow.get_finished_state(analysis_state)
+        if finished_state is not None:
+            logger.info("App workflow already finished for this plan, not running again")
+            return finished_state
+    final_state = execution_workflow.run(analysis_state, resume=resuming)
     return final_state
 
 
+def get_saved_analysis_state(narr_id: int, config: PipelineConfig) -> dict[str, Any]:
+    """Gets the finished analysis plan from an earlier run in the narrative, or raises a ValueError."""
+    workflow = AnalysisWorkflow(kbase_token=config.kbase_token, checkpointer=get_checkpointer())
+    analysis_state = workflow.get_finished_state(narr_id)
+    if analysis_state is None:
+        raise ValueError(f"No finished analysis plan is saved for narrative {narr_id}, so it can't be resumed")
+    return analysis_state
+
+
 def write_draft_mra(narr_id: int, config: PipelineConfig):
     ws_client = Workspace(token=config.kbase_token)
     ee_client = ExecutionEngine(token=config.kbase_token)
@@ -367,6 +406,10 @@ def run_pipeline(config: PipelineConfig):
     logger.info(f"input file: {config.input_file_path}")
     logger.info(f"input data type: {config.input_data_type}")
 
+    if config.resume_narrative_id is not None:
+        resume_pipeline(config)
+        return
+
     # 1. Make a new narrative
     logger.info("making a new narrative")
     ns = NarrativeService(token=config.kbase_token)
@@ -389,6 +432,8 @@ def run_pipeline(config: PipelineConfig):
     logger.info("Starting analysis step")
     analysis_result_state = run_analysis_workflow(narr_id, obj_upa, meta_context, config)
     logger.info("Done with analysis step")
+    for issue in analysis_result_state.get("plan_issues", []):
+        logger.warning(f"Plan issue: {issue}")
     logger.info(f"Final steps to run: {json.dumps(analysis_result_state, indent=4)}")
 
     # 5. Crew graph.
@@ -402,6 +447,27 @@ def run_pipeline(config: PipelineConfig):
     write_draft_mra(narr_id, config)
     logger.info("Done with writeup")
 
+
+def resume_pipeline(config: PipelineConfig):
+    """
+    Resumes an earlier pipeline run from its saved analysis plan. This skips making the narrative,
+    importing data, and the metadata and analysis steps, then continues the app workflow from the
+    last finished node (or skips it if it finished), and writes up the results.
+    """
+    narr_id = config.resume_narrative_id
+    logger.info(f"Resuming pipeline in narrative {narr_id}")
+    analysis_result_state = get_saved_analysis_state(narr_id, config)
+    logger.info(f"Saved steps to run: {json.dumps(analysis_result_state, indent=4, default=str)}")
+
+    logger.info("Resuming app workflow")
+    execution_result_state = run_execution_workflow(analysis_result_state, config)
+    logger.info("Done with app workflow")
+    logger.info(f"Final execution result state: {execution_result_state}")
+
+    logger.info("Starting writeup process")
+    write_draft_mra(narr_id, config)
+    logger.info("Done with writeup")
+
 if __name__ == "__main__":
     stdout_bak = sys.stdout
     stderr_bak = sys.stderr
@@ -0,0 +1,95 @@
+import threading
+
+import pytest
+
+from narrative_llm_agent.agents.pool import AgentPool
+
+
+class FakeAgent:
+    def __init__(self) -> None:
+        self.uses = 0
+
+
+def test_acquire_reuses_agent():
+    pool = AgentPool(FakeAgent)
+    with pool.acquire() as first:
+        first.uses += 1
+    with pool.acquire() as second:
+        second.uses += 1
+    assert first is second
+    assert second.uses == 2
+    assert pool.stats.built == 1
+    assert pool.stats.reused == 1
+    assert pool.stats.build_seconds >= 0
+    assert pool.stats.mean_build_seconds == pool.stats.build_seconds
+
+
+def test_acquire_builds_when_all_in_use():
+    pool = AgentPool(FakeAgent)
+    with pool.acquire() as first:
+        with pool.acquire() as second:
+            assert first is not second
+    assert pool.stats.built == 2
+    with pool.acquire():
+        with pool.acquire():
+            pass
+    assert pool.stats.built == 2
+    assert pool.stats.reused == 2
+
+
+def test_reset_on_release():
+    def reset(agent: FakeAgent) -> None:
+        agent.uses = 0
+    pool = AgentPool(FakeAgent, reset=reset)
+    with pool.acquire() as agent:
+        agent.uses = 5
+    assert agent.uses == 0
+
+
+def test_failed_reset_drops_agent():
+    def reset(agent: FakeAgent) -> None:
+        raise RuntimeError("nope")
+    pool = AgentPool(FakeAgent, reset=reset)
+    with pool.acquire() as first:
+        pass
+    with pool.acquire() as second:
+        pass
+    assert first is not second
+    assert pool.stats.built == 2
+
+
+def test_agent_released_on_error():
+    pool = AgentPool(FakeAgent)
+    with pytest.raises(ValueError):
+        with pool.acquire() as first:
+            raise ValueError("oops")
+    with pool.acquire() as second:
+        assert first is second
+
+
+def test_clear():
+    pool = AgentPool(FakeAgent)
+    with pool.acquire() as first:
+        pass
+    pool.clear()
+    with pool.acquire() as second:
+        assert first is not second
+
+
+def test_concurrent_acquire():
+    pool = AgentPool(FakeAgent)
+    barrier = threading.Barrier(3)
+    seen = []
+
+    def use_agent():
+        with pool.acquire() as agent:
+            seen.append(agent)
+            barrier.wait()
+
+    threads = [threading.Thread(target=use_agent) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len({id(agent) for agent in seen}) == 3
+    assert pool.stats.built == 3
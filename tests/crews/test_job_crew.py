@@ -5,6 +5,7 @@ from narrative_llm_agent.tools.job_tools import CompletedJob
 from narrative_llm_agent.kbase.objects.workspace import ObjectInfo
 from narrative_llm_agent.kbase.clients.narrative_method_store import NarrativeMethodStore
 from crewai import Task
+from crewai.types.usage_metrics import UsageMetrics
 
 from tests.test_data.test_data import load_test_data_json
 
@@ -57,3 +58,108 @@ def test_start_job_debug_skip(job_crew, app_id, expected_job_id):
     assert result.job_status == "completed"
     assert result.job_error is None
     assert result.narrative_id == narrative_id
+
+
+def test_build_tasks_with_params(job_crew, mocker):
+    obj_info = ObjectInfo(
+        ws_id=1,
+        obj_id=2,
+        version=3,
+        name="some_object",
+        ws_name="my_ws",
+        type="Module.Object-1.0",
+        saved="whenever",
+        saved_by="me",
+        size_bytes=2
+    )
+    job_crew._nms = mocker.Mock(spec=NarrativeMethodStore)
+    job = CompletedJob(job_id="some_job", job_status="completed", narrative_id=123, report_upa="123/5/1")
+    tasks = job_crew.build_tasks("prokka/annotate_contigs", 123, obj_info, job=job)
+    assert len(tasks) == 3
+    assert all(isinstance(t, Task) for t in tasks)
+    assert '"report_upa":"123/5/1"' in tasks[0].description
+    assert not tasks[0].context
+    assert tasks[2].context == [tasks[1]]
+    assert '"job_id":"some_job"' in tasks[2].description
+    job_crew._nms.get_app_spec.assert_not_called()
+
+
+def test_start_job_crew_with_template(mock_llm, mocker, app_spec):
+    crew = JobCrew(mock_llm, mock_llm, token="fake_token")
+    mock_ws = mocker.patch("narrative_llm_agent.crews.job_crew.Workspace").return_value
+    mock_ws.get_object_info.return_value = ObjectInfo(
+        ws_id=1,
+        obj_id=2,
+        version=3,
+        name="some_object",
+        ws_name="my_ws",
+        type="KBaseGenomes.Genome-1.0",
+        saved="whenever",
+        saved_by="me",
+        size_bytes=2
+    )
+    crew._nms = mocker.Mock(spec=NarrativeMethodStore)
+    crew._nms.get_app_spec.return_value = app_spec.model_dump()
+    job = CompletedJob(job_id="some_job", job_status="completed", narrative_id=1, report_upa="1/5/1")
+    mock_run_job = mocker.patch("narrative_llm_agent.crews.job_crew.run_job", return_value=job)
+    mock_crew = mocker.patch("narrative_llm_agent.crews.job_crew.Crew")
+    mock_crew.return_value.kickoff.return_value.token_usage = UsageMetrics(total_tokens=10)
+    params = {"actual_input_object": "1/2/3", "actual_output_object": "some_object_out"}
+    crew._param_templates = mocker.Mock(get_params=mocker.Mock(return_value=params))
+
+    crew.start_job("NarrativeTest/test_input_params", "1/2/3", 1, app_id="NarrativeTest/test_input_params")
+    assert mock_run_job.call_args.args[:3] == (1, "NarrativeTest/test_input_params", params)
+    tasks = mock_crew.call_args.kwargs["tasks"]
+    assert len(tasks) == 3
+    assert not any("run_job" in task.description for task in tasks)
+    crew._param_templates.record_success.assert_not_called()
+
+
+def test_init_bad_job_mode(mock_llm):
+    with pytest.raises(ValueError, match="Unknown job mode 'fast'"):
+        JobCrew(mock_llm, mock_llm, token="fake_token", job_mode="fast")
+
+
+@pytest.mark.parametrize("report_upa,expected_tasks", [("1/5/1", 1), (None, 0)])
+def test_start_job_direct(mock_llm, mocker, app_spec, report_upa, expected_tasks):
+    crew = JobCrew(mock_llm, mock_llm, token="fake_token", job_mode="direct")
+    obj_info = ObjectInfo(
+        ws_id=1,
+        obj_id=2,
+        version=3,
+        name="some_object",
+        ws_name="my_ws",
+        type="KBaseGenomes.Genome-1.0",
+        saved="whenever",
+        saved_by="me",
+        size_bytes=2
+    )
+    mock_ws = mocker.patch("narrative_llm_agent.crews.job_crew.Workspace").return_value
+    mock_ws.get_object_info.return_value = obj_info
+    crew._nms = mocker.Mock(spec=NarrativeMethodStore)
+    crew._nms.get_app_spec.return_value = app_spec.model_dump()
+    job = CompletedJob(job_id="some_job", job_status="completed", narrative_id=1, report_upa=report_upa)
+    mock_run_job = mocker.patch("narrative_llm_agent.crews.job_crew.run_job", return_value=job)
+    mocker.patch("narrative_llm_agent.crews.job_crew.get_report", return_value="a report")
+    mock_md = mocker.patch("narrative_llm_agent.crews.job_crew.create_markdown_cell")
+    mock_kickoff = mocker.patch.object(crew, "_kickoff_tasks", return_value=UsageMetrics(total_tokens=10))
+    params = {"actual_input_object": "1/2/3", "actual_output_object": "some_object_out"}
+    mocker.patch.object(crew, "_build_params_task")
+    analysis_task = mocker.patch.object(crew, "_build_report_analysis_task").return_value
+    analysis_task.output.raw = "an analysis"
+    crew._param_templates = mocker.Mock(get_params=mocker.Mock(return_value=params))
+
+    result = crew.start_job("NarrativeTest/test_input_params", "1/2/3", 1, app_id="NarrativeTest/test_input_params")
+    assert result.pydantic == job
+    assert mock_run_job.call_args.args[:3] == (1, "NarrativeTest/test_input_params", params)
+    crew._build_params_task.assert_not_called()
+    assert mock_kickoff.call_count == expected_tasks
+    mock_md.assert_called_once()
+    if report_upa is not None:
+        crew._build_report_analysis_task.assert_called_once_with("NarrativeTest/test_input_params", report="a report")
+        assert mock_md.call_args.args[1] == "an analysis"
+    else:
+        crew._build_report_analysis_task.assert_not_called()
+        assert mock_md.call_args.args[1] == "There is no report to analyze for the NarrativeTest/test_input_params job."
+    assert crew.run_stats[0].job_mode == "direct"
+    assert crew.run_stats[0].token_usage.total_tokens == 10 * expected_tasks
@@ -0,0 +1,60 @@
+import json
+from pathlib import Path
+
+import pytest
+from langchain_core.embeddings import DeterministicFakeEmbedding
+
+from narrative_llm_agent.eval.app_lookup_recall import (
+    LookupCase,
+    compare_search_modes,
+    load_lookup_cases,
+    recall_at_k,
+)
+from narrative_llm_agent.util.hybrid_retriever import CatalogApp, HybridAppRetriever
+
+TEST_DATA = Path(__file__).parent.parent / "test_data"
+
+
+@pytest.fixture(scope="module")
+def catalog_apps() -> list[CatalogApp]:
+    with open(TEST_DATA / "app_catalog_apps.json") as infile:
+        return [CatalogApp(**app) for app in json.load(infile)]
+
+
+@pytest.fixture(scope="module")
+def plan_cases() -> list[LookupCase]:
+    return load_lookup_cases(TEST_DATA / "plan_app_lookups.json")
+
+
+def test_recall_at_k():
+    cases = [LookupCase(query="a", app_id="x"), LookupCase(query="b", app_id="y"), LookupCase(query="c", app_id="z")]
+    ranked = {"a": ["x", "q"], "b": ["q", "y"], "c": ["q", "q"]}
+    result = recall_at_k(lambda query, k: ranked[query][:k], cases, k=1, mode="test")
+    assert result.hits == 1
+    assert result.recall == pytest.approx(1 / 3)
+    assert result.extra_tool_calls == 2
+    assert result.missed == ["b", "c"]
+    assert recall_at_k(lambda query, k: ranked[query][:k], cases, k=2).hits == 2
+    assert recall_at_k(lambda query, k: [], [], k=1).recall == 0.0
+
+
+def test_plan_cases_are_in_catalog(catalog_apps, plan_cases):
+    app_ids = {app.id for app in catalog_apps}
+    assert len(plan_cases) > 0
+    assert [case.app_id for case in plan_cases if case.app_id not in app_ids] == []
+
+
+def test_plan_lookup_recall(catalog_apps, plan_cases):
+    results = compare_search_modes(HybridAppRetriever.from_apps(catalog_apps), plan_cases, k=3)
+    assert set(results) == {"lexical", "hybrid"}
+    assert results["lexical"].missed == []
+    assert results["hybrid"].missed == []
+
+
+def test_plan_lookup_recall_with_vectors(catalog_apps, plan_cases):
+    retriever = HybridAppRetriever.from_apps(catalog_apps, DeterministicFakeEmbedding(size=16))
+    results = compare_search_modes(retriever, plan_cases, k=3)
+    assert list(results) == ["lexical", "vector", "hybrid"]
+    # the fake embeddings are no help, but fusing them in still finds every app id, and most names
+    assert results["hybrid"].extra_tool_calls < results["vector"].extra_tool_calls
+    assert [query for query in results["hybrid"].missed if "/" in query] == []
@@ -0,0 +1,96 @@
+import json
+import time
+
+import pytest
+from langchain_core.tools import tool
+from langchain_openai import ChatOpenAI
+
+from narrative_llm_agent.config import get_config
+from narrative_llm_agent.eval.fake_llm_server import (
+    FakeLLMScript,
+    FakeLLMServer,
+    ScriptedResponse,
+    ScriptedToolCall,
+)
+
+
+@tool
+def get_report(upa: str) -> str:
+    """Gets a report."""
+    return "report"
+
+
+def make_llm(server: FakeLLMServer, **kwargs) -> ChatOpenAI:
+    return ChatOpenAI(model="fake-model", api_key="fake", base_url=server.base_url, **kwargs)
+
+
+def test_scripted_responses():
+    script = FakeLLMScript([
+        ScriptedResponse(content="about reads", match="reads"),
+        ScriptedResponse(content="first"),
+        ScriptedResponse(content="second"),
+    ])
+    with FakeLLMServer(script) as server:
+        llm = make_llm(server)
+        assert llm.invoke("hello").content == "first"
+        assert llm.invoke("what about my reads?").content == "about reads"
+        assert llm.invoke("hello").content == "second"
+        assert llm.invoke("hello").content == "first"
+        assert server.stats.requests == 4
+        assert server.stats.prompt_tokens > 0
+        assert server.stats.completion_tokens > 0
+
+
+def test_default_response():
+    with FakeLLMServer() as server:
+        assert make_llm(server).invoke("hello").content == "OK"
+
+
+def test_tool_calls():
+    script = FakeLLMScript([
+        ScriptedResponse(tool_calls=[ScriptedToolCall(name="get_report", arguments={"upa": "1/2/3"})]),
+    ])
+    with FakeLLMServer(script) as server:
+        message = make_llm(server).bind_tools([get_report]).invoke("get the report")
+        assert len(message.tool_calls) == 1
+        assert message.tool_calls[0]["name"] == "get_report"
+        assert message.tool_calls[0]["args"] == {"upa": "1/2/3"}
+
+
+def test_streaming():
+    script = FakeLLMScript([ScriptedResponse(content="streamed")])
+    with FakeLLMServer(script) as server:
+        chunks = list(make_llm(server, streaming=True).stream("hello"))
+        assert "".join(chunk.content for chunk in chunks) == "streamed"
+
+
+def test_recorded_response(tmp_path):
+    recorded = {
+        "object": "chat.completion",
+        "choices": [{"index": 0, "message": {"role": "assistant", "content": "recorded"}, "finish_reason": "stop"}],
+        "usage": {"prompt_tokens": 5, "completion_tokens": 1, "total_tokens": 6},
+    }
+    script_path = tmp_path / "script.json"
+    script_path.write_text(json.dumps([{"response": recorded}]))
+    with FakeLLMServer(FakeLLMScript.from_file(script_path)) as server:
+        message = make_llm(server).invoke("hello")
+        assert message.content == "recorded"
+        assert message.usage_metadata["total_tokens"] == 6
+
+
+@pytest.mark.parametrize("latency,tokens_per_second", [(0.2, None), (0, 100)])
+def test_latency(latency, tokens_per_second):
+    script = FakeLLMScript([ScriptedResponse(content="x" * 80)])
+    with FakeLLMServer(script, latency=latency, tokens_per_second=tokens_per_second) as server:
+        start = time.monotonic()
+        make_llm(server).invoke("hello")
+        assert time.monotonic() - start >= 0.2
+
+
+def test_fake_provider_config(mocker):
+    config = get_config()
+    with FakeLLMServer(FakeLLMScript([ScriptedResponse(content="from config")])) as server:
+        mocker.patch.dict(config.provider_config["fake"], {"api_base": server.base_url})
+        llm = config.get_llm("fake")
+        assert llm.invoke("hello").content == "from config"
+    config.clear_llm_cache()
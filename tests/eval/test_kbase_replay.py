@@ -0,0 +1,177 @@
+import json
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import threading
+
+import pytest
+import requests
+
+from narrative_llm_agent.eval.kbase_replay import (
+    ExchangeServer,
+    RecordingProxy,
+    ReplayServer,
+    load_exchanges,
+    request_key,
+)
+from narrative_llm_agent.kbase.service_client import ServerError, ServiceClient
+
+
+class FakeKBase:
+    """A tiny stand-in for the real services, that counts job status checks."""
+
+    def __init__(self) -> None:
+        self.calls = 0
+        upstream = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args) -> None:
+                pass
+
+            def do_GET(self) -> None:
+                self._send(200, "text/plain", b"file contents")
+
+            def do_POST(self) -> None:
+                rpc = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+                upstream.calls += 1
+                if rpc["method"] == "execution_engine2.check_job":
+                    result = {"status": "running" if upstream.calls < 2 else "completed"}
+                elif rpc["method"] == "execution_engine2.run_job":
+                    result = "job1"
+                elif rpc["method"] == "ServiceWizard.get_service_status":
+                    result = {"url": f"{upstream.base_url}dynserv/NarrativeService"}
+                else:
+                    body = {"error": {"name": "JSONRPCError", "code": -32601, "message": "no such method"}}
+                    self._send(500, "application/json", json.dumps(body).encode())
+                    return
+                self._send(200, "application/json", json.dumps({"id": rpc["id"], "result": [result]}).encode())
+
+            def _send(self, status: int, content_type: str, body: bytes) -> None:
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        self._httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.base_url = f"http://127.0.0.1:{self._httpd.server_address[1]}/services/"
+        threading.Thread(target=self._httpd.serve_forever, daemon=True).start()
+
+    def stop(self) -> None:
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+
+@pytest.fixture
+def fake_kbase():
+    upstream = FakeKBase()
+    yield upstream
+    upstream.stop()
+
+
+def record_session(upstream: FakeKBase, fixtures_path) -> None:
+    with RecordingProxy(upstream.base_url, fixtures_path) as proxy:
+        ee = ServiceClient(proxy.base_url + "ee2", "execution_engine2", token="fake_token")
+        assert ee.simple_call("check_job", {"job_id": "job1"}) == {"status": "running"}
+        assert ee.simple_call("check_job", {"job_id": "job1"}) == {"status": "completed"}
+        wizard = ServiceClient(proxy.base_url + "service_wizard", "ServiceWizard", token="fake_token")
+        status = wizard.simple_call("get_service_status", {"module_name": "NarrativeService"})
+        # upstream urls get pointed back at the proxy
+        assert status["url"] == f"{proxy.base_url}dynserv/NarrativeService"
+        assert requests.get(proxy.base_url + "blobstore/node/abc?download").text == "file contents"
+        with pytest.raises(ServerError, match="no such method"):
+            ee.simple_call("not_a_method", {})
+
+
+def test_record_and_replay(fake_kbase, tmp_path):
+    fixtures_path = tmp_path / "kbase.jsonl"
+    record_session(fake_kbase, fixtures_path)
+    exchanges = load_exchanges(fixtures_path)
+    assert len(exchanges) == 5
+    assert exchanges[0].rpc_method == "execution_engine2.check_job"
+    assert fake_kbase.base_url not in "".join(ex.body_bytes().decode() for ex in exchanges)
+    fake_kbase.stop()
+
+    with ReplayServer(fixtures_path, latency_scale=0) as replay:
+        ee = ServiceClient(replay.base_url + "ee2", "execution_engine2", token="other_token")
+        # repeated calls replay in order, then the last one repeats
+        assert ee.simple_call("check_job", {"job_id": "job1"}) == {"status": "running"}
+        assert ee.simple_call("check_job", {"job_id": "job1"}) == {"status": "completed"}
+        assert ee.simple_call("check_job", {"job_id": "job1"}) == {"status": "completed"}
+        wizard = ServiceClient(replay.base_url + "service_wizard", "ServiceWizard", token="other_token")
+        status = wizard.simple_call("get_service_status", {"module_name": "NarrativeService"})
+        assert status["url"] == f"{replay.base_url}dynserv/NarrativeService"
+        assert requests.get(replay.base_url + "blobstore/node/abc?download").text == "file contents"
+        with pytest.raises(ServerError, match="no such method"):
+            ee.simple_call("not_a_method", {})
+        assert replay.misses == 0
+
+        with pytest.raises(ServerError, match="No recorded response"):
+            ee.simple_call("check_job", {"job_id": "job2"})
+        assert requests.get(replay.base_url + "blobstore/node/other").status_code == 404
+        assert replay.misses == 2
+
+
+def test_replay_latency(fake_kbase, tmp_path):
+    fixtures_path = tmp_path / "kbase.jsonl"
+    record_session(fake_kbase, fixtures_path)
+    lines = fixtures_path.read_text().splitlines()
+    slow = json.loads(lines[0]) | {"elapsed": 0.4}
+    fixtures_path.write_text(json.dumps(slow) + "\n")
+
+    for scale, min_time, max_time in [(1.0, 0.4, 5), (0.25, 0.1, 0.35), (0, 0, 0.1)]:
+        with ReplayServer(fixtures_path, latency_scale=scale) as replay:
+            ee = ServiceClient(replay.base_url + "ee2", "execution_engine2", token="fake_token")
+            start = time.monotonic()
+            ee.simple_call("check_job", {"job_id": "job1"})
+            elapsed = time.monotonic() - start
+            assert min_time <= elapsed < max_time
+
+
+def _run_job_params() -> dict:
+    # the same shape as util.app.build_run_job_params, with new uuids each time
+    return {
+        "method": "kb_quast.run_QUAST_app",
+        "app_id": "kb_quast/run_QUAST_app",
+        "params": [{"assemblies": ["1/2/3"]}],
+        "wsid": 1,
+        "meta": {"cell_id": str(uuid.uuid4()), "run_id": str(uuid.uuid4()), "tag": "release"},
+    }
+
+
+def test_replay_run_job_new_ids(fake_kbase, tmp_path):
+    fixtures_path = tmp_path / "kbase.jsonl"
+    with RecordingProxy(fake_kbase.base_url, fixtures_path) as proxy:
+        ee = ServiceClient(proxy.base_url + "ee2", "execution_engine2", token="fake_token")
+        assert ee.simple_call("run_job", _run_job_params()) == "job1"
+    fake_kbase.stop()
+
+    with ReplayServer(fixtures_path, latency_scale=0) as replay:
+        ee = ServiceClient(replay.base_url + "ee2", "execution_engine2", token="fake_token")
+        assert ee.simple_call("run_job", _run_job_params()) == "job1"
+        assert replay.misses == 0
+        other_app = _run_job_params() | {"app_id": "kb_quast/other_app"}
+        with pytest.raises(ServerError, match="No recorded response"):
+            ee.simple_call("run_job", other_app)
+
+
+def test_request_key_ignores_new_cell_ids():
+    def save_body(source: str) -> bytes:
+        cell = {
+            "cell_type": "markdown",
+            "source": source,
+            "metadata": {"kbase": {"attributes": {"id": str(uuid.uuid4()), "created": [2026, 1, 1], "title": "Cell"}}},
+        }
+        narrative = {"cells": [cell], "metadata": {"name": "my narrative"}}
+        rpc = {"id": str(uuid.uuid4()), "method": "Workspace.save_objects", "params": [{"id": 1, "objects": [{"data": narrative}]}]}
+        return json.dumps(rpc).encode("utf-8")
+
+    key, rpc_method = request_key("POST", "/ws", save_body("an analysis"))
+    assert rpc_method == "Workspace.save_objects"
+    assert request_key("POST", "/ws", save_body("an analysis"))[0] == key
+    assert request_key("POST", "/ws", save_body("a different analysis"))[0] != key
+
+
+def test_exchange_server_is_abstract():
+    with pytest.raises(TypeError):
+        ExchangeServer("127.0.0.1", 0)
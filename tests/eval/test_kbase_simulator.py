@@ -0,0 +1,69 @@
+import json
+from pathlib import Path
+
+import pytest
+import requests
+
+from narrative_llm_agent.eval.kbase_simulator import KBaseSimulatorServer, load_app_specs
+from narrative_llm_agent.kbase.clients.debug_mock import JobTiming, KBaseSimulator
+from narrative_llm_agent.kbase.clients.execution_engine import ExecutionEngine
+from narrative_llm_agent.kbase.clients.narrative_method_store import NarrativeMethodStore
+from narrative_llm_agent.kbase.clients.workspace import Workspace
+from narrative_llm_agent.kbase.service_client import ServerError
+from narrative_llm_agent.tools.job_tools import monitor_job
+
+APP_ID = "NarrativeTest/test_input_params"
+APP_SPEC_DIR = Path(__file__).parent.parent / "test_data" / "app_spec_data"
+
+
+@pytest.fixture
+def server():
+    simulator = KBaseSimulator(
+        app_specs=load_app_specs(APP_SPEC_DIR),
+        default_timing=JobTiming(queue_seconds=0.05, run_seconds=0.2, run_sigma=0.2),
+        seed=42,
+    )
+    with KBaseSimulatorServer(simulator) as sim_server:
+        yield sim_server
+
+
+def test_load_app_specs():
+    specs = load_app_specs(APP_SPEC_DIR)
+    assert APP_ID in [spec["info"]["id"] for spec in specs]
+
+
+def test_run_job_with_clients(server):
+    url = server.base_url
+    ws = Workspace(token="fake", endpoint=url + "ws")
+    ee = ExecutionEngine(token="fake", endpoint=url + "ee2")
+    nms = NarrativeMethodStore(token="fake", endpoint=url + "narrative_method_store/rpc")
+    ws.save_objects(7, [{"type": "KBaseGenomes.Genome", "name": "genome", "data": {"id": "genome"}}])
+    assert [str(upa) for upa in ws.get_object_upas(7)] == ["7/1/1"]
+    assert nms.get_app_spec(APP_ID)["info"]["id"] == APP_ID
+
+    job_id = ee.run_job({
+        "method": "NarrativeTest.test_async_job",
+        "app_id": APP_ID,
+        "service_ver": "abc",
+        "params": [{"input_genome_name": "genome", "output_genome_name": "new_genome"}],
+        "wsid": 7,
+    })
+    completed = monitor_job(job_id, ee, nms, ws, interval=0.05)
+    assert completed.job_status == "completed"
+    assert completed.report_upa is not None
+    assert "new_genome" in {obj.object_name for obj in completed.created_objects}
+
+    report = ws.get_objects([completed.report_upa])[0]["data"]
+    resp = requests.get(report["file_links"][0]["URL"] + "?download")
+    assert resp.status_code == 200
+    assert resp.content[:2] == b"PK"
+    assert server.simulator.stats.calls["execution_engine2.check_job"] >= 1
+
+
+def test_errors(server):
+    ws = Workspace(token="fake", endpoint=server.base_url + "ws")
+    with pytest.raises(ServerError, match="No object"):
+        ws.get_object_info("7/not_there")
+    assert requests.get(server.base_url + "blobstore/node/nope?download").status_code == 404
+    resp = requests.post(server.base_url + "ws", data=json.dumps({"method": "Workspace.nope", "params": [{}]}))
+    assert resp.status_code == 500
@@ -0,0 +1,152 @@
+import io
+import json
+import zipfile
+
+import pytest
+
+from narrative_llm_agent.kbase.clients.debug_mock import JobTiming, KBaseMock, KBaseSimulator
+from narrative_llm_agent.kbase.clients.execution_engine import JobState
+from narrative_llm_agent.kbase.objects.workspace import ObjectInfo
+from narrative_llm_agent.kbase.service_client import ServerError
+from tests.test_data.test_data import load_test_data_json
+
+APP_ID = "NarrativeTest/test_input_params"
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 1_700_000_000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+@pytest.fixture
+def simulator(clock):
+    app_spec = load_test_data_json("app_spec_data/test_app_spec.json")
+    return KBaseSimulator(
+        app_specs=[app_spec],
+        default_timing=JobTiming(queue_seconds=0, run_seconds=10, run_sigma=0),
+        timings={"fast/app": JobTiming(queue_seconds=0, run_seconds=1, run_sigma=0)},
+        seed=1,
+        clock=clock,
+    )
+
+
+def _submission(app_id: str = APP_ID, ws_id: int = 5) -> dict:
+    return {
+        "method": "NarrativeTest.test_async_job",
+        "app_id": app_id,
+        "service_ver": "abc",
+        "params": [{"input_genome_name": "genome", "output_genome_name": "new_genome"}],
+        "wsid": ws_id,
+    }
+
+
+def test_save_and_get_objects(simulator):
+    info = simulator.save_object(3, "my_genome", "KBaseGenomes.Genome", {"id": "x", "features": [1, 2]})
+    assert ObjectInfo.model_validate(info).upa == "3/1/1"
+    simulator.save_object(3, "my_genome", "KBaseGenomes.Genome", {"id": "y"})
+    latest = simulator.call("Workspace.get_objects2", {"objects": [{"ref": "3/my_genome"}]})["data"][0]
+    assert latest["data"] == {"id": "y"}
+    assert latest["info"][4] == 2
+    first = simulator.call("Workspace.get_objects2", {"objects": [{"ref": "3/1/1", "included": ["/id"]}]})
+    assert first["data"][0]["data"] == {"id": "x"}
+    infos = simulator.call("Workspace.get_object_info3", {"objects": [{"ref": "3/1"}]})
+    assert infos["paths"] == [["3/1/2"]]
+    assert simulator.call("Workspace.get_workspace_info", {"id": 3})[4] == 1
+    assert len(simulator.call("Workspace.list_objects", {"ids": [3], "type": "KBaseGenomes.Genome"})) == 1
+    assert simulator.call("Workspace.list_objects", {"ids": [3], "type": "KBaseFBA.FBAModel"}) == []
+    copied = simulator.call("Workspace.copy_object", {"from": {"ref": "3/1/1"}, "to": {"wsid": 4, "name": "copy"}})
+    assert copied[6] == 4 and copied[1] == "copy"
+
+
+def test_missing_object(simulator):
+    with pytest.raises(ServerError, match="No object"):
+        simulator.call("Workspace.get_objects2", {"objects": [{"ref": "3/nope"}]})
+    with pytest.raises(ServerError, match="not supported"):
+        simulator.call("Workspace.delete_everything", {})
+
+
+def test_job_lifecycle(simulator, clock):
+    simulator.default_timing = JobTiming(queue_seconds=0, run_seconds=10, run_sigma=0)
+    job_id = simulator.call("execution_engine2.run_job", _submission())
+    clock.now += 0.001
+    assert JobState(simulator.check_job(job_id)).status == "running"
+    clock.now += 5
+    assert simulator.check_job(job_id)["status"] == "running"
+    clock.now += 6
+    state = JobState(simulator.call("execution_engine2.check_job", {"job_id": job_id}))
+    assert state.status == "completed"
+    assert state.finished > state.running >= state.created
+    report_ref = state.job_output["result"][0]["report_ref"]
+    report = simulator.call("Workspace.get_objects2", {"objects": [{"ref": report_ref}]})["data"][0]
+    assert report["info"][2].startswith("KBaseReport.Report")
+    assert report["provenance"][0]["service"] == "NarrativeTest"
+    created = report["data"]["objects_created"]
+    assert len(created) == 1
+    output = simulator.call("Workspace.get_object_info3", {"objects": [{"ref": "5/new_genome"}]})
+    assert output["paths"][0][0] == created[0]["ref"]
+    assert output["infos"][0][2].startswith("KBaseGenomes.Genome")
+    zip_link = report["data"]["file_links"][0]
+    content, filename = simulator.get_blob(zip_link["URL"].split("/node/")[-1])
+    assert filename == zip_link["name"]
+    with zipfile.ZipFile(io.BytesIO(content)) as zipped:
+        assert any(name.endswith("summary.txt") for name in zipped.namelist())
+    assert simulator.stats.jobs_completed == 1
+    assert simulator.stats.calls["execution_engine2.check_job"] == 1
+
+
+def test_job_timing_per_app(simulator, clock):
+    simulator.time_scale = 2
+    slow = simulator.run_job(_submission())
+    fast = simulator.run_job(_submission(app_id="fast/app"))
+    clock.now += 3
+    assert simulator.check_job(fast)["status"] == "completed"
+    assert simulator.check_job(slow)["status"] == "running"
+    clock.now += 20
+    assert simulator.check_job(slow)["status"] == "completed"
+    states = simulator.call("execution_engine2.check_workspace_jobs", {"workspace_id": "5", "return_list": 1})
+    assert {state["job_id"] for state in states} == {slow, fast}
+
+
+def test_job_queued_error_and_cancel(simulator, clock):
+    simulator.timings["flaky/app"] = JobTiming(queue_seconds=100, run_seconds=1, run_sigma=0, error_rate=1.0)
+    failing = simulator.run_job(_submission(app_id="flaky/app"))
+    assert simulator.check_job(failing)["status"] == "queued"
+    clock.now += 10_000
+    state = JobState(simulator.check_job(failing))
+    assert state.status == "error"
+    assert "Simulated failure" in state.errormsg
+    assert simulator.stats.jobs_failed == 1
+
+    cancelled = simulator.run_job(_submission())
+    simulator.call("execution_engine2.cancel_job", {"job_id": cancelled})
+    clock.now += 10_000
+    assert simulator.check_job(cancelled)["status"] == "terminated"
+
+
+def test_get_method_spec(simulator):
+    spec = simulator.call("NarrativeMethodStore.get_method_spec", {"ids": [APP_ID], "tag": "release"})[0]
+    assert spec["info"]["id"] == APP_ID
+    with pytest.raises(ServerError, match="No app spec"):
+        simulator.call("NarrativeMethodStore.get_method_spec", {"ids": ["not/an_app"]})
+
+
+def test_kbase_mock_check_job(mocker):
+    simulator = KBaseSimulator(default_timing=JobTiming(queue_seconds=0, run_seconds=0, run_sigma=0))
+    mocker.patch.object(KBaseMock, "simulator", simulator)
+    mocker.patch.object(KBaseMock, "_jobs", {})
+    job_id = KBaseMock().mock_run_job(42, "Some/app", {}, _submission(app_id="Some/app", ws_id=42))
+    state = KBaseMock().check_mock_job(job_id)
+    assert isinstance(state, JobState)
+    assert state.job_id == job_id
+    assert state.status == "completed"
+    assert "report_ref" in state.job_output["result"][0]
+    with pytest.raises(ValueError):
+        KBaseMock().check_mock_job("not_a_job")
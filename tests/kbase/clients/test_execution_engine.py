@@ -21,6 +21,11 @@ class TestExecutionEngineClient:
         # TODO: kind of a null test. might need some introspection
         assert client.run_job({}) == ret_job_id
 
+    def test_check_workspace_jobs(self, mock_kbase_client_call, mock_job_states, client):
+        states = list(mock_job_states.values())
+        mock_kbase_client_call(client, states, service_method="check_workspace_jobs")
+        assert client.check_workspace_jobs(123) == [JobState(state) for state in states]
+
 
 def test_build_client_from_config(client, mock_token):
     assert client._endpoint == get_config().ee_endpoint
@@ -414,8 +414,9 @@ class TestProcessMetadata:
 class TestRunAnalysisWorkflow:
     """Test run_analysis_workflow function."""
 
+    @patch('scripts.full_pipeline.get_checkpointer')
     @patch('scripts.full_pipeline.AnalysisWorkflow')
-    def test_run_analysis_workflow_cborg(self, mock_workflow_class):
+    def test_run_analysis_workflow_cborg(self, mock_workflow_class, mock_get_checkpointer):
         """Test run_analysis_workflow with CBORG provider."""
         mock_workflow = mock_workflow_class.return_value
         mock_workflow.run.return_value = {"steps": ["step1", "step2"]}
@@ -437,11 +438,13 @@ class TestRunAnalysisWorkflow:
             analyst_token="llm_token",
             app_flow_llm="claude-sonnet-cborg-high",
             app_flow_token="llm_token",
-            kbase_token="token"
+            kbase_token="token",
+            checkpointer=mock_get_checkpointer.return_value
         )
 
+    @patch('scripts.full_pipeline.get_checkpointer')
     @patch('scripts.full_pipeline.AnalysisWorkflow')
-    def test_run_analysis_workflow_openai(self, mock_workflow_class):
+    def test_run_analysis_workflow_openai(self, mock_workflow_class, mock_get_checkpointer):
         """Test run_analysis_workflow with OpenAI provider."""
         mock_workflow = mock_workflow_class.return_value
         mock_workflow.run.return_value = {"steps": ["step1"]}
@@ -463,15 +466,17 @@ class TestRunAnalysisWorkflow:
             analyst_token="llm_token",
             app_flow_llm="gpt-4o-openai",
             app_flow_token="llm_token",
-            kbase_token="token"
+            kbase_token="token",
+            checkpointer=mock_get_checkpointer.return_value
         )
 
 
 class TestRunExecutionWorkflow:
     """Test run_execution_workflow function."""
 
+    @patch('scripts.full_pipeline.get_checkpointer')
     @patch('scripts.full_pipeline.ExecutionWorkflow')
-    def test_run_execution_workflow_cborg(self, mock_workflow_class):
+    def test_run_execution_workflow_cborg(self, mock_workflow_class, mock_get_checkpointer):
         """Test run_execution_workflow with CBORG provider."""
         mock_workflow = mock_workflow_class.return_value
         mock_state = Mock()
@@ -499,12 +504,58 @@ class TestRunExecutionWorkflow:
             app_flow_token="llm_token",
             writer_llm="gpt-4.1-cborg",
             writer_token="llm_token",
-            kbase_token="token"
+            kbase_token="token",
+            checkpointer=mock_get_checkpointer.return_value
+        )
+        mock_workflow.run.assert_called_once_with(analysis_state, resume=False)
+
+    @patch('scripts.full_pipeline.get_checkpointer')
+    @patch('scripts.full_pipeline.ExecutionWorkflow')
+    def test_run_execution_workflow_resume(self, mock_workflow_class, mock_get_checkpointer):
+        """Test run_execution_workflow resuming an unfinished run."""
+        mock_workflow = mock_workflow_class.return_value
+        mock_workflow.get_finished_state.return_value = None
+        mock_state = Mock()
+        mock_workflow.run.return_value = mock_state
+
+        config = PipelineConfig(
+            kbase_token="token",
+            llm_provider="cborg",
+            llm_token="llm_token",
+            narrative_name="Test",
+            input_data_type="assembly",
+            input_upa=None,
+            resume_narrative_id=1234
         )
-        mock_workflow.run.assert_called_once_with(analysis_state)
 
+        analysis_state = {"narrative_id": 1234, "steps_to_run": []}
+        assert run_execution_workflow(analysis_state, config) == mock_state
+        mock_workflow.get_finished_state.assert_called_once_with(analysis_state)
+        mock_workflow.run.assert_called_once_with(analysis_state, resume=True)
+
+    @patch('scripts.full_pipeline.get_checkpointer')
     @patch('scripts.full_pipeline.ExecutionWorkflow')
-    def test_run_execution_workflow_openai(self, mock_workflow_class):
+    def test_run_execution_workflow_resume_finished(self, mock_workflow_class, mock_get_checkpointer):
+        """Test run_execution_workflow doesn't rerun a finished run when resuming."""
+        mock_workflow = mock_workflow_class.return_value
+        mock_workflow.get_finished_state.return_value = {"results": "done"}
+
+        config = PipelineConfig(
+            kbase_token="token",
+            llm_provider="cborg",
+            llm_token="llm_token",
+            narrative_name="Test",
+            input_data_type="assembly",
+            input_upa=None,
+            resume_narrative_id=1234
+        )
+
+        assert run_execution_workflow({"narrative_id": 1234}, config) == {"results": "done"}
+        mock_workflow.run.assert_not_called()
+
+    @patch('scripts.full_pipeline.get_checkpointer')
+    @patch('scripts.full_pipeline.ExecutionWorkflow')
+    def test_run_execution_workflow_openai(self, mock_workflow_class, mock_get_checkpointer):
         """Test run_execution_workflow with OpenAI provider."""
         mock_workflow = mock_workflow_class.return_value
         mock_state = Mock()
@@ -532,7 +583,8 @@ class TestRunExecutionWorkflow:
             app_flow_token="llm_token",
             writer_llm="gpt-4o-openai",
             writer_token="llm_token",
-            kbase_token="token"
+            kbase_token="token",
+            checkpointer=mock_get_checkpointer.return_value
         )
 
 
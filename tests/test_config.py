@@ -1,3 +1,5 @@
+import asyncio
+from http.server import BaseHTTPRequestHandler
 import pytest
 from narrative_llm_agent.config import (
     get_config,
@@ -5,7 +7,9 @@ from narrative_llm_agent.config import (
     AgentConfig,
     ENV_CONFIG_FILE,
 )
+from narrative_llm_agent.eval.fake_llm_server import FakeLLMServer
 import os
+from cacheout.lru import LRUCache
 
 
 @pytest.fixture(scope="function", autouse=True)
@@ -72,3 +76,51 @@ def test_config_file_not_file(monkeypatch, tmp_path):
     monkeypatch.setenv(ENV_CONFIG_FILE, str(tmp_path))
     with pytest.raises(IsADirectoryError, match=r"is not a file"):
         get_config()
+
+
+def test_get_llm_cached():
+    config = get_config()
+    llm = config.get_llm("gpt-4o-openai", api_key="some_key")
+    assert config.get_llm("gpt-4o-openai", api_key="some_key") is llm
+    assert config.get_llm("gpt-4o-openai", api_key="other_key") is not llm
+    assert config.get_llm("gpt-4o-openai", api_key="some_key", return_crewai=True) is not llm
+    config.clear_llm_cache()
+    assert config.get_llm("gpt-4o-openai", api_key="some_key") is not llm
+
+
+def test_get_llm_shares_http_client():
+    config = get_config()
+    llm = config.get_llm("gpt-4o-cborg", api_key="some_key")
+    other_llm = config.get_llm("gpt-4.1-cborg", api_key="other_key")
+    assert llm is not other_llm
+    assert llm.http_client is other_llm.http_client
+    assert llm.http_async_client is other_llm.http_async_client
+
+
+def test_get_llm_async_across_event_loops(mocker):
+    config = get_config()
+    # keep connections open between requests, so the second call would reuse one from the first
+    mocker.patch.object(BaseHTTPRequestHandler, "protocol_version", "HTTP/1.1")
+    with FakeLLMServer() as server:
+        mocker.patch.dict(config.provider_config["fake"], {"api_base": server.base_url})
+        llm = config.get_llm("fake", api_key="some_key")
+        # each asyncio.run has its own event loop, so async connections can't carry over
+        assert asyncio.run(llm.ainvoke("hello")).content == "OK"
+        assert asyncio.run(llm.ainvoke("hello again")).content == "OK"
+        # a connection left over from the first loop would fail, and show up as a retried request
+        assert server.stats.requests == 2
+
+
+def test_get_llm_cache_off(mocker):
+    config = get_config()
+    mocker.patch.object(config, "_llm_cache", None)
+    llm = config.get_llm("gpt-4o-openai", api_key="some_key")
+    assert config.get_llm("gpt-4o-openai", api_key="some_key") is not llm
+
+
+def test_get_llm_cache_eviction(mocker):
+    config = get_config()
+    mocker.patch.object(config, "_llm_cache", LRUCache(maxsize=1))
+    llm = config.get_llm("gpt-4o-openai", api_key="some_key")
+    config.get_llm("gpt-4.1-cborg", api_key="some_key")
+    assert config.get_llm("gpt-4o-openai", api_key="some_key") is not llm
@@ -19,6 +19,7 @@ from narrative_llm_agent.kbase.objects.app_spec import (
     CheckboxOptions
 )
 from narrative_llm_agent.tools.app_tools import (
+    AppSpecCache,
     get_app_params,
     app_params_pydantic
 )
@@ -32,6 +33,17 @@ def test_get_app_params_tool(app_spec: AppSpec, mocker: MockerFixture):
     params_spec = load_test_data_json(expected_params_path)
     assert get_app_params("some_app_id", mock_nms) == params_spec
 
+
+def test_app_spec_cache(app_spec: AppSpec, mocker: MockerFixture):
+    mock_nms = mocker.Mock(spec=NarrativeMethodStore)
+    mock_nms.get_app_spec.return_value = app_spec.model_dump()
+    cache = AppSpecCache(nms=mock_nms)
+    assert cache.get_app_spec("some_app_id") == app_spec
+    assert cache.get_app_spec("some_app_id") == app_spec
+    mock_nms.get_app_spec.assert_called_once_with("some_app_id", tag="release")
+    cache.get_app_spec("some_app_id", tag="beta")
+    assert mock_nms.get_app_spec.call_count == 2
+
 @pytest.fixture
 def base_info():
     return AppBriefInfo(
@@ -1,4 +1,5 @@
 import json
+import time
 from pathlib import Path
 from typing import Any, Callable
 
@@ -9,12 +10,18 @@ from narrative_llm_agent.kbase.objects.workspace import ObjectInfo
 from narrative_llm_agent.tools.job_tools import (
     CreatedObject,
     CompletedJob,
+    JobMemoLedger,
+    build_job_submission,
+    get_job_memo_key,
     monitor_job,
     start_job,
     run_job,
+    submit_job,
     summarize_completed_job,
     get_job_status,
 )
+from narrative_llm_agent.kbase.clients.debug_mock import KBaseMock
+from narrative_llm_agent.util.app import build_run_job_params
 from narrative_llm_agent.config import get_config
 from narrative_llm_agent.kbase.clients.execution_engine import ExecutionEngine, JobState
 from narrative_llm_agent.kbase.clients.narrative_method_store import (
@@ -156,6 +163,25 @@ def test_monitor_job_tool(mock_job_states: dict[str, dict[str, Any]], mocker: Mo
     )
 
 
+def test_monitor_job_debug(mocker: MockerFixture):
+    config = get_config()
+    mocker.patch.object(config, "debug", True)
+    mocker.patch.object(config, "debug_job_time_scale", 0.001)
+    mocker.patch.object(KBaseMock, "_simulator", None)
+    mocker.patch.object(KBaseMock, "_jobs", {})
+    mock_summarize = mocker.patch("narrative_llm_agent.tools.job_tools.summarize_completed_job")
+    mock_ee = mocker.Mock(spec=ExecutionEngine)
+    submission = {"method": "Some.app", "app_id": "Some/app", "params": [{}], "wsid": 42}
+    job_id = submit_job(42, "Some/app", {}, submission, mock_ee)
+    start = time.monotonic()
+    assert monitor_job(job_id, mock_ee, mocker.Mock(), mocker.Mock()) == mock_summarize.return_value
+    assert time.monotonic() - start < 2
+    assert KBaseMock().simulator.time_scale == 0.001
+    assert mock_summarize.call_args.args[0].status == "completed"
+    mock_ee.run_job.assert_not_called()
+    mock_ee.check_job.assert_not_called()
+
+
 def test_start_job_tool(app_spec: AppSpec, mocker: MockerFixture):
     job_id = "fake_job_id"
     narrative_id = 123
@@ -294,3 +320,158 @@ def test_run_job_tool(app_spec: AppSpec, mocker: MockerFixture):
     assert job_result.created_objects == [
         CreatedObject(object_upa=f"{narr_id}/5/1", object_name="NewGenomeObject")
     ]
+
+
+def _make_job_submission(params: dict, cell_id: str = "cell_1", run_id: str = "run_1") -> dict:
+    return {
+        "method": "fake_app.run_fake_app",
+        "service_ver": "332506c1b0b98d7f3589779c94e187019883ab66",
+        "params": [params],
+        "app_id": "fake_app/run_fake_app",
+        "wsid": 1000,
+        "meta": {"cell_id": cell_id, "run_id": run_id, "tag": "release"},
+        "source_ws_objects": ["1000/4/1"],
+    }
+
+
+def test_get_job_memo_key_ignores_meta():
+    params = {"input_object_upa": "1000/4/1", "output_object_name": "new_genome"}
+    key = get_job_memo_key(_make_job_submission(params))
+    assert key == get_job_memo_key(_make_job_submission(params, cell_id="other", run_id="other"))
+    # key order doesn't matter either
+    reordered = dict(reversed(list(params.items())))
+    assert key == get_job_memo_key(_make_job_submission(reordered))
+
+
+def test_get_job_memo_key_changes_with_inputs():
+    params = {"input_object_upa": "1000/4/1", "output_object_name": "new_genome"}
+    key = get_job_memo_key(_make_job_submission(params))
+    other_params = {"input_object_upa": "1000/4/2", "output_object_name": "new_genome"}
+    assert key != get_job_memo_key(_make_job_submission(other_params))
+    other_version = _make_job_submission(params)
+    other_version["service_ver"] = "some_other_version"
+    assert key != get_job_memo_key(other_version)
+
+
+def _make_memo_job_state(job_id: str, status: str, job_submission: dict) -> JobState:
+    return JobState(
+        {"job_id": job_id, "status": status, "wsid": job_submission["wsid"], "job_input": job_submission}
+    )
+
+
+def test_job_memo_ledger(mocker: MockerFixture):
+    params = {"input_object_upa": "1000/4/1", "output_object_name": "new_genome"}
+    submission = _make_job_submission(params)
+    errored = _make_memo_job_state("errored_job", "error", submission)
+    completed = _make_memo_job_state("completed_job", "completed", submission)
+    mock_ee = mocker.Mock(spec=ExecutionEngine)
+    mock_ee.check_workspace_jobs.return_value = [errored, completed]
+
+    ledger = JobMemoLedger()
+    found = ledger.find_completed_job(get_job_memo_key(submission), 1000, mock_ee)
+    assert found == completed
+    # a second lookup uses what's already been seen
+    found = ledger.find_completed_job(get_job_memo_key(submission), 1000, mock_ee)
+    assert found == completed
+    # and so does a miss, once the narrative's jobs have been fetched
+    assert ledger.find_completed_job("not_a_key", 1000, mock_ee) is None
+    mock_ee.check_workspace_jobs.assert_called_once_with(1000)
+
+
+def test_job_memo_ledger_scope(mocker: MockerFixture):
+    params = {"input_object_upa": "1000/4/1", "output_object_name": "new_genome"}
+    submission = _make_job_submission(params)
+    completed = _make_memo_job_state("completed_job", "completed", submission)
+    mock_ee = mocker.Mock(spec=ExecutionEngine)
+    mock_ee.check_workspace_jobs.side_effect = lambda ws_id: [completed] if ws_id == 2000 else []
+
+    key = get_job_memo_key(submission)
+    assert JobMemoLedger().find_completed_job(key, 1000, mock_ee) is None
+    assert JobMemoLedger(scope=[2000]).find_completed_job(key, 1000, mock_ee) == completed
+
+
+def test_run_job_tool_memo_hit(app_spec: AppSpec, mocker: MockerFixture):
+    narrative_id = 123
+    app_id = app_spec.info.id
+    params = load_test_data_json(Path("app_spec_data") / "test_app_spec_inputs.json")
+
+    mock_nms = mocker.Mock(spec=NarrativeMethodStore)
+    mock_nms.get_app_spec.return_value = app_spec.model_dump()
+    mock_ws = mocker.Mock(spec=Workspace)
+    mock_ws.get_workspace_info.return_value = WorkspaceInfo.model_validate(
+        [narrative_id, "test_workspace", "test_user", "12345", 100, "a", "n", "n", {}]
+    )
+    mock_ws.get_object_info.return_value = ObjectInfo.model_validate(
+        [
+            2,
+            "some_object",
+            "KBaseGenomes.Genome-1.0",
+            "2024-02-02T17:55:23+0000",
+            3,
+            "me",
+            narrative_id,
+            "my_narrative",
+            "768202029fa4440b217d6c7a41a27a58",
+            1089,
+            {},
+        ]
+    )
+    prior_submission = build_job_submission(narrative_id, app_id, params, mock_nms, mock_ws)
+    prior_job = _make_memo_job_state("prior_job", "completed", prior_submission)
+    mock_ee = mocker.Mock(spec=ExecutionEngine)
+    mock_ee.check_workspace_jobs.return_value = [prior_job]
+
+    job_result = run_job(
+        narrative_id, app_id, params, mock_ee, mock_nms, mock_ws, memo=JobMemoLedger()
+    )
+    assert job_result.job_id == "prior_job"
+    assert job_result.job_status == "completed"
+    mock_ee.run_job.assert_not_called()
+
+
+def _mock_workspaces(mocker: MockerFixture) -> Workspace:
+    mock_ws = mocker.Mock(spec=Workspace)
+    mock_ws.get_workspace_info.side_effect = lambda ws_id: WorkspaceInfo.model_validate(
+        [ws_id, f"workspace_{ws_id}", "test_user", "12345", 100, "a", "n", "n", {}]
+    )
+    return mock_ws
+
+
+def test_get_job_memo_key_with_app_spec(app_spec: AppSpec, mocker: MockerFixture):
+    params = load_test_data_json(Path("app_spec_data") / "test_app_spec_inputs.json")
+    mock_ws = _mock_workspaces(mocker)
+    submission = build_run_job_params(app_spec, params, 1000, mock_ws)
+    # another workspace and output name, like a rerun from a param template
+    other_params = params | {"actual_output_object": "NewGenomeObject_1a2b3c4d"}
+    other_submission = build_run_job_params(app_spec, other_params, 2000, mock_ws)
+    assert get_job_memo_key(submission) != get_job_memo_key(other_submission)
+    key = get_job_memo_key(submission, app_spec)
+    assert key == get_job_memo_key(other_submission, app_spec)
+    # the output name is still there for the job itself
+    assert submission["params"][0]["output_genome_name"] == "NewGenomeObject"
+    other_input = build_run_job_params(app_spec, params | {"actual_input_object": "1/2/4"}, 1000, mock_ws)
+    assert key != get_job_memo_key(other_input, app_spec)
+
+
+def test_run_job_tool_memo_hit_other_workspace(app_spec: AppSpec, mocker: MockerFixture):
+    app_id = app_spec.info.id
+    params = load_test_data_json(Path("app_spec_data") / "test_app_spec_inputs.json")
+    mock_nms = mocker.Mock(spec=NarrativeMethodStore)
+    mock_nms.get_app_spec.return_value = app_spec.model_dump()
+    mock_ws = _mock_workspaces(mocker)
+    mock_ws.get_object_info.return_value = ObjectInfo.model_validate(
+        [2, "some_object", "KBaseGenomes.Genome-1.0", "2024-02-02T17:55:23+0000", 3, "me", 2000,
+         "my_narrative", "768202029fa4440b217d6c7a41a27a58", 1089, {}]
+    )
+    prior_params = params | {"actual_output_object": "OtherGenomeObject"}
+    prior_job = _make_memo_job_state(
+        "prior_job", "completed", build_run_job_params(app_spec, prior_params, 2000, mock_ws)
+    )
+    mock_ee = mocker.Mock(spec=ExecutionEngine)
+    mock_ee.check_workspace_jobs.side_effect = lambda ws_id: [prior_job] if ws_id == 2000 else []
+
+    job_result = run_job(
+        123, app_id, params, mock_ee, mock_nms, mock_ws, memo=JobMemoLedger(scope=[2000])
+    )
+    assert job_result.job_id == "prior_job"
+    mock_ee.run_job.assert_not_called()
@@ -0,0 +1,129 @@
+import pytest
+from neo4j.exceptions import ServiceUnavailable
+
+from narrative_llm_agent.tools.kgtool_cosine_sim import (
+    AppNameIndex,
+    InformationTool,
+    catalog_version_query,
+    clear_app_description_cache,
+    clear_app_name_indexes,
+    description_query,
+)
+
+APP_NAMES = [
+    "Assess Genome Quality with CheckM",
+    "Annotate Microbial Genome with Prokka",
+    "Assemble Reads with SPAdes",
+    "Classify Microbes with GTDB-Tk",
+]
+
+
+def test_app_name_index_rank():
+    index = AppNameIndex(APP_NAMES)
+    ranked = index.rank(["genome quality checkm", "spades assembly", "gtdb"], top_k=2)
+    assert [ranks[0][0] for ranks in ranked] == [APP_NAMES[0], APP_NAMES[2], APP_NAMES[3]]
+    assert all(len(ranks) == 2 for ranks in ranked)
+    assert ranked[0][0][1] >= ranked[0][1][1]
+    assert 0 < ranked[0][0][1] <= 1
+
+
+def test_app_name_index_no_apps():
+    with pytest.raises(ValueError):
+        AppNameIndex([])
+
+
+class FakeKG:
+    """Answers the queries InformationTool runs, and counts them."""
+
+    def __init__(self, app_names: list[str]) -> None:
+        self.app_names = app_names
+        self.queries = []
+
+    def run(self, query, **kwargs):
+        self.queries.append(query)
+        if query == catalog_version_query:
+            return FakeResult([{"apps": len(self.app_names), "name_chars": sum(len(n) for n in self.app_names)}])
+        if query == description_query:
+            return FakeResult([[f"App name: {kwargs['candidate']}"]])
+        return FakeResult([{"name": name} for name in self.app_names])
+
+
+class FakeResult(list):
+    def single(self):
+        return self[0]
+
+
+@pytest.fixture
+def fake_kg(mocker):
+    clear_app_name_indexes()
+    clear_app_description_cache()
+    kg = FakeKG(list(APP_NAMES))
+    driver = mocker.patch("narrative_llm_agent.tools.kgtool_cosine_sim.get_neo4j_driver").return_value
+    driver.session.return_value.__enter__.return_value = kg
+    yield kg
+    clear_app_name_indexes()
+    clear_app_description_cache()
+
+
+def test_fetch_app_description_reuses_index(fake_kg):
+    tool = InformationTool(uri="bolt://kg", user="u", password="p")
+    assert tool.fetch_app_description("checkm genome quality") == f"App name: {APP_NAMES[0]}"
+    # a new tool for the same database uses the same index, without checking the catalog
+    other_tool = InformationTool(uri="bolt://kg", user="u", password="p")
+    assert other_tool.fetch_app_descriptions(["prokka", "spades"]) == [
+        f"App name: {APP_NAMES[1]}",
+        f"App name: {APP_NAMES[2]}",
+    ]
+    assert fake_kg.queries.count(catalog_version_query) == 1
+    assert fake_kg.queries.count("MATCH (app:App) RETURN app.name AS name") == 1
+    assert fake_kg.queries.count(description_query) == 3
+
+
+def test_index_rebuilt_on_catalog_change(fake_kg):
+    tool = InformationTool(uri="bolt://kg", user="u", password="p", version_check_interval=0)
+    tool.fetch_app_description("checkm")
+    tool.fetch_app_description("prokka")
+    # same catalog, so the version gets checked but the names aren't fetched again
+    assert fake_kg.queries.count(catalog_version_query) == 2
+    assert fake_kg.queries.count("MATCH (app:App) RETURN app.name AS name") == 1
+    fake_kg.app_names.append("Bin Contigs with MetaBAT2")
+    assert tool.fetch_app_description("metabat2 binning") == "App name: Bin Contigs with MetaBAT2"
+    assert fake_kg.queries.count("MATCH (app:App) RETURN app.name AS name") == 2
+
+
+def test_descriptions_are_cached(fake_kg):
+    tool = InformationTool(uri="bolt://kg", user="u", password="p")
+    tool.fetch_app_description("checkm")
+    InformationTool(uri="bolt://kg", user="u", password="p").fetch_app_descriptions(["checkm", "prokka", "prokka"])
+    assert fake_kg.queries.count(description_query) == 2
+    clear_app_description_cache()
+    tool.fetch_app_description("checkm")
+    assert fake_kg.queries.count(description_query) == 3
+
+
+def test_description_cache_cleared_on_catalog_change(fake_kg):
+    tool = InformationTool(uri="bolt://kg", user="u", password="p", version_check_interval=0)
+    tool.fetch_app_description("checkm")
+    tool.fetch_app_description("checkm")
+    assert fake_kg.queries.count(description_query) == 1
+    fake_kg.app_names.append("Bin Contigs with MetaBAT2")
+    tool.fetch_app_description("checkm")
+    assert fake_kg.queries.count(description_query) == 2
+
+
+def test_description_cache_disabled(fake_kg, mocker):
+    config = mocker.patch("narrative_llm_agent.tools.kgtool_cosine_sim.get_config").return_value
+    config.kg_description_cache_size = 0
+    tool = InformationTool(uri="bolt://kg", user="u", password="p")
+    tool.fetch_app_description("checkm")
+    tool.fetch_app_description("checkm")
+    assert fake_kg.queries.count(description_query) == 2
+
+
+def test_driver_error_checks_driver(fake_kg, mocker):
+    mock_check = mocker.patch("narrative_llm_agent.tools.kgtool_cosine_sim.check_neo4j_driver")
+    tool = InformationTool(uri="bolt://kg", user="u", password="p")
+    fake_kg.run = mocker.Mock(side_effect=ServiceUnavailable("connection lost"))
+    with pytest.raises(ServiceUnavailable):
+        tool.fetch_app_description("checkm")
+    mock_check.assert_called_once_with("bolt://kg", "u", "p")
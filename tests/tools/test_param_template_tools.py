@@ -0,0 +1,109 @@
+import pytest
+
+from narrative_llm_agent.kbase.objects.app_spec import AppSpec
+from narrative_llm_agent.kbase.objects.workspace import ObjectInfo
+from narrative_llm_agent.tools.param_template_tools import (
+    ParamTemplateStore,
+    fill_param_template,
+    make_param_template,
+)
+from narrative_llm_agent.util.store import MemoryStore
+
+
+def make_object_info(obj_id: int, name: str, obj_type: str = "KBaseGenomes.Genome-1.0") -> ObjectInfo:
+    return ObjectInfo(
+        ws_id=1,
+        obj_id=obj_id,
+        version=1,
+        name=name,
+        ws_name="my_ws",
+        type=obj_type,
+        saved="whenever",
+        saved_by="me",
+        size_bytes=2,
+    )
+
+
+@pytest.fixture
+def first_genome() -> ObjectInfo:
+    return make_object_info(2, "first_genome")
+
+
+@pytest.fixture
+def second_genome() -> ObjectInfo:
+    return make_object_info(3, "second_genome", "KBaseGenomes.Genome-2.1")
+
+
+@pytest.fixture
+def good_params(first_genome: ObjectInfo) -> dict:
+    return {
+        "actual_input_object": first_genome.upa,
+        "actual_output_object": "first_genome_annotated",
+        "single_int": 5,
+        "list_of_strings": ["a", "b"],
+    }
+
+
+def test_make_and_fill_template(app_spec: AppSpec, good_params: dict, first_genome: ObjectInfo, second_genome: ObjectInfo):
+    template = make_param_template(app_spec, good_params, first_genome)
+    assert template.app_id == "NarrativeTest/test_input_params"
+    assert template.input_type == "KBaseGenomes.Genome"
+    assert template.params["actual_input_object"] == {"$slot": "input_object"}
+    assert template.params["actual_output_object"] == {"$slot": "output_name", "pattern": "{input_name}_annotated"}
+    assert template.params["single_int"] == 5
+
+    assert fill_param_template(template, first_genome, suffix="run1") == good_params | {
+        "actual_output_object": "first_genome_annotated_run1"
+    }
+    assert fill_param_template(template, second_genome, suffix="run2") == {
+        "actual_input_object": "1/3/1",
+        "actual_output_object": "second_genome_annotated_run2",
+        "single_int": 5,
+        "list_of_strings": ["a", "b"],
+    }
+
+
+def test_fill_template_unique_output_names(app_spec: AppSpec, good_params: dict, first_genome: ObjectInfo):
+    template = make_param_template(app_spec, good_params, first_genome)
+    first = fill_param_template(template, first_genome)["actual_output_object"]
+    second = fill_param_template(template, first_genome)["actual_output_object"]
+    assert first.startswith("first_genome_annotated_")
+    assert second.startswith("first_genome_annotated_")
+    assert first != second
+
+
+def test_make_template_input_name(app_spec: AppSpec, first_genome: ObjectInfo, second_genome: ObjectInfo):
+    params = {"actual_input_object": first_genome.name, "actual_output_object": "annotated"}
+    template = make_param_template(app_spec, params, first_genome)
+    assert fill_param_template(template, second_genome, suffix="run1") == {
+        "actual_input_object": second_genome.upa,
+        "actual_output_object": "second_genome_annotated_run1",
+    }
+
+
+@pytest.mark.parametrize("params", [
+    {"actual_input_object": "1/2/1", "actual_output_object": "out", "single_ws_object": "5/6/7"},
+    {"actual_input_object": "1/2/1", "actual_output_object": "first_genome"},
+])
+def test_make_template_not_generalizable(app_spec: AppSpec, first_genome: ObjectInfo, params: dict):
+    assert make_param_template(app_spec, params, first_genome) is None
+
+
+def test_store_round_trip(app_spec: AppSpec, good_params: dict, first_genome: ObjectInfo, second_genome: ObjectInfo):
+    templates = ParamTemplateStore(MemoryStore())
+    assert templates.get_params(app_spec, second_genome) is None
+    saved = templates.record_success(app_spec, good_params, first_genome)
+    assert saved.successes == 1
+    assert templates.record_success(app_spec, good_params, first_genome).successes == 2
+    params = templates.get_params(app_spec, second_genome)
+    assert params["actual_input_object"] == second_genome.upa
+    assert params["actual_output_object"].startswith("second_genome_annotated_")
+    # different input type, no template
+    assert templates.get_params(app_spec, make_object_info(4, "reads", "KBaseFile.PairedEndLibrary-1.0")) is None
+
+
+def test_store_skips_invalid_template(app_spec: AppSpec, good_params: dict, first_genome: ObjectInfo):
+    templates = ParamTemplateStore(MemoryStore())
+    templates.record_success(app_spec, good_params | {"single_int": "not an int"}, first_genome)
+    assert templates.get_template(app_spec.info.id, first_genome.type) is not None
+    assert templates.get_params(app_spec, first_genome) is None
@@ -0,0 +1,176 @@
+import pytest
+from pytest_mock import MockerFixture
+
+from narrative_llm_agent.kbase.objects.app_spec import (
+    AppBehavior,
+    AppBriefInfo,
+    AppSpec,
+    WidgetSpec,
+)
+from narrative_llm_agent.kbase.service_client import ServerError
+from narrative_llm_agent.tools.app_tools import AppSpecCache
+from narrative_llm_agent.tools.plan_tools import (
+    ConverterApp,
+    base_type,
+    check_next_step,
+    check_plan,
+    register_type_converter,
+)
+
+READS = "KBaseFile.PairedEndLibrary"
+ASSEMBLY = "KBaseGenomeAnnotations.Assembly"
+GENOME = "KBaseGenomes.Genome"
+GENOME_SET = "KBaseSearch.GenomeSet"
+
+app_types = {
+    "kb_SPAdes/run_SPAdes": ([READS], [ASSEMBLY]),
+    "ProkkaAnnotation/annotate_contigs": ([ASSEMBLY], [GENOME]),
+    "kb_gtdbtk/run_kb_gtdbtk_classify_wf": ([GENOME_SET], []),
+    "kb_Msuite/run_checkM_lineage_wf": ([ASSEMBLY, GENOME], []),
+    "kb_SetUtilities/KButil_Build_GenomeSet": ([GENOME], [GENOME_SET]),
+    "some/untyped_app": ([], []),
+}
+
+
+def make_spec(app_id: str) -> AppSpec:
+    if app_id not in app_types:
+        raise ServerError("NoSuchApp", 500, f"app {app_id} not found")
+    input_types, output_types = app_types[app_id]
+    info = AppBriefInfo(
+        id=app_id,
+        name=app_id,
+        ver="1.0.0",
+        subtitle="",
+        tooltip="",
+        categories=[],
+        authors=[],
+        input_types=input_types,
+        output_types=output_types,
+        app_type="app",
+    )
+    return AppSpec(info=info, widgets=WidgetSpec(), behavior=AppBehavior(), parameters=[])
+
+
+@pytest.fixture
+def app_specs(mocker: MockerFixture):
+    specs = mocker.Mock(spec=AppSpecCache)
+    specs.get_app_spec.side_effect = make_spec
+    return specs
+
+
+def make_plan(app_ids: list[str]) -> list[dict]:
+    return [
+        {
+            "step": idx + 1,
+            "name": app_id,
+            "app": app_id,
+            "description": "",
+            "expect_new_object": True,
+            "app_id": app_id,
+            "input_data_object": [],
+            "output_data_object": [],
+        }
+        for idx, app_id in enumerate(app_ids)
+    ]
+
+
+def test_base_type():
+    assert base_type("KBaseGenomes.Genome-17.0") == "KBaseGenomes.Genome"
+    assert base_type("KBaseGenomes.Genome") == "KBaseGenomes.Genome"
+
+
+def test_check_plan_ok(app_specs):
+    plan = make_plan([
+        "kb_SPAdes/run_SPAdes",
+        "ProkkaAnnotation/annotate_contigs",
+        "kb_Msuite/run_checkM_lineage_wf",
+    ])
+    result = check_plan(plan, [READS + "-1.0"], app_specs)
+    assert result.feasible
+    assert result.steps == plan
+    assert result.inserted_converters == []
+
+
+def test_check_plan_inserts_converter(app_specs):
+    plan = make_plan([
+        "kb_SPAdes/run_SPAdes",
+        "ProkkaAnnotation/annotate_contigs",
+        "kb_gtdbtk/run_kb_gtdbtk_classify_wf",
+    ])
+    result = check_plan(plan, [READS], app_specs)
+    assert result.feasible
+    assert result.inserted_converters == ["kb_SetUtilities/KButil_Build_GenomeSet"]
+    assert [step["app_id"] for step in result.steps] == [
+        "kb_SPAdes/run_SPAdes",
+        "ProkkaAnnotation/annotate_contigs",
+        "kb_SetUtilities/KButil_Build_GenomeSet",
+        "kb_gtdbtk/run_kb_gtdbtk_classify_wf",
+    ]
+    assert [step["step"] for step in result.steps] == [1, 2, 3, 4]
+    assert result.steps[2]["input_data_object"] == [GENOME]
+    assert result.steps[2]["output_data_object"] == [GENOME_SET]
+
+
+def test_check_plan_flags_converter(app_specs):
+    plan = make_plan(["ProkkaAnnotation/annotate_contigs", "kb_gtdbtk/run_kb_gtdbtk_classify_wf"])
+    result = check_plan(plan, [ASSEMBLY], app_specs, insert_converters=False)
+    assert not result.feasible
+    assert result.steps == plan
+    assert len(result.issues) == 1
+    assert result.issues[0].step == 2
+    assert "kb_SetUtilities/KButil_Build_GenomeSet" in result.issues[0].message
+
+
+def test_check_plan_no_path(app_specs):
+    plan = make_plan(["ProkkaAnnotation/annotate_contigs", "kb_Msuite/run_checkM_lineage_wf"])
+    result = check_plan(plan, [READS], app_specs)
+    # prokka can't run on reads, but its output genome still lets checkm run
+    assert [issue.step for issue in result.issues] == [1]
+    assert "ProkkaAnnotation/annotate_contigs needs one of" in result.issues[0].message
+
+
+def test_check_plan_unknown_app(app_specs):
+    plan = make_plan(["not/an_app", "kb_SPAdes/run_SPAdes"])
+    result = check_plan(plan, [READS], app_specs)
+    assert [issue.app_id for issue in result.issues] == ["not/an_app"]
+
+
+def test_check_plan_unchecked(app_specs):
+    # no initial types, or no input types on the app - nothing to check
+    plan = make_plan(["ProkkaAnnotation/annotate_contigs", "some/untyped_app"])
+    assert check_plan(plan, [], app_specs).feasible
+    assert check_plan(make_plan(["some/untyped_app"]), [READS], app_specs).feasible
+
+
+def test_register_type_converter(app_specs):
+    app_types["custom/needs_set"] = (["Custom.Set"], [])
+    app_types["custom/make_set"] = ([GENOME], ["Custom.Set"])
+    register_type_converter(
+        GENOME,
+        "Custom.Set-2.0",
+        ConverterApp(app_id="custom/make_set", name="Make Set", description="makes a set"),
+    )
+    result = check_plan(make_plan(["custom/needs_set"]), [GENOME], app_specs)
+    assert result.inserted_converters == ["custom/make_set"]
+
+
+def test_check_next_step_ok(app_specs):
+    step = make_plan(["kb_Msuite/run_checkM_lineage_wf"])[0]
+    candidates = [("1/3/1", "KBaseReport.Report-3.0"), ("1/2/1", GENOME + "-17.0"), ("1/1/1", ASSEMBLY)]
+    result = check_next_step(step, candidates, app_specs)
+    assert result.ok
+    assert result.input_object_upa == "1/2/1"
+
+
+@pytest.mark.parametrize("app_id,candidates,reason", [
+    ("ProkkaAnnotation/annotate_contigs", [("1/1/1", READS)], "needs one of"),
+    ("ProkkaAnnotation/annotate_contigs", [], "needs one of"),
+    ("some/untyped_app", [("1/1/1", READS)], "doesn't list any input types"),
+    ("not/an_app", [("1/1/1", READS)], "Unable to find app"),
+])
+def test_check_next_step_not_ok(app_specs, app_id, candidates, reason):
+    result = check_next_step(make_plan([app_id])[0], candidates, app_specs)
+    assert not result.ok
+    assert result.input_object_upa is None
+    assert reason in result.reason
+
@@ -1,13 +1,18 @@
 from pytest_mock import MockerFixture
+from narrative_llm_agent.config import get_config
 from narrative_llm_agent.kbase.clients.execution_engine import ExecutionEngine, JobState
 from narrative_llm_agent.kbase.clients.workspace import Workspace
 from narrative_llm_agent.kbase.clients.blobstore import Blobstore, convert_report_url
 from narrative_llm_agent.tools.report_tools import (
+    ANY_METHOD,
     get_report,
     get_report_from_job_id,
+    get_report_with_stats,
+    register_report_translator,
     _parse_fastqc_report,
     _round_floats_in_line,
     _process_fastqc_module,
+    _minimize_html_report,
 )
 from tests.test_data.test_data import load_test_data_json
 from pathlib import Path
@@ -207,7 +212,27 @@ def test_get_html_report(mocked_ws, test_data_path: Path, requests_mock):
     )
     ws = mocked_ws(report)
     expected = (
-        "message: \ndirect html: \nhtml report: html file:\n<html>some html</html>\n"
+        "message: \ndirect html: \nhtml report: html file:\nsome html"
+    )
+    run_get_report_test(
+        ws,
+        report,
+        [],
+        [test_data_path / "reports" / "html" / "test_html_report.zip"],
+        expected,
+        requests_mock,
+    )
+
+
+def test_get_html_report_capped(mocked_ws, test_data_path: Path, requests_mock, mocker):
+    report = load_test_data_json(
+        test_data_path / "reports" / "html" / "test_report_html_links.json"
+    )
+    ws = mocked_ws(report)
+    mocker.patch.object(get_config(), "html_report_max_bytes", 4)
+    expected = (
+        "message: \ndirect html: \nhtml report: html file:\n"
+        "some\n[report truncated, showing 4 of 9 bytes]"
     )
     run_get_report_test(
         ws,
@@ -247,6 +272,152 @@ def test_get_report_bad_dl(mocked_ws, test_data_path: Path, requests_mock):
     assert get_report("1/2/3", ws, Blobstore()) == expected
 
 
+def _set_report_source(report: dict, service: str, method: str) -> dict:
+    report["provenance"][0]["service"] = service
+    report["provenance"][0]["method"] = method
+    return report
+
+
+message_report_sources = [
+    ("kb_SPAdes", "run_SPAdes"),
+    ("kb_trimmomatic", "runTrimmomatic"),
+    ("ProkkaAnnotation", "annotate"),
+    ("RAST_SDK", "annotate_genome_assembly"),
+]
+
+
+@pytest.mark.parametrize("service,method", message_report_sources)
+def test_get_report_message_translator(service, method, mocked_ws, test_data_path: Path):
+    report = load_test_data_json(
+        test_data_path / "reports" / "html" / "test_report_html_links.json"
+    )
+    _set_report_source(report, service, method)
+    report["data"]["text_message"] = "Assembled into 42 contigs.\nAvg Length: 1234 bp."
+    report["data"]["warnings"] = ["a warning"]
+    report["data"]["objects_created"] = [{"ref": "1/2/3", "description": "new assembly"}]
+    ws = mocked_ws(report)
+    expected = (
+        "message: Assembled into 42 contigs.\nAvg Length: 1234 bp.\n"
+        "warnings:\n- a warning\n"
+        "objects created:\n- 1/2/3: new assembly"
+    )
+    # no html gets fetched here, so no need to mock the blobstore
+    assert get_report("1/2/3", ws, Blobstore()) == expected
+
+
+def test_get_report_message_translator_no_message(mocked_ws, test_data_path: Path, requests_mock):
+    report = load_test_data_json(
+        test_data_path / "reports" / "html" / "test_report_html_links.json"
+    )
+    _set_report_source(report, "kb_trimmomatic", "runTrimmomatic")
+    ws = mocked_ws(report)
+    expected = (
+        "message: \ndirect html: \nhtml report: html file:\nsome html"
+    )
+    run_get_report_test(
+        ws,
+        report,
+        [],
+        [test_data_path / "reports" / "html" / "test_html_report.zip"],
+        expected,
+        requests_mock,
+    )
+
+
+def test_get_report_quast(mocked_ws, test_data_path: Path, tmpdir, requests_mock):
+    report = load_test_data_json(
+        test_data_path / "reports" / "html" / "test_report_html_links.json"
+    )
+    _set_report_source(report, "kb_quast", "run_QUAST_app")
+    quast_table = "Assembly\tmy_assembly\n# contigs\t42\nN50\t123456\n"
+    report_zip_path = tmpdir / f"quast-{uuid.uuid4()}.zip"
+    with zipfile.ZipFile(report_zip_path, mode="w") as report_zip:
+        report_zip.writestr("quast_output/report.tsv", quast_table)
+        report_zip.writestr("quast_output/report.html", "<html>" + "x" * 1000 + "</html>")
+    ws = mocked_ws(report)
+    run_get_report_test(
+        ws,
+        report,
+        [],
+        [report_zip_path],
+        "QUAST summary table:\n" + quast_table,
+        requests_mock,
+    )
+
+
+def test_get_report_quast_missing_table(mocked_ws, test_data_path: Path, requests_mock):
+    report = load_test_data_json(
+        test_data_path / "reports" / "html" / "test_report_html_links.json"
+    )
+    _set_report_source(report, "kb_quast", "run_QUAST_app")
+    ws = mocked_ws(report)
+    expected = (
+        "message: \ndirect html: \nhtml report: html file:\nsome html"
+    )
+    run_get_report_test(
+        ws,
+        report,
+        [],
+        [test_data_path / "reports" / "html" / "test_html_report.zip"],
+        expected,
+        requests_mock,
+    )
+
+
+def test_get_report_with_stats(mocked_ws, test_data_path: Path, requests_mock):
+    report = load_test_data_json(
+        test_data_path / "reports" / "html" / "test_report_html_links.json"
+    )
+    _set_report_source(report, "kb_SPAdes", "run_SPAdes")
+    report["data"]["text_message"] = "Assembled into 42 contigs."
+    with open(test_data_path / "reports" / "html" / "test_html_report.zip", "rb") as archive:
+        requests_mock.get(
+            convert_report_url(report["data"]["html_links"][0]["URL"]),
+            content=archive.read(),
+        )
+    ws = mocked_ws(report)
+    report_text, stats = get_report_with_stats("1/2/3", ws, Blobstore(), compare_with_default=True)
+    default_text = (
+        "message: Assembled into 42 contigs.\ndirect html: \nhtml report: html file:\nsome html"
+    )
+    assert report_text == "message: Assembled into 42 contigs."
+    assert stats.source == "kb_spades.run_spades"
+    assert stats.translated_bytes == len(report_text)
+    assert stats.default_bytes == len(default_text)
+    assert stats.saved_bytes == len(default_text) - len(report_text)
+    assert stats.saved_tokens > 0
+
+
+def test_get_report_with_stats_default(mocked_ws, test_data_path: Path, requests_mock):
+    report = load_test_data_json(
+        test_data_path / "reports" / "html" / "test_report_html_links.json"
+    )
+    with open(test_data_path / "reports" / "html" / "test_html_report.zip", "rb") as archive:
+        requests_mock.get(
+            convert_report_url(report["data"]["html_links"][0]["URL"]),
+            content=archive.read(),
+        )
+    ws = mocked_ws(report)
+    _, stats = get_report_with_stats("1/2/3", ws, Blobstore(), compare_with_default=True)
+    assert stats.source == "default"
+    assert stats.default_bytes is None
+    assert stats.saved_bytes is None
+    assert stats.saved_tokens is None
+
+
+def test_register_report_translator(mocked_ws, test_data_path: Path):
+    report = load_test_data_json(
+        test_data_path / "reports" / "html" / "test_report_html_links.json"
+    )
+    _set_report_source(report, "SomeOtherApp", "run_other_app")
+    register_report_translator("someotherapp", ANY_METHOD, lambda r, b: "any method")
+    ws = mocked_ws(report)
+    assert get_report("1/2/3", ws, Blobstore()) == "any method"
+    register_report_translator("SomeOtherApp", "Run_Other_App", lambda r, b: "exact method")
+    assert get_report("1/2/3", ws, Blobstore()) == "exact method"
+
+
+
 """
 cases to cover:
 1. Bad job id
@@ -702,3 +873,72 @@ Total Sequences\t256892.0
         assert len(result) == 2
         assert isinstance(result[0], str)
         assert isinstance(result[1], dict)
+
+
+class TestMinimizeHtmlReport:
+    """Tests for the _minimize_html_report helper function."""
+
+    def test_drops_non_visible_content(self):
+        html = (
+            "<html><head><title>t</title><style>p {color: red}</style></head>"
+            "<body><script>var x = 1;</script><p>Hello <b>world</b> &amp; co</p></body></html>"
+        )
+        assert _minimize_html_report(html) == "Hello world & co"
+
+    def test_headings_and_lists(self):
+        html = "<h2>Summary</h2><ul><li>one</li><li>two</li></ul>"
+        assert _minimize_html_report(html) == "## Summary\n- one\n- two"
+
+    def test_strips_data_uris(self):
+        html = (
+            '<p>plot: <img src="data:image/png;base64,iVBORw0KGgo=" alt="GC content"></p>'
+            "<p>inline data:image/png;base64,QUJDRA== here</p>"
+        )
+        assert _minimize_html_report(html) == "plot: [image: GC content]\ninline here"
+
+    def test_table_to_markdown(self):
+        html = (
+            "<table><tr><th>Assembly</th><th>N50</th></tr>"
+            "<tr><td>a|b</td><td>100</td></tr></table>"
+        )
+        expected = "| Assembly | N50 |\n| --- | --- |\n| a\\|b | 100 |"
+        assert _minimize_html_report(html) == expected
+
+    def test_keeps_table_caption(self):
+        html = (
+            "<table><caption>Assembly <b>stats</b></caption>"
+            "<tr><th>Assembly</th><th>N50</th></tr>\n  <tr><td>a</td><td>100</td></tr></table>"
+            "<table><tr><td>outer<table><caption>inner</caption><tr><td>x</td><td>1</td></tr></table></td></tr></table>"
+        )
+        expected = (
+            "Assembly stats\n| Assembly | N50 |\n| --- | --- |\n| a | 100 |\n"
+            "| outer inner; x 1 |\n| --- |"
+        )
+        assert _minimize_html_report(html) == expected
+
+    def test_collapses_repeated_rows(self):
+        rows = "<tr><td>x</td><td>1</td></tr>" * 50
+        html = f"<table><tr><th>k</th><th>v</th></tr>{rows}<tr><td>y</td><td>2</td></tr></table>"
+        expected = (
+            "| k | v |\n| --- | --- |\n| x | 1 |\n"
+            "| (previous row repeated 49 more times) |\n| y | 2 |"
+        )
+        assert _minimize_html_report(html) == expected
+
+    def test_byte_cap(self):
+        html = "".join(f"<p>line {i}</p>" for i in range(1000))
+        result = _minimize_html_report(html, max_bytes=100)
+        kept, note = result.rsplit("\n", 1)
+        assert len(kept.encode("utf-8")) <= 100
+        assert kept.startswith("line 0\nline 1\n")
+        assert note.startswith("[report truncated, showing")
+
+    def test_token_cap(self):
+        html = "<p>" + "word " * 1000 + "</p>"
+        by_tokens = _minimize_html_report(html, max_bytes=None, max_tokens=10)
+        by_bytes = _minimize_html_report(html, max_bytes=40)
+        assert by_tokens == by_bytes
+
+    def test_no_cap(self):
+        html = "<p>" + "word " * 10000 + "</p>"
+        assert _minimize_html_report(html, max_bytes=None) == ("word " * 10000).strip()
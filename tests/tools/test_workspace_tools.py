@@ -2,7 +2,7 @@
 from pytest_mock import MockerFixture
 from narrative_llm_agent.kbase.clients.workspace import Workspace
 from narrative_llm_agent.kbase.objects.workspace import ObjectInfo
-from narrative_llm_agent.tools.workspace_tools import get_object_metadata
+from narrative_llm_agent.tools.workspace_tools import ObjectInfoCache, get_object_metadata
 
 
 def mock_obj_info(upa: str, metadata: dict[str, str] | None) -> ObjectInfo:
@@ -39,3 +39,23 @@ def test_get_obj_metadata(mocker: MockerFixture):
     assert meta_result == meta
 
 # TODO: tests for errors, bad upas, missing data, not allowed, etc.
+
+
+def test_object_info_cache(mocker: MockerFixture):
+    upa = "1/2/3"
+    mock_ws = build_mock_ws(mocker, upa, None)
+    cache = ObjectInfoCache(ws=mock_ws)
+    assert cache.get_object_info(upa).type == "SomeObject.Test-1.0"
+    assert cache.get_object_info(upa).type == "SomeObject.Test-1.0"
+    mock_ws.get_object_info.assert_called_once_with(upa)
+
+
+def test_object_info_cache_expires(mocker: MockerFixture):
+    upa = "1/2/3"
+    mock_time = mocker.patch("narrative_llm_agent.tools.workspace_tools.time.time", return_value=1000)
+    mock_ws = build_mock_ws(mocker, upa, None)
+    cache = ObjectInfoCache(ws=mock_ws, cache_expiration=10)
+    cache.get_object_info(upa)
+    mock_time.return_value = 1011
+    cache.get_object_info(upa)
+    assert mock_ws.get_object_info.call_count == 2
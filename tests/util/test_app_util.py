@@ -13,7 +13,9 @@ from narrative_llm_agent.util.app import (
     resolve_ref_if_typed,
     resolve_single_ref,
     system_variable,
+    normalize_params,
     transform_param_value,
+    validate_params,
 )
 from narrative_llm_agent.kbase.objects.app_spec import (
     AppSpec,
@@ -178,6 +180,88 @@ def test_get_ws_object_refs(app_spec: AppSpec, input_params: dict):
     assert set(get_ws_object_refs(app_spec, input_params)) == expected_refs
 
 
+@pytest.fixture(scope="module")
+def normalized_input_params() -> dict:
+    """
+    The sample parameters from input_params, after normalize_params - dropdowns use
+    their option values, and single valued parameters aren't in a list.
+    """
+    params_path = Path("app_spec_data") / "test_app_spec_inputs_normalized.json"
+    return load_test_data_json(params_path)
+
+
+def test_normalize_params(app_spec: AppSpec, input_params: dict, normalized_input_params: dict):
+    assert normalize_params(app_spec, input_params) == normalized_input_params
+    assert normalize_params(app_spec, normalized_input_params) == normalized_input_params
+
+
+def test_normalize_params_leaves_unknown_values(app_spec: AppSpec):
+    params = {"dropdown_selection": "durian", "single_string": ["a"], "list_of_strings": ["a"], "not_a_param": ["x"]}
+    assert normalize_params(app_spec, params) == params | {"single_string": "a"}
+
+
+def test_validate_params_ok(app_spec: AppSpec, input_params: dict, normalized_input_params: dict):
+    assert validate_params(app_spec, input_params) is None
+    assert validate_params(app_spec, normalized_input_params) is None
+
+
+def test_validate_params_number_strings(app_spec: AppSpec, input_params: dict):
+    params = input_params | {"single_int": "5", "list_of_ints": ["1", 2], "single_float": "1.5"}
+    assert validate_params(app_spec, params) is None
+
+
+def test_validate_params_number_without_text_options(app_spec: AppSpec):
+    spec = app_spec.model_copy(deep=True)
+    number_param = dummy_param({"id": "bare_int", "field_type": "int", "optional": 1})
+    spec.parameters.append(number_param)
+    assert validate_params(spec, {"actual_input_object": "1/2/3", "actual_output_object": "x", "bare_int": "7"}) is None
+    with pytest.raises(ValueError, match="bare_int: Input should be a valid integer"):
+        validate_params(spec, {"actual_input_object": "1/2/3", "actual_output_object": "x", "bare_int": "seven"})
+
+
+def test_validate_params_optional_empty(app_spec: AppSpec):
+    params = {
+        "actual_input_object": "1/2/3",
+        "actual_output_object": "NewGenomeObject",
+        "single_int": "",
+        "single_float": None,
+        "dropdown_selection": None,
+    }
+    assert validate_params(app_spec, params) is None
+
+
+invalid_param_cases = [
+    ({"actual_input_object": None}, "actual_input_object: Input should be a valid string"),
+    ({"actual_output_object": "12345"}, "actual_output_object: String should match pattern"),
+    ({"actual_output_object": "bad name!"}, "actual_output_object: String should match pattern"),
+    ({"single_int": 101}, "single_int: Input should be less than or equal to 100"),
+    ({"single_int": "five"}, "single_int: Input should be a valid integer"),
+    ({"single_int": "1.5"}, "single_int: Input should be a valid integer"),
+    ({"single_float": "many"}, "single_float: Input should be a valid number"),
+    ({"list_of_ints": [1, -101]}, "list_of_ints.1: Input should be greater than or equal to -100"),
+    ({"single_float": 55.6}, "single_float: Input should be less than or equal to 55.5"),
+    ({"dropdown_selection": "Durian"}, "dropdown_selection: Input should be 'apple', 'banana' or 'carrot'"),
+    ({"model_for_subdata": ["1/3/1", "1/4/1"]}, "model_for_subdata: Input should be a valid string"),
+    ({"single_checkbox": 2}, "single_checkbox: Input should be 1 or 0"),
+    ({"list_of_strings": "not a list"}, "list_of_strings: Input should be a valid list"),
+]
+
+
+@pytest.mark.parametrize("bad_params,error", invalid_param_cases)
+def test_validate_params_invalid(app_spec: AppSpec, input_params: dict, bad_params: dict, error: str):
+    with pytest.raises(ValueError) as err:
+        validate_params(app_spec, input_params | bad_params)
+    assert str(err.value).startswith("Invalid parameters for app NarrativeTest/test_input_params:\n")
+    assert error in str(err.value)
+
+
+def test_validate_params_missing_required(app_spec: AppSpec, input_params: dict):
+    params = dict(input_params)
+    del params["actual_output_object"]
+    with pytest.raises(ValueError, match="actual_output_object: Field required"):
+        validate_params(app_spec, params)
+
+
 valid_upas = ["1/2/3", "11/22/33"]
 invalid_upas = ["1/2", "1/2/3/4", None, 1, "nope"]
 
@@ -0,0 +1,121 @@
+import json
+
+import numpy as np
+import pytest
+from langchain_chroma import Chroma
+from langchain_core.embeddings import DeterministicFakeEmbedding
+
+from narrative_llm_agent.util.catalog_index import (
+    RECORDS_FILE,
+    CatalogIndex,
+    CatalogIndexRetriever,
+    clear_catalog_indexes,
+    get_catalog_index,
+)
+
+TEXTS = [
+    "Assemble reads with SPAdes",
+    "Annotate a genome with Prokka",
+    "Classify genomes with GTDB-Tk",
+    "Assess assembly quality with QUAST",
+]
+
+
+@pytest.fixture
+def embeddings():
+    return DeterministicFakeEmbedding(size=16)
+
+
+@pytest.fixture
+def catalog_db(tmp_path, embeddings):
+    db_dir = tmp_path / "catalog_db"
+    Chroma.from_texts(
+        TEXTS,
+        embeddings,
+        metadatas=[{"seq_num": idx} for idx in range(len(TEXTS))],
+        ids=[f"app_{idx}" for idx in range(len(TEXTS))],
+        persist_directory=str(db_dir),
+    )
+    return db_dir
+
+
+@pytest.fixture
+def saved_index(tmp_path, catalog_db):
+    clear_catalog_indexes()
+    index_dir = tmp_path / "catalog_index"
+    CatalogIndex.from_chroma(catalog_db).save(index_dir)
+    yield index_dir
+    clear_catalog_indexes()
+
+
+def test_from_chroma(catalog_db, embeddings):
+    index = CatalogIndex.from_chroma(catalog_db)
+    assert len(index) == len(TEXTS)
+    assert sorted(index.ids) == [f"app_{idx}" for idx in range(len(TEXTS))]
+    row = index.ids.index("app_2")
+    assert index.documents[row] == TEXTS[2]
+    assert index.metadatas[row] == {"seq_num": 2}
+    assert index.vectors.dtype == np.float32
+    np.testing.assert_allclose(np.linalg.norm(index.vectors, axis=1), 1, rtol=1e-5)
+
+
+def test_load_is_memory_mapped(saved_index):
+    index = CatalogIndex.load(saved_index)
+    assert isinstance(index.vectors, np.memmap)
+    assert not index.vectors.flags.writeable
+    assert len(index) == len(TEXTS)
+
+
+def test_load_wrong_version(saved_index):
+    records_file = saved_index / RECORDS_FILE
+    records = json.loads(records_file.read_text())
+    records["format_version"] = 0
+    records_file.write_text(json.dumps(records))
+    with pytest.raises(ValueError, match="format version 0, expected 1"):
+        CatalogIndex.load(saved_index)
+
+
+def test_search_matches_brute_force():
+    rng = np.random.default_rng(42)
+    vectors = rng.normal(size=(50, 8))
+    index = CatalogIndex.from_arrays(vectors, [str(idx) for idx in range(50)])
+    query = rng.normal(size=8)
+    cosine = vectors @ query / (np.linalg.norm(vectors, axis=1) * np.linalg.norm(query))
+    expected = list(np.argsort(-cosine)[:5])
+    results = index.search(query, k=5)
+    assert [row for row, _ in results] == expected
+    np.testing.assert_allclose([score for _, score in results], cosine[expected], rtol=1e-5)
+    assert len(index.search(query, k=100)) == 50
+    assert index.search(query, k=0) == []
+
+
+def test_search_wrong_dimensions():
+    index = CatalogIndex.from_arrays(np.eye(3), ["a", "b", "c"])
+    with pytest.raises(ValueError, match="has 3 dimensions"):
+        index.search([1.0, 0.0], k=1)
+
+
+def test_similarity_search(saved_index, embeddings):
+    index = get_catalog_index(saved_index)
+    docs = index.similarity_search_with_score("Annotate a genome with Prokka", embeddings, k=2)
+    assert len(docs) == 2
+    doc, score = docs[0]
+    assert doc.page_content == "Annotate a genome with Prokka"
+    assert doc.id == "app_1"
+    assert doc.metadata == {"seq_num": 1}
+    assert score == pytest.approx(1.0, rel=1e-5)
+
+
+def test_as_retriever(saved_index, embeddings):
+    retriever = get_catalog_index(saved_index).as_retriever(embeddings, k=3)
+    assert isinstance(retriever, CatalogIndexRetriever)
+    docs = retriever.invoke("Assess assembly quality with QUAST")
+    assert len(docs) == 3
+    assert docs[0].page_content == "Assess assembly quality with QUAST"
+
+
+def test_get_catalog_index_is_shared(saved_index):
+    index = get_catalog_index(saved_index)
+    assert get_catalog_index(str(saved_index)) is index
+    clear_catalog_indexes()
+    assert get_catalog_index(saved_index) is not index
@@ -0,0 +1,203 @@
+import pytest
+from langchain_core.embeddings import DeterministicFakeEmbedding
+
+from narrative_llm_agent.config import get_config
+from narrative_llm_agent.util.embedding_cache import (
+    CachedEmbeddings,
+    cache_embeddings,
+    clear_embedding_caches,
+    embeddings_model_key,
+    get_embedding_cache_stats,
+    make_embedding_key,
+    normalize_text,
+)
+from narrative_llm_agent.util.store import KeyValueStore, MemoryStore
+
+
+class RecordingEmbeddings(DeterministicFakeEmbedding):
+    """Records the texts it's asked to embed."""
+
+    document_calls: list[list[str]] = []
+    query_calls: list[str] = []
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        self.document_calls.append(texts)
+        return super().embed_documents(texts)
+
+    def embed_query(self, text: str) -> list[float]:
+        self.query_calls.append(text)
+        return super().embed_query(text)
+
+    def reset(self) -> None:
+        self.document_calls = []
+        self.query_calls = []
+
+
+@pytest.fixture
+def fake_embeddings():
+    embeddings = RecordingEmbeddings(size=8)
+    embeddings.reset()
+    return embeddings
+
+
+@pytest.fixture
+def cached(fake_embeddings) -> CachedEmbeddings:
+    return CachedEmbeddings(fake_embeddings, MemoryStore(), batch_size=2)
+
+
+@pytest.fixture
+def clean_caches(monkeypatch):
+    clear_embedding_caches()
+    monkeypatch.setattr(get_config(), "kv_store", "memory")
+    yield
+    clear_embedding_caches()
+
+
+def test_normalize_text():
+    assert normalize_text("  What apps\n assemble   READS? ") == "what apps assemble reads?"
+    assert normalize_text("ﬁle") == "file"
+
+
+def test_make_embedding_key():
+    key = make_embedding_key("model", "query", "assemble reads")
+    assert key == make_embedding_key("model", "query", " Assemble  reads")
+    assert key != make_embedding_key("model", "document", "assemble reads")
+    assert key != make_embedding_key("other_model", "query", "assemble reads")
+
+
+def test_embed_query_cached(cached, fake_embeddings):
+    vector = cached.embed_query("what assembles reads?")
+    assert vector == fake_embeddings.embed_query("what assembles reads?")
+    fake_embeddings.reset()
+    assert cached.embed_query("What assembles  reads?") == vector
+    assert fake_embeddings.query_calls == []
+    assert cached.stats.hits == 1
+    assert cached.stats.misses == 1
+    assert cached.stats.hit_rate == pytest.approx(0.5)
+
+
+def test_embed_documents_batches_misses(cached, fake_embeddings):
+    texts = ["a", "b", "c"]
+    expected = fake_embeddings.embed_documents(texts)
+    fake_embeddings.reset()
+    assert cached.embed_documents(texts) == expected
+    # 3 misses in batches of 2
+    assert fake_embeddings.document_calls == [["a", "b"], ["c"]]
+    fake_embeddings.reset()
+
+    # only the new text gets embedded, and repeats only once
+    vectors = cached.embed_documents(["c", "d", "a", "D"])
+    assert vectors[0] == expected[2]
+    assert vectors[2] == expected[0]
+    assert vectors[1] == vectors[3]
+    assert fake_embeddings.document_calls == [["d"]]
+    assert cached.stats.hits == 3
+    assert cached.stats.misses == 4
+    assert cached.stats.batches == 3
+
+
+def test_queries_and_documents_cached_separately(cached, fake_embeddings):
+    cached.embed_documents(["assemble reads"])
+    cached.embed_query("assemble reads")
+    assert fake_embeddings.query_calls == ["assemble reads"]
+    assert cached.stats.misses == 2
+
+
+def test_cache_persists_in_store(cached, fake_embeddings):
+    vector = cached.embed_query("annotate a genome")
+    other = CachedEmbeddings(RecordingEmbeddings(size=8), cached.store)
+    assert other.embed_query("annotate a genome") == vector
+    assert other.stats.hits == 1
+
+
+def test_embeddings_model_key(cached, fake_embeddings):
+    assert embeddings_model_key(fake_embeddings) == "RecordingEmbeddings"
+    assert embeddings_model_key(cached) == embeddings_model_key(fake_embeddings)
+
+
+def test_embeddings_model_key_dimensionality():
+    class SizedEmbeddings(DeterministicFakeEmbedding):
+        model: str = "nomic-embed-text-v1.5"
+        dimensionality: int | None = None
+
+    key = embeddings_model_key(SizedEmbeddings(size=8, dimensionality=768))
+    assert key == "SizedEmbeddings:nomic-embed-text-v1.5:768"
+    assert key != embeddings_model_key(SizedEmbeddings(size=8, dimensionality=256))
+
+
+class BrokenStore(KeyValueStore):
+    def get(self, key: str) -> bytes | None:
+        raise OSError("disk I/O error")
+
+    def set(self, key: str, value: bytes) -> None:
+        raise OSError("disk I/O error")
+
+    def delete(self, keys: list[str]) -> None:
+        raise OSError("disk I/O error")
+
+    def keys(self, prefix: str = "") -> list[str]:
+        raise OSError("disk I/O error")
+
+
+def test_store_errors_use_model(fake_embeddings):
+    cached = CachedEmbeddings(fake_embeddings, BrokenStore(), max_entries=1)
+    assert cached.embed_query("assemble reads") == fake_embeddings.embed_query("assemble reads")
+    assert cached.embed_documents(["a", "b"]) == fake_embeddings.embed_documents(["a", "b"])
+    assert cached.stats.misses == 3
+
+
+class KeyCountingStore(MemoryStore):
+    """Counts the calls that list the whole store."""
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.key_listings = 0
+
+    def keys(self, prefix: str = "") -> list[str]:
+        self.key_listings += 1
+        return super().keys(prefix)
+
+
+def test_evicts_past_max_entries(fake_embeddings):
+    store = KeyCountingStore()
+    cached = CachedEmbeddings(fake_embeddings, store, max_entries=10)
+    cached.embed_documents([str(i) for i in range(10)])
+    assert len(store.keys()) == 10
+    cached.embed_query("one more")
+    # trimmed to 90% of the max
+    assert len(store.keys()) == 9
+
+
+def test_eviction_counts_entries(fake_embeddings):
+    store = KeyCountingStore()
+    cached = CachedEmbeddings(fake_embeddings, store, max_entries=100)
+    for i in range(100):
+        cached.embed_query(f"query {i}")
+    # only listed once, to count what was there to start
+    assert store.key_listings == 1
+    cached.embed_query("one more")
+    assert store.key_listings == 2
+    assert len(MemoryStore.keys(store)) == 90
+    # then counted again from there
+    for i in range(10):
+        cached.embed_query(f"another query {i}")
+    assert store.key_listings == 2
+
+
+def test_cache_embeddings(clean_caches, fake_embeddings):
+    first = cache_embeddings(fake_embeddings)
+    second = cache_embeddings(RecordingEmbeddings(size=8))
+    assert isinstance(first, CachedEmbeddings)
+    assert first.store is second.store
+    assert first.max_entries == get_config().embedding_cache_max_entries
+    first.embed_query("assemble reads")
+    second.embed_query("assemble reads")
+    stats = get_embedding_cache_stats()
+    assert stats["RecordingEmbeddings"].hits == 1
+    assert stats["RecordingEmbeddings"].misses == 1
+
+
+def test_cache_embeddings_off(clean_caches, fake_embeddings, monkeypatch):
+    monkeypatch.setattr(get_config(), "embedding_cache", False)
+    assert cache_embeddings(fake_embeddings) is fake_embeddings
+    assert get_embedding_cache_stats() == {}
@@ -0,0 +1,64 @@
+import pytest
+from langchain_nomic import NomicEmbeddings
+from langchain_openai import OpenAIEmbeddings
+
+from narrative_llm_agent.config import get_config
+from narrative_llm_agent.util.embedding_cache import CachedEmbeddings, clear_embedding_caches
+from narrative_llm_agent.util.embeddings import (
+    CBORG_API_BASE,
+    make_embeddings,
+    make_optional_embeddings,
+    make_workflow_embeddings,
+)
+
+
+@pytest.fixture(autouse=True)
+def clean_caches():
+    clear_embedding_caches()
+    yield
+    clear_embedding_caches()
+
+
+def test_make_embeddings_cborg():
+    embeddings = make_embeddings("CBORG", "fake_key")
+    assert isinstance(embeddings, OpenAIEmbeddings)
+    assert embeddings.model == "lbl/nomic-embed-text"
+    assert embeddings.openai_api_base == CBORG_API_BASE
+
+
+def test_make_embeddings_nomic(monkeypatch):
+    monkeypatch.delenv("NOMIC_API_KEY", raising=False)
+    embeddings = make_embeddings("nomic")
+    assert isinstance(embeddings, NomicEmbeddings)
+    assert embeddings.model == "nomic-embed-text-v1.5"
+    assert embeddings.dimensionality == 768
+
+
+def test_make_embeddings_unknown():
+    with pytest.raises(ValueError, match="Unknown embedding provider 'openai'"):
+        make_embeddings("openai")
+
+
+def test_make_optional_embeddings(monkeypatch):
+    monkeypatch.setattr(get_config(), "embedding_cache", True)
+    embeddings = make_optional_embeddings("cborg", "fake_key")
+    assert isinstance(embeddings, CachedEmbeddings)
+    assert isinstance(embeddings.embeddings, OpenAIEmbeddings)
+
+
+def test_make_optional_embeddings_fails(monkeypatch):
+    monkeypatch.delenv(get_config().cborg_key_env, raising=False)
+    monkeypatch.delenv("OPENAI_API_KEY", raising=False)
+    assert make_optional_embeddings("cborg") is None
+    assert make_optional_embeddings("openai") is None
+
+
+def test_make_workflow_embeddings(mocker):
+    mock_make = mocker.patch("narrative_llm_agent.util.embeddings.make_optional_embeddings")
+    make_workflow_embeddings("cborg", "embedding_key", "analyst_key")
+    mock_make.assert_called_with("cborg", "embedding_key")
+    # cborg falls back to the analyst's CBORG key, nomic doesn't
+    make_workflow_embeddings("cborg", None, "analyst_key")
+    mock_make.assert_called_with("cborg", "analyst_key")
+    make_workflow_embeddings("nomic", None, "analyst_key")
+    mock_make.assert_called_with("nomic", None)
@@ -0,0 +1,182 @@
+import json
+from pathlib import Path
+
+import pytest
+from langchain_core.embeddings import DeterministicFakeEmbedding
+
+from narrative_llm_agent.util.catalog_index import CatalogIndex
+from narrative_llm_agent.util.hybrid_retriever import (
+    BM25Index,
+    CatalogApp,
+    HybridAppRetriever,
+    clear_app_retrievers,
+    get_app_retriever,
+    join_chunks,
+    parse_catalog_apps,
+    parse_catalog_chunks,
+    reciprocal_rank_fusion,
+    tokenize,
+)
+
+APPS_PATH = Path(__file__).parent.parent / "test_data" / "app_catalog_apps.json"
+
+
+@pytest.fixture(scope="module")
+def catalog_apps() -> list[CatalogApp]:
+    with open(APPS_PATH) as infile:
+        return [CatalogApp(**app) for app in json.load(infile)]
+
+
+@pytest.fixture
+def embeddings():
+    return DeterministicFakeEmbedding(size=16)
+
+
+def test_tokenize():
+    assert tokenize("Trim Reads with Trimmomatic") == ["trim", "reads", "with", "trimmomatic"]
+    tokens = tokenize("kb_trimmomatic/run_trimmomatic")
+    assert tokens.count("trimmomatic") == 2
+    assert "kb_trimmomatic/run_trimmomatic" in tokens
+    assert {"gtdb", "tk", "gtdb-tk", "gtdbtk"} <= set(tokenize("Run GTDB-Tk."))
+    assert {"run", "fast", "qc", "runfastqc"} <= set(tokenize("kb_fastqc/runFastQC"))
+    assert tokenize("  -- ") == []
+
+
+def test_join_chunks():
+    # split on whitespace, overlapping by whole words, or not at all
+    chunks = ["assemble the reads", "the reads with SPAdes,", "then annotate", "annotate them"]
+    assert join_chunks(chunks) == "assemble the reads with SPAdes, then annotate them"
+    # a partial word isn't an overlap
+    assert join_chunks(["run fastqc", "qc reports"]) == "run fastqc qc reports"
+    assert join_chunks([]) == ""
+
+
+def test_parse_catalog_apps():
+    app = {"name": "Assemble Reads with SPAdes", "id": "kb_SPAdes/run_SPAdes", "ver": "1.3.4", "tooltip": "Assemble reads.", "categories": ["assembly"]}
+    other = {"name": "Prokka", "id": "ProkkaAnnotation/annotate_contigs"}
+    catalog = json.dumps([app, other, {"name": "GTDB-Tk", "id": "kb_gtdbtk/run_kb_gtdbtk_classify_wf"}, app, {"not": "an app"}])
+    # chunks like the catalog's, split on spaces with a word or two of overlap
+    words = catalog.split(" ")
+    documents = ["KBase app catalog"] + [" ".join(words[start:start + 7]) for start in range(0, len(words), 5)]
+    apps = parse_catalog_apps(documents)
+    assert [app.id for app in apps] == [
+        "kb_SPAdes/run_SPAdes",
+        "ProkkaAnnotation/annotate_contigs",
+        "kb_gtdbtk/run_kb_gtdbtk_classify_wf",
+    ]
+    assert apps[0].categories == ["assembly"]
+    assert apps[1].tooltip == ""
+    # a record that's cut off is skipped
+    assert parse_catalog_apps(['[{"name": "Cut off", "id":']) == []
+
+
+def test_parse_catalog_chunks():
+    records = [{"name": f"App {idx}", "id": f"module/app_{idx}"} for idx in range(3)]
+    catalog = json.dumps(records)
+    words = catalog.split(" ")
+    documents = ["KBase app catalog"] + [" ".join(words[start:start + 5]) for start in range(0, len(words), 4)]
+    apps, chunk_apps = parse_catalog_chunks(documents)
+    assert [app.id for app in apps] == ["module/app_0", "module/app_1", "module/app_2"]
+    # each chunk has the apps with any of their record in it
+    assert chunk_apps == [[], [0], [0, 1], [1, 2], [2]]
+
+
+def test_bm25_index():
+    index = BM25Index(["assemble reads with spades", "annotate a genome with prokka", "assess assembly quality"])
+    results = index.search("Prokka annotation", k=5)
+    assert [idx for idx, _ in results] == [1]
+    assert index.search("nothing matches", k=5) == []
+    assert [idx for idx, _ in index.search("assemble with spades or prokka", k=1)] == [0]
+
+
+def test_reciprocal_rank_fusion():
+    fused = reciprocal_rank_fusion([[1, 2, 3], [3, 1]], rrf_k=60)
+    assert [item for item, _ in fused] == [1, 3, 2]
+    assert fused[0][1] == pytest.approx(1 / 61 + 1 / 62)
+    assert reciprocal_rank_fusion([[], []]) == []
+
+
+@pytest.mark.parametrize("query,app_id", [
+    ("kb_trimmomatic/run_trimmomatic", "kb_trimmomatic/run_trimmomatic"),
+    ("Trimmomatic", "kb_trimmomatic/run_trimmomatic"),
+    ("FastQC", "kb_fastqc/runFastQC"),
+    ("metaSPAdes", "kb_SPAdes/run_metaSPAdes"),
+    ("Assess Quality of Assemblies with QUAST", "kb_quast/run_QUAST_app"),
+])
+def test_lexical_search(catalog_apps, query, app_id):
+    retriever = HybridAppRetriever.from_apps(catalog_apps)
+    app, score = retriever.search(query, k=1, mode="lexical")[0]
+    assert app.id == app_id
+    assert score > 0
+
+
+def test_hybrid_search(catalog_apps, embeddings):
+    retriever = HybridAppRetriever.from_apps(catalog_apps, embeddings, k=3)
+    assert retriever.vector_index is not None
+    assert len(retriever.vector_index) == len(catalog_apps)
+    results = retriever.search("Prokka")
+    assert len(results) == 3
+    # both Prokka apps, for assemblies and metagenomes, are found
+    assert {"ProkkaAnnotation/annotate_contigs", "ProkkaAnnotation/annotate_metagenome"} <= {
+        app.id for app, _ in results
+    }
+    assert len(retriever.search("Prokka", mode="vector")) == 3
+    # a full app id goes first
+    assert retriever.search("run kb_fastqc/runFastQC on the reads")[0][0].id == "kb_fastqc/runFastQC"
+    # an app's own record is its closest vector
+    assert retriever.search(catalog_apps[5].model_dump_json(), k=1, mode="vector")[0][0].id == catalog_apps[5].id
+
+
+def test_hybrid_search_without_embeddings(catalog_apps):
+    retriever = HybridAppRetriever.from_apps(catalog_apps)
+    hybrid = [app.id for app, _ in retriever.search("Trim reads", k=4)]
+    lexical = [app.id for app, _ in retriever.search("Trim reads", k=4, mode="lexical")]
+    assert hybrid == lexical
+    with pytest.raises(ValueError, match="needs an embeddings model"):
+        retriever.search("Trim reads", mode="vector")
+    with pytest.raises(ValueError, match="Unknown search mode 'fuzzy'"):
+        retriever.search("Trim reads", mode="fuzzy")
+
+
+def test_retriever_documents(catalog_apps):
+    docs = HybridAppRetriever.from_apps(catalog_apps, k=2).invoke("Assemble Reads with SPAdes")
+    assert len(docs) == 2
+    assert docs[0].metadata["app_id"] == "kb_SPAdes/run_SPAdes"
+    assert docs[0].metadata["name"] == "Assemble Reads with SPAdes - v3.15.3"
+    assert json.loads(docs[0].page_content)["id"] == "kb_SPAdes/run_SPAdes"
+
+
+def test_from_catalog_index(mocker, catalog_apps, embeddings):
+    # one chunk of a few apps per row, embedded like the catalog's chunks
+    documents = [json.dumps([app.model_dump() for app in catalog_apps[start:start + 4]]) for start in range(0, 40, 4)]
+    index = CatalogIndex.from_arrays(embeddings.embed_documents(documents), [str(idx) for idx in range(len(documents))], documents)
+    spy = mocker.spy(DeterministicFakeEmbedding, "embed_documents")
+    retriever = HybridAppRetriever.from_catalog_index(index, embeddings, k=3)
+    assert [app.id for app in retriever.apps] == [app.id for app in catalog_apps[:40]]
+    assert retriever.vector_index is index
+    # the query's closest chunk is its own, so its apps come first
+    results = retriever.search(documents[2], k=6, mode="vector")
+    assert [app.id for app, _ in results[:4]] == [app.id for app in catalog_apps[8:12]]
+    assert len(results) == 6
+    assert len({app.id for app, _ in results}) == 6
+    assert retriever.search(f"run {catalog_apps[30].id}")[0][0].id == catalog_apps[30].id
+    # only the queries got embedded
+    spy.assert_not_called()
+    assert HybridAppRetriever.from_catalog_index(index).vector_index is None
+
+
+def test_get_app_retriever_is_shared(mocker, catalog_apps, embeddings, tmp_path):
+    clear_app_retrievers()
+    documents = [json.dumps([app.model_dump() for app in catalog_apps])]
+    index = CatalogIndex.from_arrays(embeddings.embed_documents(documents), ["0"], documents)
+    mock_load = mocker.patch(
+        "narrative_llm_agent.util.hybrid_retriever.load_catalog_index", return_value=index
+    )
+    lexical = get_app_retriever(tmp_path)
+    assert get_app_retriever(str(tmp_path)) is lexical
+    assert lexical.vector_index is None
+    hybrid = get_app_retriever(tmp_path, embeddings)
+    assert hybrid is not lexical
+    assert hybrid.vector_index is not None
+    assert mock_load.call_count == 2
+    clear_app_retrievers()
@@ -0,0 +1,129 @@
+import numpy as np
+import pytest
+
+from narrative_llm_agent.tools.information_tool import get_information
+from narrative_llm_agent.tools.kgtool_cosine_sim import (
+    InformationTool,
+    clear_app_description_cache,
+    clear_app_name_indexes,
+)
+from narrative_llm_agent.util.kg_snapshot import KGSnapshot, clear_kg_snapshots, get_kg_snapshot
+from narrative_llm_agent.util.semantic import get_candidates
+
+NODES = [
+    {"id": "a1", "label": "App", "name": "Assess Genome Quality with CheckM", "tooltip": "Checks genomes",
+     "appid": "kb_Msuite/run_checkM_lineage_wf", "hidden": False},
+    {"id": "a2", "label": "App", "name": "Assemble Reads with SPAdes", "tooltip": "Assembles reads",
+     "appid": "kb_SPAdes/run_SPAdes", "hidden": None},
+    {"id": "a3", "label": "App", "name": "Old Assembler", "tooltip": "Don't use", "appid": "old/assemble",
+     "hidden": True},
+    {"id": "d1", "label": "DataObject", "name": "Assembly", "tooltip": None, "appid": None, "hidden": None},
+    {"id": "d2", "label": "DataObject", "name": "PairedEndLibrary", "tooltip": None, "appid": None, "hidden": None},
+    {"id": "c1", "label": "Category", "name": "assembly", "tooltip": None, "appid": None, "hidden": None},
+]
+RELATIONSHIPS = [
+    {"source": "a2", "type": "INPUT", "target": "d2"},
+    {"source": "a2", "type": "OUTPUT", "target": "d1"},
+    {"source": "a1", "type": "INPUT", "target": "d1"},
+    {"source": "a2", "type": "CATEGORY", "target": "c1"},
+]
+
+
+@pytest.fixture
+def snapshot():
+    return KGSnapshot.from_records(NODES, RELATIONSHIPS)
+
+
+def test_adjacency(snapshot):
+    assert len(snapshot.adj_neighbors) == 2 * len(RELATIONSHIPS)
+    spades = 1
+    neighbors = snapshot.adj_neighbors[snapshot.adj_indptr[spades]:snapshot.adj_indptr[spades + 1]]
+    assert sorted(snapshot.name[neighbors]) == ["Assembly", "PairedEndLibrary", "assembly"]
+
+
+def test_save_and_load(snapshot, tmp_path):
+    path = tmp_path / "kg.npz"
+    snapshot.save(path)
+    loaded = KGSnapshot.load(path)
+    assert loaded.app_names() == snapshot.app_names()
+    assert loaded.describe("SPAdes") == snapshot.describe("SPAdes")
+    np.testing.assert_array_equal(loaded.adj_indptr, snapshot.adj_indptr)
+
+
+def test_describe(snapshot):
+    assert snapshot.describe("SPAdes") == (
+        "type: App\n"
+        "INPUT: PairedEndLibrary\n"
+        "OUTPUT: Assembly\n"
+        "CATEGORY: assembly\n"
+        "App name: Assemble Reads with SPAdes\n"
+        "Tooltip: Assembles reads\n"
+        "AppID: kb_SPAdes/run_SPAdes"
+    )
+    # hidden apps are skipped
+    assert snapshot.describe("Old Assembler") is None
+    assert snapshot.describe("PairedEnd").startswith("type: DataObject\nINPUT: Assemble Reads with SPAdes\n")
+
+
+def test_describe_exact(snapshot):
+    records = snapshot.describe_exact("Assess Genome Quality with CheckM")
+    assert records == [{
+        "final_context": "type:App\nINPUT: Assembly\n\nApp name: Assess Genome Quality with CheckM\n"
+        "Tooltip: Checks genomes\nAppID: kb_Msuite/run_checkM_lineage_wf"
+    }]
+    assert snapshot.describe_exact("Old Assembler") == []
+    assert snapshot.describe_exact("CheckM") == []
+
+
+def test_fulltext_candidates(snapshot):
+    assert snapshot.fulltext_candidates("assemble reads spades") == [{"candidate": "Assemble Reads with SPAdes"}]
+    # misspelled words still match
+    assert snapshot.fulltext_candidates("genome qualty checkm")[0] == {"candidate": "Assess Genome Quality with CheckM"}
+    # exact matches come first, and only Apps and DataObjects are searched
+    assert snapshot.fulltext_candidates("assembly", limit=5) == [
+        {"candidate": "Assembly"},
+        {"candidate": "Assemble Reads with SPAdes"},
+    ]
+    # all words have to match
+    assert snapshot.fulltext_candidates("spades genome") == []
+    assert snapshot.fulltext_candidates("!!") == []
+
+
+def test_catalog_version(snapshot):
+    names = [node["name"] for node in NODES if node["label"] == "App"]
+    assert snapshot.catalog_version() == (3, sum(len(name) for name in names))
+    assert snapshot.app_ids("SPAdes") == ["kb_SPAdes/run_SPAdes"]
+
+
+@pytest.fixture
+def snapshot_backend(snapshot, tmp_path, mocker):
+    path = tmp_path / "kg.npz"
+    snapshot.save(path)
+    config = mocker.patch("narrative_llm_agent.util.kg_snapshot.get_config").return_value
+    config.kg_backend = "snapshot"
+    config.kg_snapshot_path = str(path)
+    config.kg_description_cache_size = 16
+    config.kg_description_cache_ttl = 60
+    mocker.patch("narrative_llm_agent.tools.kgtool_cosine_sim.get_config", return_value=config)
+    neo4j = mocker.patch("narrative_llm_agent.util.neo4j_driver.GraphDatabase.driver")
+    clear_kg_snapshots()
+    clear_app_name_indexes()
+    clear_app_description_cache()
+    yield neo4j
+    clear_kg_snapshots()
+    clear_app_name_indexes()
+    clear_app_description_cache()
+
+
+def test_snapshot_backend(snapshot_backend):
+    assert get_kg_snapshot() is get_kg_snapshot()
+    assert get_candidates("SPAdes genome", "AppCatalog") == []
+    assert get_candidates("spades", "AppCatalog") == [{"candidate": "Assemble Reads with SPAdes"}]
+    assert "AppID: kb_SPAdes/run_SPAdes" in get_information("spades reads", "AppCatalog")
+    tool = InformationTool()
+    assert tool.fetch_app_description("checkm quality").endswith("AppID: kb_Msuite/run_checkM_lineage_wf")
+    snapshot_backend.assert_not_called()
+
+
+def test_neo4j_backend():
+    assert get_kg_snapshot() is None
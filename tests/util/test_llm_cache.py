@@ -0,0 +1,93 @@
+import pytest
+from langchain_core.language_models.fake_chat_models import FakeListChatModel
+from langchain_core.load import dumps
+from langchain_core.messages import AIMessage, HumanMessage
+
+from narrative_llm_agent.config import get_config
+from narrative_llm_agent.util.llm_cache import (
+    LLMResponseCache,
+    clear_llm_response_caches,
+    get_llm_cache_stats,
+    get_llm_response_cache,
+    make_cache_key,
+)
+from narrative_llm_agent.util.store import MemoryStore
+
+
+@pytest.fixture
+def fake_llm_cache() -> LLMResponseCache:
+    return LLMResponseCache(MemoryStore(), scope="test")
+
+
+def make_llm(cache: LLMResponseCache) -> FakeListChatModel:
+    return FakeListChatModel(responses=["first", "second", "third"], cache=cache)
+
+
+def test_cache_hit(fake_llm_cache: LLMResponseCache):
+    llm = make_llm(fake_llm_cache)
+    assert llm.invoke("hello").content == "first"
+    assert llm.invoke("hello").content == "first"
+    assert llm.invoke("something else").content == "second"
+    assert fake_llm_cache.stats.hits == 1
+    assert fake_llm_cache.stats.misses == 2
+    assert fake_llm_cache.stats.hit_rate == pytest.approx(1 / 3)
+
+
+def test_cache_shared_store(fake_llm_cache: LLMResponseCache):
+    make_llm(fake_llm_cache).invoke("hello")
+    other_cache = LLMResponseCache(fake_llm_cache.store, scope="other")
+    # a new model, as in a later run, gets the saved response
+    assert make_llm(other_cache).invoke("hello").content == "first"
+    assert other_cache.stats.hits == 1
+
+
+def test_cache_expires(fake_llm_cache: LLMResponseCache, mocker):
+    fake_llm_cache.ttl = 10
+    mock_time = mocker.patch("narrative_llm_agent.util.llm_cache.time.time", return_value=100)
+    llm = make_llm(fake_llm_cache)
+    assert llm.invoke("hello").content == "first"
+    mock_time.return_value = 105
+    assert llm.invoke("hello").content == "first"
+    mock_time.return_value = 111
+    assert llm.invoke("hello").content == "second"
+    assert fake_llm_cache.stats.hits == 1
+
+
+def test_cache_key_normalizes_messages():
+    first = [HumanMessage("hi", id="abc"), AIMessage("hey", id="run-1", response_metadata={"tokens": 5})]
+    second = [HumanMessage("hi", id="def"), AIMessage("hey", id="run-2", response_metadata={"tokens": 7})]
+    assert make_cache_key(dumps(first), "llm") == make_cache_key(dumps(second), "llm")
+    assert make_cache_key(dumps(first), "llm") != make_cache_key(dumps(first), "other llm")
+    assert make_cache_key(dumps([HumanMessage("hi")]), "llm") != make_cache_key(dumps([HumanMessage("bye")]), "llm")
+    assert make_cache_key("not json", "llm") == make_cache_key("not json", "llm")
+
+
+def test_clear(fake_llm_cache: LLMResponseCache):
+    llm = make_llm(fake_llm_cache)
+    llm.invoke("hello")
+    fake_llm_cache.clear()
+    assert llm.invoke("hello").content == "second"
+
+
+def test_get_llm_response_cache(mocker):
+    mocker.patch("narrative_llm_agent.util.llm_cache.get_kv_store", return_value=MemoryStore())
+    clear_llm_response_caches()
+    cache = get_llm_response_cache("analyst", ttl=60)
+    assert cache.ttl == 60
+    assert get_llm_response_cache("analyst") is cache
+    assert get_llm_cache_stats() == {"analyst": cache.stats}
+    clear_llm_response_caches()
+
+
+def test_get_llm_cache_scope(mocker):
+    mocker.patch("narrative_llm_agent.util.llm_cache.get_kv_store", return_value=MemoryStore())
+    clear_llm_response_caches()
+    config = get_config()
+    mocker.patch.object(config, "llm_response_cache_ttls", {"analyst": 0})
+    llm = config.get_llm("gpt-4o-openai", api_key="some_key", cache_scope="analyst")
+    assert isinstance(llm.cache, LLMResponseCache)
+    assert llm.cache.scope == "analyst"
+    assert llm.cache.ttl is None
+    assert config.get_llm("gpt-4o-openai", api_key="some_key", cache_scope="writer").cache is None
+    assert config.get_llm("gpt-4o-openai", api_key="some_key").cache is None
+    clear_llm_response_caches()
@@ -0,0 +1,58 @@
+import pytest
+
+from narrative_llm_agent.util.neo4j_driver import (
+    check_neo4j_driver,
+    close_neo4j_drivers,
+    get_neo4j_driver,
+)
+
+
+@pytest.fixture
+def mock_graph_db(mocker):
+    close_neo4j_drivers()
+    mock_driver = mocker.patch("narrative_llm_agent.util.neo4j_driver.GraphDatabase.driver")
+    mock_driver.side_effect = lambda *args, **kwargs: mocker.Mock()
+    yield mock_driver
+    close_neo4j_drivers()
+
+
+def test_get_neo4j_driver_is_shared(mock_graph_db):
+    driver = get_neo4j_driver("bolt://kg", "user", "pw")
+    assert get_neo4j_driver("bolt://kg", "user", "pw") is driver
+    assert get_neo4j_driver("bolt://other", "user", "pw") is not driver
+    assert mock_graph_db.call_count == 2
+    kwargs = mock_graph_db.call_args.kwargs
+    assert kwargs["auth"] == ("user", "pw")
+    assert kwargs["max_connection_pool_size"] == 50
+    assert kwargs["liveness_check_timeout"] == 60
+
+
+def test_get_neo4j_driver_from_env(mock_graph_db, monkeypatch):
+    monkeypatch.setenv("NEO4J_URI", "bolt://from_env")
+    monkeypatch.setenv("NEO4J_USERNAME", "env_user")
+    monkeypatch.setenv("NEO4J_PASSWORD", "env_pw")
+    get_neo4j_driver()
+    assert mock_graph_db.call_args.args == ("bolt://from_env",)
+    assert mock_graph_db.call_args.kwargs["auth"] == ("env_user", "env_pw")
+
+
+def test_get_neo4j_driver_no_uri(mock_graph_db, monkeypatch):
+    monkeypatch.delenv("NEO4J_URI", raising=False)
+    with pytest.raises(ValueError, match="No Neo4j URI"):
+        get_neo4j_driver()
+
+
+def test_check_neo4j_driver(mock_graph_db):
+    driver = get_neo4j_driver("bolt://kg", "user", "pw")
+    assert check_neo4j_driver("bolt://kg", "user", "pw")
+    driver.verify_connectivity.side_effect = ConnectionError("down")
+    assert not check_neo4j_driver("bolt://kg", "user", "pw")
+    driver.close.assert_called_once()
+    assert get_neo4j_driver("bolt://kg", "user", "pw") is not driver
+
+
+def test_close_neo4j_drivers(mock_graph_db):
+    driver = get_neo4j_driver("bolt://kg", "user", "pw")
+    close_neo4j_drivers()
+    driver.close.assert_called_once()
+    assert get_neo4j_driver("bolt://kg", "user", "pw") is not driver
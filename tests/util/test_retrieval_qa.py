@@ -0,0 +1,137 @@
+import threading
+import time
+
+import pytest
+from langchain.chains import RetrievalQA
+from langchain_chroma import Chroma
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.documents import Document
+from langchain_core.embeddings import DeterministicFakeEmbedding
+from langchain_core.language_models import FakeListLLM
+from langchain_core.runnables import RunnableLambda
+
+from narrative_llm_agent.util.retrieval_qa import (
+    NO_RELEVANT_TEXT,
+    MapReduceQA,
+    StuffQA,
+    make_qa_chain,
+)
+
+DOCS = [
+    Document(page_content="SPAdes assembles reads into contigs."),
+    Document(page_content="Prokka annotates a genome."),
+    Document(page_content="GTDB-Tk classifies a GenomeSet."),
+]
+
+
+class RecordingLLM:
+    """Stands in for an LLM, recording the prompts and how many were answered at once."""
+
+    def __init__(self, delay: float = 0.0, extract: str | None = None) -> None:
+        self.delay = delay
+        self.extract = extract
+        self.prompts = []
+        self.running = 0
+        self.max_running = 0
+        self._lock = threading.Lock()
+        self.runnable = RunnableLambda(self._answer)
+
+    def _answer(self, prompt) -> str:
+        text = prompt.to_string()
+        with self._lock:
+            self.prompts.append(text)
+            self.running += 1
+            self.max_running = max(self.max_running, self.running)
+        time.sleep(self.delay)
+        with self._lock:
+            self.running -= 1
+        if text.startswith("Use the following portion"):
+            if self.extract is not None:
+                return self.extract
+            return text.split("\n")[2]
+        return "the answer"
+
+
+def docs_retriever(docs=DOCS):
+    return RunnableLambda(lambda query: docs)
+
+
+def test_map_reduce_runs_documents_in_parallel():
+    llm = RecordingLLM(delay=0.2)
+    chain = MapReduceQA(llm.runnable, docs_retriever(), max_concurrency=8)
+    start = time.monotonic()
+    result = chain.invoke({"query": "what assembles reads?"})
+    elapsed = time.monotonic() - start
+    assert result == {"query": "what assembles reads?", "result": "the answer"}
+    assert llm.max_running == len(DOCS)
+    # all the map calls at once, then the answer, instead of one after another
+    assert elapsed < 0.2 * (len(DOCS) + 1)
+    answer_prompt = llm.prompts[-1]
+    for doc in DOCS:
+        assert doc.page_content in answer_prompt
+
+
+def test_map_reduce_max_concurrency():
+    llm = RecordingLLM(delay=0.05)
+    chain = MapReduceQA(llm.runnable, docs_retriever(), max_concurrency=1)
+    chain.invoke("what assembles reads?")
+    assert llm.max_running == 1
+    assert len(llm.prompts) == len(DOCS) + 1
+
+
+def test_map_reduce_drops_irrelevant_text():
+    llm = RecordingLLM(extract=NO_RELEVANT_TEXT)
+    chain = MapReduceQA(llm.runnable, docs_retriever())
+    assert chain.extract("a question", DOCS) == []
+    assert chain.extract("a question", []) == []
+    chain.invoke({"query": "a question"})
+    assert "SPAdes" not in llm.prompts[-1]
+
+
+class LLMCallRecorder(BaseCallbackHandler):
+    def __init__(self) -> None:
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def on_chain_start(self, serialized, inputs, **kwargs) -> None:
+        if kwargs.get("name") == "_answer":
+            with self._lock:
+                self.calls += 1
+
+
+def test_map_reduce_passes_config():
+    llm = RecordingLLM()
+    recorder = LLMCallRecorder()
+    chain = MapReduceQA(llm.runnable, docs_retriever())
+    chain.invoke({"query": "what assembles reads?"}, config={"callbacks": [recorder]})
+    # every map call gets the callbacks, as well as the answer
+    assert recorder.calls == len(DOCS) + 1
+
+
+def test_stuff_makes_one_call():
+    llm = RecordingLLM()
+    chain = StuffQA(llm.runnable, docs_retriever())
+    result = chain.invoke({"query": "what annotates a genome?"})
+    assert result["result"] == "the answer"
+    assert len(llm.prompts) == 1
+    for doc in DOCS:
+        assert doc.page_content in llm.prompts[0]
+
+
+def test_stuff_token_budget():
+    # each doc is under 10 tokens, at 4 bytes per token
+    chain = StuffQA(RecordingLLM().runnable, docs_retriever(), token_budget=20)
+    assert chain.fit_documents(DOCS) == [DOCS[0].page_content, DOCS[1].page_content]
+    big_doc = Document(page_content="x" * 1000)
+    assert chain.fit_documents([big_doc] + DOCS) == ["x" * 80]
+    assert chain.fit_documents([]) == []
+
+
+def test_make_qa_chain():
+    llm = RecordingLLM().runnable
+    retriever = Chroma.from_documents(DOCS, DeterministicFakeEmbedding(size=8)).as_retriever()
+    assert isinstance(make_qa_chain(FakeListLLM(responses=["ok"]), retriever), RetrievalQA)
+    assert isinstance(make_qa_chain(llm, retriever, chain_type="map_reduce"), MapReduceQA)
+    assert isinstance(make_qa_chain(llm, retriever, chain_type="stuff"), StuffQA)
+    with pytest.raises(ValueError, match="Unknown QA chain type 'not_a_chain'"):
+        make_qa_chain(llm, retriever, chain_type="not_a_chain")
@@ -0,0 +1,108 @@
+from unittest.mock import Mock
+import pytest
+from narrative_llm_agent.util.store import (
+    KeyValueStore,
+    MemoryStore,
+    RedisStore,
+    SqliteStore,
+    default_kv_store_path,
+    get_kv_store,
+)
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def kv_store(request, tmp_path):
+    if request.param == "memory":
+        return MemoryStore()
+    return SqliteStore(tmp_path / "test.db", table="test_store")
+
+
+def test_kv_store_set_get(kv_store):
+    assert kv_store.get("missing") is None
+    kv_store.set("a", b"1")
+    assert kv_store.get("a") == b"1"
+    kv_store.set("a", b"2")
+    assert kv_store.get("a") == b"2"
+
+
+def test_kv_store_keys_and_delete(kv_store):
+    for key in ["thread-1/b", "thread-1/a", "thread-10/a", "thread-2/a"]:
+        kv_store.set(key, b"x")
+    assert kv_store.keys("thread-1/") == ["thread-1/a", "thread-1/b"]
+    assert kv_store.keys() == ["thread-1/a", "thread-1/b", "thread-10/a", "thread-2/a"]
+    kv_store.delete(["thread-1/a", "not-a-key"])
+    assert kv_store.keys("thread-1") == ["thread-1/b", "thread-10/a"]
+
+
+def test_sqlite_store_persists(tmp_path):
+    db_path = tmp_path / "test.db"
+    store = SqliteStore(db_path)
+    store.set("key", b"value")
+    store.close()
+    assert SqliteStore(db_path).get("key") == b"value"
+    assert SqliteStore(db_path, table="other").get("key") is None
+
+
+def test_sqlite_store_bad_table(tmp_path):
+    with pytest.raises(ValueError, match="Invalid SQLite table name"):
+        SqliteStore(tmp_path / "test.db", table="drop table; --")
+
+
+def test_redis_store():
+    client = Mock()
+    client.get.return_value = b"value"
+    client.scan_iter.return_value = [b"ns:a*b/2", b"ns:a*b/1"]
+    store = RedisStore(client, namespace="ns:")
+    assert store.get("key") == b"value"
+    client.get.assert_called_once_with("ns:key")
+    store.set("key", b"value")
+    client.set.assert_called_once_with("ns:key", b"value")
+    store.delete(["a", "b"])
+    client.delete.assert_called_once_with("ns:a", "ns:b")
+    assert store.keys("a*b/") == ["a*b/1", "a*b/2"]
+    client.scan_iter.assert_called_once_with(match="ns:a\\*b/*")
+    store.close()
+    client.close.assert_called_once()
+
+
+def test_kv_store_is_abstract():
+    with pytest.raises(TypeError):
+        KeyValueStore()
+
+
+@pytest.mark.parametrize("store_type,expected", [("memory", MemoryStore), ("sqlite", SqliteStore)])
+def test_get_kv_store(mocker, tmp_path, store_type, expected):
+    config = Mock(kv_store=store_type, kv_store_path=str(tmp_path / "test.db"))
+    mocker.patch("narrative_llm_agent.util.store.get_config", return_value=config)
+    assert isinstance(get_kv_store("things"), expected)
+
+
+def test_get_kv_store_redis(mocker):
+    config = Mock(kv_store="redis", redis_url="redis://localhost:6379")
+    mocker.patch("narrative_llm_agent.util.store.get_config", return_value=config)
+    mock_from_url = mocker.patch("narrative_llm_agent.util.store.redis.from_url")
+    store = get_kv_store("things")
+    assert isinstance(store, RedisStore)
+    assert store.namespace == "narrative_llm_agent:things:"
+    mock_from_url.assert_called_once_with("redis://localhost:6379")
+
+
+def test_get_kv_store_fail(mocker):
+    config = Mock(kv_store="redis", redis_url=None)
+    mocker.patch("narrative_llm_agent.util.store.get_config", return_value=config)
+    with pytest.raises(ValueError, match="Redis URL must be set"):
+        get_kv_store("things")
+    config.kv_store = "floppy_disk"
+    with pytest.raises(ValueError, match="Unknown key-value store type 'floppy_disk'"):
+        get_kv_store("things")
+
+
+def test_get_kv_store_default_path(mocker, monkeypatch, tmp_path):
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path / "cache"))
+    assert default_kv_store_path() == tmp_path / "cache" / "narrative_llm_agent" / "kv_store.db"
+    config = Mock(kv_store="sqlite", kv_store_path=None)
+    mocker.patch("narrative_llm_agent.util.store.get_config", return_value=config)
+    store = get_kv_store("things")
+    assert isinstance(store, SqliteStore)
+    assert store.db_path == str(default_kv_store_path())
+    store.close()
@@ -0,0 +1,68 @@
+import pytest
+from chromadb.errors import NotFoundError
+from langchain_chroma import Chroma
+from langchain_core.embeddings import DeterministicFakeEmbedding
+
+from narrative_llm_agent.util.vector_stores import (
+    clear_vector_stores,
+    get_vector_store,
+    get_vector_store_stats,
+)
+
+
+@pytest.fixture
+def embeddings():
+    return DeterministicFakeEmbedding(size=8)
+
+
+@pytest.fixture
+def persisted_db(tmp_path, embeddings):
+    clear_vector_stores()
+    db_dir = tmp_path / "db"
+    Chroma.from_texts(
+        ["assemble reads with SPAdes", "annotate a genome with Prokka"],
+        embeddings,
+        persist_directory=str(db_dir),
+    )
+    yield db_dir
+    clear_vector_stores()
+
+
+def test_get_vector_store_is_shared(persisted_db, embeddings):
+    store = get_vector_store(persisted_db, embeddings)
+    assert get_vector_store(str(persisted_db), embeddings) is store
+    assert get_vector_store(persisted_db, DeterministicFakeEmbedding(size=8)) is store
+    docs = store.similarity_search("assemble reads with SPAdes", k=1)
+    assert docs[0].page_content == "assemble reads with SPAdes"
+
+
+def test_get_vector_store_stats(persisted_db, embeddings):
+    get_vector_store(persisted_db, embeddings)
+    stats = get_vector_store_stats()
+    assert len(stats) == 1
+    assert stats[0].persist_directory == str(persisted_db.resolve())
+    assert stats[0].embeddings == "DeterministicFakeEmbedding"
+    assert stats[0].open_seconds >= 0
+
+
+def test_vector_store_is_read_only(persisted_db, embeddings):
+    store = get_vector_store(persisted_db, embeddings)
+    with pytest.raises(RuntimeError, match="read-only"):
+        store.add_texts(["new text"])
+    with pytest.raises(RuntimeError, match="read-only"):
+        store.delete(["some_id"])
+    assert len(store.similarity_search("annotate", k=5)) == 2
+
+
+def test_clear_vector_stores(persisted_db, embeddings):
+    store = get_vector_store(persisted_db, embeddings)
+    clear_vector_stores()
+    assert get_vector_store_stats() == []
+    assert get_vector_store(persisted_db, embeddings) is not store
+
+
+def test_get_vector_store_missing_collection(tmp_path, embeddings):
+    clear_vector_stores()
+    with pytest.raises(NotFoundError):
+        get_vector_store(tmp_path / "empty", embeddings)
+    assert get_vector_store_stats() == []
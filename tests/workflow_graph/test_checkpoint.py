@@ -0,0 +1,156 @@
+from unittest.mock import patch
+import pytest
+from narrative_llm_agent.util.store import MemoryStore, SqliteStore
+from narrative_llm_agent.workflow_graph.checkpoint import (
+    CHECKPOINT_NAMESPACE,
+    KVCheckpointSaver,
+    analysis_thread_id,
+    close_checkpointer,
+    execution_thread_id,
+    get_checkpointer,
+)
+from narrative_llm_agent.workflow_graph.graph_hitl import ExecutionWorkflow
+from narrative_llm_agent.workflow_graph.nodes_hitl import WorkflowState
+
+STEPS = [
+    {"step": 1, "app_id": "Mod/assemble"},
+    {"step": 2, "app_id": "Mod/annotate"},
+]
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def checkpointer(request, tmp_path):
+    if request.param == "memory":
+        return KVCheckpointSaver(MemoryStore())
+    return KVCheckpointSaver(SqliteStore(tmp_path / "checkpoints.db", table="checkpoints"))
+
+
+def test_thread_ids():
+    assert analysis_thread_id(123) == "analysis-123"
+    thread_id = execution_thread_id(123, STEPS)
+    assert thread_id.startswith("execution-123-")
+    assert thread_id == execution_thread_id(123, [dict(step) for step in STEPS])
+    assert thread_id != execution_thread_id(123, STEPS[:1])
+    assert thread_id != execution_thread_id(124, STEPS)
+
+
+class FlakyNodes:
+    """Stands in for WorkflowNodes, where running the first step crashes once."""
+    def __init__(self):
+        self.app_runs = []
+        self.crashed = False
+
+    def workflow_validator_node(self, state: WorkflowState):
+        return state
+
+    def app_runner_node(self, state: WorkflowState):
+        step = state.steps_to_run[0]
+        if step["step"] == 2 and not self.crashed:
+            self.crashed = True
+            raise RuntimeError("redeployed!")
+        self.app_runs.append(step["app_id"])
+        return state.model_copy(update={
+            "steps_to_run": state.steps_to_run[1:],
+            "completed_steps": state.completed_steps + [step],
+            "last_executed_step": step,
+        })
+
+    def handle_error(self, state: WorkflowState):
+        return state
+
+    def workflow_end(self, state: WorkflowState):
+        return state.model_copy(update={"results": "done"})
+
+
+@pytest.fixture
+def flaky_nodes():
+    nodes = FlakyNodes()
+    with patch("narrative_llm_agent.workflow_graph.graph_hitl.WorkflowNodes", return_value=nodes):
+        yield nodes
+
+
+def _execution_state(narrative_id: int = 1) -> dict:
+    return {
+        "narrative_id": narrative_id,
+        "reads_id": "1/2/3",
+        "description": "test",
+        "steps_to_run": STEPS,
+        "completed_steps": [],
+        "last_executed_step": {},
+    }
+
+
+def test_execution_workflow_resume(flaky_nodes, checkpointer):
+    workflow = ExecutionWorkflow(kbase_token="test_token", checkpointer=checkpointer)
+    state = _execution_state()
+    with pytest.raises(RuntimeError, match="redeployed!"):
+        workflow.run(state)
+    assert workflow.get_finished_state(state) is None
+
+    # a new workflow, like after a restart, using the same store
+    workflow = ExecutionWorkflow(kbase_token="test_token", checkpointer=KVCheckpointSaver(checkpointer.store))
+    final_state = workflow.run(state, resume=True)
+    assert final_state["results"] == "done"
+    assert final_state["completed_steps"] == STEPS
+    # the first step only ran once
+    assert flaky_nodes.app_runs == ["Mod/assemble", "Mod/annotate"]
+    assert workflow.get_finished_state(state)["results"] == "done"
+
+
+def test_execution_workflow_no_resume(flaky_nodes, checkpointer):
+    workflow = ExecutionWorkflow(kbase_token="test_token", checkpointer=checkpointer)
+    state = _execution_state()
+    with pytest.raises(RuntimeError):
+        workflow.run(state)
+    final_state = workflow.run(state)
+    assert final_state["results"] == "done"
+    assert flaky_nodes.app_runs == ["Mod/assemble", "Mod/assemble", "Mod/annotate"]
+
+
+def test_execution_workflow_resume_other_plan(flaky_nodes, checkpointer):
+    workflow = ExecutionWorkflow(kbase_token="test_token", checkpointer=checkpointer)
+    with pytest.raises(RuntimeError):
+        workflow.run(_execution_state())
+    # a different plan doesn't pick up the old one
+    new_state = _execution_state()
+    new_state["steps_to_run"] = STEPS[:1]
+    final_state = workflow.run(new_state, resume=True)
+    assert final_state["completed_steps"] == STEPS[:1]
+    assert flaky_nodes.app_runs == ["Mod/assemble", "Mod/assemble"]
+
+
+def test_checkpointer_list_and_delete(flaky_nodes, checkpointer):
+    workflow = ExecutionWorkflow(kbase_token="test_token", checkpointer=checkpointer)
+    state = _execution_state()
+    state["steps_to_run"] = STEPS[:1]
+    workflow.run(state)
+    thread_id = execution_thread_id(1, STEPS[:1])
+    config = {"configurable": {"thread_id": thread_id}}
+    history = list(checkpointer.list(config))
+    assert len(history) > 1
+    checkpoint_ids = [checkpoint.config["configurable"]["checkpoint_id"] for checkpoint in history]
+    assert checkpoint_ids == sorted(checkpoint_ids, reverse=True)
+    assert checkpointer.get_tuple(config).config == history[0].config
+    assert history[0].parent_config == history[1].config
+    assert len(list(checkpointer.list(config, limit=2))) == 2
+    assert len(list(checkpointer.list(None))) == len(history)
+    assert list(checkpointer.list(config, before=history[1].config))[0].config == history[2].config
+
+    checkpointer.delete_thread(thread_id)
+    assert checkpointer.get_tuple(config) is None
+    assert workflow.get_finished_state(state) is None
+
+
+def test_get_checkpointer_shares_store(mocker):
+    store = mocker.Mock(spec=MemoryStore)
+    mock_get_kv_store = mocker.patch(
+        "narrative_llm_agent.workflow_graph.checkpoint.get_kv_store", return_value=store
+    )
+    close_checkpointer()
+    assert get_checkpointer().store is store
+    assert get_checkpointer().store is store
+    mock_get_kv_store.assert_called_once_with(CHECKPOINT_NAMESPACE)
+    close_checkpointer()
+    store.close.assert_called_once()
+    close_checkpointer()
+    store.close.assert_called_once()
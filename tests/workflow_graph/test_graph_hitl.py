@@ -1,6 +1,7 @@
 import pytest
 from unittest.mock import Mock, patch
 from narrative_llm_agent.tools.job_tools import CompletedJob
+from narrative_llm_agent.config import get_config
 from narrative_llm_agent.workflow_graph.graph_hitl import AnalysisWorkflow, ExecutionWorkflow, WorkflowCallback
 from narrative_llm_agent.workflow_graph.nodes_hitl import WorkflowState
 
@@ -192,7 +193,8 @@ class TestAnalysisWorkflow:
                 "reads_id": "test_reads",
                 "results": None,
                 "human_approval_status": None,
-                "validation_reasoning": ""
+                "validation_reasoning": "",
+                "plan_issues": [],
             }
             print(result)
             # Verify the workflow completed successfully
@@ -215,7 +217,10 @@ class TestExecutionWorkflow:
             validator_token=None,
             app_flow_token=None,
             writer_token=None,
-            embedding_token=None
+            embedding_token=None,
+            job_memo=None,
+            param_templates=None,
+            job_mode=None,
         )
 
         # Check that the graph was built
@@ -244,6 +249,25 @@ class TestExecutionWorkflow:
         # Verify that graph was compiled
         mock_graph_instance.compile.assert_called_once()
 
+    def test_build_execution_dag_graph(self, mock_workflow_nodes, mock_state_graph):
+        """Test building the concurrent graph when max_concurrency is more than 1"""
+        workflow = ExecutionWorkflow(kbase_token="test_token", max_concurrency=3)
+        assert workflow.max_concurrency == 3
+
+        mock_graph_instance = mock_state_graph.return_value
+        assert mock_graph_instance.add_node.call_count == 3
+        assert mock_graph_instance.add_conditional_edges.call_count == 1
+        assert mock_graph_instance.add_edge.call_count == 2
+        mock_graph_instance.set_entry_point.assert_called_once_with("run_workflow_steps")
+        mock_graph_instance.compile.assert_called_once()
+
+    def test_execution_workflow_max_concurrency_from_config(self, mock_workflow_nodes, mock_state_graph, mocker):
+        """Test that max_concurrency defaults to the config value"""
+        mocker.patch.object(get_config(), "workflow_max_concurrency", 4)
+        workflow = ExecutionWorkflow(kbase_token="test_token")
+        assert workflow.max_concurrency == 4
+        mock_state_graph.return_value.set_entry_point.assert_called_once_with("run_workflow_steps")
+
     def test_run_execution_workflow(self, mock_workflow_nodes, mock_state_graph):
         """Test running a workflow with parameters"""
         # Setup mock compiled graph
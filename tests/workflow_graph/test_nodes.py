@@ -251,6 +251,27 @@ def test_workflow_validator_node_continue(workflow_nodes, mock_validator_agent,
     assert "validation_reasoning" in result.__dict__
     assert result.validation_reasoning == "All looks good"
 
+def test_workflow_validator_node_embeddings(mock_llm_factory, mock_validator_agent, mock_extract_json_curly):
+    """Test that the validator gets the embeddings for the embedding provider."""
+    workflow_nodes = WorkflowNodes(*[VALID_LLM_NAME] * 4, "cborg", token="mock_token", embedding_token="embedding_key")
+    state = WorkflowState(
+        description="Test workflow",
+        narrative_id=123,
+        reads_id="test_reads",
+        steps_to_run=[{"Step": 2, "Name": "Next Step", "App": "NextApp"}],
+        last_executed_step={"Step": 1, "Name": "Previous Step", "App": "PrevApp"},
+        completed_steps=[],
+        step_result=CompletedJob(job_id="123", job_status="completed", created_objects=[], narrative_id=123),
+        input_object_upa="1/2/3"
+    )
+    mock_extract_json_curly.return_value = {"continue_as_planned": True, "reasoning": "", "input_object_upa": "1/2/3"}
+    embeddings = Mock()
+    with patch('narrative_llm_agent.workflow_graph.nodes.make_workflow_embeddings', return_value=embeddings) as mock_make:
+        workflow_nodes.workflow_validator_node(state)
+    mock_make.assert_called_once_with("cborg", "embedding_key", None)
+    assert mock_validator_agent.call_args.kwargs["embeddings"] is embeddings
+
+
 def test_workflow_validator_node_modify(workflow_nodes, mock_validator_agent, mock_extract_json_curly):
     """Test the workflow_validator_node when modifying the steps."""
     # Create a state with steps left to run
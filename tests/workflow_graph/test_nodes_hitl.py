@@ -1,5 +1,9 @@
 from narrative_llm_agent.workflow_graph.nodes_hitl import WorkflowNodes, WorkflowState
 from narrative_llm_agent.agents.analyst_lang import AnalysisSteps
+from narrative_llm_agent.config import get_config
+from narrative_llm_agent.tools.job_tools import CompletedJob, CreatedObject, JobMemoLedger
+from narrative_llm_agent.tools.param_template_tools import ParamTemplateStore
+from concurrent.futures import ThreadPoolExecutor
 import pytest
 from unittest.mock import Mock, patch
 
@@ -55,6 +59,40 @@ def test_init_wf_nodes():
     assert isinstance(nodes, WorkflowNodes)
 
 
+def test_init_wf_nodes_job_memo(mocker, mock_llm_factory):
+    assert WorkflowNodes(*[VALID_LLM_NAME] * 4, "cborg", token="mock_token")._job_memo is None
+    config = get_config()
+    mocker.patch.object(config, "job_memo", True)
+    mocker.patch.object(config, "job_memo_scope", [2000])
+    nodes = WorkflowNodes(*[VALID_LLM_NAME] * 4, "cborg", token="mock_token")
+    assert isinstance(nodes._job_memo, JobMemoLedger)
+    assert nodes._job_memo._scope == [2000]
+    mock_job_crew = mocker.patch("narrative_llm_agent.workflow_graph.nodes_hitl.JobCrew")
+    nodes._build_job_crew()
+    assert mock_job_crew.call_args.kwargs["job_memo"] is nodes._job_memo
+
+
+def test_init_wf_nodes_param_templates(mocker, mock_llm_factory):
+    assert WorkflowNodes(*[VALID_LLM_NAME] * 4, "cborg", token="mock_token")._param_templates is None
+    mocker.patch.object(get_config(), "param_templates", True)
+    nodes = WorkflowNodes(*[VALID_LLM_NAME] * 4, "cborg", token="mock_token")
+    assert isinstance(nodes._param_templates, ParamTemplateStore)
+    mock_job_crew = mocker.patch("narrative_llm_agent.workflow_graph.nodes_hitl.JobCrew")
+    nodes._build_job_crew()
+    assert mock_job_crew.call_args.kwargs["param_templates"] is nodes._param_templates
+
+
+def test_init_wf_nodes_job_mode(mocker, mock_llm_factory):
+    mock_job_crew = mocker.patch("narrative_llm_agent.workflow_graph.nodes_hitl.JobCrew")
+    WorkflowNodes(*[VALID_LLM_NAME] * 4, "cborg", token="mock_token")._build_job_crew()
+    assert mock_job_crew.call_args.kwargs["job_mode"] == "crew"
+    mocker.patch.object(get_config(), "job_mode", "direct")
+    WorkflowNodes(*[VALID_LLM_NAME] * 4, "cborg", token="mock_token")._build_job_crew()
+    assert mock_job_crew.call_args.kwargs["job_mode"] == "direct"
+    WorkflowNodes(*[VALID_LLM_NAME] * 4, "cborg", token="mock_token", job_mode="crew")._build_job_crew()
+    assert mock_job_crew.call_args.kwargs["job_mode"] == "crew"
+
+
 def test_init_wf_nodes_token_fail():
     with pytest.raises(ValueError, match="KBase auth token must be provided"):
         WorkflowNodes("llm1", "llm2", "llm3", "llm4", "embed")
@@ -199,3 +237,195 @@ class TestWorkflowValidatorNode:
 
         next_state = workflow_nodes.workflow_validator_node(state)
         assert "Some stuff failed with the LLM!" in next_state.error
+
+
+class TestValidatorFastPath:
+    narrative_id = 123
+    next_step = {"step": 2, "app_id": "Mod/annotate", "expect_new_object": True}
+    last_step = {"step": 1, "app_id": "Mod/assemble", "expect_new_object": True}
+    object_types = {"1/1/1": "KBaseFile.PairedEndLibrary-2.0", "1/2/1": "KBaseGenomeAnnotations.Assembly-6.0"}
+
+    @pytest.fixture
+    def fast_nodes(self, mocker, workflow_nodes: WorkflowNodes):
+        mocker.patch.object(
+            workflow_nodes._object_infos,
+            "get_object_info",
+            side_effect=lambda upa: Mock(type=self.object_types[upa]),
+        )
+        mocker.patch.object(
+            workflow_nodes._app_specs,
+            "get_app_spec",
+            return_value=Mock(info=Mock(input_types=["KBaseGenomeAnnotations.Assembly"])),
+        )
+        return workflow_nodes
+
+    def _make_state(self, base_wf_state: WorkflowState, job_status: str = "completed", created: list[str] | None = None) -> WorkflowState:
+        created_objects = [CreatedObject(object_upa=upa, object_name="obj") for upa in (created or [])]
+        return base_wf_state.model_copy(update={
+            "steps_to_run": [self.next_step],
+            "last_executed_step": self.last_step,
+            "completed_steps": [self.last_step],
+            "reads_id": "1/1/1",
+            "input_object_upa": "1/1/1",
+            "last_data_object_upa": created[0] if created else "1/1/1",
+            "narrative_id": self.narrative_id,
+            "step_result": CompletedJob(
+                job_id="job1", job_status=job_status, created_objects=created_objects, narrative_id=self.narrative_id
+            ),
+        })
+
+    def test_validator_gets_embeddings(self, mocker, mock_llm_factory):
+        embeddings = Mock()
+        mock_make = mocker.patch(
+            "narrative_llm_agent.workflow_graph.nodes_hitl.make_workflow_embeddings", return_value=embeddings
+        )
+        mock_agent = mocker.patch("narrative_llm_agent.workflow_graph.nodes_hitl.WorkflowValidatorAgent")
+        nodes = WorkflowNodes(*[VALID_LLM_NAME] * 4, "cborg", token="mock_token", analyst_token="analyst_key")
+        nodes._build_validator()
+        mock_make.assert_called_once_with("cborg", None, "analyst_key")
+        assert mock_agent.call_args.kwargs["embeddings"] is embeddings
+
+    def test_fast_path_continue(self, mocker, fast_nodes: WorkflowNodes, base_wf_state: WorkflowState):
+        mock_agent = mocker.patch("narrative_llm_agent.workflow_graph.nodes_hitl.WorkflowValidatorAgent")
+        next_state = fast_nodes.workflow_validator_node(self._make_state(base_wf_state, created=["1/2/1"]))
+        mock_agent.assert_not_called()
+        assert next_state.input_object_upa == "1/2/1"
+        assert next_state.steps_to_run == [self.next_step]
+        assert "KBaseGenomeAnnotations.Assembly" in next_state.validation_reasoning
+        assert fast_nodes.validation_stats.fast_path == 1
+        assert fast_nodes.validation_stats.agent == 0
+        assert fast_nodes.validation_stats.fast_path_rate == 1.0
+
+    def test_fast_path_counts_from_threads(self, mocker, fast_nodes: WorkflowNodes, base_wf_state: WorkflowState):
+        mocker.patch("narrative_llm_agent.workflow_graph.nodes_hitl.WorkflowValidatorAgent")
+        state = self._make_state(base_wf_state, created=["1/2/1"])
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            list(executor.map(lambda _: fast_nodes.workflow_validator_node(state), range(40)))
+        assert fast_nodes.validation_stats.fast_path == 40
+        assert fast_nodes.validation_stats.agent == 0
+
+    def test_fast_path_first_step(self, mocker, fast_nodes: WorkflowNodes, base_wf_state: WorkflowState):
+        mocker.patch.object(
+            fast_nodes._app_specs,
+            "get_app_spec",
+            return_value=Mock(info=Mock(input_types=["KBaseFile.PairedEndLibrary"])),
+        )
+        state = base_wf_state.model_copy(update={"steps_to_run": [self.last_step], "reads_id": "1/1/1"})
+        next_state = fast_nodes.workflow_validator_node(state)
+        assert next_state.input_object_upa == "1/1/1"
+        assert fast_nodes.validation_stats.fast_path == 1
+
+    @pytest.mark.parametrize("job_status,created", [
+        ("error", ["1/2/1"]),  # job failed
+        ("completed", []),  # no new object
+        ("completed", ["1/1/1"]),  # wrong type
+    ])
+    def test_fast_path_fallback(self, mocker, fast_nodes: WorkflowNodes, base_wf_state: WorkflowState, mock_validator_agent, job_status, created):
+        mocker.patch(
+            "narrative_llm_agent.workflow_graph.nodes_hitl.WorkflowValidatorAgent",
+            return_value=mock_validator_agent
+        )
+        next_state = fast_nodes.workflow_validator_node(self._make_state(base_wf_state, job_status=job_status, created=created))
+        assert next_state.validation_reasoning == "Test validation passed"
+        assert fast_nodes.validation_stats.fast_path == 0
+        assert fast_nodes.validation_stats.agent == 1
+        assert fast_nodes.validation_stats.fast_path_rate == 0.0
+
+class TestDagRunnerNode:
+    steps = [
+        {"step": 1, "app_id": "Mod/assemble", "input_data_object": ["reads"], "output_data_object": ["assembly"], "expect_new_object": True},
+        {"step": 2, "app_id": "Mod/assess", "input_data_object": ["assembly"], "output_data_object": ["report"], "expect_new_object": False},
+        {"step": 3, "app_id": "Mod/annotate", "input_data_object": ["assembly"], "output_data_object": ["genome"], "expect_new_object": True},
+        {"step": 4, "app_id": "Mod/build_set", "input_data_object": ["genome"], "output_data_object": ["genome set"], "expect_new_object": True},
+    ]
+
+    def _make_state(self, base_wf_state: WorkflowState) -> WorkflowState:
+        return base_wf_state.model_copy(update={"steps_to_run": self.steps, "narrative_id": 5, "reads_id": "5/1/1"})
+
+    def _completed_job(self, upa: str | None) -> CompletedJob:
+        created = [CreatedObject(object_upa=upa, object_name="obj")] if upa else []
+        return CompletedJob(job_id="job", job_status="completed", created_objects=created, narrative_id=5)
+
+    @pytest.fixture(autouse=True)
+    def mock_validator(self, mocker, workflow_nodes: WorkflowNodes):
+        return mocker.patch.object(workflow_nodes, "workflow_validator_node", side_effect=lambda state: state)
+
+    def test_dag_runner_node_ok(self, mocker, workflow_nodes: WorkflowNodes, base_wf_state: WorkflowState):
+        upas = {"Mod/assemble": "5/2/1", "Mod/assess": None, "Mod/annotate": "5/3/1", "Mod/build_set": "5/4/1"}
+        mock_run = mocker.patch.object(
+            workflow_nodes, "_run_step", side_effect=lambda app_id, upa, narr_id: self._completed_job(upas[app_id])
+        )
+        next_state = workflow_nodes.dag_runner_node(self._make_state(base_wf_state), max_concurrency=2)
+        assert next_state.error is None
+        assert next_state.steps_to_run == []
+        assert next_state.completed_steps == self.steps
+        assert next_state.last_executed_step == self.steps[3]
+        assert next_state.last_data_object_upa == "5/4/1"
+        mock_run.assert_any_call("Mod/assemble", "5/1/1", 5)
+        mock_run.assert_any_call("Mod/build_set", "5/3/1", 5)
+
+    def test_dag_runner_node_failure(self, mocker, workflow_nodes: WorkflowNodes, base_wf_state: WorkflowState):
+        def run_step(app_id, upa, narr_id):
+            if app_id == "Mod/annotate":
+                raise ValueError("bad genome")
+            return self._completed_job("5/2/1" if app_id == "Mod/assemble" else None)
+
+        mocker.patch.object(workflow_nodes, "_run_step", side_effect=run_step)
+        next_state = workflow_nodes.dag_runner_node(self._make_state(base_wf_state), max_concurrency=2)
+        assert next_state.error == "Step 3 (Mod/annotate) failed: bad genome"
+        assert next_state.completed_steps == self.steps[:2]
+        assert next_state.steps_to_run == self.steps[2:]
+        assert next_state.last_executed_step == self.steps[1]
+        assert next_state.last_data_object_upa == "5/2/1"
+
+    def test_dag_runner_node_validates_steps(
+        self, mocker, mock_validator, workflow_nodes: WorkflowNodes, base_wf_state: WorkflowState
+    ):
+        def validate(state):
+            step = state.steps_to_run[0]
+            if step["app_id"] == "Mod/build_set":
+                return state.model_copy(update={"steps_to_run": [], "validation_reasoning": "genome looks wrong"})
+            return state
+
+        mock_validator.side_effect = validate
+        mock_run = mocker.patch.object(
+            workflow_nodes, "_run_step", side_effect=lambda app_id, upa, narr_id: self._completed_job("5/2/1")
+        )
+        next_state = workflow_nodes.dag_runner_node(self._make_state(base_wf_state), max_concurrency=2)
+        assert mock_validator.call_count == 4
+        assert mock_run.call_count == 3
+        checked = {call.args[0].steps_to_run[0]["app_id"]: call.args[0] for call in mock_validator.call_args_list}
+        assert checked["Mod/assemble"].last_executed_step == {}
+        assert checked["Mod/annotate"].last_executed_step == self.steps[0]
+        assert checked["Mod/annotate"].input_object_upa == "5/2/1"
+        assert next_state.error.startswith("Step 4 (Mod/build_set) failed: The validator would stop or change this step")
+        assert "genome looks wrong" in next_state.error
+        assert next_state.completed_steps == self.steps[:3]
+        assert next_state.steps_to_run == self.steps[3:]
+
+
+def test_run_step_reuses_job_crew(mocker, workflow_nodes: WorkflowNodes):
+    mock_job_crew = mocker.patch("narrative_llm_agent.workflow_graph.nodes_hitl.JobCrew")
+    job = CompletedJob(job_id="job", job_status="completed", narrative_id=5)
+    mock_job_crew.return_value.start_job.return_value.pydantic = job
+    assert workflow_nodes._run_step("Mod/assemble", "5/1/1", 5) == job
+    assert workflow_nodes._run_step("Mod/annotate", "5/2/1", 5) == job
+    mock_job_crew.assert_called_once()
+    assert mock_job_crew.return_value.reset.call_count == 2
+    stats = workflow_nodes.agent_pool_stats["job_crew"]
+    assert stats.built == 1
+    assert stats.reused == 1
+
+
+def test_human_approval_node_shows_plan_issues(capsys, workflow_nodes: WorkflowNodes, base_wf_state: WorkflowState):
+    state = base_wf_state.model_copy(update={
+        "steps_to_run": [{"step": 1, "name": "Classify", "app": "GTDB-Tk", "app_id": "kb_gtdbtk/run_kb_gtdbtk"}],
+        "plan_issues": ["Step 1 needs a KBaseSearch.GenomeSet, but none is made before it"],
+        "awaiting_approval": True,
+    })
+    result = workflow_nodes.human_approval_node(state)
+    assert result.awaiting_approval
+    assert result.plan_issues == state.plan_issues
+    printed = capsys.readouterr().out
+    assert "App ID: kb_gtdbtk/run_kb_gtdbtk" in printed
+    assert "Plan issues to review before approving:\n   - Step 1 needs a KBaseSearch.GenomeSet" in printed
@@ -0,0 +1,147 @@
+import threading
+import time
+import pytest
+from narrative_llm_agent.tools.job_tools import CompletedJob, CreatedObject
+from narrative_llm_agent.workflow_graph.scheduler import build_step_dag, run_step_dag
+
+
+def _step(num: int, inputs: list[str], outputs: list[str], new_object: bool = True) -> dict:
+    return {
+        "step": num,
+        "app_id": f"Module/app_{num}",
+        "input_data_object": inputs,
+        "output_data_object": outputs,
+        "expect_new_object": new_object,
+    }
+
+
+def _job(step: dict, upa: str | None = None, error: str | None = None) -> CompletedJob:
+    created = [CreatedObject(object_upa=upa, object_name=f"obj_{step['step']}")] if upa else []
+    return CompletedJob(
+        job_id=f"job_{step['step']}",
+        job_status="error" if error else "completed",
+        created_objects=created,
+        job_error=error,
+        narrative_id=1,
+    )
+
+
+# reads -> assembly, then two independent steps on the assembly, then one that needs both
+DIAMOND_STEPS = [
+    _step(1, ["paired-end reads"], ["Assembly"]),
+    _step(2, ["assembly"], ["QUAST report"], new_object=False),
+    _step(3, ["Assembly"], ["Genome"]),
+    _step(4, ["QUAST report", "Genome"], ["GenomeSet"]),
+]
+
+
+def test_build_step_dag():
+    assert build_step_dag(DIAMOND_STEPS) == [set(), {0}, {0}, {1, 2}]
+
+
+def test_build_step_dag_falls_back_to_last_new_object():
+    steps = [
+        _step(1, ["reads"], ["Assembly"]),
+        _step(2, ["Assembly"], ["report"], new_object=False),
+        _step(3, ["something else"], ["Genome"]),
+    ]
+    assert build_step_dag(steps) == [set(), {0}, {0}]
+
+
+def test_build_step_dag_empty():
+    assert build_step_dag([]) == []
+
+
+def test_run_step_dag_input_upas():
+    upas = {1: "1/2/1", 2: None, 3: "1/3/1", 4: "1/4/1"}
+
+    def run_step(step, input_upa):
+        return _job(step, upas[step["step"]])
+
+    outcomes = run_step_dag(DIAMOND_STEPS, run_step, "1/1/1", max_concurrency=2)
+    assert [outcome.index for outcome in outcomes] == [0, 1, 2, 3]
+    assert all(outcome.succeeded for outcome in outcomes)
+    assert [outcome.input_object_upa for outcome in outcomes] == ["1/1/1", "1/2/1", "1/2/1", "1/3/1"]
+
+
+@pytest.mark.parametrize("max_concurrency", [1, 2, 3])
+def test_run_step_dag_concurrency_limit(max_concurrency):
+    steps = [_step(1, ["reads"], ["Assembly"])] + [
+        _step(num, ["Assembly"], [f"report {num}"], new_object=False) for num in range(2, 7)
+    ]
+    lock = threading.Lock()
+    active = 0
+    peak = 0
+
+    def run_step(step, input_upa):
+        nonlocal active, peak
+        with lock:
+            active += 1
+            peak = max(peak, active)
+        time.sleep(0.05)
+        with lock:
+            active -= 1
+        return _job(step, "1/2/1" if step["step"] == 1 else None)
+
+    outcomes = run_step_dag(steps, run_step, "1/1/1", max_concurrency=max_concurrency)
+    assert all(outcome.succeeded for outcome in outcomes)
+    assert peak == max_concurrency
+
+
+def test_run_step_dag_order_is_deterministic():
+    # later steps finish first, results should still come back in plan order
+    steps = [_step(num, ["reads"], [f"report {num}"], new_object=False) for num in range(1, 5)]
+
+    def run_step(step, input_upa):
+        time.sleep(0.05 * (5 - step["step"]))
+        return _job(step)
+
+    outcomes = run_step_dag(steps, run_step, "1/1/1", max_concurrency=4)
+    assert [outcome.result.job_id for outcome in outcomes] == ["job_1", "job_2", "job_3", "job_4"]
+
+
+def test_run_step_dag_skips_dependents_of_failures():
+    def run_step(step, input_upa):
+        if step["step"] == 3:
+            raise RuntimeError("annotation failed")
+        return _job(step, f"1/{step['step'] + 1}/1")
+
+    outcomes = run_step_dag(DIAMOND_STEPS, run_step, "1/1/1", max_concurrency=2)
+    assert [outcome.succeeded for outcome in outcomes] == [True, True, False, False]
+    assert outcomes[2].error == "annotation failed"
+    assert not outcomes[2].skipped
+    assert outcomes[3].skipped
+    assert outcomes[3].result is None
+
+
+def test_run_step_dag_job_error_is_failure():
+    def run_step(step, input_upa):
+        return _job(step, "1/2/1", error="job died" if step["step"] == 1 else None)
+
+    outcomes = run_step_dag(DIAMOND_STEPS, run_step, "1/1/1", max_concurrency=2)
+    assert outcomes[0].error == "job died"
+    assert [outcome.skipped for outcome in outcomes] == [False, True, True, True]
+
+
+def test_run_step_dag_validate_step():
+    seen = {}
+
+    def validate_step(step, input_upa, dependencies):
+        seen[step["step"]] = (input_upa, [dep.index for dep in dependencies])
+        if step["step"] == 3:
+            return "1/9/1"
+        if step["step"] == 2:
+            raise RuntimeError("validator said no")
+        return input_upa
+
+    def run_step(step, input_upa):
+        return _job(step, f"1/{step['step'] + 1}/1")
+
+    outcomes = run_step_dag(DIAMOND_STEPS, run_step, "1/1/1", max_concurrency=2, validate_step=validate_step)
+    assert seen[1] == ("1/1/1", [])
+    assert seen[3] == ("1/2/1", [0])
+    assert 4 not in seen
+    assert outcomes[2].input_object_upa == "1/9/1"
+    assert outcomes[1].error == "validator said no"
+    assert outcomes[1].result is None
+    assert outcomes[3].skipped